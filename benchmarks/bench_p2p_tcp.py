@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_p2p_tcp.py
+request_inference over the TCP transport: worker nodes run in separate
+processes on loopback, the client issues sequential and concurrent
+requests and reports latency percentiles and throughput.
+
+Usage: python benchmarks/bench_p2p_tcp.py [--workers 3] [--requests 500] [--concurrency 32]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from ultimate_agent.network.p2p.distributed_ai import NodeType, P2PNetworkManager  # noqa: E402
+
+SECRET = "bench-secret"
+MODEL = "bench-model"
+
+
+def node_config(models):
+    return {'transport': 'tcp', 'network_secret': SECRET, 'models': models, 'rpc_timeout': 5.0}
+
+
+async def start(node):
+    await node.transport.start()
+    node.running = True
+    asyncio.create_task(node._message_dispatch_loop())
+
+
+def worker_main(name, bootstrap, ready):
+    async def serve():
+        node = P2PNetworkManager(name, NodeType.COMPUTE_NODE, node_config([MODEL]))
+        await start(node)
+        if bootstrap:
+            await node.join_network([bootstrap])
+        ready.put(node.transport.address)
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+async def run_client(bootstrap, requests, concurrency, workers):
+    client = P2PNetworkManager("bench-client", NodeType.COMPUTE_NODE, node_config([]))
+    await start(client)
+    await client.join_network([bootstrap])
+    holders = client.dht.find_nodes_with_model(MODEL)
+    print(f"client sees {len(holders)}/{workers} workers holding {MODEL}")
+
+    latencies = []
+
+    async def one(i):
+        start_time = time.perf_counter()
+        result = await client.request_inference(MODEL, {'prompt': f'request {i}'}, timeout=10.0)
+        latencies.append(time.perf_counter() - start_time)
+        return result['success']
+
+    for i in range(min(50, requests)):
+        await one(i)
+    sequential = sorted(latencies)
+    latencies.clear()
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(i):
+        async with semaphore:
+            return await one(i)
+
+    start_time = time.perf_counter()
+    outcomes = await asyncio.gather(*(bounded(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start_time
+
+    stats = client.get_network_status()
+    client.running = False
+    await client.transport.stop()
+    return sequential, sorted(latencies), elapsed, outcomes, stats
+
+
+def pct(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))] * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    ready = ctx.Queue()
+    processes = []
+    bootstrap = None
+    for i in range(args.workers):
+        process = ctx.Process(target=worker_main, args=(f"bench-worker-{i}", bootstrap, ready), daemon=True)
+        process.start()
+        processes.append(process)
+        address = ready.get(timeout=30)
+        bootstrap = bootstrap or address
+
+    try:
+        sequential, concurrent, elapsed, outcomes, stats = asyncio.run(
+            run_client(bootstrap, args.requests, args.concurrency, args.workers)
+        )
+    finally:
+        for process in processes:
+            process.terminate()
+
+    print(f"sequential   p50 {pct(sequential, 0.5):7.2f} ms  p99 {pct(sequential, 0.99):7.2f} ms")
+    print(f"concurrent   p50 {pct(concurrent, 0.5):7.2f} ms  p99 {pct(concurrent, 0.99):7.2f} ms  "
+          f"mean {statistics.mean(concurrent) * 1e3:7.2f} ms")
+    print(f"throughput   {len(outcomes) / elapsed:8.1f} req/s  "
+          f"({sum(outcomes)}/{len(outcomes)} succeeded, concurrency {args.concurrency})")
+    transport = stats['transport']
+    print(f"transport    {transport['frames_sent']} frames in {transport['batches_sent']} writes, "
+          f"{transport['dropped_frames']} dropped, {transport['reconnects']} reconnects")
+
+
+if __name__ == '__main__':
+    main()
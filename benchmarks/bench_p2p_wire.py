@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_p2p_wire.py
+Encode/decode cost and wire size of P2PMessage: the JSON+zlib encoding
+against the binary envelope, including a relay hop (decode, ttl/path
+update, re-encode).
+
+Usage: python benchmarks/bench_p2p_wire.py [--iterations 2000]
+"""
+
+import argparse
+import base64
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from ultimate_agent.network.p2p.distributed_ai import P2PMessage, MessageType  # noqa: E402
+
+
+def payloads():
+    rng = np.random.default_rng(0)
+    tensor = rng.standard_normal((256, 256), dtype=np.float32)
+    blob = rng.integers(0, 256, 256 * 1024, dtype=np.uint8).tobytes()
+    return {
+        'heartbeat': ({'timestamp': time.time(), 'load': 0.42, 'active_inferences': 3}, None),
+        'announce': ({'node_id': 'node-1', 'models': [f'model-{i}' for i in range(50)],
+                      'compute_power': 12.5, 'memory_gb': 64.0, 'bandwidth_mbps': 1000.0}, None),
+        # The JSON path can only carry these as lists / base64 text
+        'tensor_256x256': (tensor, {'tensor': tensor.tolist()}),
+        'bytes_256k': (blob, {'blob': base64.b64encode(blob).decode('ascii')}),
+    }
+
+
+def timed(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        result = fn()
+    return (time.perf_counter() - start) / iterations * 1e6, result
+
+
+def relay(data: bytes, legacy: bool) -> bytes:
+    if legacy:
+        msg = P2PMessage.deserialize_legacy(data)
+        msg.ttl -= 1
+        msg.path.append('relay')
+        return msg.serialize_legacy()
+    msg = P2PMessage.deserialize(data)
+    msg.ttl -= 1
+    msg.path.append('relay')
+    return msg.serialize()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'payload':<16}{'format':<8}{'bytes':>10}{'encode us':>12}{'decode us':>12}{'relay us':>12}")
+    for name, (native, json_form) in payloads().items():
+        iterations = args.iterations if json_form is None else max(10, args.iterations // 50)
+        legacy_msg = P2PMessage(MessageType.PARTIAL_RESULT, 'node-1', json_form if json_form is not None else native)
+        encode_legacy, legacy_bytes = timed(legacy_msg.serialize_legacy, iterations)
+        decode_legacy, _ = timed(lambda: P2PMessage.deserialize_legacy(legacy_bytes).data, iterations)
+        relay_legacy, _ = timed(lambda: relay(legacy_bytes, True), iterations)
+
+        # Fresh message per encode so the cached payload frame is not reused
+        encode_binary, binary_bytes = timed(
+            lambda: P2PMessage(MessageType.PARTIAL_RESULT, 'node-1', native).serialize(), iterations)
+        decode_binary, _ = timed(lambda: P2PMessage.deserialize(binary_bytes).data, iterations)
+        relay_binary, _ = timed(lambda: relay(binary_bytes, False), iterations)
+
+        print(f"{name:<16}{'json':<8}{len(legacy_bytes):>10}{encode_legacy:>12.1f}{decode_legacy:>12.1f}{relay_legacy:>12.1f}")
+        print(f"{'':<16}{'binary':<8}{len(binary_bytes):>10}{encode_binary:>12.1f}{decode_binary:>12.1f}{relay_binary:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from ultimate_agent.storage.database.migrations import DatabaseManager
+
+
+def _task(i):
+    return {'id': f"rec-{i}", 'task_id': f"task-{i}", 'task_type': "inference", 'duration': 0.1,
+            'success': True, 'reward': 0.01, 'ai_result': {'score': i}}
+
+
+def test_saves_are_batched_and_flushed_by_size_and_interval(tmp_path):
+    db = DatabaseManager(str(tmp_path / "agent.db"), batch_size=100, flush_interval=0.05)
+    try:
+        start = time.perf_counter()
+        for i in range(250):
+            assert db.save_task_record(_task(i))
+            db.save_performance_metric({'cpu_percent': i})
+        enqueue_time = time.perf_counter() - start
+
+        deadline = time.time() + 2.0
+        while db.get_write_stats()['queue_depth'] and time.time() < deadline:
+            time.sleep(0.01)
+        stats = db.get_database_stats()
+        assert stats['task_records'] == 250 and stats['performance_metrics'] == 250
+        writes = stats['write_behind']
+        assert writes['rows_written'] == 500 and writes['rows_failed'] == 0
+        assert writes['batches'] < 50 and writes['max_batch_size'] <= 100
+        assert writes['avg_flush_ms'] > 0
+        assert enqueue_time < 0.5
+
+        journal = sqlite3.connect(str(tmp_path / "agent.db")).execute("PRAGMA journal_mode").fetchone()[0]
+        assert journal.lower() == "wal"
+    finally:
+        db.close()
+
+
+def test_reads_and_close_flush_pending_rows(tmp_path):
+    path = str(tmp_path / "agent.db")
+    db = DatabaseManager(path, batch_size=10_000, flush_interval=60.0)
+    db.save_task_record(_task(0))
+    db.save_task_record(_task(0))  # duplicate task_id: only this row is lost
+    db.save_task_record(_task(1))
+    assert db.get_write_stats()['queue_depth'] == 3
+    assert {r['task_id'] for r in db.get_task_records()} == {"task-0", "task-1"}
+    assert db.get_write_stats()['rows_failed'] == 1
+
+    db.save_earnings_record({'amount': 1.5, 'task_id': "task-1"})
+    db.save_ai_training_record({'session_id': "s", 'model_type': "mlp"})
+    db.close()
+
+    reopened = DatabaseManager(path, write_behind=False)
+    try:
+        assert reopened.get_earnings_summary()['currency_totals'] == {'ETH': 1.5}
+        assert reopened.get_ai_training_summary()['total_sessions'] == 1
+    finally:
+        reopened.close()
+
+
+def test_stats_report_queued_rows_without_flushing(tmp_path):
+    db = DatabaseManager(str(tmp_path / "agent.db"), batch_size=10_000, flush_interval=60.0)
+    try:
+        for i in range(3):
+            db.save_task_record(_task(i))
+        stats = db.get_database_stats()
+        assert stats['task_records'] == 0
+        assert stats['write_behind']['queue_depth'] == 3
+    finally:
+        db.close()
+
+
+def test_backup_includes_rows_still_in_the_wal(tmp_path):
+    db = DatabaseManager(str(tmp_path / "agent.db"), flush_interval=0.05)
+    try:
+        for i in range(20):
+            db.save_task_record(_task(i))
+        assert db.backup_database(str(tmp_path / "b.db"))
+
+        conn = sqlite3.connect(str(tmp_path / "b.db"))
+        try:
+            assert conn.execute("SELECT COUNT(*) FROM task_records").fetchone()[0] == 20
+        finally:
+            conn.close()
+
+        db.save_task_record(_task(99))
+        db.flush()
+        assert db.restore_database(str(tmp_path / "b.db"))
+        assert db.get_database_stats()['task_records'] == 20
+    finally:
+        db.close()
+
+
+def test_restore_while_rows_are_still_being_saved(tmp_path):
+    db = DatabaseManager(str(tmp_path / "agent.db"), batch_size=5, flush_interval=0.001)
+    try:
+        for i in range(20):
+            db.save_task_record(_task(i))
+        assert db.backup_database(str(tmp_path / "b.db"))
+
+        stop = threading.Event()
+
+        def save():
+            i = 100
+            while not stop.is_set():
+                db.save_task_record(_task(i))
+                i += 1
+                time.sleep(0.001)
+
+        writer = threading.Thread(target=save)
+        writer.start()
+        try:
+            for _ in range(5):
+                assert db.restore_database(str(tmp_path / "b.db"))
+        finally:
+            stop.set()
+            writer.join()
+
+        db.flush()
+        stats = db.get_database_stats()
+        assert stats['task_records'] >= 20
+        assert stats['write_behind']['rows_failed'] == 0
+        assert db.get_write_stats()['queue_depth'] == 0
+    finally:
+        db.close()
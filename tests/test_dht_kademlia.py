@@ -0,0 +1,156 @@
+import asyncio
+import random
+import time
+
+from ultimate_agent.network.p2p.distributed_ai import (
+    DistributedHashTable, MessageType, NodeCapability, NodeType, P2PMessage, P2PNetworkManager,
+    SIMULATED_NETWORK, _key_digest
+)
+
+
+def _capability(node_id):
+    return NodeCapability(node_id=node_id, node_type=NodeType.COMPUTE_NODE, models=[],
+                          compute_power=1.0, memory_gb=8.0, bandwidth_mbps=100.0, gpu_available=False)
+
+
+def test_buckets_by_prefix_length_and_lru_eviction():
+    dht = DistributedHashTable("self", k_bucket_size=2)
+    ids = [f"n{i}" for i in range(400)]
+    by_bucket = {}
+    for node_id in ids:
+        by_bucket.setdefault(dht.bucket_index(node_id), []).append(node_id)
+    index, members = max(by_bucket.items(), key=lambda item: len(item[1]))
+    first, second, third = members[:3]
+
+    assert dht.add_node(_capability(first)) is None
+    assert dht.add_node(_capability(second)) is None
+    # Full bucket: the least recently seen contact is offered for a liveness ping
+    assert dht.add_node(_capability(third)) == first
+    assert third not in dht
+
+    dht.touch(first)
+    assert dht.add_node(_capability(third)) == second
+    dht.remove_node(second)
+    assert third in dht and first in dht
+    assert list(dht.routing_table[index]) == [first, third]
+
+    # A contact is only evicted after repeated failures; a reply resets the count
+    assert not dht.record_failure(first) and not dht.record_failure(first)
+    dht.touch(first)
+    assert not dht.record_failure(first) and not dht.record_failure(first)
+    assert dht.record_failure(first)
+    assert first not in dht and first not in dht.failures
+
+
+def test_relayed_messages_refresh_the_relay_not_the_originator():
+    async def scenario():
+        node = P2PNetworkManager("self", NodeType.COMPUTE_NODE, {})
+        for node_id in ("relay", "origin"):
+            node.dht.add_node(_capability(node_id))
+            node.dht.record_failure(node_id)
+        node.running = True
+        task = asyncio.create_task(node._message_dispatch_loop())
+        try:
+            await node.incoming_queue.put(("relay", P2PMessage(MessageType.HEARTBEAT, "origin", {})))
+            while not node.incoming_queue.empty():
+                await asyncio.sleep(0.001)
+            await asyncio.sleep(0.001)
+        finally:
+            node.running = False
+            task.cancel()
+            SIMULATED_NETWORK.pop(node.node_id, None)
+        return node.dht.failures
+
+    failures = asyncio.run(scenario())
+
+    assert "relay" not in failures
+    assert failures["origin"] == 1
+
+
+def test_find_closest_nodes_orders_by_xor_distance():
+    dht = DistributedHashTable("self")
+    ids = [f"n{i}" for i in range(300)]
+    for node_id in ids:
+        dht.add_node(_capability(node_id))
+    known = [n for bucket in dht.buckets for n in bucket]
+    target = _key_digest("model:llama")
+    expected = sorted(known, key=lambda n: _key_digest(n) ^ target)[:5]
+
+    assert [c.node_id for c in dht.find_closest_nodes("model:llama", 5)] == expected
+
+
+def test_iterative_lookup_across_network():
+    async def scenario():
+        rng = random.Random(7)
+        nodes = [P2PNetworkManager(f"node-{i}", NodeType.COMPUTE_NODE, {'dht_k': 8, 'rpc_timeout': 1.0})
+                 for i in range(80)]
+        try:
+            for node in nodes:
+                node.running = True
+                asyncio.create_task(node._message_dispatch_loop())
+            # Every node joins through one random, already joined node
+            for i, node in enumerate(nodes[1:], start=1):
+                await node.join_network([rng.choice(nodes[:i]).node_id])
+
+            origin = nodes[0]
+            found = await origin.iterative_find_node("model:llama")
+            stored = await nodes[5].dht_store("model:llama", {"holder": "node-5"})
+            value = await nodes[40].iterative_find_value("model:llama")
+            return origin, found, stored, value, nodes
+        finally:
+            for node in nodes:
+                node.running = False
+                SIMULATED_NETWORK.pop(node.node_id, None)
+
+    origin, found, stored, value, nodes = asyncio.run(scenario())
+
+    target = _key_digest("model:llama")
+    truth = sorted((n.node_id for n in nodes if n is not origin), key=lambda n: _key_digest(n) ^ target)[:8]
+    assert [c.node_id for c in found][:3] == truth[:3]
+    assert len(set(c.node_id for c in found) & set(truth)) >= 6
+    assert stored >= 6
+    assert value == {"holder": "node-5"}
+    # O(log n) rounds rather than a walk over every node
+    assert origin.metrics['dht_lookup_rounds'] < 20
+
+
+def test_model_index_tracks_announce_heartbeat_and_eviction():
+    dht = DistributedHashTable("self")
+    for i, power in enumerate([1.0, 4.0, 2.0, 8.0]):
+        capability = _capability(f"n{i}")
+        capability.compute_power = power
+        capability.models = ["llama"] if i < 3 else []
+        capability.last_seen = time.time()
+        dht.add_node(capability)
+
+    assert dht.model_index["llama"] == {"n0", "n1", "n2"}
+    dht.add_model("n3", "llama")
+    dht.record_heartbeat("n3", load=0.9)
+    dht.record_heartbeat("n1", load=0.2)
+    dht.record_heartbeat("n2", load=0.2)
+
+    # least loaded first, ties broken by compute power
+    assert [c.node_id for c in dht.top_nodes_for_model("llama", 3)] == ["n0", "n1", "n2"]
+
+    dht.remove_node("n0")
+    stale = dht.node_info["n2"]
+    stale.last_seen = time.time() - 600
+    assert [c.node_id for c in dht.top_nodes_for_model("llama", 5)] == ["n1", "n3"]
+    assert "n0" not in dht.model_index["llama"]
+
+
+def test_stop_network_waits_for_background_tasks():
+    async def scenario():
+        node = P2PNetworkManager("node-stop", NodeType.COMPUTE_NODE, {})
+        try:
+            await node.start_network()
+            tasks = list(node._background_tasks)
+            await node.stop_network()
+            return [task.done() for task in tasks], node
+        finally:
+            SIMULATED_NETWORK.pop(node.node_id, None)
+
+    done, node = asyncio.run(scenario())
+
+    assert done == [True, True, True]
+    assert node._background_tasks == []
@@ -0,0 +1,153 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from ultimate_agent.ai.distributed.attention_protocol import (
+    AttentionShard, AttentionShardProcessor, DistributedAttentionCoordinator
+)
+
+HEADS, HIDDEN = 8, 64
+REMOTE_DELAY = 0.05
+
+
+def _reference(query, key, value):
+    b, s, h = query.shape
+    d = h // HEADS
+    out = np.empty_like(query)
+    for head in range(HEADS):
+        cols = slice(head * d, (head + 1) * d)
+        scores = query[:, :, cols] @ key[:, :, cols].transpose(0, 2, 1) / np.sqrt(d)
+        probs = np.exp(scores - scores.max(-1, keepdims=True))
+        probs /= probs.sum(-1, keepdims=True)
+        out[:, :, cols] = probs @ value[:, :, cols]
+    return out
+
+
+class FakeConnection:
+    def __init__(self, head_start, head_end):
+        self.processor = AttentionShardProcessor({'head_start': head_start, 'head_end': head_end})
+        self.tensors = []
+        self.requests = 0
+
+    async def send_control_message(self, message):
+        self.requests += 1
+
+    async def send_tensor(self, tensor, name):
+        assert tensor.flags['C_CONTIGUOUS']
+        self.tensors.append(tensor)
+
+    async def receive_tensor(self):
+        query, key, value = self.tensors
+        self.tensors = []
+        await asyncio.sleep(REMOTE_DELAY)
+        return {'type': 'attention_result', 'tensor': await self.processor.compute_attention(query, key, value)}
+
+
+def _inputs(seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.standard_normal((2, 16, HIDDEN)).astype(np.float32) for _ in range(3)]
+
+
+def test_local_shards_compute_in_process():
+    coordinator = DistributedAttentionCoordinator(
+        {'num_attention_heads': HEADS, 'hidden_size': HIDDEN}, local_node_id="me")
+    coordinator.register_attention_shard(AttentionShard(0, 0, 4, "me", 0))
+    coordinator.register_attention_shard(AttentionShard(1, 4, 8, "me", 0))
+    query, key, value = _inputs()
+
+    output = asyncio.run(coordinator.distributed_attention(query, key, value, 0, "r1"))
+
+    assert output.shape == query.shape and output.dtype == np.float32
+    np.testing.assert_allclose(output, _reference(query, key, value), rtol=1e-4, atol=1e-5)
+    stats = coordinator.get_layer_stats()[0]
+    assert stats['local_shards'] == 2 and stats['remote_shards'] == 0
+    assert stats['wait_time'] < stats['total_time']
+
+
+def test_remote_shards_overlap_with_local_compute():
+    coordinator = DistributedAttentionCoordinator(
+        {'num_attention_heads': HEADS, 'hidden_size': HIDDEN}, local_node_id="me")
+    remotes = {"a": FakeConnection(2, 4), "b": FakeConnection(4, 8)}
+    coordinator.register_attention_shard(AttentionShard(0, 0, 2, "me", 3))
+    coordinator.register_attention_shard(AttentionShard(1, 2, 4, "a", 3), remotes["a"])
+    coordinator.register_attention_shard(AttentionShard(2, 4, 6, "b", 3), remotes["b"])
+    coordinator.register_attention_shard(AttentionShard(3, 6, 8, "b", 3), remotes["b"])
+    query, key, value = _inputs(1)
+
+    start = time.perf_counter()
+    output = asyncio.run(coordinator.distributed_attention(query, key, value, 3, "r2"))
+    elapsed = time.perf_counter() - start
+
+    np.testing.assert_allclose(output, _reference(query, key, value), rtol=1e-4, atol=1e-5)
+    assert remotes["a"].requests == 1 and remotes["b"].requests == 2
+    # Node b's two shards share a connection; node a runs alongside them
+    assert elapsed < 3 * REMOTE_DELAY
+    stats = coordinator.get_layer_stats()[3]
+    assert stats['remote_shards'] == 3
+    assert stats['remote_time'] >= stats['wait_time'] >= REMOTE_DELAY
+
+
+def test_missing_heads_are_rejected():
+    coordinator = DistributedAttentionCoordinator({'num_attention_heads': HEADS, 'hidden_size': HIDDEN})
+    coordinator.register_attention_shard(AttentionShard(0, 0, 4, "me", 0))
+    query, key, value = _inputs()
+    with pytest.raises(ValueError):
+        asyncio.run(coordinator.distributed_attention(query, key, value, 0, "r3"))
+
+
+def test_shards_on_a_node_without_a_connection_are_rejected():
+    coordinator = DistributedAttentionCoordinator(
+        {'num_attention_heads': HEADS, 'hidden_size': HIDDEN}, local_node_id="me")
+    remote = FakeConnection(4, 8)
+    coordinator.register_attention_shard(AttentionShard(0, 0, 4, "me", 0))
+    coordinator.register_attention_shard(AttentionShard(1, 4, 8, "a", 0), remote)
+    # The connection to "a" is dropped; its heads must not silently run here
+    del coordinator.node_connections["a"]
+    query, key, value = _inputs()
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(coordinator.distributed_attention(query, key, value, 0, "r4"))
+    assert remote.requests == 0
+
+
+def test_cancelled_request_drops_its_connection_before_returning():
+    class SlowConnection(FakeConnection):
+        closed = False
+
+        async def receive_tensor(self):
+            await asyncio.sleep(REMOTE_DELAY)
+            return await super().receive_tensor()
+
+        def close(self):
+            self.closed = True
+
+    coordinator = DistributedAttentionCoordinator(
+        {'num_attention_heads': HEADS, 'hidden_size': HIDDEN}, local_node_id="me")
+    remote = SlowConnection(4, 8)
+    coordinator.register_attention_shard(AttentionShard(0, 0, 4, "me", 0))
+    coordinator.register_attention_shard(AttentionShard(1, 4, 8, "a", 0), remote)
+    query, key, value = _inputs()
+
+    async def scenario():
+        first = asyncio.create_task(coordinator.distributed_attention(query, key, value, 0, "r1"))
+        # Queue a second request behind the first on the same connection
+        second = asyncio.create_task(coordinator.distributed_attention(query, key, value, 0, "r2"))
+        while remote.requests == 0:
+            await asyncio.sleep(0.001)
+        first.cancel()
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        # Nothing of the cancelled request is left running
+        pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        return results, pending
+
+    (first, second), pending = asyncio.run(scenario())
+
+    assert isinstance(first, asyncio.CancelledError)
+    # The queued request must not read the reply meant for the cancelled one
+    assert isinstance(second, ConnectionError)
+    assert remote.requests == 1
+    assert remote.closed
+    assert "a" not in coordinator.node_connections
+    assert pending == []
@@ -0,0 +1,228 @@
+import asyncio
+import importlib
+import json
+import pytest
+
+if importlib.util.find_spec('aiohttp') is None or importlib.util.find_spec('psutil') is None:
+    pytest.skip("aiohttp/psutil not available", allow_module_level=True)
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from ultimate_agent.ai.local_models.local_ai_manager import LocalAIManager, get_quantized_model_catalog
+
+
+class _Config:
+    def getboolean(self, section, key, fallback=None):
+        return False
+
+    def getint(self, section, key, fallback=None):
+        return 1 if key == 'max_concurrent_requests' else fallback
+
+    def has_section(self, section):
+        return False
+
+
+def _manager(base_url):
+    manager = LocalAIManager(_Config())
+    manager.http_client.base_url = base_url
+    manager.current_model = get_quantized_model_catalog()[0]
+
+    async def ready(task_type="general"):
+        return manager.current_model
+
+    manager.ensure_model_ready = ready
+    return manager
+
+
+def test_stream_yields_tokens_and_bounds_model_concurrency():
+    active = []
+    peak = []
+
+    async def handler(request):
+        body = await request.json()
+        assert body['options']['num_predict'] == 1000
+        active.append(1)
+        peak.append(len(active))
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for i, token in enumerate(["a", "b", "c"]):
+            await asyncio.sleep(0.01)
+            await response.write((json.dumps({"response": token, "done": i == 2}) + "\n").encode())
+        active.pop()
+        await response.write_eof()
+        return response
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/api/generate", handler)
+        server = TestServer(app)
+        await server.start_server()
+        manager = _manager(str(server.make_url("")))
+        try:
+            async def consume():
+                return [chunk async for chunk in manager.generate_stream("hi")]
+            return await asyncio.gather(consume(), consume()), manager
+        finally:
+            await manager.close()
+            await server.close()
+
+    (first, second), manager = asyncio.run(scenario())
+
+    assert [c['response'] for c in first] == ["a", "b", "c"]
+    assert first[-1]['done'] and first[-1]['full_response'] == "abc"
+    assert second[-1]['full_response'] == "abc"
+    # max_concurrent_requests=1 serializes generations for the same model
+    assert max(peak) == 1
+    assert manager.inference_stats['streams_started'] == 2
+    assert manager.inference_stats['avg_time_to_first_token'] > 0
+
+
+def test_cache_hits_skip_the_model_load_and_failed_loads_are_reported():
+    from ultimate_agent.ai.inference.response_cache import ResponseCache
+
+    manager = LocalAIManager(_Config())
+    manager.response_cache = ResponseCache()
+    model = get_quantized_model_catalog()[0]
+    manager.hardware_detector.get_optimal_model = lambda task_type="general": model
+    acquired = []
+
+    class _FailingPool:
+        def record(self, task_type):
+            pass
+
+        async def acquire(self, model, task_type=None):
+            acquired.append(model.full_name)
+            return False
+
+        async def shutdown(self):
+            pass
+
+    manager.warm_pool = _FailingPool()
+    manager._is_model_available = lambda model: True
+
+    async def scenario():
+        options = {'temperature': 0.7, 'max_tokens': 1000, 'top_p': 0.9, 'repeat_penalty': 1.1}
+        await manager.response_cache.put(model.full_name, "hi", options, {'response': "cached"})
+        try:
+            return await manager.generate_response("hi"), await manager.generate_response("other")
+        finally:
+            await manager.close()
+
+    hit, miss = asyncio.run(scenario())
+
+    assert hit['success'] and hit['cached'] and hit['response'] == "cached"
+    assert not miss['success']
+    assert acquired == [model.full_name]
+
+
+def test_concurrent_task_types_generate_with_their_own_model():
+    catalog = get_quantized_model_catalog()
+    models = {"general": catalog[0], "coding": catalog[1]}
+
+    async def handler(request):
+        body = await request.json()
+        return web.json_response({"response": body['model'], "done": True})
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/api/generate", handler)
+        server = TestServer(app)
+        await server.start_server()
+        manager = LocalAIManager(_Config())
+        manager.http_client.base_url = str(server.make_url(""))
+        manager.response_cache = None
+        manager.hardware_detector.get_optimal_model = lambda task_type="general": models[task_type]
+        manager._is_model_available = lambda model: True
+
+        class _SlowPool:
+            async def acquire(self, model, task_type=None):
+                # The other request switches current_model while this one loads
+                await asyncio.sleep(0.05 if task_type == "general" else 0.01)
+                return True
+
+            async def shutdown(self):
+                pass
+
+        manager.warm_pool = _SlowPool()
+        try:
+            return await asyncio.gather(manager.generate_response("hi", task_type="general"),
+                                        manager.generate_response("hi", task_type="coding"))
+        finally:
+            await manager.close()
+            await server.close()
+
+    general, coding = asyncio.run(scenario())
+
+    assert general['response'] == general['model_full_name'] == models["general"].full_name
+    assert coding['response'] == coding['model_full_name'] == models["coding"].full_name
+
+
+def test_warm_pool_is_shared_across_event_loops():
+    manager = LocalAIManager(_Config())
+    model = get_quantized_model_catalog()[0]
+    manager.hardware_detector.get_optimal_model = lambda task_type="general": model
+    manager._is_model_available = lambda model: True
+    loads = []
+
+    async def load(model):
+        loads.append(model.full_name)
+        await asyncio.sleep(0.01)
+
+    manager.warm_pool.load = load
+
+    try:
+        # Each call runs on its own short-lived loop, like the dashboard routes
+        assert asyncio.run(manager.ensure_model_ready("general")) is model
+        assert asyncio.run(manager.ensure_model_ready("general")) is model
+        status = manager.warm_pool.get_status()
+    finally:
+        asyncio.run(manager.close())
+
+    assert loads == [model.full_name]
+    assert status["cold_starts"] == 1 and status["warm_hits"] == 1
+
+
+def test_model_concurrency_limit_holds_across_per_thread_loops():
+    active = []
+    peak = []
+
+    async def handler(request):
+        body = await request.json()
+        active.append(1)
+        peak.append(len(active))
+        await asyncio.sleep(0.02)
+        active.pop()
+        return web.json_response({"response": body['model'], "done": True})
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/api/generate", handler)
+        server = TestServer(app)
+        await server.start_server()
+        manager = _manager(str(server.make_url("")))
+        manager.response_cache = None
+        manager.warm_pool = None
+        sessions = []
+
+        def dashboard_call():
+            # Each Flask worker thread runs the coroutine on its own loop
+            result = asyncio.run(manager.generate_response("hi"))
+            sessions.append(manager.http_client._session)
+            return result
+
+        loop = asyncio.get_running_loop()
+        try:
+            results = await asyncio.gather(*(loop.run_in_executor(None, dashboard_call) for _ in range(4)))
+        finally:
+            await manager.close()
+            await server.close()
+        return results, sessions, manager
+
+    results, sessions, manager = asyncio.run(scenario())
+
+    assert all(r['success'] for r in results)
+    # max_concurrent_requests=1 for the model, whichever loop the caller is on
+    assert max(peak) == 1
+    assert len({id(s) for s in sessions}) == 1
+    assert manager.http_client._session is None
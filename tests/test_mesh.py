@@ -37,3 +37,91 @@ def test_rebalance_and_broadcast():
 
     total = mesh.broadcast("b", 100)
     assert total > 0
+
+
+def _two_tier_mesh(clusters=4, size=8):
+    mesh = HierarchicalMeshNetwork()
+    for c in range(clusters):
+        for n in range(size):
+            mesh.add_node(f"c{c}n{n}", f"c{c}", bandwidth_mbps=100.0 if n < 2 else 25.0)
+    mesh.rebalance_leaders()
+    return mesh
+
+
+def test_broadcast_tree_is_cached_and_beats_unicast():
+    mesh = _two_tier_mesh()
+    tree = mesh.broadcast_tree("c0n5")
+
+    assert mesh.broadcast_tree("c0n5") is tree
+    assert set(tree.parent) == set(mesh.nodes) - {"c0n5"}
+    # Source hands off to its leader; leaders are only fed by leaders
+    assert tree.children["c0n5"] == ["c0n0"]
+    assert all(tree.parent[f"c{c}n0"].endswith("n0") for c in range(1, 4))
+    # Slow nodes are leaves
+    assert all(int(node[-1]) < 2 for node in tree.children if node != "c0n5")
+
+    unicast = mesh.unicast_broadcast_time("c0n5", 400)
+    tree_time = mesh.broadcast("c0n5", 400)
+    pipelined = mesh.broadcast("c0n5", 400, chunk_mb=4)
+    assert tree_time < unicast / 3
+    assert pipelined < tree_time / 2
+
+    mesh.add_node("late", "c1", bandwidth_mbps=10.0)
+    assert mesh.broadcast_tree("c0n5") is not tree
+    assert "late" in mesh.broadcast_tree("c0n5").parent
+    assert mesh.route_path("late", "c0n5") == ["late", "c1n0", "c0n0", "c0n5"]
+
+
+def test_distribute_pushes_chunks_along_the_tree():
+    import asyncio
+
+    mesh = _two_tier_mesh(clusters=2, size=8)
+    payload = bytes(range(256)) * 64
+    received = {node_id: [] for node_id in mesh.nodes}
+    # Virtual clock: each uplink sends one chunk per tick, and a node can
+    # only forward a chunk once it has arrived
+    uplink_free = {}
+    arrival = {}
+
+    async def send(sender, receiver, index, chunk):
+        start = max(uplink_free.get(sender, 0), arrival.get((sender, index), 0))
+        uplink_free[sender] = arrival[(receiver, index)] = start + 1
+        await asyncio.sleep(0)
+        received[receiver].append((index, bytes(chunk)))
+
+    async def scenario():
+        return await mesh.distribute("c0n0", payload, send, chunk_mb=4096 / (1024 * 1024))
+
+    stats = asyncio.run(scenario())
+
+    assert stats['chunks'] == 4 and stats['nodes'] == 15
+    for node_id, chunks in received.items():
+        if node_id != "c0n0":
+            assert [i for i, _ in chunks] == [0, 1, 2, 3]
+            assert b"".join(c for _, c in chunks) == payload
+    # The source uplink is the only bottleneck: relays forward while it is
+    # still sending, so the last chunk lands at most `depth` ticks after the
+    # source's final send. Unicast would take 15 nodes x 4 chunks = 60 ticks.
+    fanout = len(mesh.broadcast_tree("c0n0").children["c0n0"])
+    assert max(arrival.values()) <= stats['chunks'] * fanout + stats['depth'] < 60
+
+
+def test_distribute_cancels_remaining_hops_when_one_fails():
+    import asyncio
+
+    import pytest
+
+    mesh = _two_tier_mesh(clusters=2, size=4)
+
+    async def send(sender, receiver, index, chunk):
+        if receiver == "c1n0":
+            raise ConnectionError(receiver)
+        await asyncio.sleep(0)
+
+    async def scenario():
+        with pytest.raises(ConnectionError):
+            await mesh.distribute("c0n0", bytes(64), send, chunk_mb=16 / (1024 * 1024))
+        current = asyncio.current_task()
+        return [task for task in asyncio.all_tasks() if task is not current]
+
+    assert asyncio.run(scenario()) == []
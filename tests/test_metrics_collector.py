@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+psutil = pytest.importorskip("psutil")
+
+from ultimate_agent.monitoring.metrics import MonitoringManager
+
+
+def test_collect_metrics_does_not_block_and_caches_slow_families(monkeypatch):
+    manager = MonitoringManager(history_capacity=100)
+    disk_reads = []
+    real_disk_usage = psutil.disk_usage
+    monkeypatch.setattr(psutil, "disk_usage", lambda path: disk_reads.append(path) or real_disk_usage(path))
+
+    def forbidden(*args, **kwargs):
+        raise AssertionError("expensive probe ran without being enabled")
+
+    monkeypatch.setattr(psutil.Process, "open_files", forbidden)
+
+    start = time.perf_counter()
+    for _ in range(5):
+        metrics = manager.collect_metrics()
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.5  # used to block for a second per call
+    assert 0.0 <= metrics['cpu_percent'] <= 100.0
+    assert metrics['process']['memory_mb'] > 0 and 'open_files' not in metrics['process']
+    assert len(disk_reads) == 1  # re-read only every 30 seconds
+    assert len(manager.metrics_history) == 5
+
+    stats = manager.get_collector_stats()
+    assert stats['samples'] == 5 and stats['avg_ms'] > 0
+    assert 'cpu_overhead_percent' in manager.get_status()['collector']
+
+
+def test_expensive_probes_are_opt_in():
+    manager = MonitoringManager(history_capacity=10, expensive_probes=['open_files', 'connections'])
+    process = manager.collect_metrics()['process']
+    assert process['open_files'] >= 0 and process['connections'] >= 0
+
+
+def test_collection_loop_stops_promptly():
+    manager = MonitoringManager(history_capacity=10, collection_interval=60)
+    manager.start_monitoring()
+    time.sleep(0.05)
+    start = time.perf_counter()
+    manager.stop_monitoring()
+    assert time.perf_counter() - start < 1.0
+    assert len(manager.metrics_history) == 1
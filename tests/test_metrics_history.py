@@ -0,0 +1,65 @@
+import time
+
+import numpy as np
+import pytest
+
+from ultimate_agent.monitoring.metrics import MonitoringManager
+from ultimate_agent.monitoring.metrics.history import MetricsHistory
+
+
+def _sample(ts, cpu):
+    return {'timestamp': ts, 'cpu_percent': cpu, 'memory_percent': 50.0,
+            'network_io': {'bytes_sent': 10 ** 12 + ts}, 'gpu': {'name': "none"}}
+
+
+def test_ring_buffer_wraps_and_windows_by_timestamp():
+    history = MetricsHistory(capacity=100)
+    for i in range(250):
+        history.append(_sample(float(i), float(i % 7)))
+
+    assert len(history) == 100 and history.oldest_timestamp() == 150.0
+    window = history.window(start=180.0, end=220.0)
+    assert window['timestamp'].tolist() == [float(t) for t in range(181, 221)]
+    assert history.count(start=0.0) == 100
+
+    expected = np.array([i % 7 for i in range(181, 250)], dtype=float)
+    stats = history.aggregate('cpu_percent', start=180.0)
+    assert stats['count'] == len(expected)
+    assert stats['average'] == pytest.approx(expected.mean())
+    assert stats['peak'] == 6.0 and stats['minimum'] == 0.0
+    assert stats['p95'] == pytest.approx(np.percentile(expected, 95))
+
+    (record,) = history.to_records(start=248.0)
+    assert record['timestamp'] == 249.0 and record['cpu_percent'] == 4.0
+    assert record['network_io'] == {'bytes_sent': 10 ** 12 + 249.0}
+    assert 'gpu' not in record  # nothing numeric was collected for it
+
+
+def test_a_week_at_ten_seconds_fits_in_a_few_megabytes():
+    history = MetricsHistory()
+    assert history.capacity == 7 * 24 * 360
+    assert history.memory_bytes / history.capacity < 100
+    now = time.time()
+    for i in range(history.capacity + 10):
+        history.timestamps[i % history.capacity] = now - (history.capacity - i) * 10
+    history._size, history._head = history.capacity, 10
+
+    start = time.perf_counter()
+    history.aggregate('cpu_percent', start=now - 86400)
+    assert time.perf_counter() - start < 0.05
+
+
+def test_monitoring_summary_reads_the_ring_buffer():
+    manager = MonitoringManager(history_capacity=1000)
+    now = time.time()
+    for i in range(600):
+        ts = now - 600 + i
+        manager.metrics_history.append(_sample(ts, float(i % 100)), ts)
+        manager.rollups.add({'cpu_percent': float(i % 100)}, ts)
+
+    summary = manager.get_performance_summary(hours=1)
+    assert summary['data_points'] == 600
+    assert summary['cpu_stats']['peak'] == 99.0 and summary['cpu_stats']['minimum'] == 0.0
+    assert summary['memory_stats']['average'] == 50.0
+    assert len(manager.get_metrics_history(hours=1)) == 600
+    assert manager.get_status()['metrics_history_size'] == 600
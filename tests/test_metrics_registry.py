@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+from ultimate_agent.monitoring.metrics.registry import MetricsRegistry, REGISTRY
+
+
+def test_text_exposition_format():
+    registry = MetricsRegistry()
+    requests = registry.counter('demo_requests_total', 'Requests', ['endpoint'])
+    latency = registry.histogram('demo_latency_seconds', 'Latency', ['endpoint'], buckets=(0.1, 1.0))
+    depth = registry.gauge('demo_queue_depth', 'Depth')
+
+    requests.labels('/api/"x"').inc()
+    requests.labels('/api/"x"').inc(2)
+    for value in (0.05, 0.5, 5.0):
+        latency.labels('/a').observe(value)
+    depth.set_function(lambda: 7)
+
+    text = registry.render()
+    assert '# TYPE demo_requests_total counter' in text
+    assert 'demo_requests_total{endpoint="/api/\\"x\\""} 3' in text
+    assert 'demo_latency_seconds_bucket{endpoint="/a",le="0.1"} 1' in text
+    assert 'demo_latency_seconds_bucket{endpoint="/a",le="1"} 2' in text
+    assert 'demo_latency_seconds_bucket{endpoint="/a",le="+Inf"} 3' in text
+    assert 'demo_latency_seconds_sum{endpoint="/a"} 5.55' in text
+    assert 'demo_latency_seconds_count{endpoint="/a"} 3' in text
+    assert 'demo_queue_depth 7' in text
+    assert text.endswith('\n')
+
+    # Registering again returns the same family; a different type is an error
+    assert registry.counter('demo_requests_total', 'Requests', ['endpoint']) is requests
+    with pytest.raises(ValueError):
+        registry.gauge('demo_requests_total', 'Requests')
+    with pytest.raises(ValueError):
+        requests.labels('a', 'b')
+
+
+def test_concurrent_observations_are_not_lost():
+    registry = MetricsRegistry()
+    latency = registry.histogram('demo_concurrent_seconds', 'Latency', ['worker'])
+    child = latency.labels('shared')
+
+    def work():
+        for _ in range(20000):
+            child.observe(0.01)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    counts, total = child.snapshot()
+    assert sum(counts) == 80000
+    assert total == pytest.approx(800.0)
+
+
+def test_agent_components_feed_the_default_registry(tmp_path):
+    pytest.importorskip("sqlalchemy")
+    from ultimate_agent.storage.database.migrations import DatabaseManager
+
+    db = DatabaseManager(str(tmp_path / "agent.db"), write_behind=False)
+    try:
+        db.save_performance_metric({'cpu_percent': 1.0})
+    finally:
+        db.close()
+
+    text = REGISTRY.render()
+    assert 'agent_db_flush_seconds_count' in text
+    assert 'agent_db_rows_total{outcome="written"}' in text
+    # Registered at import by the scheduler and network modules
+    import ultimate_agent.network.communication  # noqa: F401
+    import ultimate_agent.tasks.execution.task_scheduler  # noqa: F401
+    assert REGISTRY.get('agent_task_queue_wait_seconds') is not None
+    assert REGISTRY.get('agent_http_request_seconds') is not None
@@ -0,0 +1,134 @@
+import random
+import time
+
+import numpy as np
+import pytest
+
+from ultimate_agent.monitoring.metrics.rollups import QuantileSketch, RollupStore
+
+WEEK = 7 * 86400
+
+
+def _fill(store, seconds, step, seed=3, now=None):
+    rng = random.Random(seed)
+    now = time.time() if now is None else now
+    values = []
+    for ts in np.arange(now - seconds, now, step):
+        value = rng.uniform(5, 95)
+        values.append((ts, value))
+        store.add({'cpu_percent': value, 'label': "ignored"}, ts)
+    return values
+
+
+def test_queries_pick_the_coarsest_tier_that_fits():
+    store = RollupStore()
+    now = time.time()
+    values = _fill(store, WEEK, 60, now=now)
+
+    week = store.query(['cpu_percent'], start=now - WEEK, end=now)
+    assert 160 <= len(week) <= 170 and week[0]['resolution'] == 3600
+    assert sum(row['cpu_percent']['count'] for row in week) == len(values)
+
+    hour = store.query(['cpu_percent'], start=now - 3600, end=now)
+    assert hour[0]['resolution'] == 60 and 60 <= len(hour) <= 62
+
+    year = store.query(['cpu_percent'], start=now - 365 * 86400, end=now)
+    assert year[0]['resolution'] == 86400
+
+    # Minute buckets past their 2 day retention are gone
+    tiers = store.get_stats()['tiers']
+    assert tiers[0]['buckets'] <= 2 * 1440 + 1
+    assert 'label' not in week[0]
+
+
+def test_summary_matches_raw_aggregates():
+    store = RollupStore()
+    values = np.array([v for _, v in _fill(store, 86400, 30)])
+    summary = store.summary('cpu_percent', time.time() - 2 * 86400)
+    assert summary['count'] == len(values)
+    assert summary['min'] == values.min() and summary['max'] == values.max()
+    assert summary['avg'] == pytest.approx(values.mean())
+    assert summary['p50'] == pytest.approx(np.percentile(values, 50), rel=0.02)
+    assert summary['p95'] == pytest.approx(np.percentile(values, 95), rel=0.02)
+
+
+def test_sketches_merge_and_handle_zero_and_negative():
+    a, b = QuantileSketch(), QuantileSketch()
+    for v in range(-50, 0):
+        a.add(v)
+    for v in range(0, 50):
+        b.add(v)
+    a.merge(b)
+    assert a.count == 100
+    assert a.quantile(0.0) == pytest.approx(-50, rel=0.01)
+    assert a.quantile(1.0) == pytest.approx(49, rel=0.01)
+    restored = QuantileSketch.from_dict(a.to_dict())
+    assert restored.count == 100 and restored.quantile(0.5) == a.quantile(0.5)
+
+
+def test_database_rollups_persist_across_restart(tmp_path):
+    pytest.importorskip("sqlalchemy")
+    from ultimate_agent.storage.database.migrations import DatabaseManager
+
+    path = str(tmp_path / "agent.db")
+    db = DatabaseManager(path, flush_interval=60.0)
+    for i in range(120):
+        db.save_performance_metric({'cpu_percent': i % 100, 'memory_percent': 40.0})
+    rows = db.get_performance_metrics(24)
+    assert rows[0]['resolution_seconds'] == 60
+    assert sum(row['samples'] for row in rows) == 120
+    assert rows[0]['memory_percent'] == 40.0
+    db.close()
+
+    reopened = DatabaseManager(path, write_behind=False)
+    try:
+        week = reopened.get_performance_metrics(24 * 7)
+        assert week[0]['resolution_seconds'] == 3600
+        assert sum(row['samples'] for row in week) == 120
+        assert len(reopened.get_performance_metrics(24, raw=True)) == 120
+    finally:
+        reopened.close()
+
+
+def test_a_separate_reader_sees_rollups_written_after_it_started(tmp_path):
+    pytest.importorskip("sqlalchemy")
+    from ultimate_agent.storage.database.migrations import DatabaseManager
+
+    path = str(tmp_path / "agent.db")
+    writer = DatabaseManager(path, write_behind=False)
+    reader = DatabaseManager(path, write_behind=False)  # e.g. the API process
+    try:
+        assert reader.get_performance_metrics(1) == []
+        for i in range(10):
+            writer.save_performance_metric({'cpu_percent': 50.0})
+        rows = reader.get_performance_metrics(1)
+        assert sum(row['samples'] for row in rows) == 10
+        assert rows[0]['cpu_percent'] == 50.0
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_rollups_that_fail_to_save_are_retried(tmp_path, monkeypatch):
+    pytest.importorskip("sqlalchemy")
+    from ultimate_agent.storage.database import migrations
+
+    def unavailable(table):
+        raise RuntimeError("database is locked")
+
+    path = str(tmp_path / "agent.db")
+    db = migrations.DatabaseManager(path, write_behind=False)
+    reader = migrations.DatabaseManager(path, write_behind=False)
+    try:
+        real_insert = migrations.sqlite_insert
+        monkeypatch.setattr(migrations, 'sqlite_insert', unavailable)
+        db.save_performance_metric({'cpu_percent': 50.0})
+        assert reader.get_performance_metrics(1) == []
+
+        monkeypatch.setattr(migrations, 'sqlite_insert', real_insert)
+        db.flush()
+        rows = reader.get_performance_metrics(1)
+        assert sum(row['samples'] for row in rows) == 1
+    finally:
+        db.close()
+        reader.close()
@@ -0,0 +1,95 @@
+import importlib
+import pytest
+
+if importlib.util.find_spec('numpy') is None or importlib.util.find_spec('psutil') is None:
+    pytest.skip("numpy/psutil not available", allow_module_level=True)
+
+import numpy as np
+
+from ultimate_agent.ai.training import AITrainingEngine
+from ultimate_agent.ai.training.mlp import MLPWorkspace
+
+
+class DummyManager:
+    gpu_available = False
+    config = {}
+
+
+@pytest.mark.parametrize("dtype,fused", [("float32", False), ("float64", False), ("float32", True)])
+def test_train_neural_network_workspace(dtype, fused):
+    engine = AITrainingEngine(DummyManager())
+    reports = []
+    result = engine.train_neural_network(
+        {'epochs': 4, 'batch_size': 16, 'data_size': 64, 'input_dim': 20, 'hidden_dim': 8,
+         'output_dim': 3, 'dtype': dtype, 'fused': fused, 'seed': 1},
+        lambda p, d: reports.append(d) or True
+    )
+
+    assert result['success'] is True, result
+    assert result['dtype'] == dtype
+    assert result['model_architecture'] == '20-8-3'
+    assert [r['epoch'] for r in reports] == [1, 2, 3, 4]
+    validated = [r['epoch'] for r in reports if 'validation_loss' in r]
+    assert validated == ([4] if fused else [1, 2, 3, 4])
+
+
+def test_fused_training_is_cancelled_between_validations():
+    engine = AITrainingEngine(DummyManager())
+    reports = []
+    result = engine.train_neural_network(
+        {'epochs': 20, 'batch_size': 16, 'data_size': 64, 'input_dim': 20, 'hidden_dim': 8,
+         'output_dim': 3, 'fused': True, 'progress_every': 10, 'seed': 1},
+        lambda p, d: reports.append(d) and False
+    )
+
+    assert result == {'success': False, 'error': 'Training cancelled'}
+    assert [r['epoch'] for r in reports] == [1]
+
+
+def _reference_step(params, x, targets, learning_rate):
+    """The original allocating SGD step, with gradients taken before any update"""
+    w_ih, w_ho, b_h, b_o = params
+    n = len(x)
+    hidden = np.maximum(0, x @ w_ih + b_h)
+    logits = hidden @ w_ho + b_o
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    probs = exp / exp.sum(axis=1, keepdims=True)
+    loss = -np.mean(np.log(probs[range(n), targets] + 1e-15))
+
+    grad_out = probs.copy()
+    grad_out[range(n), targets] -= 1
+    grad_out /= n
+    grad_hidden = (grad_out @ w_ho.T) * (hidden > 0)
+    new_params = (w_ih - learning_rate * x.T @ grad_hidden,
+                  w_ho - learning_rate * hidden.T @ grad_out,
+                  b_h - learning_rate * grad_hidden.sum(axis=0),
+                  b_o - learning_rate * grad_out.sum(axis=0))
+    return new_params, loss
+
+
+@pytest.mark.parametrize("dtype,tolerance", [("float64", 1e-10), ("float32", 1e-4)])
+def test_workspace_matches_the_reference_loop(dtype, tolerance):
+    batch_size, num_batches = 16, 6
+    workspace = MLPWorkspace(20, 8, 3, batch_size, dtype=dtype, seed=7)
+    params = tuple(np.array(workspace.state()[k], dtype=np.float64)
+                   for k in ('weights_ih', 'weights_ho', 'bias_h', 'bias_o'))
+    rng = np.random.default_rng(3)
+    dataset = rng.standard_normal((num_batches * batch_size, 20)).astype(dtype)
+    targets = rng.integers(0, 3, size=(num_batches, batch_size))
+
+    for batch in range(num_batches):
+        # Row views of one dataset, as the fused path trains on
+        x = dataset[batch * batch_size:(batch + 1) * batch_size]
+        loss = workspace.train_batch(x, targets[batch], 0.5)
+        params, expected_loss = _reference_step(params, x.astype(np.float64), targets[batch], 0.5)
+        assert loss == pytest.approx(expected_loss, rel=tolerance, abs=tolerance)
+
+    state = workspace.state()
+    for name, expected in zip(('weights_ih', 'weights_ho', 'bias_h', 'bias_o'), params):
+        np.testing.assert_allclose(state[name], expected, rtol=tolerance, atol=tolerance)
+
+
+def test_train_neural_network_rejects_unknown_dtype():
+    engine = AITrainingEngine(DummyManager())
+    result = engine.train_neural_network({'epochs': 1, 'dtype': 'float16'}, lambda p, d: True)
+    assert result['success'] is False
@@ -0,0 +1,146 @@
+import asyncio
+from types import SimpleNamespace
+
+from ultimate_agent.ai.local_models.warm_pool import ModelWarmPool
+
+MODELS = {
+    "general": SimpleNamespace(full_name="general:7b", memory_gb=4.0),
+    "coding": SimpleNamespace(full_name="coder:7b", memory_gb=4.0),
+    "creative": SimpleNamespace(full_name="writer:13b", memory_gb=8.0),
+    "summarize": SimpleNamespace(full_name="summary:7b", memory_gb=4.0),
+}
+
+
+def _pool(events, budget=9.0, max_models=2):
+    async def load(model):
+        events.append(("load", model.full_name))
+        await asyncio.sleep(0.01)
+
+    async def unload(model):
+        events.append(("unload", model.full_name))
+        await asyncio.sleep(0.01)
+
+    return ModelWarmPool(load, unload, MODELS.get, memory_budget_gb=budget, max_models=max_models)
+
+
+def test_cold_start_then_warm_hit_and_background_preload():
+    events = []
+    pool = _pool(events)
+
+    async def scenario():
+        # Traffic is mostly coding, but the first request is general
+        for _ in range(3):
+            pool.record("coding")
+        await pool.acquire(MODELS["general"], "general")
+        await pool._preload_task
+        await pool.acquire(MODELS["coding"], "coding")
+        await pool.acquire(MODELS["general"], "general")
+
+    asyncio.run(scenario())
+    status = pool.get_status()
+
+    assert status["cold_starts"] == 1
+    assert status["preloads"] == 1
+    assert status["warm_hits"] == 2
+    assert sorted(status["resident_models"]) == ["coder:7b", "general:7b"]
+    assert status["memory_used_gb"] <= status["memory_budget_gb"]
+    assert status["avg_load_time"] > 0
+
+
+def test_eviction_prefers_low_value_models():
+    events = []
+    pool = _pool(events, budget=12.0, max_models=2)
+
+    async def scenario():
+        await pool.acquire(MODELS["general"], "general")
+        for _ in range(5):
+            await pool.acquire(MODELS["coding"], "coding")
+        # Needs room: the rarely used general model goes, the busy coding model stays
+        await pool.acquire(MODELS["creative"], "creative")
+        await pool.shutdown()
+
+    asyncio.run(scenario())
+
+    assert ("unload", "general:7b") in events
+    assert ("unload", "coder:7b") not in events
+    assert sorted(pool.resident) == ["coder:7b", "writer:13b"]
+
+
+def test_concurrent_cold_acquires_share_one_load():
+    events = []
+    pool = _pool(events, budget=12.0, max_models=2)
+
+    async def scenario():
+        await pool.acquire(MODELS["general"], "general")
+        await pool.acquire(MODELS["coding"], "coding")
+        # Both callers arrive while the eviction for the first is still running
+        results = await asyncio.gather(pool.acquire(MODELS["creative"], "creative"),
+                                       pool.acquire(MODELS["creative"], "creative"))
+        await pool.shutdown()
+        return results
+
+    assert asyncio.run(scenario()) == [True, True]
+    assert events.count(("load", "writer:13b")) == 1
+    assert pool.get_status()["cold_starts"] == 3
+
+
+def test_concurrent_cold_acquires_of_different_models_respect_the_budget():
+    events = []
+    pool = _pool(events, budget=8.0, max_models=2)
+    loaded = {}
+    peak = []
+
+    async def load(model):
+        loaded[model.full_name] = model.memory_gb
+        peak.append((len(loaded), sum(loaded.values())))
+        await asyncio.sleep(0.01)
+
+    async def unload(model):
+        await asyncio.sleep(0.01)
+        loaded.pop(model.full_name, None)
+
+    pool.load, pool.unload = load, unload
+
+    async def scenario():
+        await pool.acquire(MODELS["general"], "general")
+        results = await asyncio.gather(pool.acquire(MODELS["coding"], "coding"),
+                                       pool.acquire(MODELS["summarize"], "summarize"))
+        await pool.shutdown()
+        return results
+
+    assert asyncio.run(scenario()) == [True, True]
+    # A background preload may swap models afterwards, but never past the limits
+    assert len(pool.resident) <= 2
+    assert pool.get_status()["memory_used_gb"] <= 8.0
+    assert all(count <= 2 and used <= 8.0 for count, used in peak)
+
+
+def test_acquire_from_a_new_loop_while_work_is_stranded_on_the_old_one():
+    events = []
+    pool = _pool(events)
+    for _ in range(3):
+        pool.record("coding")
+
+    # Like a Flask handler's per-thread loop: the preload started by this
+    # acquire is left pending when the handler returns
+    old_loop = asyncio.new_event_loop()
+    try:
+        assert old_loop.run_until_complete(pool.acquire(MODELS["general"], "general"))
+        assert "coder:7b" in pool._loading
+
+        async def again():
+            loaded = await pool.acquire(MODELS["coding"], "coding")
+            await pool.shutdown()
+            return loaded
+
+        assert asyncio.run(again())
+        assert asyncio.run(pool.acquire(MODELS["coding"], "coding"))
+        assert "coder:7b" in pool.resident and not pool._loading
+    finally:
+        stranded = asyncio.all_tasks(old_loop)
+        for task in stranded:
+            task.cancel()
+        old_loop.run_until_complete(asyncio.gather(*stranded, return_exceptions=True))
+        old_loop.close()
+    # The stranded load finishing late does not disturb the new loop's state
+    assert not pool._loading
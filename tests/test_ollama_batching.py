@@ -0,0 +1,101 @@
+import asyncio
+import importlib
+import pytest
+
+if importlib.util.find_spec('aiohttp') is None:
+    pytest.skip("aiohttp not available", allow_module_level=True)
+
+from ultimate_agent.ai.backends.ollama_advanced import (
+    AdvancedOllamaManager, InferenceRequest, InferenceResponse
+)
+
+
+def _manager(calls):
+    manager = AdvancedOllamaManager()
+
+    async def fake_process(request):
+        calls.append(request)
+        await asyncio.sleep(0.01)
+        return InferenceResponse(success=True, response=f"out:{request.prompt}",
+                                 model=request.model,
+                                 request_id=request.request_id)
+
+    manager._process_request = fake_process
+    return manager
+
+
+def test_identical_requests_share_one_backend_call():
+    calls = []
+    manager = _manager(calls)
+
+    async def scenario():
+        await manager.start()
+        try:
+            requests = [InferenceRequest(model="m", prompt="hello", request_id=f"r{i}") for i in range(4)]
+            requests.append(InferenceRequest(model="m", prompt="other", request_id="r4"))
+            return await asyncio.gather(*(manager.generate(r) for r in requests))
+        finally:
+            await manager.stop()
+
+    responses = asyncio.run(scenario())
+
+    assert [r.request_id for r in responses] == ["r0", "r1", "r2", "r3", "r4"]
+    assert responses[0].response == "out:hello"
+    assert sorted(c.prompt for c in calls) == ["hello", "other"]
+    batching = manager.get_stats()["batching"]
+    assert batching["coalesced_requests"] == 3
+    assert batching["batched_requests"] == 5
+    assert 0 < batching["avg_fill_ratio"] <= 1
+
+
+def test_prompts_with_a_shared_prefix_are_sent_whole():
+    calls = []
+    manager = _manager(calls)
+    prefix = "You are a helpful system. Context follows. "
+
+    async def scenario():
+        await manager.start()
+        try:
+            requests = [InferenceRequest(model="m", prompt=prefix + q, raw=True) for q in ("one?", "two?")]
+            return await asyncio.gather(*(manager.generate(r) for r in requests))
+        finally:
+            await manager.stop()
+
+    responses = asyncio.run(scenario())
+
+    assert all(r.success for r in responses)
+    assert sorted(c.prompt for c in calls) == [prefix + "one?", prefix + "two?"]
+    assert all(c.context is None and "num_predict" not in c.options for c in calls)
+
+
+def test_stop_settles_in_flight_and_queued_requests():
+    manager = AdvancedOllamaManager()
+    started = []
+
+    async def hanging_process(request):
+        started.append(request)
+        await asyncio.Event().wait()
+
+    manager._process_request = hanging_process
+
+    async def scenario():
+        await manager.start()
+        in_flight = [asyncio.create_task(manager.generate(InferenceRequest(model="m", prompt="p", request_id=f"r{i}")))
+                     for i in range(2)]
+        while not started:
+            await asyncio.sleep(0.001)
+        # Park the batch processor so the next request stays in the queue
+        manager.batch_processor_task.cancel()
+        await asyncio.gather(manager.batch_processor_task, return_exceptions=True)
+        manager.batch_processor_task = asyncio.create_task(asyncio.Event().wait())
+        queued = asyncio.create_task(manager.generate(InferenceRequest(model="m", prompt="q", request_id="r2")))
+        await asyncio.sleep(0.01)
+        await manager.stop()
+        return await asyncio.wait_for(asyncio.gather(*in_flight, queued), timeout=1.0)
+
+    responses = asyncio.run(scenario())
+
+    assert [r.request_id for r in responses] == ["r0", "r1", "r2"]
+    assert not any(r.success for r in responses)
+    assert [r.error for r in responses] == ["Backend call cancelled"] * 2 + ["Ollama manager stopped"]
+    assert manager.request_queue.empty()
@@ -0,0 +1,214 @@
+import asyncio
+import importlib
+import json
+import pytest
+
+if importlib.util.find_spec('aiohttp') is None:
+    pytest.skip("aiohttp not available", allow_module_level=True)
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from ultimate_agent.ai.backends.ollama_advanced import (
+    AdvancedOllamaManager, ConnectionPool, InferenceRequest, InstanceStatus, OllamaInstance
+)
+
+
+async def _stream_handler(request):
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    await response.prepare(request)
+    for i, token in enumerate(["Hel", "lo", "!"]):
+        await asyncio.sleep(0.01)
+        chunk = {"model": "m", "response": token, "done": i == 2}
+        if i == 2:
+            chunk["eval_count"] = 3
+        await response.write((json.dumps(chunk) + "\n").encode())
+    await response.write_eof()
+    return response
+
+
+async def _serve():
+    app = web.Application()
+    app.router.add_post("/api/generate", _stream_handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+def test_slot_held_until_body_is_read_and_connection_reused():
+    async def scenario():
+        server = await _serve()
+        instance = OllamaInstance(host=server.host, port=server.port, max_connections=1)
+        pool = ConnectionPool(instance)
+        try:
+            async with pool.request("POST", "/api/generate", json={}) as response:
+                assert instance.active_connections == 1
+                assert pool.semaphore.locked()
+                lines = [json.loads(line) async for line in response.content if line.strip()]
+            assert instance.active_connections == 0
+            assert not pool.semaphore.locked()
+
+            async with pool.request("POST", "/api/generate", json={}) as response:
+                await response.read()
+            return lines, pool.get_metrics()
+        finally:
+            await pool.close()
+            await server.close()
+
+    lines, metrics = asyncio.run(scenario())
+
+    assert "".join(line["response"] for line in lines) == "Hello!"
+    assert metrics["total_requests"] == 2
+    assert metrics["active_requests"] == 0
+    assert metrics["idle_connections"] == 1
+
+
+def test_streamed_inference_is_aggregated():
+    async def scenario():
+        server = await _serve()
+        manager = AdvancedOllamaManager()
+        manager.add_instance(OllamaInstance(host=server.host, port=server.port))
+        instance = manager.instances[-1]
+        try:
+            request = InferenceRequest(model="m", prompt="hi", stream=True, request_id="s1")
+            return await manager._make_inference_request(request, instance)
+        finally:
+            for pool in manager.connection_pools.values():
+                await pool.close()
+            await server.close()
+
+    response = asyncio.run(scenario())
+
+    assert response.success
+    assert response.response == "Hello!"
+    assert response.done
+    assert response.eval_count == 3
+
+
+def test_non_idempotent_requests_are_not_resent_after_a_disconnect():
+    calls = []
+
+    async def drop(request):
+        calls.append(request.method)
+        request.transport.close()
+        return web.Response()
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_route("*", "/api/generate", drop)
+        server = TestServer(app)
+        await server.start_server()
+        pool = ConnectionPool(OllamaInstance(host=server.host, port=server.port))
+        try:
+            for method in ("POST", "GET"):
+                with pytest.raises(aiohttp.ClientError):
+                    async with pool.request(method, "/api/generate", json={}) as response:
+                        await response.read()
+            return pool.get_metrics()
+        finally:
+            await pool.close()
+            await server.close()
+
+    metrics = asyncio.run(scenario())
+
+    # The POST went out once; only the GET was re-dialed
+    assert calls.count("POST") == 1 and calls.count("GET") >= 2
+    assert metrics["reconnects"] == 1
+
+
+def test_process_request_does_not_resend_a_generation_after_a_disconnect():
+    calls = []
+
+    async def drop(request):
+        calls.append(request.method)
+        request.transport.close()
+        return web.Response()
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/api/generate", drop)
+        server = TestServer(app)
+        await server.start_server()
+        manager = AdvancedOllamaManager()
+        manager.retry_delay = 0.01
+        manager.add_instance(OllamaInstance(host=server.host, port=server.port))
+        instance = manager.instances[-1]
+        instance.status = InstanceStatus.HEALTHY
+        instance.available_models.append("m")
+        try:
+            return await manager._process_request(InferenceRequest(model="m", prompt="hi", max_retries=3))
+        finally:
+            for pool in manager.connection_pools.values():
+                await pool.close()
+            await server.close()
+
+    response = asyncio.run(scenario())
+
+    assert not response.success
+    assert calls == ["POST"]
+
+
+def test_process_request_does_not_resend_a_generation_that_timed_out():
+    calls = []
+
+    async def slow(request):
+        calls.append(request.method)
+        await asyncio.sleep(1.0)
+        return web.json_response({"response": "late", "done": True})
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/api/generate", slow)
+        server = TestServer(app)
+        await server.start_server()
+        manager = AdvancedOllamaManager()
+        manager.retry_delay = 0.01
+        manager.add_instance(OllamaInstance(host=server.host, port=server.port, timeout=0.2))
+        instance = manager.instances[-1]
+        instance.status = InstanceStatus.HEALTHY
+        instance.available_models.append("m")
+        try:
+            return await manager._process_request(InferenceRequest(model="m", prompt="hi", max_retries=3))
+        finally:
+            for pool in manager.connection_pools.values():
+                await pool.close()
+            await server.close()
+
+    response = asyncio.run(scenario())
+
+    assert not response.success
+    assert calls == ["POST"]
+
+
+def test_retries_metric_counts_only_attempts_that_are_retried():
+    from ultimate_agent.ai.backends.ollama_advanced import OLLAMA_RETRIES
+
+    async def fail(request):
+        return web.Response(status=500, text="boom")
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/api/generate", fail)
+        server = TestServer(app)
+        await server.start_server()
+        manager = AdvancedOllamaManager()
+        manager.retry_delay = 0.01
+        manager.add_instance(OllamaInstance(host=server.host, port=server.port))
+        instance = manager.instances[-1]
+        instance.status = InstanceStatus.HEALTHY
+        instance.available_models.append("m")
+        retries = OLLAMA_RETRIES.labels(instance.instance_id)
+        before = retries.value
+        try:
+            response = await manager._process_request(InferenceRequest(model="m", prompt="hi", max_retries=3))
+            return response, retries.value - before
+        finally:
+            for pool in manager.connection_pools.values():
+                await pool.close()
+            await server.close()
+
+    response, retried = asyncio.run(scenario())
+
+    assert not response.success
+    assert retried == 2
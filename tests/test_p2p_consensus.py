@@ -0,0 +1,97 @@
+import asyncio
+import random
+import time
+
+import numpy as np
+
+from ultimate_agent.network.p2p.consensus import ReliabilityTracker, cluster_rows, flatten_result, rebuild_result
+from ultimate_agent.network.p2p.distributed_ai import ConsensusManager
+
+
+def _classification(rng, label, noise=0.001):
+    probabilities = [0.02] * 10
+    probabilities[label] = 0.82
+    return {'class': label, 'probabilities': [p * (1 + rng.uniform(-noise, noise)) for p in probabilities],
+            'model': 'm'}
+
+
+def test_hundreds_of_replicas_reach_weighted_consensus():
+    rng = random.Random(7)
+    results = [(f"honest-{i}", _classification(rng, 3)) for i in range(240)]
+    # A colluding minority and a few random liars
+    results += [(f"byzantine-{i}", _classification(rng, 5)) for i in range(40)]
+    results += [(f"random-{i}", _classification(rng, rng.randrange(10), noise=0.5)) for i in range(20)]
+    rng.shuffle(results)
+    manager = ConsensusManager("client")
+
+    start = time.perf_counter()
+    groups = manager._group_similar_results(results)
+    elapsed = time.perf_counter() - start
+    assert elapsed < 0.5
+    assert sum(len(nodes) for _, nodes in groups) == len(results)
+    assert len(groups[0][1]) == 240 and all(n.startswith("honest") for n in groups[0][1])
+    assert len(groups[1][1]) == 40
+
+    result = asyncio.run(manager.initiate_consensus("t1", results))
+    assert result['class'] == 3 and result['model'] == 'm'
+    assert abs(result['probabilities'][3] - 0.82) < 0.001
+
+    # Scores persist into the next task: dissenters lose voting weight
+    reliability = manager.reliability
+    assert reliability.score("honest-0") == 1.0
+    assert reliability.score("byzantine-0") < 1.0
+    asyncio.run(manager.initiate_consensus("t2", results))
+    assert reliability.score("byzantine-0") < 0.85
+    assert manager.get_stats()['reached'] == 2
+
+
+def test_non_numeric_and_mixed_results_group_exactly():
+    manager = ConsensusManager("client")
+    results = [("a", "cat"), ("b", "cat"), ("c", "dog"), ("d", {'x': 1.0}), ("e", {'x': 1.005}),
+               ("f", {'x': 1.0, 'y': 2}), ("g", [1, 2]), ("h", None)]
+    groups = {tuple(nodes) for _, nodes in manager._group_similar_results(results)}
+    assert groups == {("a", "b"), ("c",), ("d", "e"), ("f",), ("g",), ("h",)}
+
+    assert asyncio.run(manager.initiate_consensus("t", results[:3])) == "cat"
+    assert asyncio.run(manager.initiate_consensus("t", [("a", 1.0), ("b", 1.0), ("c", 2.0)])) == 1.0
+
+
+def test_flatten_round_trip_and_tolerance_rules():
+    tensor = np.arange(6, dtype=np.float32).reshape(2, 3)
+    result = {'logits': tensor, 'top': (1, 'x'), 'score': 0.5}
+    signature, values = flatten_result(result)
+    rebuilt = rebuild_result(result, values)
+    assert rebuilt['top'] == (1, 'x') and rebuilt['score'] == 0.5
+    assert rebuilt['logits'].dtype == np.float32 and np.array_equal(rebuilt['logits'], tensor)
+
+    rows = [[0.0, 100.0], [0.005, 100.5], [0.02, 100.0], [0.0, 103.0]]
+    clusters = cluster_rows(rows, [1.0] * 4, 0.01)
+    assert sorted(c.tolist() for c in clusters) == [[0, 1], [2], [3]]
+
+    # NaN matches nothing but still forms its own group
+    clusters = cluster_rows([[1.0], [np.nan], [1.0]], [1.0] * 3, 0.01)
+    assert sorted(c.tolist() for c in clusters) == [[0, 2], [1]]
+
+
+def test_ints_and_floats_agree_and_nan_reporters_are_counted():
+    manager = ConsensusManager("client")
+    results = [("a", {'x': 2}), ("b", {'x': 2.0}), ("c", 1), ("d", 1.0), ("e", {'x': float('nan')})]
+    groups = manager._group_similar_results(results)
+    assert {tuple(nodes) for _, nodes in groups} == {("a", "b"), ("c", "d"), ("e",)}
+    assert all(nodes for _, nodes in groups)
+
+    assert asyncio.run(manager.initiate_consensus("t", results[:2] + results[4:])) == {'x': 2}
+    assert manager.reliability.score("e") < 1.0
+
+
+def test_reliability_scores_survive_restart(tmp_path):
+    path = str(tmp_path / "reliability.json")
+    tracker = ReliabilityTracker(persist_path=path, save_interval=3600)
+    tracker.record(["good"], ["bad"])
+    tracker.record(["good"], ["bad"])
+    tracker.save()
+
+    restored = ReliabilityTracker(persist_path=path)
+    assert restored.score("bad") == tracker.score("bad") < 1.0
+    assert restored.rounds["good"] == 2
+    assert restored.weight("unknown") == 1.0
@@ -0,0 +1,113 @@
+import asyncio
+import random
+import time
+
+from ultimate_agent.network.p2p.distributed_ai import (
+    NodeCapability, NodeType, P2PNetworkManager, SIMULATED_NETWORK
+)
+from ultimate_agent.network.p2p.gossip import SeenMessageFilter
+
+
+async def _network(count, mode, degree=None, **config):
+    nodes = [P2PNetworkManager(f"g{i}", NodeType.COMPUTE_NODE, dict(config, broadcast_mode=mode))
+             for i in range(count)]
+    rng = random.Random(1)
+    for node in nodes:
+        others = [n for n in nodes if n is not node]
+        peers = others if degree is None else rng.sample(others, degree)
+        for peer in peers:
+            for a, b in ((node, peer), (peer, node)):
+                a.connected_peers[b.node_id] = {'status': 'connected'}
+                a.dht.add_node(NodeCapability(b.node_id, NodeType.COMPUTE_NODE, [], 1.0, 8.0, 100.0, False,
+                                              last_seen=time.time()))
+        node.running = True
+        asyncio.create_task(node._message_dispatch_loop())
+    return nodes
+
+
+async def _drain(nodes):
+    for _ in range(200):
+        await asyncio.sleep(0.005)
+        if all(node.incoming_queue.empty() for node in nodes):
+            return
+
+
+def _stop(nodes):
+    for node in nodes:
+        node.running = False
+        SIMULATED_NETWORK.pop(node.node_id, None)
+
+
+def test_gossip_reaches_everyone_with_n_log_n_messages():
+    async def run(mode):
+        random.seed(5)
+        nodes = await _network(64, mode)
+        try:
+            await nodes[0].announce_model("llama", {"size": 7})
+            await _drain(nodes)
+            reached = sum("model:llama" in node.dht.data_store for node in nodes)
+            sent = sum(node.metrics['messages_sent'] for node in nodes)
+            suppressed = sum(node.metrics['messages_suppressed'] for node in nodes)
+            return reached, sent, suppressed
+        finally:
+            _stop(nodes)
+
+    flood = asyncio.run(run('flood'))
+    gossip = asyncio.run(run('gossip'))
+
+    assert flood[0] == gossip[0] == 64
+    # Flooding a full mesh costs ~N^2 sends; gossip ~N * (ln N + 3)
+    assert flood[1] > 3000
+    assert gossip[1] < 64 * 9
+    assert gossip[2] == gossip[1] - 63
+
+
+def test_anti_entropy_spreads_heartbeats_without_broadcast():
+    async def scenario():
+        random.seed(2)
+        nodes = await _network(32, 'gossip', degree=2, anti_entropy_fanout=1)
+        try:
+            rounds = 0
+            while rounds < 12 and not all(len(n.heartbeats.entries) == 32 for n in nodes):
+                for node in nodes:
+                    await node._anti_entropy_round()
+                await _drain(nodes)
+                rounds += 1
+            sent = sum(node.metrics['messages_sent'] for node in nodes)
+            return rounds, sent, nodes
+        finally:
+            _stop(nodes)
+
+    rounds, sent, nodes = asyncio.run(scenario())
+
+    assert all(len(node.heartbeats.entries) == 32 for node in nodes)
+    assert rounds <= 8
+    # At most a push, a reply and a final push per node per round
+    assert sent <= rounds * 32 * 3
+
+
+def test_seen_filter_expires_by_bucket():
+    now = [0.0]
+    seen = SeenMessageFilter(window=40.0, buckets=4, capacity=1000, clock=lambda: now[0])
+
+    assert seen.add("m1")
+    assert not seen.add("m1")
+    now[0] = 25.0
+    assert "m1" in seen and seen.add("m2")
+    now[0] = 45.0
+    assert "m1" not in seen
+    assert "m2" in seen
+    assert not any(seen.add(f"x{i}") is False for i in range(1000))
+
+
+def test_seen_filter_recovers_after_a_long_idle_gap():
+    now = [0.0]
+    seen = SeenMessageFilter(window=40.0, buckets=4, capacity=1000, clock=lambda: now[0])
+    assert seen.add("old")
+
+    now[0] = 3600.0
+    assert "old" not in seen
+    assert seen.add("a")
+    assert "a" in seen and not seen.add("a")
+    now[0] = 3615.0
+    assert not seen.add("a")
@@ -0,0 +1,215 @@
+import asyncio
+import time
+
+from ultimate_agent.network.p2p.distributed_ai import (
+    ConsensusManager, DistributedHashTable, InferenceCoordinator, InferenceTask, ModelShard,
+    ModelShardManager, NodeCapability, NodeType
+)
+from ultimate_agent.network.p2p.pipeline import PipelineExecutor
+
+STAGE_TIME = 0.02
+
+
+def _coordinator(stages):
+    shard_manager = ModelShardManager("client")
+    coordinator = InferenceCoordinator("client", DistributedHashTable("client"), shard_manager,
+                                       ConsensusManager("client"))
+    plan = []
+    for i in range(stages):
+        node = NodeCapability(f"stage-{i}", NodeType.COMPUTE_NODE, ["m"], 1.0, 8.0, 100.0, False)
+        shard = ModelShard("m", f"m_shard_{i}", i, i, 10.0, "")
+        shard_manager.local_shards[shard.shard_id] = shard
+        shard_manager.shard_locations[shard.shard_id] = [node.node_id]
+        plan.append(node)
+    busy = set()
+    overlap = []
+
+    async def fake_stage(node_id, model_id, data, shard_id=None, **kwargs):
+        busy.add(node_id)
+        overlap.append(len(busy))
+        await asyncio.sleep(STAGE_TIME)
+        busy.discard(node_id)
+        return {'success': True, 'result': [item + [node_id] for item in data]}
+
+    coordinator._send_inference_request = fake_stage
+    return coordinator, plan, overlap
+
+
+def test_micro_batches_keep_every_stage_busy():
+    async def scenario():
+        coordinator, nodes, overlap = _coordinator(4)
+        coordinator.micro_batches = 8
+        task = InferenceTask("t1", "m", [[i] for i in range(16)], timeout=5.0, batched=True)
+        plan = await coordinator._create_execution_plan(task, nodes)
+        start = time.perf_counter()
+        results = await coordinator._execute_distributed_inference(task, plan)
+        elapsed = time.perf_counter() - start
+        stats = coordinator.get_pipeline_stats()
+        await coordinator.close()
+        return plan, results, elapsed, overlap, stats
+
+    plan, results, elapsed, overlap, stats = asyncio.run(scenario())
+
+    assert plan['type'] == 'pipeline'
+    node_id, output = results[0]
+    assert node_id == "stage-3"
+    assert output == [[i, "stage-0", "stage-1", "stage-2", "stage-3"] for i in range(16)]
+    # 8 micro-batches x 4 stages: (8 + 4 - 1) slots pipelined instead of 32 sequential
+    assert elapsed < 20 * STAGE_TIME
+    assert max(overlap) == 4
+
+    (pipeline,) = stats.values()
+    assert pipeline['micro_batches_completed'] == 8
+    assert [stage['processed'] for stage in pipeline['stages']] == [8, 8, 8, 8]
+    # Fill and drain leave each stage idle for about 3 of the 11 slots
+    assert 0.1 < pipeline['bubble_fraction'] < 0.5
+    assert all(stage['queue_high_water'] <= 2 for stage in pipeline['stages'])
+
+
+def test_pipelined_output_matches_sequential_output():
+    async def run(micro_batches, task, dict_output):
+        coordinator, nodes, _ = _coordinator(2)
+        coordinator.micro_batches = micro_batches
+        seen = []
+        list_stage = coordinator._send_inference_request
+
+        async def stage(node_id, model_id, data, shard_id=None, **kwargs):
+            seen.append(data)
+            if not dict_output:
+                return await list_stage(node_id, model_id, data, shard_id=shard_id, **kwargs)
+            if isinstance(data, dict):
+                data = data['tokens']
+            return {'success': True, 'result': {'tokens': [item + [node_id] for item in data], 'model': model_id}}
+
+        coordinator._send_inference_request = stage
+        plan = await coordinator._create_execution_plan(task, nodes)
+        results = await coordinator._execute_pipeline_inference(task, plan)
+        await coordinator.close()
+        return results[0][1], seen
+
+    # A single token sequence has no batch axis and travels whole
+    sequence = [[1], [2], [3], [4]]
+    output, seen = asyncio.run(run(4, InferenceTask("seq", "m", sequence, timeout=5.0), False))
+    assert seen[0] == sequence
+    assert len(seen) == 2
+
+    # Dict outputs are merged key by key into the same shape a single pass produces
+    batch = [[i] for i in range(8)]
+    pipelined, seen = asyncio.run(run(4, InferenceTask("b", "m", batch, timeout=5.0, batched=True), True))
+    sequential, _ = asyncio.run(run(1, InferenceTask("b", "m", batch, timeout=5.0, batched=True), True))
+    assert len(seen) == 8
+    assert pipelined == sequential
+    assert pipelined == {'tokens': [[i, "stage-0", "stage-1"] for i in range(8)], 'model': "m"}
+
+
+def test_outputs_that_cannot_be_merged_fall_back_to_one_pass():
+    async def scenario():
+        coordinator, nodes, _ = _coordinator(1)
+        coordinator.micro_batches = 4
+        calls = []
+
+        async def stage(node_id, model_id, data, shard_id=None, **kwargs):
+            calls.append(data)
+            return {'success': True, 'result': f"summary of {len(data)}"}
+
+        coordinator._send_inference_request = stage
+        task = InferenceTask("s", "m", [[i] for i in range(8)], timeout=5.0, batched=True)
+        plan = await coordinator._create_execution_plan(task, nodes)
+        first = await coordinator._execute_pipeline_inference(task, plan)
+        calls_after_first = len(calls)
+        second = await coordinator._execute_pipeline_inference(task, plan)
+        await coordinator.close()
+        return first, second, calls_after_first, len(calls)
+
+    first, second, calls_after_first, total_calls = asyncio.run(scenario())
+
+    assert first[0][1] == second[0][1] == "summary of 8"
+    # 4 micro-batches, then one unsplit retry; later requests skip the split
+    assert calls_after_first == 5
+    assert total_calls == 6
+
+
+def test_concurrent_requests_share_the_pipeline_and_failures_are_isolated():
+    async def scenario():
+        coordinator, nodes, _ = _coordinator(3)
+        coordinator.micro_batches = 1
+        plan = await coordinator._create_execution_plan(InferenceTask("t", "m", []), nodes)
+        stage_request = coordinator._send_inference_request
+
+        async def flaky(node_id, model_id, data, shard_id=None, **kwargs):
+            if data[0][0] == "bad" and node_id == "stage-1":
+                return {'success': False}
+            return await stage_request(node_id, model_id, data, shard_id)
+
+        coordinator._send_inference_request = flaky
+        tasks = [InferenceTask(f"t{i}", "m", [[i]], timeout=5.0) for i in range(6)]
+        tasks.append(InferenceTask("bad", "m", [["bad"]], timeout=5.0))
+        start = time.perf_counter()
+        results = await asyncio.gather(*(coordinator._execute_pipeline_inference(task, plan) for task in tasks),
+                                       return_exceptions=True)
+        elapsed = time.perf_counter() - start
+        stats = coordinator.get_pipeline_stats()
+        await coordinator.close()
+        return results, elapsed, stats
+
+    results, elapsed, stats = asyncio.run(scenario())
+
+    assert [r[0][1] for r in results[:6]] == [[[i, "stage-0", "stage-1", "stage-2"]] for i in range(6)]
+    assert isinstance(results[6], Exception)
+    assert elapsed < 12 * STAGE_TIME
+    (pipeline,) = stats.values()
+    assert pipeline['requests'] == 7
+    assert pipeline['micro_batches_failed'] == 1
+
+
+def test_close_fails_in_flight_micro_batches_and_stages_carry_the_task_timeout():
+    async def scenario():
+        coordinator, nodes, _ = _coordinator(2)
+        coordinator.micro_batches = 1
+        plan = await coordinator._create_execution_plan(InferenceTask("t", "m", []), nodes)
+        seen = []
+
+        async def hanging(node_id, model_id, data, shard_id=None, **kwargs):
+            seen.append(kwargs)
+            await asyncio.sleep(60)
+
+        coordinator._send_inference_request = hanging
+        task = InferenceTask("slow", "m", [[1]], timeout=30.0)
+        request = asyncio.create_task(coordinator._execute_pipeline_inference(task, plan))
+        await asyncio.sleep(0.01)
+        (pipeline,) = coordinator.pipelines.values()
+        await coordinator.close()
+        try:
+            await asyncio.wait_for(request, 1.0)
+        except RuntimeError as e:
+            return seen, e, pipeline.get_stats()
+
+    seen, error, stats = asyncio.run(scenario())
+
+    assert seen == [{'timeout': 30.0, 'task_id': "slow"}]
+    assert "closed" in str(error)
+    assert stats['in_flight'] == 0
+
+
+def test_cancelling_a_request_blocked_on_a_full_queue_does_not_leak_in_flight():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def stage(index, data, context):
+            await release.wait()
+            return data
+
+        pipeline = PipelineExecutor(["a"], stage, queue_size=1)
+        request = asyncio.create_task(pipeline.run(list(range(5))))
+        await asyncio.sleep(0.01)
+        request.cancel()
+        await asyncio.gather(request, return_exceptions=True)
+        release.set()
+        await asyncio.sleep(0.01)
+        stats = pipeline.get_stats()
+        await pipeline.close()
+        return stats
+
+    stats = asyncio.run(scenario())
+
+    assert stats['in_flight'] == 0
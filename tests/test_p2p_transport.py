@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from ultimate_agent.network.advanced.network_manager import AdvancedNetworkManager
+from ultimate_agent.network.p2p.distributed_ai import NodeType, P2PMessage, MessageType, P2PNetworkManager
+from ultimate_agent.network.p2p.transport import TCPTransport, create_transport
+
+
+def _tcp_node(name, models=()):
+    config = {'transport': 'tcp', 'network_secret': 'test-secret', 'rpc_timeout': 2.0,
+              'models': list(models)}
+    return P2PNetworkManager(name, NodeType.COMPUTE_NODE, config)
+
+
+async def _start(node):
+    # Skip the periodic loops; only dispatch is needed
+    await node.transport.start()
+    node.running = True
+    asyncio.create_task(node._message_dispatch_loop())
+
+
+def test_inference_over_loopback_tcp():
+    async def scenario():
+        nodes = [_tcp_node("client"), _tcp_node("worker-a", ["bert"]), _tcp_node("worker-b", ["bert"])]
+        client, worker_a, worker_b = nodes
+        try:
+            for node in nodes:
+                await _start(node)
+            await worker_b.join_network([worker_a.transport.address])
+            await client.join_network([worker_a.transport.address])
+
+            result = await client.request_inference("bert", {"text": "hello"}, timeout=5.0)
+            return result, client.dht.find_nodes_with_model("bert"), client.get_network_status()
+        finally:
+            for node in nodes:
+                node.running = False
+                await node.transport.stop()
+
+    result, holders, status = asyncio.run(scenario())
+
+    # worker-b was only ever contacted through the lookup, by address
+    assert {c.node_id for c in holders} == {"worker-a", "worker-b"}
+    assert result['success']
+    assert result['nodes_used'] == 1
+    assert 'processing_info' in result['result']
+    assert status['metrics']['inference_rpcs'] == 1
+    assert status['metrics']['inference_rpc_timeouts'] == 0
+    assert status['transport']['frames_sent'] >= 3
+
+
+def test_tcp_send_queue_is_bounded_and_coalesced():
+    async def scenario():
+        sender = P2PNetworkManager("sender", NodeType.COMPUTE_NODE, {},
+                                   transport=TCPTransport(secret=b"s", max_queue_bytes=4096))
+        receiver = P2PNetworkManager("receiver", NodeType.COMPUTE_NODE, {},
+                                     transport=TCPTransport(secret=b"s"))
+        try:
+            await sender.transport.start()
+            await receiver.transport.start()
+            sender.transport.addresses["receiver"] = receiver.transport.address
+
+            accepted = 0
+            for i in range(50):
+                message = P2PMessage(MessageType.NETWORK_UPDATE, "sender", {"seq": i, "pad": "x" * 200})
+                accepted += await sender.transport.send("receiver", message)
+
+            received = []
+            while len(received) < accepted:
+                _, message = await asyncio.wait_for(receiver.incoming_queue.get(), 2.0)
+                received.append(message.data["seq"])
+            return accepted, received, sender.transport.get_stats()
+        finally:
+            await sender.transport.stop()
+            await receiver.transport.stop()
+
+    accepted, received, stats = asyncio.run(scenario())
+
+    assert 0 < accepted < 50
+    assert stats['dropped_frames'] == 50 - accepted
+    assert received == list(range(accepted))
+    # Everything queued while the connection was dialing went out in one write
+    assert stats['batches_sent'] < accepted
+
+
+def test_tcp_requires_a_shared_secret_and_accepts_long_node_ids():
+    with pytest.raises(ValueError, match="network_secret"):
+        create_transport({'transport': 'tcp'})
+
+    class _Writer:
+        def __init__(self):
+            self.data = b""
+
+        def write(self, data):
+            self.data += data
+
+        async def drain(self):
+            pass
+
+    async def scenario():
+        manager = AdvancedNetworkManager("n" * 300, secret=b"s")
+        writer = _Writer()
+        await manager._send_hello(writer)
+        reader = asyncio.StreamReader()
+        reader.feed_data(writer.data)
+        return await manager._receive_hello(reader)
+
+    assert asyncio.run(scenario()) == "n" * 300
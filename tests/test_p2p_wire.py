@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from ultimate_agent.network.p2p import wire
+from ultimate_agent.network.p2p.distributed_ai import P2PMessage, MessageType
+
+
+def test_roundtrip_json_bytes_and_ndarray():
+    tensor = np.arange(12, dtype=np.float32).reshape(3, 4)
+    for data in ({"load": 0.5, "models": ["a"] * 200}, b"\x00\x01raw", tensor, np.array(2.5, dtype=np.float32)):
+        msg = P2PMessage(MessageType.PARTIAL_RESULT, "node-a", data, ttl=7)
+        msg.path.append("node-b")
+        decoded = P2PMessage.deserialize(msg.serialize())
+
+        assert decoded.type == MessageType.PARTIAL_RESULT
+        assert (decoded.message_id, decoded.sender_id, decoded.ttl) == (msg.message_id, "node-a", 7)
+        assert decoded.path == ["node-a", "node-b"]
+        assert decoded.timestamp == msg.timestamp
+        if isinstance(data, np.ndarray):
+            assert decoded.data.dtype == np.float32 and decoded.data.shape == data.shape
+            np.testing.assert_array_equal(decoded.data, data)
+        else:
+            assert decoded.data == data
+
+
+def test_relay_reuses_payload_frame_without_decoding():
+    msg = P2PMessage(MessageType.MODEL_ANNOUNCE, "node-a", {"model_id": "m" * 2000})
+    received = P2PMessage.deserialize(msg.serialize())
+    received.ttl -= 1
+    received.path.append("relay")
+    relayed = received.serialize()
+
+    # The payload was never decoded on the relay and is forwarded byte for byte
+    assert received._data is P2PMessage._UNDECODED
+    assert relayed.endswith(msg.payload_frame())
+    final = P2PMessage.deserialize(relayed)
+    assert final.ttl == msg.ttl - 1
+    assert final.data == {"model_id": "m" * 2000}
+
+
+def test_compression_threshold_and_legacy_frames():
+    small = wire.encode_payload({"x": 1})
+    large = wire.encode_payload({"x": "y" * 5000})
+    assert small[1] == 0 and large[1] == 1
+    assert len(large) < 5000
+
+    legacy = P2PMessage(MessageType.HEARTBEAT, "old-node", {"load": 0.1}).serialize_legacy()
+    assert P2PMessage.deserialize(legacy).data == {"load": 0.1}
+
+    with pytest.raises(wire.WireFormatError):
+        P2PMessage.deserialize(P2PMessage(MessageType.HEARTBEAT, "n", {"a": 1}).serialize()[:-2])
+
+
+def test_unknown_message_type_is_a_format_error():
+    frame = P2PMessage(MessageType.HEARTBEAT, "n", {"a": 1}).serialize()
+    header, offset = wire.decode_header(frame)
+    unknown = wire.encode_header(250, header['ttl'], header['timestamp'], header['message_id'],
+                                 header['sender_id'], header['path']) + frame[offset:]
+
+    with pytest.raises(ValueError, match="Unknown message type"):
+        P2PMessage.deserialize(unknown)
+
+
+def test_ndarray_dtypes_that_cannot_travel_raw_are_rejected():
+    for array in (np.array([{"a": 1}], dtype=object),
+                  np.zeros(2, dtype=[("x", np.float32), ("y", np.int8)])):
+        with pytest.raises(ValueError, match="Cannot send arrays"):
+            wire.encode_payload(array)
+
+    def frame(header, body):
+        return wire._PAYLOAD.pack(wire.PAYLOAD_NDARRAY, 0, len(header + body)) + header + body
+
+    one = (1).to_bytes(8, "big")
+    bad_frames = [
+        frame(b"\x03|O8\x01" + one, bytes(8)),      # object pointers
+        frame(b"\x04|V16\x01" + one, bytes(16)),    # fields stripped to raw void
+        frame(b"\x03<zz\x01" + one, bytes(4)),      # not a dtype
+        frame(b"\x03<i4\x02" + one, b""),           # shape cut short
+        frame(b"\x03<i4\x01" + one, bytes(3)),      # body too short
+        frame(b"\x03<i4\x01" + one, bytes(5)),      # body too long
+    ]
+    for bad in bad_frames:
+        with pytest.raises(wire.WireFormatError):
+            wire.decode_payload(bad)
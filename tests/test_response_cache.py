@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+from ultimate_agent.ai.inference.response_cache import ResponseCache
+
+
+def test_exact_hits_ignore_whitespace_and_respect_options():
+    cache = ResponseCache()
+
+    async def scenario():
+        await cache.put("m", "What is  AI?", {"temperature": 0.1}, {"response": "x"}, tokens=12)
+        hit = await cache.get("m", " What is AI? ", {"temperature": 0.1})
+        other_options = await cache.get("m", "What is AI?", {"temperature": 0.9})
+        other_model = await cache.get("n", "What is AI?", {"temperature": 0.1})
+        return hit, other_options, other_model
+
+    hit, other_options, other_model = asyncio.run(scenario())
+
+    assert hit == {"response": "x"}
+    assert other_options is None and other_model is None
+    stats = cache.get_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+    assert stats["saved_tokens"] == 12
+
+
+def test_byte_budget_evicts_lru_and_ttl_expires():
+    cache = ResponseCache(max_bytes=60, ttl=0.05)
+
+    async def scenario():
+        await cache.put("m", "a", None, {"response": "a" * 10})
+        await cache.put("m", "b", None, {"response": "b" * 10})
+        await cache.get("m", "a")
+        await cache.put("m", "c", None, {"response": "c" * 10})
+        present = {p: await cache.get("m", p) is not None for p in "abc"}
+        time.sleep(0.06)
+        return present, await cache.get("m", "a")
+
+    present, expired = asyncio.run(scenario())
+
+    assert present == {"a": True, "b": False, "c": True}
+    assert expired is None
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_persistence_and_similarity(tmp_path):
+    path = str(tmp_path / "cache.db")
+
+    async def scenario():
+        first = ResponseCache(persist_path=path)
+        await first.put("m", "hello", None, {"response": "hi"}, tokens=3)
+        first.close()
+
+        second = ResponseCache(persist_path=path)
+        restored = await second.get("m", "hello")
+
+        vectors = {"how do I reset my password": [1.0, 0.0], "how can I reset my password": [0.99, 0.05],
+                   "weather today": [0.0, 1.0]}
+        similar = ResponseCache(embedder=lambda text: vectors[text], similarity_threshold=0.95)
+        await similar.put("m", "how do I reset my password", None, {"response": "steps"})
+        near = await similar.get("m", "how can I reset my password")
+        far = await similar.get("m", "weather today")
+        return restored, second.get_stats(), near, far
+
+    restored, stats, near, far = asyncio.run(scenario())
+
+    assert restored == {"response": "hi"}
+    assert stats["disk_hits"] == 1
+    assert near == {"response": "steps"}
+    assert far is None
+
+
+def test_miss_embedding_is_reused_and_disk_store_is_bounded(tmp_path):
+    calls = []
+
+    def embed(text):
+        calls.append(text)
+        return [1.0, float(len(text))]
+
+    cache = ResponseCache(persist_path=str(tmp_path / "cache.db"), embedder=embed,
+                          max_disk_bytes=100, sweep_interval=0.0)
+
+    async def scenario():
+        assert await cache.get("m", "first") is None
+        await cache.put("m", "first", None, {"response": "x" * 40})
+        for prompt in ("second", "third"):
+            await cache.put("m", prompt, None, {"response": "y" * 40})
+
+    asyncio.run(scenario())
+
+    assert calls == ["first", "second", "third"]
+    rows = cache._db.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+    assert rows == 1
+    assert cache.get_stats()["disk_evictions"] == 2
+    cache.close()
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+
+from ultimate_agent.tasks.execution.stream_consumer import StreamConsumer
+
+
+class FakeStream:
+    """Minimal in-process stand-in for a Redis stream with one consumer group."""
+
+    def __init__(self):
+        self.entries = []
+        self.next_index = 0
+        self.pending = {}
+        self.ack_calls = []
+
+    def add(self, fields):
+        message_id = f"{len(self.entries) + 1}-0".encode()
+        self.entries.append((message_id, {k.encode(): v.encode() for k, v in fields.items()}))
+        return message_id
+
+    async def xreadgroup(self, groupname, consumername, streams, count, block):
+        batch = self.entries[self.next_index:self.next_index + count]
+        self.next_index += len(batch)
+        for message_id, _ in batch:
+            self.pending[message_id] = (consumername, time.time())
+        if not batch:
+            await asyncio.sleep(block / 1000)
+            return []
+        return [(b"agent:tasks", batch)]
+
+    async def xack(self, stream, group, *ids):
+        self.ack_calls.append(ids)
+        for message_id in ids:
+            self.pending.pop(message_id, None)
+        return len(ids)
+
+    async def xautoclaim(self, stream, group, consumer, min_idle_time, start_id, count):
+        claimed = []
+        lookup = dict(self.entries)
+        for message_id, (_, since) in list(self.pending.items()):
+            if len(claimed) < count and (time.time() - since) * 1000 >= min_idle_time:
+                self.pending[message_id] = (consumer, time.time())
+                claimed.append((message_id, lookup[message_id]))
+        return [b"0-0", claimed, []]
+
+
+def test_consumer_runs_tasks_concurrently_and_batches_acks():
+    stream = FakeStream()
+    for i in range(12):
+        stream.add({"task_id": f"t{i}"})
+
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0, "done": []}
+
+    def execute(task):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.05)
+        with lock:
+            state["active"] -= 1
+            state["done"].append(task["task_id"])
+        return {"task_id": task["task_id"]}
+
+    consumer = StreamConsumer(stream, "agent:tasks", "g", "c1", execute,
+                              max_in_flight=4, ack_batch_size=4, block_ms=10, reclaim_interval=60)
+
+    async def scenario():
+        runner = asyncio.create_task(consumer.run())
+        while len(state["done"]) < 12:
+            await asyncio.sleep(0.01)
+        consumer.stop()
+        await runner
+
+    asyncio.run(scenario())
+
+    assert sorted(state["done"]) == sorted(f"t{i}" for i in range(12))
+    assert 1 < state["peak"] <= 4
+    assert not stream.pending
+    assert len(stream.ack_calls) < 12
+
+
+def test_reclaims_stalled_pending_entries():
+    stream = FakeStream()
+    stream.add({"task_id": "orphan"})
+    stream.next_index = 1
+    stream.pending[b"1-0"] = ("dead-consumer", time.time() - 120)
+    done = []
+
+    consumer = StreamConsumer(stream, "agent:tasks", "g", "c1", lambda t: done.append(t["task_id"]),
+                              max_in_flight=2, block_ms=10, reclaim_idle_ms=1000, reclaim_interval=0)
+
+    async def scenario():
+        runner = asyncio.create_task(consumer.run())
+        while not done:
+            await asyncio.sleep(0.01)
+        consumer.stop()
+        await runner
+
+    asyncio.run(scenario())
+
+    assert done == ["orphan"]
+    assert consumer.get_stats()["reclaimed"] == 1
+    assert not stream.pending
@@ -0,0 +1,99 @@
+import threading
+import time
+
+from ultimate_agent.tasks.execution.engine import TaskExecutionEngine, TaskState
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def _blocked_engine():
+    """Engine with its single worker parked on a gate task."""
+    engine = TaskExecutionEngine(max_workers=1)
+    gate = threading.Event()
+    engine.submit("gate", "gate", lambda h: gate.wait(2))
+    assert _wait_for(lambda: engine.running_count() == 1)
+    return engine, gate
+
+
+def test_priority_and_type_fairness():
+    engine, gate = _blocked_engine()
+    order = []
+    for i in range(3):
+        engine.submit(f"a{i}", "a", lambda h: order.append(h.task_id))
+    engine.submit("b0", "b", lambda h: order.append(h.task_id))
+    engine.submit("urgent", "c", lambda h: order.append(h.task_id), priority=5)
+
+    gate.set()
+    assert _wait_for(lambda: len(order) == 5)
+    engine.shutdown()
+
+    assert order[0] == "urgent"
+    # the single "b" task is interleaved with the "a" burst instead of waiting behind it
+    assert order.index("b0") < order.index("a2")
+
+
+def test_cancel_pause_resume_queued():
+    engine, gate = _blocked_engine()
+    ran = []
+    engine.submit("x", "t", lambda h: ran.append("x"))
+    engine.submit("y", "t", lambda h: ran.append("y"))
+
+    assert engine.cancel("x") is True
+    assert engine.get("x") is None
+    assert engine.pause("y") is True
+    assert engine.queued_count() == 0
+
+    gate.set()
+    assert _wait_for(lambda: engine.running_count() == 0)
+    assert ran == []
+
+    assert engine.resume("y") is True
+    assert _wait_for(lambda: ran == ["y"])
+    engine.shutdown()
+
+
+def test_running_task_checkpoint():
+    engine = TaskExecutionEngine(max_workers=1)
+    steps = []
+
+    def body(handle):
+        for i in range(100):
+            if not handle.checkpoint():
+                return
+            steps.append(i)
+            time.sleep(0.005)
+
+    engine.submit("loop", "t", body)
+    assert _wait_for(lambda: len(steps) > 2)
+    engine.pause("loop")
+    assert engine.get("loop").state == TaskState.PAUSED
+    paused_at = len(steps)
+    time.sleep(0.05)
+    assert len(steps) <= paused_at + 1
+
+    engine.resume("loop")
+    assert _wait_for(lambda: len(steps) > paused_at + 2)
+    engine.cancel("loop")
+    assert _wait_for(lambda: engine.running_count() == 0)
+    assert len(steps) < 100
+    engine.shutdown()
+
+
+def test_shutdown_without_cancel_drains_the_queue():
+    engine, gate = _blocked_engine()
+    ran = []
+    for i in range(3):
+        engine.submit(f"q{i}", "t", lambda h: ran.append(h.task_id))
+
+    threading.Timer(0.02, gate.set).start()
+    engine.shutdown(cancel_pending=False, timeout=2.0)
+
+    assert sorted(ran) == ["q0", "q1", "q2"]
+    assert engine.worker_count() == 0 and engine.queued_count() == 0
@@ -0,0 +1,40 @@
+from ultimate_agent.tasks.execution.history import TaskHistoryStore
+
+
+def test_ring_buffer_keeps_index_and_lifetime_stats():
+    store = TaskHistoryStore(max_records=3)
+    for i in range(5):
+        store.append({'task_id': f"t{i}", 'success': i % 2 == 0, 'duration': 2.0, 'reward': 1.0 if i % 2 == 0 else 0})
+
+    assert len(store) == 3
+    assert store.get("t0") is None
+    assert store.get("t4")['task_id'] == "t4"
+    assert [r['task_id'] for r in store] == ["t2", "t3", "t4"]
+
+    stats = store.get_statistics()
+    assert stats['total_completed'] == 5
+    assert stats['successful_tasks'] == 3
+    assert stats['failed_tasks'] == 2
+    assert stats['average_duration'] == 2.0
+    assert stats['total_earnings'] == 3.0
+
+
+def test_trim_drops_oldest_records():
+    store = TaskHistoryStore(max_records=10)
+    for i in range(4):
+        store.append({'task_id': f"t{i}", 'success': True})
+
+    assert store.trim(1) == 3
+    assert store.get("t2") is None
+    assert [r['task_id'] for r in store.recent()] == ["t3"]
+    assert store.get_statistics()['total_completed'] == 4
+
+
+def test_scheduler_exposes_recent_tasks_newest_first():
+    from ultimate_agent.tasks.execution.task_scheduler import TaskScheduler
+
+    scheduler = TaskScheduler(None, None)
+    for i in range(5):
+        scheduler.completed_tasks.append({'task_id': f"t{i}", 'success': True})
+
+    assert [r['task_id'] for r in scheduler.get_recent_tasks(3)] == ["t4", "t3", "t2"]
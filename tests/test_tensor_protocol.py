@@ -0,0 +1,90 @@
+import asyncio
+import socket
+
+import numpy as np
+import pytest
+
+from ultimate_agent.network.protocols.tensor_protocol import (
+    STREAM_PREFIX, StreamingTensorSocket, TensorProtocol
+)
+
+
+def _pair(chunk_size):
+    left, right = socket.socketpair()
+    return StreamingTensorSocket(left, chunk_size=chunk_size), StreamingTensorSocket(right)
+
+
+def test_stream_round_trip_into_preallocated_array():
+    tensor = np.random.default_rng(0).standard_normal((3, 1000, 7)).astype(np.float32)
+    out = np.empty_like(tensor)
+
+    async def scenario():
+        sender, receiver = _pair(chunk_size=4096)
+        try:
+            _, received = await asyncio.gather(
+                sender.send_tensor_stream(tensor, request_id="req-1"),
+                receiver.receive_tensor_stream(out=out)
+            )
+            strided = tensor[:, ::2]
+            _, second = await asyncio.gather(
+                sender.send_tensor_stream(strided), receiver.receive_tensor_stream()
+            )
+            _, scalar = await asyncio.gather(
+                sender.send_tensor_stream(np.array(3.5)), receiver.receive_tensor_stream()
+            )
+            return received, second, strided, scalar
+        finally:
+            sender.socket.close()
+            receiver.socket.close()
+
+    received, second, strided, scalar = asyncio.run(scenario())
+
+    assert received['tensor'] is out
+    assert received['request_id'] == "req-1"
+    np.testing.assert_array_equal(out, tensor)
+    np.testing.assert_array_equal(second['tensor'], strided)
+    assert scalar['tensor'].shape == () and scalar['tensor'] == 3.5
+
+
+def test_chunks_are_bounded_views_and_checked():
+    tensor = np.arange(10_000, dtype=np.int64)
+
+    async def scenario():
+        sender, receiver = _pair(chunk_size=1000)
+        try:
+            send = asyncio.ensure_future(sender.send_tensor_stream(tensor))
+            header = await receiver.receive_tensor_header()
+            pieces = []
+            async for offset, chunk in receiver.iter_tensor_chunks(header):
+                assert chunk.nbytes <= header['chunk_size']
+                pieces.append((offset, chunk.copy()))
+            await send
+            return header, pieces
+        finally:
+            sender.socket.close()
+            receiver.socket.close()
+
+    header, pieces = asyncio.run(scenario())
+
+    # Chunk size is rounded down to whole int64 elements
+    assert header['chunk_size'] == 1000 // 8 * 8
+    assert pieces[1][0] == len(pieces[0][1])
+    np.testing.assert_array_equal(np.concatenate([chunk for _, chunk in pieces]), tensor)
+
+    frame = bytearray(b"".join(bytes(b) for b in TensorProtocol.stream_buffers(tensor[:10], 1)))
+    assert TensorProtocol.decode_stream(frame)['tensor'].tolist() == list(range(10))
+    frame[-1] ^= 0xFF
+    with pytest.raises(ValueError, match="Checksum"):
+        TensorProtocol.decode_stream(frame)
+
+
+def test_stream_header_carries_64_bit_sizes():
+    huge = np.broadcast_to(np.zeros(1, dtype=np.float16), (2, 2 ** 33))
+    header = TensorProtocol.stream_header(huge, TensorProtocol.MSG_INFERENCE_RESPONSE, "big")
+
+    parsed = TensorProtocol.parse_stream_prefix(header)
+    TensorProtocol.parse_stream_extra(parsed, header[STREAM_PREFIX.size:])
+
+    assert parsed['nbytes'] == 2 ** 35
+    assert parsed['shape'] == (2, 2 ** 33)
+    assert parsed['dtype'] == np.float16
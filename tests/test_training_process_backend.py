@@ -0,0 +1,37 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from ultimate_agent.ai.training.process_backend import ProcessTrainingBackend
+
+
+def test_process_backend_relays_progress_and_cancels():
+    backend = ProcessTrainingBackend(max_workers=1)
+    try:
+        seen = []
+        result = backend.run('hyperparameter_optimization', {'max_trials': 5},
+                             lambda p, d: seen.append(p) or True)
+        assert result['success'] is True
+        assert seen == [20.0, 40.0, 60.0, 80.0, 100.0]
+
+        result = backend.run('hyperparameter_optimization', {'max_trials': 50},
+                             lambda p, d: False)
+        assert result['success'] is False
+        assert backend.get_status()['cancelled'] == 1
+    finally:
+        backend.shutdown()
+
+
+def test_process_backend_recovers_from_a_crashed_worker():
+    backend = ProcessTrainingBackend(max_workers=1)
+    try:
+        crash = backend._get_pool().submit(os._exit, 1)
+        with pytest.raises(BrokenProcessPool):
+            crash.result(timeout=30)
+
+        result = backend.run('hyperparameter_optimization', {'max_trials': 2}, lambda p, d: True)
+        assert result['success'] is True
+        assert backend.get_status()['pool_restarts'] == 1
+    finally:
+        backend.shutdown()
@@ -20,8 +20,8 @@ import time
 import json
 import hashlib
 import random
-from typing import Dict, Any, List, Optional, Union, AsyncGenerator, Callable
-from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Union, AsyncGenerator, Callable, Tuple
+from dataclasses import dataclass, field, replace
 from enum import Enum
 import logging
 from datetime import datetime, timedelta
@@ -30,6 +30,10 @@ import weakref
 from collections import defaultdict, deque
 import threading
 from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from ..inference.response_cache import ResponseCache
+from ...monitoring.metrics.registry import REGISTRY
 
 try:
     import ollama
@@ -38,6 +42,18 @@ except ImportError:
     OLLAMA_AVAILABLE = False
     print("⚠️ ollama-python not available. Install with: pip install ollama")
 
+OLLAMA_TTFT = REGISTRY.histogram(
+    'agent_ollama_ttft_seconds', 'Time to first token per Ollama instance', ['instance'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+)
+OLLAMA_TOKENS_PER_SECOND = REGISTRY.histogram(
+    'agent_ollama_tokens_per_second', 'Generation throughput per Ollama instance', ['instance'],
+    buckets=(1, 5, 10, 20, 40, 80, 160, 320, 640)
+)
+OLLAMA_RETRIES = REGISTRY.counter(
+    'agent_ollama_retries_total', 'Failed inference attempts that were retried', ['instance']
+)
+
 
 class InstanceStatus(Enum):
     """Ollama instance status"""
@@ -154,6 +170,30 @@ class InferenceRequest:
             data["raw"] = self.raw
             
         return data
+    
+    def cache_options(self) -> Dict[str, Any]:
+        """Everything besides model and prompt that affects the generated text"""
+        return {
+            "options": self.options,
+            "system": self.system,
+            "template": self.template,
+            "format": self.format,
+            "raw": self.raw,
+            "context": self.context
+        }
+    
+    def batch_key(self) -> Tuple:
+        """Requests with equal keys differ only in their prompt and can share backend work"""
+        return (
+            self.model,
+            json.dumps(self.options, sort_keys=True, default=str),
+            self.system,
+            self.template,
+            self.format,
+            self.raw,
+            self.keep_alive,
+            tuple(self.context) if self.context else None
+        )
 
 
 @dataclass
@@ -186,49 +226,139 @@ class InferenceResponse:
         return 0.0
 
 
+# Methods that can be resent on a new connection without repeating work
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class RequestNotRetryableError(aiohttp.ClientConnectionError):
+    """A non-idempotent request failed after it was written (dropped
+    connection, timeout or broken body), so the server may already be
+    running it; sending it again could repeat the work"""
+
+
 class ConnectionPool:
-    """Manages HTTP connections to Ollama instances"""
+    """Manages keep-alive HTTP connections to one Ollama instance.
+
+    ``request`` is an async context manager: the in-flight slot and the
+    underlying connection stay held until the caller has finished reading
+    the body, and are released together on exit.
+    """
     
-    def __init__(self, instance: OllamaInstance):
+    def __init__(self, instance: OllamaInstance, keepalive_timeout: float = 60.0):
         self.instance = instance
+        self.keepalive_timeout = keepalive_timeout
         self.session: Optional[aiohttp.ClientSession] = None
+        self.connector: Optional[aiohttp.TCPConnector] = None
         self.semaphore = asyncio.Semaphore(instance.max_connections)
+        # Retries released their first slot; this caps how many of them
+        # can be in flight at once
+        self.retry_slots = asyncio.Semaphore(max(1, instance.max_connections // 4))
         self._lock = asyncio.Lock()
         
+        # Metrics
+        self.in_flight = 0
+        self.total_requests = 0
+        self.reconnects = 0
+        self.retries = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        
     async def get_session(self) -> aiohttp.ClientSession:
         """Get or create aiohttp session"""
         if self.session is None or self.session.closed:
             async with self._lock:
                 if self.session is None or self.session.closed:
-                    if self.session and not self.session.closed:
-                        await self.session.close()
-
                     timeout = aiohttp.ClientTimeout(total=self.instance.timeout)
-                    connector = aiohttp.TCPConnector(
+                    self.connector = aiohttp.TCPConnector(
                         limit=self.instance.max_connections,
+                        limit_per_host=self.instance.max_connections,
+                        keepalive_timeout=self.keepalive_timeout,
                         ttl_dns_cache=300,
                         use_dns_cache=True,
                         enable_cleanup_closed=True
                     )
                     self.session = aiohttp.ClientSession(
                         timeout=timeout,
-                        connector=connector
+                        connector=self.connector
                     )
         return self.session
     
-    async def request(self, method: str, endpoint: str, **kwargs) -> aiohttp.ClientResponse:
-        """Make HTTP request with connection pooling"""
+    @asynccontextmanager
+    async def request(self, method: str, endpoint: str, **kwargs) -> AsyncGenerator[aiohttp.ClientResponse, None]:
+        """Make HTTP request with connection pooling.
+
+        Usage: ``async with pool.request("GET", "/api/tags") as response``.
+        A failed connection is re-dialed once without giving up the
+        in-flight slot, but only when resending cannot repeat work: the
+        method is idempotent, or the connection failed before any request
+        bytes were written. Any later failure of a non-idempotent request,
+        including a timeout while reading the body, is raised as
+        ``RequestNotRetryableError``.
+        """
+        wait_start = time.perf_counter()
         async with self.semaphore:
+            waited = time.perf_counter() - wait_start
+            self.total_wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+            self.total_requests += 1
+            self.in_flight += 1
             self.instance.active_connections += 1
             try:
                 session = await self.get_session()
                 url = f"{self.instance.base_url}{endpoint}"
-                
-                async with session.request(method, url, **kwargs) as response:
-                    return response
+                idempotent = method.upper() in IDEMPOTENT_METHODS
+                try:
+                    try:
+                        response = await session.request(method, url, **kwargs)
+                    except (aiohttp.ServerDisconnectedError, aiohttp.ClientOSError) as e:
+                        if not idempotent and not isinstance(e, aiohttp.ClientConnectorError):
+                            raise
+                        self.reconnects += 1
+                        response = await session.request(method, url, **kwargs)
+                    
+                    async with response:
+                        yield response
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    # Only a failed connect proves nothing was sent; a drop,
+                    # timeout or broken body may leave the work running
+                    if idempotent or isinstance(e, (aiohttp.ClientConnectorError, RequestNotRetryableError)):
+                        raise
+                    raise RequestNotRetryableError(
+                        f"{method} {endpoint} failed after it was sent: {e}") from e
             finally:
+                self.in_flight -= 1
                 self.instance.active_connections -= 1
     
+    async def warm_up(self, connections: int = 2):
+        """Open keep-alive connections ahead of the first real request"""
+        async def ping():
+            try:
+                async with self.request("GET", "/api/version") as response:
+                    await response.read()
+            except Exception as e:
+                logging.debug(f"Warm-up request to {self.instance.instance_id} failed: {e}")
+        
+        count = max(1, min(connections, self.instance.max_connections))
+        await asyncio.gather(*(ping() for _ in range(count)))
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Idle/active connection counts and slot wait times"""
+        idle = 0
+        if self.connector is not None and not self.connector.closed:
+            # aiohttp keeps idle keep-alive connections per host key in _conns
+            idle = sum(len(conns) for conns in getattr(self.connector, '_conns', {}).values())
+        return {
+            "instance_id": self.instance.instance_id,
+            "idle_connections": idle,
+            "active_requests": self.in_flight,
+            "max_connections": self.instance.max_connections,
+            "total_requests": self.total_requests,
+            "reconnects": self.reconnects,
+            "retries": self.retries,
+            "avg_wait_time": self.total_wait_time / self.total_requests if self.total_requests else 0.0,
+            "max_wait_time": self.max_wait_time
+        }
+    
     async def close(self):
         """Close connection pool"""
         if self.session and not self.session.closed:
@@ -561,6 +691,11 @@ class HealthMonitor:
 class AdvancedOllamaManager:
     """Advanced Ollama integration with distributed capabilities"""
     
+    # InferenceResponse fields kept in the response cache
+    _CACHED_FIELDS = ("success", "response", "model", "context", "done", "total_duration",
+                      "load_duration", "prompt_eval_count", "prompt_eval_duration",
+                      "eval_count", "eval_duration")
+    
     def __init__(self, config_manager=None):
         self.config = config_manager
         self.instances: List[OllamaInstance] = []
@@ -579,11 +714,26 @@ class AdvancedOllamaManager:
         self.enable_batching = True
         self.batch_size = 10
         self.batch_timeout = 1.0
+        self.batch_window_fraction = 0.05  # share of observed latency spent collecting a batch
+        self.keepalive_timeout = 60.0
+        self.warm_connections = 2
+        self.response_cache: Optional[ResponseCache] = ResponseCache()
         
         # State
         self.request_queue: asyncio.Queue = asyncio.Queue()
         self.batch_processor_task: Optional[asyncio.Task] = None
+        self.batch_tasks: set = set()
         self.running = False
+        self.latency_ewma = 0.0
+        self.backend_calls_in_flight = 0
+        self.batch_stats = {
+            'batches': 0,
+            'batched_requests': 0,
+            'backend_calls': 0,
+            'coalesced_requests': 0,
+            'fill_ratios': deque(maxlen=1000),
+            'queue_delays': deque(maxlen=1000)
+        }
         
         # Metrics
         self.total_requests = 0
@@ -604,6 +754,8 @@ class AdvancedOllamaManager:
         if not self.config:
             return
         
+        self.keepalive_timeout = self.config.getfloat('OLLAMA', 'keepalive_timeout', fallback=60.0)
+        
         # Load default instances
         instances_config = self.config.get('OLLAMA', 'instances', fallback='localhost:11434')
         for instance_str in instances_config.split(','):
@@ -618,12 +770,23 @@ class AdvancedOllamaManager:
         self.max_retries = self.config.getint('OLLAMA', 'max_retries', fallback=3)
         self.enable_batching = self.config.getboolean('OLLAMA', 'enable_batching', fallback=True)
         self.batch_size = self.config.getint('OLLAMA', 'batch_size', fallback=10)
+        self.batch_timeout = self.config.getfloat('OLLAMA', 'batch_timeout', fallback=1.0)
+        self.warm_connections = self.config.getint('OLLAMA', 'warm_connections', fallback=2)
+        
+        if self.config.getboolean('OLLAMA', 'response_cache', fallback=True):
+            self.response_cache = ResponseCache(
+                max_bytes=self.config.getint('OLLAMA', 'response_cache_max_bytes', fallback=64 * 1024 * 1024),
+                ttl=self.config.getfloat('OLLAMA', 'response_cache_ttl', fallback=3600.0),
+                persist_path=self.config.get('OLLAMA', 'response_cache_path', fallback='') or None
+            )
+        else:
+            self.response_cache = None
     
     def add_instance(self, instance: OllamaInstance):
         """Add Ollama instance"""
         if instance.instance_id not in [i.instance_id for i in self.instances]:
             self.instances.append(instance)
-            self.connection_pools[instance.instance_id] = ConnectionPool(instance)
+            self.connection_pools[instance.instance_id] = ConnectionPool(instance, self.keepalive_timeout)
             logging.info(f"Added Ollama instance: {instance.instance_id}")
     
     def remove_instance(self, instance_id: str):
@@ -645,6 +808,11 @@ class AdvancedOllamaManager:
         
         self.running = True
         
+        # Open keep-alive connections before the first request needs them
+        if self.warm_connections > 0:
+            await asyncio.gather(*(pool.warm_up(self.warm_connections)
+                                   for pool in self.connection_pools.values()))
+        
         # Start health monitoring
         await self.health_monitor.start()
         
@@ -664,13 +832,23 @@ class AdvancedOllamaManager:
         # Stop health monitoring
         await self.health_monitor.stop()
         
-        # Stop batch processor
+        # Stop batch processor and any batches still running
         if self.batch_processor_task:
             self.batch_processor_task.cancel()
             try:
                 await self.batch_processor_task
             except asyncio.CancelledError:
                 pass
+        for task in list(self.batch_tasks):
+            task.cancel()
+        if self.batch_tasks:
+            await asyncio.gather(*self.batch_tasks, return_exceptions=True)
+        
+        # Fail requests that were queued but never picked up
+        queued = []
+        while not self.request_queue.empty():
+            queued.append(self.request_queue.get_nowait())
+        self._fail_pending(queued, "Ollama manager stopped")
         
         # Close all connection pools
         for pool in self.connection_pools.values():
@@ -683,14 +861,28 @@ class AdvancedOllamaManager:
     
     async def generate(self, request: InferenceRequest) -> InferenceResponse:
         """Generate response for inference request"""
-        if self.enable_batching and not request.stream:
+        use_cache = self.response_cache is not None and not request.stream
+        if use_cache:
+            cached = await self.response_cache.get(request.model, request.prompt, request.cache_options())
+            if cached is not None:
+                return replace(InferenceResponse(**cached), request_id=request.request_id)
+        
+        if self.enable_batching and self.running and not request.stream:
             # Add to batch queue
-            future = asyncio.Future()
-            await self.request_queue.put((request, future))
-            return await future
+            future = asyncio.get_running_loop().create_future()
+            await self.request_queue.put((request, future, time.time()))
+            response = await future
         else:
             # Process immediately
-            return await self._process_request(request)
+            response = await self._process_request(request)
+        
+        if use_cache and response.success:
+            await self.response_cache.put(
+                request.model, request.prompt, request.cache_options(),
+                {f: getattr(response, f) for f in self._CACHED_FIELDS},
+                tokens=response.eval_count or 0
+            )
+        return response
     
     async def generate_stream(self, request: InferenceRequest) -> AsyncGenerator[InferenceResponse, None]:
         """Generate streaming response"""
@@ -751,25 +943,37 @@ class AdvancedOllamaManager:
         # Try with retries
         last_error = None
         for attempt in range(request.max_retries):
+            instance = None
             try:
                 # Select instance
                 instance = self.load_balancer.select_instance(available_instances, request)
                 if not instance:
                     raise Exception("No healthy instances available")
                 
-                # Make request
-                response = await self._make_inference_request(request, instance)
+                # Make request; retries also need one of the instance's
+                # retry slots, so a failing instance is not hit by every
+                # caller's retries at once
+                if attempt:
+                    pool = self._get_connection_pool(instance)
+                    async with pool.retry_slots:
+                        pool.retries += 1
+                        response = await self._make_inference_request(request, instance)
+                else:
+                    response = await self._make_inference_request(request, instance)
                 
                 # Record metrics
                 processing_time = time.time() - start_time
                 self.total_response_time += processing_time
                 self.successful_requests += 1
+                self.latency_ewma = (processing_time if self.latency_ewma == 0.0
+                                     else self.latency_ewma * 0.9 + processing_time * 0.1)
                 
                 # Update load balancer
                 self.load_balancer.record_response_time(instance.instance_id, processing_time)
                 
                 # Update instance metrics
                 instance.total_requests += 1
+                self._record_generation_metrics(instance.instance_id, response)
                 
                 response.processing_time = processing_time
                 response.instance_id = instance.instance_id
@@ -781,7 +985,11 @@ class AdvancedOllamaManager:
                 last_error = str(e)
                 logging.warning(f"Request attempt {attempt + 1} failed: {e}")
                 
+                if isinstance(e, RequestNotRetryableError):
+                    # The generation may already be running; do not start it twice
+                    break
                 if attempt < request.max_retries - 1:
+                    OLLAMA_RETRIES.labels(instance.instance_id if instance else 'none').inc()
                     await asyncio.sleep(self.retry_delay * (2 ** attempt))  # Exponential backoff
         
         # All retries failed
@@ -793,6 +1001,15 @@ class AdvancedOllamaManager:
             retry_count=request.max_retries
         )
     
+    def _record_generation_metrics(self, instance_id: str, response: InferenceResponse):
+        """TTFT (model load + prompt eval, as reported by Ollama) and tokens/s"""
+        if response.prompt_eval_duration is not None:
+            OLLAMA_TTFT.labels(instance_id).observe(
+                ((response.load_duration or 0) + response.prompt_eval_duration) / 1_000_000_000
+            )
+        if response.tokens_per_second:
+            OLLAMA_TOKENS_PER_SECOND.labels(instance_id).observe(response.tokens_per_second)
+    
     async def _make_inference_request(self, request: InferenceRequest, instance: OllamaInstance) -> InferenceResponse:
         """Make inference request to specific instance"""
         pool = self._get_connection_pool(instance)
@@ -827,11 +1044,45 @@ class AdvancedOllamaManager:
                 error_text = await response.text()
                 raise Exception(f"HTTP {response.status}: {error_text}")
     
+    async def _handle_streaming_response(self, response: aiohttp.ClientResponse,
+                                         request: InferenceRequest) -> InferenceResponse:
+        """Read an NDJSON stream to the end and fold it into one response"""
+        parts = []
+        final: Dict[str, Any] = {}
+        async for line in response.content:
+            if not line.strip():
+                continue
+            try:
+                chunk_data = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            parts.append(chunk_data.get("response", ""))
+            if chunk_data.get("done", False):
+                final = chunk_data
+                break
+        
+        return InferenceResponse(
+            success=True,
+            response="".join(parts),
+            model=final.get("model", request.model),
+            context=final.get("context"),
+            done=bool(final.get("done", False)),
+            total_duration=final.get("total_duration"),
+            load_duration=final.get("load_duration"),
+            prompt_eval_count=final.get("prompt_eval_count"),
+            prompt_eval_duration=final.get("prompt_eval_duration"),
+            eval_count=final.get("eval_count"),
+            eval_duration=final.get("eval_duration"),
+            request_id=request.request_id
+        )
+    
     async def _stream_from_instance(self, request: InferenceRequest, instance: OllamaInstance) -> AsyncGenerator[InferenceResponse, None]:
         """Stream response from specific instance"""
         pool = self._get_connection_pool(instance)
         data = request.to_ollama_dict()
         
+        started = time.perf_counter()
+        first_token = True
         try:
             async with pool.request("POST", "/api/generate", json=data) as response:
                 if response.status == 200:
@@ -839,6 +1090,10 @@ class AdvancedOllamaManager:
                         if line:
                             try:
                                 chunk_data = json.loads(line.decode())
+                                if first_token:
+                                    # Measured at the client: includes queueing and network
+                                    OLLAMA_TTFT.labels(instance.instance_id).observe(time.perf_counter() - started)
+                                    first_token = False
                                 yield InferenceResponse(
                                     success=True,
                                     response=chunk_data.get("response", ""),
@@ -856,6 +1111,11 @@ class AdvancedOllamaManager:
                                 )
                                 
                                 if chunk_data.get("done", False):
+                                    eval_count = chunk_data.get("eval_count")
+                                    eval_duration = chunk_data.get("eval_duration")
+                                    if eval_count and eval_duration:
+                                        OLLAMA_TOKENS_PER_SECOND.labels(instance.instance_id).observe(
+                                            eval_count / (eval_duration / 1_000_000_000))
                                     break
                                     
                             except json.JSONDecodeError:
@@ -877,97 +1137,109 @@ class AdvancedOllamaManager:
                 instance_id=instance.instance_id
             )
     
+    def _batch_window(self) -> float:
+        """How long to keep collecting before dispatching the current batch.
+
+        An idle backend gets requests immediately. Under load, the window is a
+        small fraction of the observed request latency (capped by
+        ``batch_timeout``), which is long enough for duplicate prompts to pile
+        up without adding noticeable delay.
+        """
+        if self.request_queue.qsize() + 1 >= self.batch_size:
+            return 0.0
+        if self.backend_calls_in_flight == 0:
+            return 0.0
+        return min(self.batch_timeout, self.latency_ewma * self.batch_window_fraction)
+    
     async def _batch_processor(self):
-        """Process requests in batches"""
+        """Continuously collect queued requests and dispatch them without waiting for earlier batches"""
+        loop = asyncio.get_running_loop()
         batch = []
-        batch_futures = []
-        last_batch_time = time.time()
         
         while self.running:
             try:
-                # Wait for request or timeout
-                try:
-                    timeout = self.batch_timeout - (time.time() - last_batch_time)
-                    if timeout <= 0:
-                        timeout = 0.01
-                    
-                    request, future = await asyncio.wait_for(
-                        self.request_queue.get(), 
-                        timeout=timeout
-                    )
-                    
-                    batch.append(request)
-                    batch_futures.append(future)
-                    
-                except asyncio.TimeoutError:
-                    pass
+                batch = [await self.request_queue.get()]
+                deadline = loop.time() + self._batch_window()
                 
-                # Process batch if ready
-                current_time = time.time()
-                should_process = (
-                    len(batch) >= self.batch_size or 
-                    (batch and (current_time - last_batch_time) >= self.batch_timeout)
-                )
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.request_queue.get_nowait())
+                        continue
+                    except asyncio.QueueEmpty:
+                        pass
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.request_queue.get(), timeout=remaining))
+                    except asyncio.TimeoutError:
+                        break
+                
+                self._dispatch_batch(batch)
+                batch = []
                 
-                if should_process and batch:
-                    # Process batch
-                    await self._process_batch(batch, batch_futures)
-                    batch = []
-                    batch_futures = []
-                    last_batch_time = current_time
-                    
             except asyncio.CancelledError:
+                self._fail_pending(batch, "Batch processor stopped")
                 break
             except Exception as e:
                 logging.error(f"Batch processor error: {e}")
-                
-                # Fail pending requests
-                for future in batch_futures:
-                    if not future.done():
-                        future.set_result(InferenceResponse(
-                            success=False,
-                            error=f"Batch processing error: {e}"
-                        ))
-                
+                self._fail_pending(batch, f"Batch processing error: {e}")
                 batch = []
-                batch_futures = []
     
-    async def _process_batch(self, requests: List[InferenceRequest], futures: List[asyncio.Future]):
-        """Process batch of requests"""
-        # Group by model for efficiency
-        model_groups = defaultdict(list)
-        for i, request in enumerate(requests):
-            model_groups[request.model].append((request, futures[i]))
+    def _fail_pending(self, batch: List[tuple], error: str):
+        for request, future, _ in batch:
+            if not future.done():
+                future.set_result(InferenceResponse(success=False, error=error, request_id=request.request_id))
+    
+    def _dispatch_batch(self, batch: List[tuple]):
+        """Merge a batch into the fewest backend calls and start them"""
+        now = time.time()
+        stats = self.batch_stats
+        stats['batches'] += 1
+        stats['batched_requests'] += len(batch)
+        stats['fill_ratios'].append(len(batch) / max(1, self.batch_size))
+        stats['queue_delays'].extend(now - enqueued_at for _, _, enqueued_at in batch)
         
-        # Process each model group
-        tasks = []
-        for model, group in model_groups.items():
-            task = asyncio.create_task(self._process_model_group(group))
-            tasks.append(task)
+        groups: Dict[Tuple, Dict[str, List[tuple]]] = defaultdict(lambda: defaultdict(list))
+        for request, future, _ in batch:
+            groups[request.batch_key()][request.prompt].append((request, future))
         
-        await asyncio.gather(*tasks, return_exceptions=True)
+        for by_prompt in groups.values():
+            for waiters in by_prompt.values():
+                stats['coalesced_requests'] += len(waiters) - 1
+            self._spawn_batch_task(self._process_merged_group(list(by_prompt.values())))
     
-    async def _process_model_group(self, group: List[tuple]):
-        """Process requests for same model"""
-        # Process requests concurrently
-        tasks = []
-        for request, future in group:
-            task = asyncio.create_task(self._process_single_request_for_batch(request, future))
-            tasks.append(task)
-        
-        await asyncio.gather(*tasks, return_exceptions=True)
+    def _spawn_batch_task(self, coro):
+        task = asyncio.create_task(coro)
+        self.batch_tasks.add(task)
+        task.add_done_callback(self.batch_tasks.discard)
+    
+    async def _process_merged_group(self, prompt_groups: List[List[tuple]]):
+        """Run requests that share model and options; identical prompts share one call"""
+        calls = [self._run_backend_call(waiters[0][0], waiters) for waiters in prompt_groups]
+        await asyncio.gather(*calls, return_exceptions=True)
     
-    async def _process_single_request_for_batch(self, request: InferenceRequest, future: asyncio.Future):
-        """Process single request within batch"""
+    async def _run_backend_call(self, request: InferenceRequest, waiters: List[tuple]):
+        """One backend call whose result is fanned out to every waiting caller"""
+        self.backend_calls_in_flight += 1
+        self.batch_stats['backend_calls'] += 1
         try:
             response = await self._process_request(request)
-            future.set_result(response)
+        except asyncio.CancelledError:
+            # Settle every caller before unwinding so none waits forever
+            for original, future in waiters:
+                if not future.done():
+                    future.set_result(InferenceResponse(success=False, error="Backend call cancelled",
+                                                        request_id=original.request_id))
+            raise
         except Exception as e:
-            future.set_result(InferenceResponse(
-                success=False,
-                error=str(e),
-                request_id=request.request_id
-            ))
+            response = InferenceResponse(success=False, error=str(e))
+        finally:
+            self.backend_calls_in_flight -= 1
+        
+        for original, future in waiters:
+            if not future.done():
+                future.set_result(replace(response, request_id=original.request_id))
     
     async def get_available_models(self, instance_id: Optional[str] = None) -> List[str]:
         """Get available models"""
@@ -1035,12 +1307,43 @@ class AdvancedOllamaManager:
                 "avg_response_time": avg_response_time,
                 "queue_size": self.request_queue.qsize() if hasattr(self.request_queue, 'qsize') else 0
             },
+            "batching": self._get_batch_stats(),
+            "cache": self.response_cache.get_stats() if self.response_cache else None,
+            "connections": self._get_connection_stats(),
             "models": {
-                "total_unique": len(self.get_available_models()),
+                "total_unique": len({m for i in self.instances for m in i.available_models}),
                 "download_progress": dict(self.model_manager.download_progress)
             }
         }
     
+    def _get_batch_stats(self) -> Dict[str, Any]:
+        stats = self.batch_stats
+        fill_ratios = stats['fill_ratios']
+        delays = sorted(stats['queue_delays'])
+        return {
+            "batches": stats['batches'],
+            "batched_requests": stats['batched_requests'],
+            "backend_calls": stats['backend_calls'],
+            "coalesced_requests": stats['coalesced_requests'],
+            "avg_fill_ratio": sum(fill_ratios) / len(fill_ratios) if fill_ratios else 0.0,
+            "avg_queue_delay": sum(delays) / len(delays) if delays else 0.0,
+            "p95_queue_delay": delays[min(len(delays) - 1, int(len(delays) * 0.95))] if delays else 0.0,
+            "current_window": self._batch_window() if self.running else 0.0,
+            "backend_calls_in_flight": self.backend_calls_in_flight
+        }
+    
+    def _get_connection_stats(self) -> Dict[str, Any]:
+        metrics = [pool.get_metrics() for pool in self.connection_pools.values()]
+        total_requests = sum(m["total_requests"] for m in metrics)
+        return {
+            "idle": sum(m["idle_connections"] for m in metrics),
+            "active": sum(m["active_requests"] for m in metrics),
+            "reconnects": sum(m["reconnects"] for m in metrics),
+            "avg_wait_time": (sum(m["avg_wait_time"] * m["total_requests"] for m in metrics) / total_requests
+                              if total_requests else 0.0),
+            "max_wait_time": max((m["max_wait_time"] for m in metrics), default=0.0)
+        }
+    
     def get_instance_stats(self) -> List[Dict[str, Any]]:
         """Get per-instance statistics"""
         stats = []
@@ -1057,7 +1360,9 @@ class AdvancedOllamaManager:
                 "available_models": len(instance.available_models),
                 "last_health_check": instance.last_health_check.isoformat() if instance.last_health_check else None,
                 "cpu_usage": instance.cpu_usage,
-                "gpu_memory_used": instance.gpu_memory_used
+                "gpu_memory_used": instance.gpu_memory_used,
+                "connection_pool": self.connection_pools[instance.instance_id].get_metrics()
+                if instance.instance_id in self.connection_pools else None
             })
         return stats
 
@@ -1,9 +1,30 @@
 # ultimate_agent/ai/distributed/attention_protocol.py
 import asyncio
+import inspect
+import logging
+import time
 import numpy as np
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 
+
+def scaled_dot_product_attention(query: np.ndarray,
+                                 key: np.ndarray,
+                                 value: np.ndarray,
+                                 out: Optional[np.ndarray] = None) -> np.ndarray:
+    """softmax(Q K^T / sqrt(d)) V over [..., seq, head_dim] inputs.
+
+    Every head is handled by one batched matmul; the scale is folded into
+    Q (seq x d) rather than the scores (seq x seq) and the softmax runs in
+    place on the score buffer. ``out`` may be a strided view, e.g. a slice
+    of the caller's output tensor, and is written without a copy.
+    """
+    scores = np.matmul(query * (1.0 / np.sqrt(query.shape[-1])), np.swapaxes(key, -1, -2))
+    scores -= scores.max(axis=-1, keepdims=True)
+    np.exp(scores, out=scores)
+    scores /= scores.sum(axis=-1, keepdims=True)
+    return np.matmul(scores, value, out=out)
+
 @dataclass
 class AttentionShard:
     shard_id: int
@@ -13,20 +34,43 @@ class AttentionShard:
     layer_index: int
 
 class DistributedAttentionCoordinator:
-    """Coordinates multi-head attention across nodes"""
+    """Coordinates multi-head attention across nodes
+
+    Shards registered without a connection, or on ``local_node_id``, are
+    computed in-process; any other shard needs a connection to its node.
+    Remote shard requests are issued first and run while the local heads
+    are computed in a worker thread; every shard writes straight into its
+    head range of one preallocated output. Without remote shards, inputs
+    above ``INLINE_WORK_LIMIT`` multiply-adds are also computed off the
+    event loop. A connection whose exchange is interrupted is dropped and
+    must be registered again.
+    """
     
-    def __init__(self, model_config: Dict):
+    INLINE_WORK_LIMIT = 1 << 22
+    
+    def __init__(self, model_config: Dict, local_node_id: Optional[str] = None):
         self.model_config = model_config
         self.num_heads = model_config['num_attention_heads']
         self.head_dim = model_config['hidden_size'] // self.num_heads
+        self.local_node_id = local_node_id or model_config.get('local_node_id')
         self.shards = {}
         self.node_connections = {}
+        self._local_shards: set = set()
+        self._connection_locks: Dict[str, asyncio.Lock] = {}
+        self.layer_stats: Dict[int, Dict[str, float]] = {}
     
     def register_attention_shard(self, shard: AttentionShard, 
-                               connection):
+                               connection=None):
         """Register an attention shard with its node connection"""
         self.shards[shard.shard_id] = shard
-        self.node_connections[shard.node_id] = connection
+        if connection is not None:
+            self.node_connections[shard.node_id] = connection
+            self._local_shards.discard(shard.shard_id)
+        else:
+            self._local_shards.add(shard.shard_id)
+    
+    def _is_local(self, shard: AttentionShard) -> bool:
+        return shard.node_id == self.local_node_id or shard.shard_id in self._local_shards
     
     async def distributed_attention(self,
                                   query: np.ndarray,
@@ -51,43 +95,93 @@ class DistributedAttentionCoordinator:
             raise ValueError("Request ID must be a non-empty string")
 
         batch_size, seq_len, hidden_size = query.shape
+        layer_shards = sorted((s for s in self.shards.values() if s.layer_index == layer_index),
+                              key=lambda s: s.head_start)
+        self._check_coverage(layer_shards, layer_index)
+        started = time.perf_counter()
         
-        # Split Q, K, V across attention heads
+        # Split Q, K, V across attention heads (views, no copies)
         query_heads = self._split_heads(query)  # [batch, heads, seq, head_dim]
         key_heads = self._split_heads(key)
         value_heads = self._split_heads(value)
         
-        # Distribute heads across shards
-        shard_tasks = []
-        layer_shards = [s for s in self.shards.values() if s.layer_index == layer_index]
+        # Shards write their heads into this buffer; _merge_heads is then a reshape
+        dtype = np.result_type(query.dtype, key.dtype, value.dtype, np.float32)
+        output = np.empty((batch_size, seq_len, self.num_heads, self.head_dim), dtype=dtype)
+        output_heads = output.transpose(0, 2, 1, 3)
         
-        for shard in layer_shards:
-            # Extract heads for this shard
-            shard_query = query_heads[:, shard.head_start:shard.head_end]
-            shard_key = key_heads[:, shard.head_start:shard.head_end] 
-            shard_value = value_heads[:, shard.head_start:shard.head_end]
-            
-            # Send to shard node
-            task = self._compute_attention_shard(
-                shard, shard_query, shard_key, shard_value, request_id
-            )
-            shard_tasks.append(task)
+        local_shards = [s for s in layer_shards if self._is_local(s)]
+        remote_shards = [s for s in layer_shards if not self._is_local(s)]
+        for shard in remote_shards:
+            if shard.node_id not in self.node_connections:
+                raise ConnectionError(f"No connection to node {shard.node_id} "
+                                      f"for attention shard {shard.shard_id}")
+        
+        # Put remote requests on the wire before starting local compute
+        remote_tasks = [
+            asyncio.create_task(self._compute_attention_shard(
+                shard,
+                query_heads[:, shard.head_start:shard.head_end],
+                key_heads[:, shard.head_start:shard.head_end],
+                value_heads[:, shard.head_start:shard.head_end],
+                request_id,
+                out=output_heads[:, shard.head_start:shard.head_end]
+            ))
+            for shard in remote_shards
+        ]
         
-        # Collect results from all shards
-        shard_results = await asyncio.gather(*shard_tasks)
+        try:
+            compute_started = time.perf_counter()
+            if local_shards and (remote_tasks or
+                                 batch_size * seq_len * seq_len * hidden_size > self.INLINE_WORK_LIMIT):
+                # numpy releases the GIL, so remote I/O proceeds meanwhile
+                await asyncio.to_thread(self._compute_local_shards, local_shards,
+                                        query_heads, key_heads, value_heads, output_heads)
+            elif local_shards:
+                self._compute_local_shards(local_shards, query_heads, key_heads, value_heads, output_heads)
+            compute_time = time.perf_counter() - compute_started
+            
+            wait_started = time.perf_counter()
+            await asyncio.gather(*remote_tasks)
+            wait_time = time.perf_counter() - wait_started
+        except BaseException:
+            # Let every shard unwind (and drop its half-used connection) before returning
+            for task in remote_tasks:
+                task.cancel()
+            await asyncio.gather(*remote_tasks, return_exceptions=True)
+            raise
         
-        # Concatenate attention outputs
-        attention_output = np.concatenate(shard_results, axis=1)  # Concat on head dim
+        total_time = time.perf_counter() - started
+        remote_time = compute_time + wait_time if remote_tasks else 0.0
+        self._record_layer(layer_index, len(local_shards), len(remote_shards),
+                           compute_time, wait_time, remote_time, total_time)
         
         # Reshape back to [batch, seq, hidden]
-        return self._merge_heads(attention_output)
+        return output.reshape(batch_size, seq_len, hidden_size)
+    
+    def _check_coverage(self, layer_shards: List[AttentionShard], layer_index: int):
+        next_head = 0
+        for shard in layer_shards:
+            if shard.head_start != next_head:
+                break
+            next_head = shard.head_end
+        if next_head != self.num_heads or not layer_shards:
+            raise ValueError(f"Attention shards for layer {layer_index} do not cover heads "
+                             f"0..{self.num_heads} exactly once")
+    
+    def _compute_local_shards(self, shards: List[AttentionShard], query: np.ndarray,
+                              key: np.ndarray, value: np.ndarray, out: np.ndarray):
+        for shard in shards:
+            heads = slice(shard.head_start, shard.head_end)
+            scaled_dot_product_attention(query[:, heads], key[:, heads], value[:, heads], out=out[:, heads])
     
     async def _compute_attention_shard(self, 
                                      shard: AttentionShard,
                                      query: np.ndarray,
                                      key: np.ndarray,
                                      value: np.ndarray,
-                                     request_id: str) -> np.ndarray:
+                                     request_id: str,
+                                     out: Optional[np.ndarray] = None) -> np.ndarray:
         """Compute attention for a specific shard"""
         
         connection = self.node_connections[shard.node_id]
@@ -103,20 +197,80 @@ class DistributedAttentionCoordinator:
             'value_shape': value.shape
         }
         
-        # Send tensors
-        await connection.send_control_message(request_data)
-        await connection.send_tensor(query, f"{request_id}_query")
-        await connection.send_tensor(key, f"{request_id}_key") 
-        await connection.send_tensor(value, f"{request_id}_value")
-        
-        # Receive result
-        response = await connection.receive_tensor()
+        # One request at a time per connection so responses cannot interleave
+        lock = self._connection_locks.setdefault(shard.node_id, asyncio.Lock())
+        async with lock:
+            if self.node_connections.get(shard.node_id) is not connection:
+                raise ConnectionError(f"Connection to node {shard.node_id} was dropped")
+            try:
+                # Send tensors (head slices are strided views; the wire needs them contiguous)
+                await connection.send_control_message(request_data)
+                await connection.send_tensor(np.ascontiguousarray(query), f"{request_id}_query")
+                await connection.send_tensor(np.ascontiguousarray(key), f"{request_id}_key") 
+                await connection.send_tensor(np.ascontiguousarray(value), f"{request_id}_value")
+                
+                # Receive result
+                response = await connection.receive_tensor()
+            except BaseException:
+                # A reply may still be in flight; the next request would read it as its own
+                self._drop_connection(shard.node_id, connection)
+                raise
         
         if response['type'] == 'attention_result':
-            return response['tensor']
+            if out is None:
+                return response['tensor']
+            out[...] = response['tensor']
+            return out
         else:
             raise Exception(f"Attention computation failed: {response.get('error')}")
     
+    def _drop_connection(self, node_id: str, connection):
+        """Forget a connection left mid-exchange and close it if it can be closed"""
+        if self.node_connections.get(node_id) is connection:
+            del self.node_connections[node_id]
+        close = getattr(connection, 'close', None)
+        if close is None:
+            return
+        try:
+            result = close()
+            if inspect.isawaitable(result):
+                asyncio.ensure_future(result)
+        except Exception as e:
+            logging.debug(f"Closing connection to {node_id} failed: {e}")
+    
+    def _record_layer(self, layer_index: int, local_shards: int, remote_shards: int,
+                      compute_time: float, wait_time: float, remote_time: float, total_time: float):
+        stats = self.layer_stats.setdefault(layer_index, {
+            'calls': 0, 'local_shards': 0, 'remote_shards': 0,
+            'compute_time': 0.0, 'wait_time': 0.0, 'remote_time': 0.0, 'total_time': 0.0
+        })
+        stats['calls'] += 1
+        stats['local_shards'] = local_shards
+        stats['remote_shards'] = remote_shards
+        stats['compute_time'] += compute_time
+        stats['wait_time'] += wait_time
+        stats['remote_time'] += remote_time
+        stats['total_time'] += total_time
+    
+    def get_layer_stats(self) -> Dict[int, Dict[str, float]]:
+        """Per-layer local compute vs. exposed wait on remote shards.
+
+        ``remote_time`` is the wall time until the last remote shard
+        answered; ``wait_time`` is the part of it not hidden behind local
+        compute, so ``overlap`` is the fraction of remote latency hidden.
+        """
+        report = {}
+        for layer_index, stats in sorted(self.layer_stats.items()):
+            calls = stats['calls']
+            report[layer_index] = {
+                **stats,
+                'avg_compute_time': stats['compute_time'] / calls,
+                'avg_wait_time': stats['wait_time'] / calls,
+                'avg_total_time': stats['total_time'] / calls,
+                'overlap': (1.0 - stats['wait_time'] / stats['remote_time']) if stats['remote_time'] else 0.0
+            }
+        return report
+    
     def _split_heads(self, tensor: np.ndarray) -> np.ndarray:
         """Split tensor into attention heads"""
         batch_size, seq_len, hidden_size = tensor.shape
@@ -151,24 +305,4 @@ class AttentionShardProcessor:
                               key: np.ndarray,
                               value: np.ndarray) -> np.ndarray:
         """Compute multi-head attention for assigned heads"""
-        
-        batch_size, num_heads, seq_len, head_dim = query.shape
-        
-        # Compute attention scores
-        scores = np.matmul(query, key.transpose(0, 1, 3, 2))  # [batch, heads, seq, seq]
-        scores = scores / np.sqrt(head_dim)
-        
-        # Apply softmax
-        attention_probs = self._softmax(scores)
-        
-        # Apply attention to values
-        attention_output = np.matmul(attention_probs, value)  # [batch, heads, seq, head_dim]
-        
-        return attention_output
-    
-    def _softmax(self, x: np.ndarray) -> np.ndarray:
-        """Numerically stable softmax"""
-        x_max = np.max(x, axis=-1, keepdims=True)
-        x_shifted = np.clip(x - x_max, -700, 700)
-        exp_x = np.exp(x_shifted)
-        return exp_x / (np.sum(exp_x, axis=-1, keepdims=True) + 1e-8)
+        return scaled_dot_product_attention(query, key, value)
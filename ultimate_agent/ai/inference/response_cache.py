@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+ultimate_agent/ai/inference/response_cache.py
+LRU response cache for LLM generations with TTL, byte budget and optional disk store
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, List, Tuple
+
+import numpy as np
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so trivially reformatted prompts share an entry"""
+    return " ".join(prompt.split())
+
+
+def _unit(vector) -> Optional[np.ndarray]:
+    values = np.asarray(vector, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(values))
+    return values / norm if norm else None
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'expires_at', 'tokens', 'scope', 'vector')
+
+    def __init__(self, value: Dict[str, Any], size: int, expires_at: float, tokens: int,
+                 scope: str, vector: Optional[np.ndarray] = None):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.tokens = tokens
+        self.scope = scope
+        self.vector = vector
+
+
+class _ScopeIndex:
+    """Unit vectors of one scope's entries packed into a matrix, so a
+    similarity lookup is a single matrix-vector product"""
+
+    __slots__ = ('keys', 'positions', 'matrix')
+
+    def __init__(self, dim: int):
+        self.keys: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.matrix = np.empty((8, dim), dtype=np.float32)
+
+    def add(self, key: str, vector: np.ndarray):
+        if vector.shape[0] != self.matrix.shape[1]:
+            return
+        n = len(self.keys)
+        if n == self.matrix.shape[0]:
+            self.matrix = np.concatenate([self.matrix, np.empty_like(self.matrix)])
+        self.matrix[n] = vector
+        self.positions[key] = n
+        self.keys.append(key)
+
+    def remove(self, key: str):
+        position = self.positions.pop(key, None)
+        if position is None:
+            return
+        last = len(self.keys) - 1
+        if position != last:
+            moved = self.keys[last]
+            self.matrix[position] = self.matrix[last]
+            self.keys[position] = moved
+            self.positions[moved] = position
+        self.keys.pop()
+
+    def best(self, vector: np.ndarray) -> Tuple[float, Optional[str]]:
+        if not self.keys or vector.shape[0] != self.matrix.shape[1]:
+            return -1.0, None
+        scores = self.matrix[:len(self.keys)] @ vector
+        i = int(np.argmax(scores))
+        return float(scores[i]), self.keys[i]
+
+
+class ResponseCache:
+    """Generation results keyed on (model, normalized prompt, options).
+
+    Entries are kept in LRU order and evicted once their serialized size
+    exceeds ``max_bytes`` or they are older than ``ttl`` seconds. With
+    ``persist_path`` set, entries are also written to a SQLite file and
+    read back on a memory miss, so the cache survives restarts. Disk
+    writes are batched and run off the event loop; every ``sweep_interval``
+    seconds expired rows are deleted and the oldest rows are dropped until
+    the file holds at most ``max_disk_bytes`` of values (default
+    ``max_bytes``).
+
+    When an ``embedder`` is given (a callable, sync or async, that maps a
+    prompt to a vector), a miss falls back to the most similar cached prompt
+    for the same model and options if its cosine similarity reaches
+    ``similarity_threshold``. The embedding computed for a miss is reused
+    when the generated result is put.
+    """
+
+    MAX_PENDING_VECTORS = 256
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 3600.0,
+                 persist_path: Optional[str] = None,
+                 embedder: Optional[Callable[[str], Any]] = None,
+                 similarity_threshold: float = 0.95,
+                 max_disk_bytes: Optional[int] = None,
+                 sweep_interval: float = 60.0):
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl = ttl
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self.max_disk_bytes = max(1, int(max_disk_bytes or self.max_bytes))
+        self.sweep_interval = sweep_interval
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._index: Dict[str, _ScopeIndex] = {}
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'hits': 0,
+            'similar_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'disk_evictions': 0,
+            'saved_tokens': 0
+        }
+
+        # Rows waiting for the next batched disk write, guarded by _lock;
+        # the connection itself is only used under _db_lock
+        self._disk_pending: List[Tuple[str, str, int, float]] = []
+        self._db_lock = threading.Lock()
+        self._last_sweep = 0.0
+        self._db: Optional[sqlite3.Connection] = None
+        if persist_path:
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, value TEXT, tokens INTEGER, expires_at REAL)"
+            )
+            with self._db_lock:
+                self._sweep(time.time())
+
+    @staticmethod
+    def scope(model: str, options: Optional[Dict[str, Any]]) -> str:
+        return f"{model}\x00{json.dumps(options or {}, sort_keys=True, default=str)}"
+
+    def make_key(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None) -> str:
+        raw = f"{self.scope(model, options)}\x00{normalize_prompt(prompt)}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    async def get(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Cached value for an exact or (with an embedder) near-duplicate prompt"""
+        key = self.make_key(model, prompt, options)
+        value = self._lookup(key)
+        if value is None and self._db is not None:
+            value = await asyncio.to_thread(self._lookup_disk, key)
+        if value is None and self.embedder is not None:
+            value = await self._lookup_similar(key, self.scope(model, options), prompt)
+        if value is None:
+            self.stats['misses'] += 1
+        return value
+
+    async def put(self, model: str, prompt: str, options: Optional[Dict[str, Any]],
+                  value: Dict[str, Any], tokens: int = 0):
+        """Cache a JSON-serializable generation result"""
+        key = self.make_key(model, prompt, options)
+        vector = None
+        if self.embedder is not None:
+            with self._lock:
+                vector = self._vectors.pop(key, None)
+            if vector is None:
+                vector = await self._embed(prompt)
+        self.store(key, value, tokens, scope=self.scope(model, options), vector=vector)
+        if self._db is not None:
+            await asyncio.to_thread(self.flush)
+
+    def store(self, key: str, value: Dict[str, Any], tokens: int = 0,
+              scope: str = "", vector: Optional[np.ndarray] = None):
+        """Cache a value in memory; with a disk store the row is written by
+        the next ``flush()``"""
+        payload = json.dumps(value, default=str)
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._insert(key, _Entry(value, size, expires_at, tokens, scope, vector))
+            self.stats['stores'] += 1
+            if self._db is not None:
+                self._disk_pending.append((key, payload, tokens, expires_at))
+
+    def flush(self):
+        """Write pending rows to disk in one transaction (blocking)"""
+        with self._lock:
+            rows, self._disk_pending = self._disk_pending, []
+        with self._db_lock:
+            if self._db is None:
+                return
+            if rows:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO response_cache (key, value, tokens, expires_at) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                self._db.commit()
+            now = time.time()
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep(now)
+
+    def _sweep(self, now: float):
+        """Delete expired rows, then the oldest rows beyond the disk budget;
+        caller holds _db_lock"""
+        removed = self._db.execute("DELETE FROM response_cache WHERE expires_at < ?", (now,)).rowcount
+        removed += self._db.execute(
+            "DELETE FROM response_cache WHERE key IN ("
+            "SELECT key FROM (SELECT key, SUM(LENGTH(value)) OVER "
+            "(ORDER BY expires_at DESC, key) AS total FROM response_cache) WHERE total > ?)",
+            (self.max_disk_bytes,)
+        ).rowcount
+        self._db.commit()
+        self._last_sweep = now
+        self.stats['disk_evictions'] += max(0, removed)
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at < now:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self._record_hit(entry.tokens)
+            return entry.value
+
+    def _lookup_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._db_lock:
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT value, tokens, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[2] < time.time():
+            return None
+        value = json.loads(row[0])
+        with self._lock:
+            self._insert(key, _Entry(value, len(row[0]), row[2], row[1], ""))
+            self.stats['disk_hits'] += 1
+            self._record_hit(row[1])
+        return value
+
+    async def _lookup_similar(self, key: str, scope: str, prompt: str) -> Optional[Dict[str, Any]]:
+        vector = await self._embed(prompt)
+        if vector is None:
+            return None
+        now = time.time()
+        with self._lock:
+            index = self._index.get(scope)
+            while index is not None and index.keys:
+                score, best = index.best(vector)
+                if best is None or score < self.similarity_threshold:
+                    break
+                entry = self._entries[best]
+                if entry.expires_at < now:
+                    self._drop(best)
+                    continue
+                self._entries.move_to_end(best)
+                self.stats['similar_hits'] += 1
+                self._record_hit(entry.tokens)
+                return entry.value
+
+            # Keep the embedding for the put that usually follows a miss
+            self._vectors[key] = vector
+            self._vectors.move_to_end(key)
+            while len(self._vectors) > self.MAX_PENDING_VECTORS:
+                self._vectors.popitem(last=False)
+            return None
+
+    async def _embed(self, prompt: str) -> Optional[np.ndarray]:
+        try:
+            vector = self.embedder(normalize_prompt(prompt))
+            if asyncio.iscoroutine(vector):
+                vector = await vector
+            return _unit(vector) if vector is not None else None
+        except Exception:
+            return None
+
+    def _record_hit(self, tokens: int):
+        self.stats['hits'] += 1
+        self.stats['saved_tokens'] += tokens or 0
+
+    def _insert(self, key: str, entry: _Entry):
+        self._drop(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        if entry.vector is not None:
+            index = self._index.get(entry.scope)
+            if index is None:
+                index = self._index[entry.scope] = _ScopeIndex(entry.vector.shape[0])
+            index.add(key, entry.vector)
+        while self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.stats['evictions'] += 1
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        if entry.vector is not None:
+            index = self._index.get(entry.scope)
+            if index is not None:
+                index.remove(key)
+                if not index.keys:
+                    del self._index[entry.scope]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+            self._vectors.clear()
+            self._disk_pending = []
+            self._bytes = 0
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM response_cache")
+                self._db.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'hit_rate': self.stats['hits'] / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'persistent': self._db is not None
+        }
+
+    def close(self):
+        self.flush()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+__all__ = ['ResponseCache', 'normalize_prompt']
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+ultimate_agent/ai/local_models/io_loop.py
+A long-lived event loop on its own thread for loop-bound local AI state
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Optional
+
+
+class BackgroundLoop:
+    """Runs one event loop on a daemon thread and hands coroutines to it.
+
+    Locks, tasks and aiohttp sessions belong to the loop that created them.
+    LocalAIManager is called from many loops (the agent's own, and Flask
+    handlers that spin up a loop per thread), so state that must be shared
+    across those calls lives here and is only touched through ``run``.
+    The thread is started on first use.
+    """
+
+    def __init__(self, name: str = "LocalAI-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name=self.name, daemon=True)
+                self._thread.start()
+            return self._loop
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None and not self._loop.is_closed()
+
+    async def run(self, coro: Awaitable[Any]) -> Any:
+        """Await ``coro`` on the background loop from any loop.
+
+        Cancelling the caller cancels the coroutine on the background loop.
+        """
+        loop = self.loop
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    async def iterate(self, agen: AsyncIterator[Any]) -> AsyncGenerator[Any, None]:
+        """Drive ``agen`` on the background loop and yield its items here.
+
+        Items are handed over as they are produced; closing this generator
+        early cancels ``agen`` on the background loop.
+        """
+        loop = self.loop
+        caller = asyncio.get_running_loop()
+        if caller is loop:
+            async for item in agen:
+                yield item
+            return
+
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    caller.call_soon_threadsafe(queue.put_nowait, (True, item))
+            except Exception as e:
+                caller.call_soon_threadsafe(queue.put_nowait, (False, e))
+            else:
+                caller.call_soon_threadsafe(queue.put_nowait, (False, None))
+
+        future = asyncio.run_coroutine_threadsafe(pump(), loop)
+        try:
+            while True:
+                has_item, item = await queue.get()
+                if not has_item:
+                    if item is not None:
+                        raise item
+                    return
+                yield item
+        finally:
+            future.cancel()
+
+    def call_soon(self, callback: Callable[..., Any], *args: Any):
+        """Schedule a plain callback on the background loop from any thread"""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the loop and join its thread; pending tasks are abandoned"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is threading.current_thread():
+            return  # Cannot join or close the loop from inside it
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                logging.warning(f"{self.name} did not stop within {timeout}s")
+                return
+        loop.close()
+
+
+__all__ = ['BackgroundLoop']
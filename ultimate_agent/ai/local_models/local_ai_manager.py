@@ -20,6 +20,10 @@ from pathlib import Path
 import threading
 from concurrent.futures import ThreadPoolExecutor
 
+from ..inference.response_cache import ResponseCache
+from .io_loop import BackgroundLoop
+from .warm_pool import ModelWarmPool
+
 DEFAULT_MODEL_DOWNLOAD_TIMEOUT = 60  # seconds
 
 try:
@@ -405,6 +409,101 @@ def get_quantized_model_catalog() -> List[QuantizedModel]:
     ]
 
 
+class OllamaHTTPClient:
+    """Async client for the local Ollama HTTP API.
+
+    One keep-alive ``aiohttp`` session is reused for every request made from
+    the same event loop; streamed generations are read line by line from the
+    response body, so each token chunk reaches the caller as it arrives.
+    LocalAIManager only calls it from its background loop, so the session
+    is replaced only if that loop is restarted.
+    """
+    
+    def __init__(self, base_url: str = "http://localhost:11434", timeout: float = 300.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is not None and self._loop is not loop:
+            # Sessions cannot be shared across event loops
+            self._retire_session()
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(keepalive_timeout=60)
+            )
+            self._loop = loop
+        return self._session
+    
+    def _retire_session(self):
+        """Close the session left on a previous event loop"""
+        session, loop = self._session, self._loop
+        self._session = self._loop = None
+        if session.closed:
+            return
+        if loop is not None and not loop.is_closed():
+            # Runs on the loop that owns the session's connections
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+        else:
+            logging.debug("Dropping an Ollama session whose event loop is closed")
+    
+    async def generate(self, model: str, prompt: str, options: Dict[str, Any],
+                       keep_alive: Optional[str] = None) -> Dict[str, Any]:
+        """Non-streaming generation; returns Ollama's final response object"""
+        payload = {'model': model, 'prompt': prompt, 'options': options, 'stream': False}
+        if keep_alive is not None:
+            payload['keep_alive'] = keep_alive
+        async with self._get_session().post(f"{self.base_url}/api/generate", json=payload) as response:
+            if response.status != 200:
+                raise RuntimeError(f"Ollama HTTP {response.status}: {await response.text()}")
+            return await response.json()
+    
+    async def stream(self, model: str, prompt: str, options: Dict[str, Any],
+                     keep_alive: Optional[str] = None) -> AsyncGenerator[Dict[str, Any], None]:
+        """Yield Ollama's NDJSON chunks as they are received"""
+        payload = {'model': model, 'prompt': prompt, 'options': options, 'stream': True}
+        if keep_alive is not None:
+            payload['keep_alive'] = keep_alive
+        async with self._get_session().post(f"{self.base_url}/api/generate", json=payload) as response:
+            if response.status != 200:
+                raise RuntimeError(f"Ollama HTTP {response.status}: {await response.text()}")
+            async for line in response.content:
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if 'error' in chunk:
+                    raise RuntimeError(chunk['error'])
+                yield chunk
+                if chunk.get('done', False):
+                    break
+    
+    async def load_model(self, model: str, keep_alive: str = "30m"):
+        """Load a model into memory without generating anything"""
+        payload = {'model': model, 'keep_alive': keep_alive, 'stream': False}
+        async with self._get_session().post(f"{self.base_url}/api/generate", json=payload) as response:
+            if response.status != 200:
+                raise RuntimeError(f"Ollama HTTP {response.status}: {await response.text()}")
+            await response.read()
+    
+    async def unload_model(self, model: str):
+        await self.load_model(model, keep_alive=0)
+    
+    async def embed(self, model: str, text: str) -> List[float]:
+        payload = {'model': model, 'prompt': text}
+        async with self._get_session().post(f"{self.base_url}/api/embeddings", json=payload) as response:
+            if response.status != 200:
+                raise RuntimeError(f"Ollama HTTP {response.status}: {await response.text()}")
+            return (await response.json())['embedding']
+    
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
 class LocalAIManager:
     """Enhanced Local AI Manager with automatic model selection and optimization"""
     
@@ -421,7 +520,10 @@ class LocalAIManager:
             'total_requests': 0,
             'successful_requests': 0,
             'avg_response_time': 0.0,
-            'tokens_per_second': 0.0
+            'tokens_per_second': 0.0,
+            'streams_started': 0,
+            'avg_time_to_first_token': 0.0,
+            'cache_hits': 0
         }
 
         # Configuration defaults
@@ -429,6 +531,15 @@ class LocalAIManager:
         self.auto_model_management = True
         self.preload_models = True
         self.download_timeout = DEFAULT_MODEL_DOWNLOAD_TIMEOUT
+        ollama_url = os.environ.get('OLLAMA_HOST', 'http://localhost:11434')
+        ollama_timeout = 300.0
+        cache_enabled = True
+        cache_settings = {'max_bytes': 64 * 1024 * 1024, 'ttl': 3600.0, 'persist_path': None}
+        cache_embedding_model = None
+        warm_pool_enabled = True
+        warm_pool_size = 2
+        warm_pool_memory_fraction = 0.6
+        self.keep_alive = "30m"
 
 
         if self.config:
@@ -441,10 +552,71 @@ class LocalAIManager:
             self.max_concurrent_requests = self.config.getint(
                 'LOCAL_AI', 'max_concurrent_requests', fallback=3
             )
+            if self.config.has_section('OLLAMA'):
+                host = self.config.get('OLLAMA', 'host', fallback='localhost')
+                port = self.config.getint('OLLAMA', 'port', fallback=11434)
+                ollama_url = host if host.startswith('http') else f"http://{host}:{port}"
+                ollama_timeout = self.config.getfloat('OLLAMA', 'timeout', fallback=ollama_timeout)
+            if self.config.has_section('LOCAL_AI'):
+                cache_enabled = self.config.getboolean('LOCAL_AI', 'response_cache', fallback=True)
+                cache_settings['max_bytes'] = self.config.getint(
+                    'LOCAL_AI', 'response_cache_max_bytes', fallback=cache_settings['max_bytes']
+                )
+                cache_settings['ttl'] = self.config.getfloat(
+                    'LOCAL_AI', 'response_cache_ttl', fallback=cache_settings['ttl']
+                )
+                cache_settings['persist_path'] = self.config.get(
+                    'LOCAL_AI', 'response_cache_path', fallback=''
+                ) or None
+                cache_embedding_model = self.config.get(
+                    'LOCAL_AI', 'response_cache_embedding_model', fallback=''
+                ) or None
+                warm_pool_enabled = self.config.getboolean('LOCAL_AI', 'warm_pool', fallback=True)
+                warm_pool_size = self.config.getint('LOCAL_AI', 'warm_pool_size', fallback=warm_pool_size)
+                warm_pool_memory_fraction = self.config.getfloat(
+                    'LOCAL_AI', 'warm_pool_memory_fraction', fallback=warm_pool_memory_fraction
+                )
+                self.keep_alive = self.config.get('LOCAL_AI', 'keep_alive', fallback=self.keep_alive)
+
+        # Generation goes straight to the Ollama HTTP API; the blocking
+        # ollama-python client is only used for listing and pulling models,
+        # on one long-lived executor. Callers arrive on many event loops
+        # (the agent's, and a loop per Flask thread), so the HTTP session,
+        # per-model slots and warm pool all live on one background loop.
+        self._io = BackgroundLoop()
+        self.http_client = OllamaHTTPClient(ollama_url, ollama_timeout)
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="LocalAI")
+        self._model_slots: Dict[str, asyncio.Semaphore] = {}
 
+        # Repeated prompts are answered from the response cache
+        self.response_cache: Optional[ResponseCache] = None
+        if cache_enabled:
+            embedder = None
+            if cache_embedding_model:
+                embedder = lambda text: self._io.run(self.http_client.embed(cache_embedding_model, text))
+            self.response_cache = ResponseCache(embedder=embedder, **cache_settings)
+
+        # Models kept resident in Ollama, sized to the memory they can use
+        self.warm_pool: Optional[ModelWarmPool] = None
+        if warm_pool_enabled:
+            self.warm_pool = ModelWarmPool(
+                load=lambda model: self.http_client.load_model(model.full_name, self.keep_alive),
+                unload=lambda model: self.http_client.unload_model(model.full_name),
+                resolve=self.hardware_detector.get_optimal_model,
+                memory_budget_gb=self._model_memory_budget_gb(warm_pool_memory_fraction),
+                max_models=warm_pool_size
+            )
 
         self._initialize()
     
+    def _model_memory_budget_gb(self, fraction: float) -> float:
+        """Memory models may occupy: GPU memory when CUDA is present, else system RAM"""
+        system_info = self.hardware_detector.system_info
+        gpu = system_info['gpu_info']
+        if gpu.get('cuda_available') and gpu.get('memory_gb', 0) > 0:
+            return gpu['memory_gb'] * fraction
+        return system_info['memory_gb'] * fraction
+    
     def _initialize(self):
         """Initialize the local AI manager"""
         try:
@@ -525,23 +697,17 @@ class LocalAIManager:
                         return False
 
 
-                loop = asyncio.get_event_loop()
-                with ThreadPoolExecutor() as executor:
-                    future = loop.run_in_executor(executor, download_model)
-                    try:
-                        return await asyncio.wait_for(
-                            future, timeout=self.download_timeout
-                        )
-                    except asyncio.TimeoutError:
-                        logging.error(
-                            f"Download timed out for {name} after {self.download_timeout}s"
-                        )
-                        return False
-
-                with ThreadPoolExecutor() as executor:
-                    return await asyncio.get_event_loop().run_in_executor(
-                        executor, download_model
+                loop = asyncio.get_running_loop()
+                future = loop.run_in_executor(self._executor, download_model)
+                try:
+                    return await asyncio.wait_for(
+                        future, timeout=self.download_timeout
+                    )
+                except asyncio.TimeoutError:
+                    logging.error(
+                        f"Download timed out for {name} after {self.download_timeout}s"
                     )
+                    return False
 
 
             for name in [model.full_name, *model.aliases]:
@@ -584,14 +750,14 @@ class LocalAIManager:
             } if self.current_model else None
         }
     
-    async def ensure_model_ready(self, task_type: str = "general") -> bool:
-        """Ensure appropriate model is ready for the task"""
+    async def ensure_model_ready(self, task_type: str = "general") -> Optional[QuantizedModel]:
+        """Ensure appropriate model is ready for the task and return it (None if unavailable)"""
         try:
             # Get optimal model for task
             optimal_model = self.hardware_detector.get_optimal_model(task_type)
             if not optimal_model:
                 logging.error("No suitable model found for hardware")
-                return False
+                return None
             
             # Check if we need to switch models
             if (not self.current_model or 
@@ -602,30 +768,30 @@ class LocalAIManager:
                     logging.info(f"Downloading required model: {optimal_model.display_name}")
                     success = await self._download_model_async(optimal_model)
                     if not success:
-                        return False
+                        return None
                 
                 self.current_model = optimal_model
                 logging.info(f"Switched to model: {optimal_model.display_name}")
             
-            return True
+            if self.warm_pool:
+                # Loads the model now if it is cold and preloads the predicted next one
+                if not await self._io.run(self.warm_pool.acquire(optimal_model, task_type)):
+                    logging.error(f"Failed to load model: {optimal_model.display_name}")
+                    return None
+            
+            return optimal_model
             
         except Exception as e:
             logging.error(f"Failed to ensure model ready: {e}")
-            return False
+            return None
     
     async def generate_response(self, prompt: str, **options) -> Dict[str, Any]:
         """Generate response using optimal local model"""
         start_time = time.time()
         
         try:
-            # Ensure model is ready
             task_type = options.get('task_type', 'general')
-            if not await self.ensure_model_ready(task_type):
-                return {
-                    'success': False,
-                    'error': 'No suitable model available',
-                    'hardware_info': self.get_hardware_info()
-                }
+            optimal_model = self.hardware_detector.get_optimal_model(task_type)
             
             # Prepare generation options
             generation_options = {
@@ -635,24 +801,65 @@ class LocalAIManager:
                 'repeat_penalty': options.get('repeat_penalty', 1.1),
             }
             
+            # Serve repeated prompts from the cache before touching the
+            # model, so a hit never waits on a cold load
+            use_cache = self.response_cache is not None and options.get('use_cache', True)
+            if use_cache and optimal_model:
+                cached = await self.response_cache.get(optimal_model.full_name, prompt, generation_options)
+                if cached is not None:
+                    if self.warm_pool:
+                        self._io.call_soon(self.warm_pool.record, task_type)
+                    processing_time = time.time() - start_time
+                    self.inference_stats['cache_hits'] += 1
+                    return {
+                        'success': True,
+                        'response': cached['response'],
+                        'model_used': optimal_model.display_name,
+                        'model_full_name': optimal_model.full_name,
+                        'processing_time': processing_time,
+                        'tokens_generated': cached.get('eval_count', 0),
+                        'tokens_per_second': 0,
+                        'hardware_type': self.hardware_detector.hardware_type.value,
+                        'memory_used_gb': optimal_model.memory_gb,
+                        'context_length': cached.get('prompt_eval_count', 0),
+                        'cached': True
+                    }
+            
+            # Ensure model is ready
+            model = await self.ensure_model_ready(task_type)
+            if not model:
+                return {
+                    'success': False,
+                    'error': 'No suitable model available',
+                    'hardware_info': self.get_hardware_info()
+                }
+            
             # Generate response
-            response = await self._generate_with_ollama(prompt, generation_options)
+            response = await self._generate_with_ollama(model, prompt, generation_options)
             
             # Calculate metrics
             processing_time = time.time() - start_time
             self._update_stats(processing_time, response)
             
+            if use_cache:
+                await self.response_cache.put(model.full_name, prompt, generation_options, {
+                    'response': response['response'],
+                    'eval_count': response.get('eval_count', 0),
+                    'prompt_eval_count': response.get('prompt_eval_count', 0)
+                }, tokens=response.get('eval_count', 0))
+            
             return {
                 'success': True,
                 'response': response['response'],
-                'model_used': self.current_model.display_name,
-                'model_full_name': self.current_model.full_name,
+                'model_used': model.display_name,
+                'model_full_name': model.full_name,
                 'processing_time': processing_time,
                 'tokens_generated': response.get('eval_count', 0),
                 'tokens_per_second': response.get('eval_count', 0) / processing_time if processing_time > 0 else 0,
                 'hardware_type': self.hardware_detector.hardware_type.value,
-                'memory_used_gb': self.current_model.memory_gb,
-                'context_length': response.get('prompt_eval_count', 0)
+                'memory_used_gb': model.memory_gb,
+                'context_length': response.get('prompt_eval_count', 0),
+                'cached': False
             }
             
         except Exception as e:
@@ -664,23 +871,32 @@ class LocalAIManager:
                 'model_attempted': self.current_model.display_name if self.current_model else None
             }
     
-    async def _generate_with_ollama(self, prompt: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    def _model_slot(self, model_name: str) -> asyncio.Semaphore:
+        """Semaphore bounding concurrent generations against one model; background loop only"""
+        slot = self._model_slots.get(model_name)
+        if slot is None:
+            slot = asyncio.Semaphore(max(1, self.max_concurrent_requests))
+            self._model_slots[model_name] = slot
+        return slot
+    
+    @staticmethod
+    def _ollama_options(options: Dict[str, Any]) -> Dict[str, Any]:
+        """Translate generation options to Ollama's names"""
+        ollama_options = dict(options)
+        if 'max_tokens' in ollama_options:
+            ollama_options['num_predict'] = ollama_options.pop('max_tokens')
+        return ollama_options
+    
+    async def _generate_with_ollama(self, model: QuantizedModel, prompt: str, options: Dict[str, Any]) -> Dict[str, Any]:
         """Generate response using Ollama"""
-        try:
-            def ollama_generate():
-                return self.ollama_client.generate(
-                    model=self.current_model.full_name,
-                    prompt=prompt,
-                    options=options
-                )
-            
-            # Run in executor to avoid blocking
-            with ThreadPoolExecutor() as executor:
-                response = await asyncio.get_event_loop().run_in_executor(
-                    executor, ollama_generate
+        async def generate():
+            async with self._model_slot(model.full_name):
+                return await self.http_client.generate(
+                    model.full_name, prompt, self._ollama_options(options), keep_alive=self.keep_alive
                 )
-            
-            return response
+        
+        try:
+            return await self._io.run(generate())
             
         except Exception as e:
             logging.error(f"Ollama generation failed: {e}")
@@ -691,7 +907,8 @@ class LocalAIManager:
         try:
             # Ensure model is ready
             task_type = options.get('task_type', 'general')
-            if not await self.ensure_model_ready(task_type):
+            model = await self.ensure_model_ready(task_type)
+            if not model:
                 yield {
                     'success': False,
                     'error': 'No suitable model available',
@@ -708,40 +925,40 @@ class LocalAIManager:
             
             start_time = time.time()
             full_response = ""
+            first_token = True
             
-            def ollama_stream():
-                return self.ollama_client.generate(
-                    model=self.current_model.full_name,
-                    prompt=prompt,
-                    options=generation_options,
-                    stream=True
-                )
+            async def stream():
+                # The model slot is held until the stream ends
+                async with self._model_slot(model.full_name):
+                    async for chunk in self.http_client.stream(
+                        model.full_name, prompt, self._ollama_options(generation_options),
+                        keep_alive=self.keep_alive
+                    ):
+                        yield chunk
             
-            # Stream response
-            with ThreadPoolExecutor() as executor:
-                stream = await asyncio.get_event_loop().run_in_executor(
-                    executor, ollama_stream
-                )
+            async for chunk in self._io.iterate(stream()):
+                response_text = chunk.get('response', '')
+                full_response += response_text
+                done = chunk.get('done', False)
                 
-                for chunk in stream:
-                    response_text = chunk.get('response', '')
-                    full_response += response_text
-                    done = chunk.get('done', False)
-                    
-                    yield {
-                        'success': True,
-                        'response': response_text,
-                        'full_response': full_response,
-                        'done': done,
-                        'model_used': self.current_model.display_name,
-                        'processing_time': time.time() - start_time
-                    }
-                    
-                    if done:
-                        # Final metrics
-                        total_time = time.time() - start_time
-                        self._update_stats(total_time, chunk)
-                        break
+                if first_token and response_text:
+                    first_token = False
+                    self._record_first_token(time.time() - start_time)
+                
+                yield {
+                    'success': True,
+                    'response': response_text,
+                    'full_response': full_response,
+                    'done': done,
+                    'model_used': model.display_name,
+                    'processing_time': time.time() - start_time
+                }
+                
+                if done:
+                    # Final metrics
+                    total_time = time.time() - start_time
+                    self._update_stats(total_time, chunk)
+                    break
             
         except Exception as e:
             logging.error(f"Streaming generation failed: {e}")
@@ -751,6 +968,38 @@ class LocalAIManager:
                 'done': True
             }
     
+    def _record_first_token(self, latency: float):
+        stats = self.inference_stats
+        stats['streams_started'] += 1
+        stats['avg_time_to_first_token'] += (latency - stats['avg_time_to_first_token']) / stats['streams_started']
+    
+    async def _close_io(self):
+        """Stop the warm pool and close the HTTP session; runs on the background loop"""
+        if self.warm_pool:
+            await self.warm_pool.shutdown()
+        await self.http_client.close()
+    
+    def _release_threads(self):
+        self._io.stop()
+        self._executor.shutdown(wait=False)
+        if self.response_cache:
+            self.response_cache.close()
+    
+    async def close(self):
+        """Release the HTTP session, background loop and worker thread"""
+        if self._io.running:
+            await self._io.run(self._close_io())
+        self._release_threads()
+    
+    def shutdown(self, timeout: float = 10.0):
+        """Synchronous ``close`` for shutdown paths that have no event loop"""
+        if self._io.running:
+            try:
+                asyncio.run_coroutine_threadsafe(self._close_io(), self._io.loop).result(timeout)
+            except Exception as e:
+                logging.warning(f"Local AI shutdown did not finish cleanly: {e}")
+        self._release_threads()
+    
     def _update_stats(self, processing_time: float, response: Dict[str, Any]):
         """Update performance statistics"""
         self.inference_stats['total_requests'] += 1
@@ -888,6 +1137,7 @@ class LocalAIManager:
                 'tags': self.current_model.tags
             } if self.current_model else None,
             'loaded_models_count': len(self.loaded_models),
+            'response_cache': self.response_cache.get_stats() if self.response_cache else None,
             'ollama_available': OLLAMA_AVAILABLE and self.ollama_client is not None
         }
     
@@ -900,7 +1150,8 @@ class LocalAIManager:
             'current_model': self.current_model.display_name if self.current_model else None,
             'models_loaded': len(self.loaded_models),
             'auto_management': self.auto_model_management,
-            'performance': self.inference_stats
+            'performance': self.inference_stats,
+            'warm_pool': self.warm_pool.get_status() if self.warm_pool else None
         }
 
 
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+ultimate_agent/ai/local_models/warm_pool.py
+Keeps the most useful local models resident and preloads the next one
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Awaitable, List
+
+
+class ModelWarmPool:
+    """Tracks which models Ollama holds in memory and decides what to keep.
+
+    Every request is recorded against its task type with an exponentially
+    decaying weight, which gives a traffic forecast per task type; ``resolve``
+    maps a task type to the model that serves it. At most ``max_models``
+    models totalling ``memory_budget_gb`` are kept resident.
+
+    Eviction is cost-aware: each resident model is scored by its forecast
+    share of traffic times the time it took to load, divided by its memory
+    footprint, and the lowest-scoring models go first. A cheap, rarely used
+    model is dropped before an expensive one that will be needed again.
+
+    ``load`` and ``unload`` are coroutines taking a model object with
+    ``full_name`` and ``memory_gb`` attributes.
+
+    The admission lock and load tasks belong to one event loop at a time.
+    Callers on several loops should funnel through one loop (LocalAIManager
+    uses a ``BackgroundLoop``); when the pool is driven from a new loop,
+    work left on the previous one is dropped rather than awaited.
+    """
+
+    def __init__(self, load: Callable[[Any], Awaitable[Any]], unload: Callable[[Any], Awaitable[Any]],
+                 resolve: Callable[[str], Any], memory_budget_gb: float, max_models: int = 2,
+                 half_life: float = 300.0):
+        self.load = load
+        self.unload = unload
+        self.resolve = resolve
+        self.memory_budget_gb = memory_budget_gb
+        self.max_models = max(1, int(max_models))
+        self.half_life = half_life
+
+        self.resident: Dict[str, Any] = {}
+        self.load_times: Dict[str, float] = {}
+        self._loading: Dict[str, asyncio.Task] = {}
+        self._loading_models: Dict[str, Any] = {}
+        self._admission: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._preload_task: Optional[asyncio.Task] = None
+
+        # Decayed request weight per task type, and when it was last decayed
+        self._traffic: Dict[str, float] = {}
+        self._traffic_at = time.monotonic()
+
+        self.stats = {
+            'warm_hits': 0,
+            'cold_starts': 0,
+            'preloads': 0,
+            'evictions': 0,
+            'load_failures': 0
+        }
+        self._recent_load_times: deque = deque(maxlen=100)
+
+    # Traffic forecast
+
+    def record(self, task_type: str):
+        self._decay()
+        self._traffic[task_type] = self._traffic.get(task_type, 0.0) + 1.0
+
+    def _decay(self):
+        now = time.monotonic()
+        factor = 0.5 ** ((now - self._traffic_at) / self.half_life)
+        self._traffic_at = now
+        if factor < 1.0:
+            for task_type in list(self._traffic):
+                self._traffic[task_type] *= factor
+                if self._traffic[task_type] < 1e-3:
+                    del self._traffic[task_type]
+
+    def model_demand(self) -> Dict[str, float]:
+        """Forecast share of upcoming requests per model name"""
+        self._decay()
+        total = sum(self._traffic.values())
+        demand: Dict[str, float] = {}
+        if not total:
+            return demand
+        for task_type, weight in self._traffic.items():
+            model = self.resolve(task_type)
+            if model is not None:
+                demand[model.full_name] = demand.get(model.full_name, 0.0) + weight / total
+        return demand
+
+    def predict_next(self) -> Optional[Any]:
+        """Most-demanded model that is not resident yet"""
+        best = None
+        best_demand = 0.0
+        demand = self.model_demand()
+        for task_type in self._traffic:
+            model = self.resolve(task_type)
+            if model is None or model.full_name in self.resident:
+                continue
+            if demand.get(model.full_name, 0.0) > best_demand:
+                best, best_demand = model, demand[model.full_name]
+        return best
+
+    # Residency
+
+    def _value(self, model, demand: Dict[str, float]) -> float:
+        load_cost = self.load_times.get(model.full_name, model.memory_gb)
+        return demand.get(model.full_name, 0.0) * load_cost / max(model.memory_gb, 0.1)
+
+    def _victims_for(self, model, demand: Dict[str, float]) -> Optional[List[Any]]:
+        """Lowest-value resident models to drop so ``model`` fits, or None if it cannot.
+
+        Loads already in flight count against the budget but cannot be
+        evicted, so a model may not fit until they finish.
+        """
+        if model.memory_gb > self.memory_budget_gb:
+            return None
+        in_flight = list(self._loading_models.values())
+        used = sum(m.memory_gb for m in self.resident.values()) + sum(m.memory_gb for m in in_flight)
+        count = len(self.resident) + len(in_flight)
+        victims = []
+        for candidate in sorted(self.resident.values(), key=lambda m: self._value(m, demand)):
+            if used + model.memory_gb <= self.memory_budget_gb and count < self.max_models:
+                break
+            victims.append(candidate)
+            used -= candidate.memory_gb
+            count -= 1
+        if used + model.memory_gb > self.memory_budget_gb or count >= self.max_models:
+            return None
+        return victims
+
+    def _bind_loop(self):
+        """Start fresh loop-bound state when called from a different event loop"""
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        self._loop = loop
+        self._admission = asyncio.Lock()
+        # Loads and preloads started on the previous loop can never be
+        # awaited from this one, and if that loop is closed they never finish
+        for name, task in list(self._loading.items()):
+            if task.get_loop() is not loop:
+                self._loading.pop(name, None)
+                self._loading_models.pop(name, None)
+        if self._preload_task is not None and self._preload_task.get_loop() is not loop:
+            self._preload_task = None
+
+    async def acquire(self, model, task_type: Optional[str] = None) -> bool:
+        """Make ``model`` resident for a request; returns False if loading failed"""
+        self._bind_loop()
+        if task_type is not None:
+            self.record(task_type)
+
+        if model.full_name in self.resident:
+            self.stats['warm_hits'] += 1
+            self._schedule_preload()
+            return True
+
+        pending = self._loading.get(model.full_name)
+        if pending is not None and not pending.done():
+            # Already being preloaded; only wait for the remaining load time
+            self.stats['warm_hits'] += 1
+            loaded = await asyncio.shield(pending)
+        else:
+            self.stats['cold_starts'] += 1
+            loaded = await self._load(model, force=True)
+        self._schedule_preload()
+        return loaded
+
+    async def _load(self, model, force: bool) -> bool:
+        while True:
+            async with self._admission:
+                if model.full_name in self.resident:
+                    return True
+                pending = self._loading.get(model.full_name)
+                if pending is None:
+                    demand = self.model_demand()
+                    victims = self._victims_for(model, demand)
+                    if victims is None and model.memory_gb <= self.memory_budget_gb:
+                        # It would fit, but loads already in flight are in the way
+                        if not force:
+                            return False
+                        in_flight = list(self._loading.values())
+                    else:
+                        if victims is None:
+                            if not force:
+                                return False
+                            victims = list(self.resident.values())
+                        if not force:
+                            # A preload must be worth more than everything it would push out
+                            value = self._value(model, demand)
+                            if any(self._value(v, demand) >= value for v in victims):
+                                return False
+                        task = self._start_load(model, victims)
+                        break
+            if pending is not None:
+                # Another caller is already loading this model
+                return await asyncio.shield(pending)
+            await asyncio.wait(in_flight)
+        return await task
+
+    def _start_load(self, model, victims: List[Any]) -> asyncio.Task:
+        """Start replacing ``victims`` with ``model``; the caller holds ``_admission``.
+
+        Victims leave the resident set and the load is registered before the
+        lock is released, so the next admission sees both.
+        """
+        for victim in victims:
+            self.resident.pop(victim.full_name, None)
+        task = asyncio.ensure_future(self._replace(victims, model))
+        self._loading[model.full_name] = task
+        self._loading_models[model.full_name] = model
+        return task
+
+    async def _replace(self, victims: List[Any], model) -> bool:
+        try:
+            for victim in victims:
+                await self._evict(victim)
+            return await self._timed_load(model)
+        finally:
+            # A newer load of the same model may have replaced this entry
+            if self._loading.get(model.full_name) is asyncio.current_task():
+                del self._loading[model.full_name]
+                self._loading_models.pop(model.full_name, None)
+
+    async def _timed_load(self, model) -> bool:
+        start = time.perf_counter()
+        try:
+            await self.load(model)
+        except Exception as e:
+            self.stats['load_failures'] += 1
+            logging.warning(f"Failed to load {model.full_name}: {e}")
+            return False
+        elapsed = time.perf_counter() - start
+        self.load_times[model.full_name] = elapsed
+        self._recent_load_times.append(elapsed)
+        self.resident[model.full_name] = model
+        return True
+
+    async def _evict(self, model):
+        self.resident.pop(model.full_name, None)
+        self.stats['evictions'] += 1
+        try:
+            await self.unload(model)
+        except Exception as e:
+            logging.debug(f"Failed to unload {model.full_name}: {e}")
+
+    def _schedule_preload(self):
+        if self._preload_task is not None and not self._preload_task.done():
+            return
+        model = self.predict_next()
+        if model is None or model.full_name in self._loading:
+            return
+        self._preload_task = asyncio.ensure_future(self._preload(model))
+
+    async def _preload(self, model):
+        if await self._load(model, force=False):
+            self.stats['preloads'] += 1
+            logging.info(f"🔥 Preloaded {model.full_name}")
+
+    async def shutdown(self):
+        self._bind_loop()
+        if self._preload_task is not None and not self._preload_task.done():
+            self._preload_task.cancel()
+            await asyncio.gather(self._preload_task, return_exceptions=True)
+
+    def get_status(self) -> Dict[str, Any]:
+        load_times = self._recent_load_times
+        return {
+            **self.stats,
+            'resident_models': list(self.resident),
+            'memory_used_gb': sum(m.memory_gb for m in self.resident.values()),
+            'memory_budget_gb': self.memory_budget_gb,
+            'max_models': self.max_models,
+            'avg_load_time': sum(load_times) / len(load_times) if load_times else 0.0,
+            'max_load_time': max(load_times) if load_times else 0.0,
+            'load_times': dict(self.load_times),
+            'predicted_next': getattr(self.predict_next(), 'full_name', None)
+        }
+
+
+__all__ = ['ModelWarmPool']
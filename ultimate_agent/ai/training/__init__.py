@@ -17,15 +17,42 @@ except Exception:  # pragma: no cover - optional dependency
 from typing import Dict, Any, Callable
 import uuid
 
+from .mlp import MLPWorkspace
+
+
+def _config_value(config, section: str, key: str, fallback):
+    """Read a setting from a ConfigManager or a plain dict config"""
+    if config is None:
+        return fallback
+    if hasattr(config, 'get_section'):
+        return config.get_section(section).get(key, fallback)
+    if isinstance(config, dict):
+        return config.get(f"{section.lower()}_{key}", fallback)
+    return fallback
+
 
 class AITrainingEngine:
     """Advanced AI training capabilities with real computation"""
     
-    def __init__(self, ai_manager):
+    # Pure NumPy workloads that benefit from running outside the GIL
+    PROCESS_TASK_TYPES = {
+        "neural_network_training",
+        "cnn_training",
+        "gradient_computation",
+        "data_preprocessing"
+    }
+    
+    def __init__(self, ai_manager, execution_mode: str = None):
         self.ai_manager = ai_manager
         self.training_sessions = {}
         self.model_cache = {}
         
+        # Opt-in process pool for CPU-bound jobs (AI_TRAINING.execution_mode = process)
+        config = getattr(ai_manager, 'config', None)
+        self.execution_mode = execution_mode or _config_value(config, 'AI_TRAINING', 'execution_mode', 'thread')
+        self.process_workers = int(_config_value(config, 'AI_TRAINING', 'process_workers', 0)) or None
+        self.process_backend = None
+        
         # Define training task types
         self.training_tasks = {
             "neural_network_training": self.train_neural_network,
@@ -57,7 +84,12 @@ class AITrainingEngine:
         }
         
         try:
-            result = self.training_tasks[task_type](config, progress_callback)
+            result = None
+            if self._use_process_backend(task_type, config):
+                result = self._get_process_backend().run(task_type, config, progress_callback)
+                self.training_sessions[session_id]['execution_mode'] = 'process' if result is not None else 'thread'
+            if result is None:
+                result = self.training_tasks[task_type](config, progress_callback)
             result['session_id'] = session_id
             
             # Update session
@@ -76,6 +108,26 @@ class AITrainingEngine:
             })
             return {'success': False, 'error': str(e)}
     
+    def _use_process_backend(self, task_type: str, config: Dict) -> bool:
+        mode = config.get('execution_mode', self.execution_mode)
+        return mode == 'process' and task_type in self.PROCESS_TASK_TYPES
+    
+    def _get_process_backend(self):
+        if self.process_backend is None:
+            from .process_backend import ProcessTrainingBackend
+            self.process_backend = ProcessTrainingBackend(
+                max_workers=self.process_workers,
+                gpu_available=getattr(self.ai_manager, 'gpu_available', False)
+            )
+            print(f"🧵 Training process pool started with {self.process_backend.max_workers} workers")
+        return self.process_backend
+    
+    def shutdown(self):
+        """Stop the training process pool if one was started"""
+        if self.process_backend is not None:
+            self.process_backend.shutdown()
+            self.process_backend = None
+    
     def train_neural_network(self, config: Dict, progress_callback: Callable) -> Dict:
         """Enhanced neural network training with real computation"""
         try:
@@ -99,12 +151,28 @@ class AITrainingEngine:
             input_dim = config.get('input_dim', 784)
             hidden_dim = config.get('hidden_dim', 128)
             output_dim = config.get('output_dim', 10)
+            data_size = config.get('data_size', 1000)
+            num_batches = max(1, data_size // batch_size)
             
-            # Initialize weights
-            weights_ih = np.random.randn(input_dim, hidden_dim) * 0.1
-            weights_ho = np.random.randn(hidden_dim, output_dim) * 0.1
-            bias_h = np.zeros(hidden_dim)
-            bias_o = np.zeros(output_dim)
+            # Fused mode trains on one pre-generated dataset and validates every few
+            # epochs; progress (and with it cancellation) is still checked every epoch
+            fused = bool(config.get('fused', False))
+            validate_every = max(1, int(config.get('progress_every', 5 if fused else 1)))
+            
+            workspace = MLPWorkspace(
+                input_dim, hidden_dim, output_dim, batch_size,
+                dtype=config.get('dtype', 'float32'),
+                seed=config.get('seed')
+            )
+            
+            # Fixed validation set, evaluated into reused buffers
+            val_input = workspace.rng.standard_normal((100, input_dim), dtype=workspace.dtype)
+            val_target = workspace.random_targets(100)
+            val_buffers = workspace.make_eval_buffers(100)
+            
+            if fused:
+                dataset = workspace.rng.standard_normal((num_batches * batch_size, input_dim), dtype=workspace.dtype)
+                dataset_targets = workspace.random_targets(num_batches * batch_size).reshape(num_batches, batch_size)
 
             import psutil
             process = psutil.Process()
@@ -112,74 +180,47 @@ class AITrainingEngine:
             
             training_losses = []
             validation_losses = []
+            accuracy = 0.0
             
             for epoch in range(epochs):
                 epoch_loss = 0.0
-                data_size = config.get('data_size', 1000)
-                num_batches = data_size // batch_size
                 
-                for batch in range(num_batches):
-                    # Generate batch data
-                    batch_input = np.random.randn(batch_size, input_dim)
-                    batch_target = np.random.randint(0, output_dim, batch_size)
-                    
-                    # Forward pass
-                    hidden = np.maximum(0, np.dot(batch_input, weights_ih) + bias_h)  # ReLU
-                    output = np.dot(hidden, weights_ho) + bias_o
-                    
-                    # Softmax
-                    exp_output = np.exp(output - np.max(output, axis=1, keepdims=True))
-                    softmax_output = exp_output / np.sum(exp_output, axis=1, keepdims=True)
-                    
-                    # Cross-entropy loss
-                    batch_loss = -np.mean(np.log(softmax_output[range(batch_size), batch_target] + 1e-15))
-                    epoch_loss += batch_loss
-                    
-                    # Backward pass
-                    output_error = softmax_output.copy()
-                    output_error[range(batch_size), batch_target] -= 1
-                    output_error /= batch_size
-                    
-                    # Update weights
-                    weights_ho -= learning_rate * np.dot(hidden.T, output_error)
-                    bias_o -= learning_rate * np.sum(output_error, axis=0)
-                    
-                    hidden_error = np.dot(output_error, weights_ho.T)
-                    hidden_error[hidden <= 0] = 0  # ReLU derivative
-                    
-                    weights_ih -= learning_rate * np.dot(batch_input.T, hidden_error)
-                    bias_h -= learning_rate * np.sum(hidden_error, axis=0)
+                if fused:
+                    for batch in range(num_batches):
+                        start = batch * batch_size
+                        epoch_loss += workspace.train_batch(
+                            dataset[start:start + batch_size], dataset_targets[batch], learning_rate
+                        )
+                else:
+                    targets = workspace.random_targets(num_batches * batch_size).reshape(num_batches, batch_size)
+                    for batch in range(num_batches):
+                        epoch_loss += workspace.train_batch(
+                            workspace.fill_random_batch(), targets[batch], learning_rate
+                        )
                 
                 avg_loss = epoch_loss / num_batches
                 training_losses.append(avg_loss)
                 
+                details = {
+                    'epoch': epoch + 1,
+                    'training_loss': float(avg_loss),
+                    'learning_rate': learning_rate
+                }
+                
                 # Validation
-                val_input = np.random.randn(100, input_dim)
-                val_target = np.random.randint(0, output_dim, 100)
-                val_hidden = np.maximum(0, np.dot(val_input, weights_ih) + bias_h)
-                val_output = np.dot(val_hidden, weights_ho) + bias_o
-                val_exp = np.exp(val_output - np.max(val_output, axis=1, keepdims=True))
-                val_softmax = val_exp / np.sum(val_exp, axis=1, keepdims=True)
-                val_loss = -np.mean(np.log(val_softmax[range(100), val_target] + 1e-15))
-                validation_losses.append(val_loss)
-                
-                # Calculate accuracy
-                predictions = np.argmax(val_softmax, axis=1)
-                accuracy = np.mean(predictions == val_target)
+                validate = not (epoch + 1) % validate_every or epoch + 1 == epochs
+                if validate:
+                    val_loss, accuracy = workspace.evaluate(val_input, val_target, val_buffers)
+                    validation_losses.append(val_loss)
+                    details.update(validation_loss=float(val_loss), accuracy=float(accuracy))
                 
                 # Progress callback
                 progress = ((epoch + 1) / epochs) * 100
-                if not progress_callback(progress, {
-                    'epoch': epoch + 1,
-                    'training_loss': float(avg_loss),
-                    'validation_loss': float(val_loss),
-                    'accuracy': float(accuracy),
-                    'learning_rate': learning_rate
-                }):
+                if not progress_callback(progress, details):
                     return {'success': False, 'error': 'Training cancelled'}
                 
                 # Adaptive learning rate
-                if epoch > 0 and validation_losses[-1] > validation_losses[-2]:
+                if validate and len(validation_losses) > 1 and validation_losses[-1] > validation_losses[-2]:
                     learning_rate *= 0.95
 
                 current_memory = process.memory_info().rss / 1024 / 1024
@@ -193,7 +234,8 @@ class AITrainingEngine:
                 'epochs_completed': epochs,
                 'device_used': 'gpu' if self.ai_manager.gpu_available else 'cpu',
                 'model_architecture': f'{input_dim}-{hidden_dim}-{output_dim}',
-                'parameters_trained': (input_dim * hidden_dim) + (hidden_dim * output_dim),
+                'parameters_trained': workspace.parameter_count,
+                'dtype': str(workspace.dtype),
                 'convergence_status': 'converged' if avg_loss < 1.0 else 'training'
             }
             
@@ -747,6 +789,8 @@ class AITrainingEngine:
             'available_tasks': list(self.training_tasks.keys()),
             'gpu_available': self.ai_manager.gpu_available,
             'model_cache_size': len(self.model_cache),
+            'execution_mode': self.execution_mode,
+            'process_pool': self.process_backend.get_status() if self.process_backend else None,
             'sessions': {sid: {
                 'task_type': session['task_type'],
                 'status': session['status'],
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+ultimate_agent/ai/training/mlp.py
+Two-layer MLP training kernels with preallocated, reused workspaces
+"""
+
+from typing import Dict, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:  # pragma: no cover - optional dependency
+    class _DummyNumpy:
+        class ndarray:
+            pass
+
+    np = _DummyNumpy()
+    NUMPY_AVAILABLE = False
+
+
+SUPPORTED_DTYPES = ('float32', 'float64')
+
+
+class MLPWorkspace:
+    """Weights plus every intermediate buffer needed for one mini-batch.
+
+    All forward/backward arrays are allocated once for ``batch_size`` rows
+    and updated in place with ``out=`` ufunc calls, so a training step does
+    no array allocation beyond the small target-index gathers.
+
+    Every gradient is taken against the weights as they were before the
+    step.
+    """
+
+    def __init__(self, input_dim: int, hidden_dim: int, output_dim: int, batch_size: int,
+                 dtype: str = 'float32', seed: int = None):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy is required for MLP training")
+        if str(dtype) not in SUPPORTED_DTYPES:
+            raise ValueError(f"dtype must be one of {SUPPORTED_DTYPES}")
+
+        self.input_dim = input_dim
+        self.hidden_dim = hidden_dim
+        self.output_dim = output_dim
+        self.batch_size = batch_size
+        self.dtype = np.dtype(dtype)
+        self.rng = np.random.default_rng(seed)
+
+        # Parameters
+        self.weights_ih = self._randn(input_dim, hidden_dim) * self.dtype.type(0.1)
+        self.weights_ho = self._randn(hidden_dim, output_dim) * self.dtype.type(0.1)
+        self.bias_h = np.zeros(hidden_dim, dtype=self.dtype)
+        self.bias_o = np.zeros(output_dim, dtype=self.dtype)
+
+        # Forward buffers
+        self.batch_input = np.empty((batch_size, input_dim), dtype=self.dtype)
+        self.hidden = np.empty((batch_size, hidden_dim), dtype=self.dtype)
+        self.output = np.empty((batch_size, output_dim), dtype=self.dtype)
+        self.row_stat = np.empty((batch_size, 1), dtype=self.dtype)
+        self.rows = np.arange(batch_size)
+
+        # Backward buffers
+        self.hidden_error = np.empty((batch_size, hidden_dim), dtype=self.dtype)
+        self.relu_mask = np.empty((batch_size, hidden_dim), dtype=bool)
+        self.grad_ih = np.empty((input_dim, hidden_dim), dtype=self.dtype)
+        self.grad_ho = np.empty((hidden_dim, output_dim), dtype=self.dtype)
+        self.grad_bh = np.empty(hidden_dim, dtype=self.dtype)
+        self.grad_bo = np.empty(output_dim, dtype=self.dtype)
+
+    @property
+    def parameter_count(self) -> int:
+        return (self.input_dim * self.hidden_dim) + (self.hidden_dim * self.output_dim)
+
+    def _randn(self, *shape):
+        return self.rng.standard_normal(shape, dtype=self.dtype)
+
+    def fill_random_batch(self) -> np.ndarray:
+        """Overwrite the input buffer with a synthetic batch and return it"""
+        self.rng.standard_normal(out=self.batch_input, dtype=self.dtype)
+        return self.batch_input
+
+    def random_targets(self, count: int) -> np.ndarray:
+        return self.rng.integers(0, self.output_dim, size=count)
+
+    def _forward(self, x: np.ndarray, hidden: np.ndarray, output: np.ndarray, row_stat: np.ndarray):
+        """ReLU hidden layer and row-wise softmax, written into ``output``"""
+        np.dot(x, self.weights_ih, out=hidden)
+        hidden += self.bias_h
+        np.maximum(hidden, 0, out=hidden)
+
+        np.dot(hidden, self.weights_ho, out=output)
+        output += self.bias_o
+        np.max(output, axis=1, keepdims=True, out=row_stat)
+        output -= row_stat
+        np.exp(output, out=output)
+        np.sum(output, axis=1, keepdims=True, out=row_stat)
+        output /= row_stat
+
+    def train_batch(self, x: np.ndarray, targets: np.ndarray, learning_rate: float) -> float:
+        """One SGD step on a full batch; returns the cross-entropy loss"""
+        n = self.batch_size
+        lr = self.dtype.type(learning_rate)
+        probs = self.output
+
+        self._forward(x, self.hidden, probs, self.row_stat)
+        picked = probs[self.rows, targets]
+        loss = -float(np.mean(np.log(picked + 1e-15)))
+
+        # dL/dlogits = (softmax - onehot) / n, computed in place over the probabilities
+        probs[self.rows, targets] = picked - 1
+        probs /= n
+
+        np.dot(probs, self.weights_ho.T, out=self.hidden_error)
+        np.greater(self.hidden, 0, out=self.relu_mask)
+        self.hidden_error *= self.relu_mask
+
+        np.dot(self.hidden.T, probs, out=self.grad_ho)
+        np.sum(probs, axis=0, out=self.grad_bo)
+        np.dot(x.T, self.hidden_error, out=self.grad_ih)
+        np.sum(self.hidden_error, axis=0, out=self.grad_bh)
+
+        for param, grad in ((self.weights_ho, self.grad_ho), (self.bias_o, self.grad_bo),
+                            (self.weights_ih, self.grad_ih), (self.bias_h, self.grad_bh)):
+            grad *= lr
+            param -= grad
+
+        return loss
+
+    def make_eval_buffers(self, count: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return (np.empty((count, self.hidden_dim), dtype=self.dtype),
+                np.empty((count, self.output_dim), dtype=self.dtype),
+                np.empty((count, 1), dtype=self.dtype))
+
+    def evaluate(self, x: np.ndarray, targets: np.ndarray, buffers=None) -> Tuple[float, float]:
+        """Loss and accuracy on a fixed evaluation set"""
+        count = len(x)
+        hidden, output, row_stat = buffers or self.make_eval_buffers(count)
+        self._forward(x, hidden, output, row_stat)
+        loss = -float(np.mean(np.log(output[np.arange(count), targets] + 1e-15)))
+        accuracy = float(np.mean(np.argmax(output, axis=1) == targets))
+        return loss, accuracy
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {
+            'weights_ih': self.weights_ih,
+            'weights_ho': self.weights_ho,
+            'bias_h': self.bias_h,
+            'bias_o': self.bias_o
+        }
+
+
+__all__ = ['MLPWorkspace', 'SUPPORTED_DTYPES']
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+ultimate_agent/ai/training/process_backend.py
+Process-pool execution backend for CPU-bound training jobs
+"""
+
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Callable, Optional
+
+
+# Per-job control flags shared with the workers
+_RUN = 0
+_CANCEL = 1
+
+# Worker-process globals, set by _init_worker
+_worker_engine = None
+_worker_progress = None
+_worker_flags = None
+
+
+class _WorkerAIManager:
+    """Stand-in for AIModelManager inside worker processes"""
+
+    def __init__(self, gpu_available: bool):
+        self.gpu_available = gpu_available
+        self.config = {}
+
+
+def _init_worker(progress_queue, flags, gpu_available: bool):
+    global _worker_engine, _worker_progress, _worker_flags
+    from . import AITrainingEngine
+
+    _worker_progress = progress_queue
+    _worker_flags = flags
+    _worker_engine = AITrainingEngine(_WorkerAIManager(gpu_available), execution_mode='thread')
+
+
+def _run_job(job_id: int, slot: int, task_type: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    def progress_callback(progress: float, details: Dict = None) -> bool:
+        _worker_progress.put((job_id, progress, details))
+        return _worker_flags[slot] != _CANCEL
+
+    try:
+        if _worker_flags[slot] == _CANCEL:
+            return {'success': False, 'error': 'Training cancelled'}
+        return _worker_engine.training_tasks[task_type](config, progress_callback)
+    finally:
+        # End-of-job marker so the parent knows every progress report has arrived
+        _worker_progress.put((job_id, None, None))
+
+
+class ProcessTrainingBackend:
+    """Runs training jobs in a pool of worker processes.
+
+    Progress reported by a job is sent over a ``multiprocessing.Queue`` and
+    replayed through the caller's ``progress_callback`` on the calling
+    thread. When that callback returns False the job's slot in a shared
+    flag array is set, and the worker sees it on its next progress report.
+
+    A worker that dies (e.g. killed for running out of memory) breaks the
+    whole pool; the jobs it took down fail, and the pool is rebuilt on the
+    next submission.
+    """
+
+    def __init__(self, max_workers: int = None, gpu_available: bool = False,
+                 start_method: str = 'spawn', max_jobs: int = None):
+        self.max_workers = max_workers or multiprocessing.cpu_count()
+        self.max_jobs = max_jobs or max(16, self.max_workers * 4)
+
+        self._ctx = multiprocessing.get_context(start_method)
+        self._progress = self._ctx.Queue()
+        self._flags = self._ctx.Array('b', self.max_jobs, lock=False)
+        self._gpu_available = gpu_available
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+        self._lock = threading.Lock()
+        self._free_slots = list(range(self.max_jobs))
+        self._job_ids = itertools.count(1)
+        self._job_queues: Dict[int, queue.Queue] = {}
+        self._closed = False
+        self._relay = threading.Thread(target=self._relay_loop, daemon=True, name="TrainingProgressRelay")
+        self._relay.start()
+
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'cancelled': 0,
+            'rejected': 0,
+            'crashed': 0,
+            'pool_restarts': 0
+        }
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=self._ctx,
+                    initializer=_init_worker,
+                    initargs=(self._progress, self._flags, self._gpu_available)
+                )
+            return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        """Drop a broken pool so the next job starts a fresh one"""
+        with self._lock:
+            if self._pool is not pool:
+                return  # another job already replaced it
+            self._pool = None
+            self.stats['pool_restarts'] += 1
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, task_type: str, config: Dict, progress_callback: Callable) -> Optional[Dict[str, Any]]:
+        """Run a job in the pool and block until it finishes.
+
+        Returns None when every job slot is taken so the caller can fall
+        back to running the job on its own thread.
+        """
+        with self._lock:
+            if self._closed or not self._free_slots:
+                self.stats['rejected'] += 1
+                return None
+            slot = self._free_slots.pop()
+            job_id = next(self._job_ids)
+            events: queue.Queue = queue.Queue()
+            self._job_queues[job_id] = events
+            self._flags[slot] = _RUN
+            self.stats['submitted'] += 1
+
+        pool = self._get_pool()
+        try:
+            try:
+                future = pool.submit(_run_job, job_id, slot, task_type, config)
+            except BrokenProcessPool:
+                # Broken by a crash that no running job has noticed yet
+                self._discard_pool(pool)
+                pool = self._get_pool()
+                future = pool.submit(_run_job, job_id, slot, task_type, config)
+            cancelled = False
+            done_since = None
+            while True:
+                try:
+                    _, progress, details = events.get(timeout=0.1)
+                except queue.Empty:
+                    # A crashed worker never sends its end marker
+                    if future.done():
+                        done_since = done_since or time.monotonic()
+                        if time.monotonic() - done_since > 1.0:
+                            break
+                    continue
+                if progress is None:
+                    break
+                if not cancelled and not progress_callback(progress, details):
+                    cancelled = True
+                    self._flags[slot] = _CANCEL
+
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                self.stats['crashed'] += 1
+                self._discard_pool(pool)
+                return {'success': False, 'error': 'Training worker process crashed'}
+            self.stats['cancelled' if cancelled else 'completed'] += 1
+            if cancelled and result.get('success'):
+                result = {'success': False, 'error': 'Training cancelled'}
+            return result
+        finally:
+            with self._lock:
+                self._job_queues.pop(job_id, None)
+                self._free_slots.append(slot)
+
+    def _relay_loop(self):
+        while True:
+            try:
+                message = self._progress.get()
+            except (EOFError, OSError):
+                return
+            if message is None:
+                return
+            events = self._job_queues.get(message[0])
+            if events is not None:
+                events.put(message)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'max_workers': self.max_workers,
+            'active_jobs': len(self._job_queues),
+            **self.stats
+        }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for slot in range(self.max_jobs):
+                self._flags[slot] = _CANCEL
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+        self._progress.put(None)
+        self._relay.join(timeout=5)
+
+
+__all__ = ['ProcessTrainingBackend']
@@ -46,7 +46,9 @@ class ConfigManager:
             'gpu_enabled': 'auto',
             'training_data_path': './training_data',
             'model_cache_size': '1000',
-            'training_timeout': '3600'
+            'training_timeout': '3600',
+            'execution_mode': 'thread',
+            'process_workers': '0'
         }
         
         # Blockchain settings
@@ -124,7 +126,15 @@ class ConfigManager:
             'preload_models': 'false',
             'prefer_local_ai': 'true',
             'fallback_to_cloud': 'true',
-            'max_concurrent_requests': '3'
+            'max_concurrent_requests': '3',
+            'response_cache': 'true',
+            'response_cache_ttl': '3600',
+            'response_cache_path': '',
+            'response_cache_embedding_model': '',
+            'warm_pool': 'true',
+            'warm_pool_size': '2',
+            'warm_pool_memory_fraction': '0.6',
+            'keep_alive': '30m'
         }
 
         # Ollama settings
@@ -38,7 +38,7 @@ from ..remote.command_handler import RemoteCommandHandler
 try:
     from ..ai.local_models.local_ai_manager import (
         create_local_ai_manager,
-        create_local_ai_conversation_manager,
+        LocalAIConversationManager,
     )
     LOCAL_AI_AVAILABLE = True
 except ImportError:  # pragma: no cover - optional dependency
@@ -248,7 +248,7 @@ class UltimatePainNetworkAgent(UltimateAgent):
         self.monitoring_manager = MonitoringManager()
         self.plugin_manager = PluginManager()
         self.database_manager = DatabaseManager()
-        self.task_scheduler = TaskScheduler(self.ai_manager, self.blockchain_manager)
+        self.task_scheduler = TaskScheduler(self.ai_manager, self.blockchain_manager, self.config_manager)
         self.network_manager = NetworkManager(self.config_manager)
 
         node_service_url = self.config_manager.get('DEFAULT', 'node_url', fallback='https://srvnodes.peoplesainetwork.com')
@@ -318,7 +318,10 @@ class UltimatePainNetworkAgent(UltimateAgent):
         try:
             print("🧠 Initializing Local AI...")
             self.local_ai_manager = create_local_ai_manager(self.config_manager)
-            self.local_ai_conversation_manager = create_local_ai_conversation_manager(self.config_manager)
+            # Shares the manager so both use one HTTP session and one set of model slots
+            self.local_ai_conversation_manager = LocalAIConversationManager(
+                self.local_ai_manager, self.config_manager
+            )
             print("✅ Local AI components initialized successfully")
         except Exception as e:
             print(f"⚠️ Local AI initialization failed: {e}")
@@ -786,6 +789,10 @@ class UltimatePainNetworkAgent(UltimateAgent):
         try:
             self.database_manager.close()
             self.task_scheduler.stop()
+            if self.ai_manager and getattr(self.ai_manager, 'training_engine', None):
+                self.ai_manager.training_engine.shutdown()
+            if getattr(self, 'local_ai_manager', None):
+                self.local_ai_manager.shutdown()
             if self.dashboard_manager and hasattr(self.dashboard_manager, 'stop'):
                 self.dashboard_manager.stop()
             self.network_manager.close()
@@ -36,6 +36,14 @@ except ImportError:
     def Response(*args, **kwargs):
         return None
 
+from ....monitoring.metrics.registry import REGISTRY, CONTENT_TYPE
+
+# Refreshed from the monitoring manager on every scrape
+SYSTEM_CPU = REGISTRY.gauge('agent_cpu_percent', 'System CPU utilisation')
+SYSTEM_MEMORY = REGISTRY.gauge('agent_memory_percent', 'System memory utilisation')
+COLLECTOR_OVERHEAD = REGISTRY.gauge('agent_metrics_collector_cpu_percent',
+                                    'CPU used by the metrics collector itself, percent of one core')
+
 
 class DashboardServer:
     """Enhanced Dashboard Server with complete functionality"""
@@ -244,15 +252,18 @@ class DashboardServer:
                 completed_tasks = len(getattr(self.agent, 'completed_tasks', []))
                 
                 scheduler_status = {}
+                recent_tasks = []
                 if hasattr(self.agent, 'task_scheduler'):
                     try:
                         scheduler_status = self.agent.task_scheduler.get_scheduler_status()
+                        recent_tasks = self.agent.task_scheduler.get_recent_tasks(request.args.get('limit', 20, type=int))
                     except:
                         scheduler_status = {'status': 'available'}
                 
                 return jsonify({
                     'current_tasks': current_tasks,
                     'completed_tasks': completed_tasks,
+                    'recent_tasks': recent_tasks,
                     'scheduler_status': scheduler_status
                 })
             except Exception as e:
@@ -376,6 +387,18 @@ class DashboardServer:
             except Exception as e:
                 return jsonify({'error': f'Monitoring error: {str(e)}'})
 
+        @self.app.route('/metrics')
+        def prometheus_metrics():
+            """Prometheus text exposition of the agent's metrics registry"""
+            monitoring = getattr(self.agent, 'monitoring_manager', None)
+            if monitoring is not None:
+                current = monitoring.current_metrics or {}
+                SYSTEM_CPU.set(current.get('cpu_percent', 0))
+                SYSTEM_MEMORY.set(current.get('memory_percent', 0))
+                if hasattr(monitoring, 'get_collector_stats'):
+                    COLLECTOR_OVERHEAD.set(monitoring.get_collector_stats()['cpu_overhead_percent'])
+            return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
         # ==================== REMOTE MANAGEMENT ====================
         
         @self.app.route('/api/v4/remote/command', methods=['POST'])
@@ -12,18 +12,26 @@ except Exception:  # pragma: no cover - optional dependency
 import threading
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
-from collections import deque
 import json
 
+from .history import MetricsHistory
+from .rollups import RollupStore
+
+# Scalar metrics kept in the 1 minute / 1 hour / 1 day rollups
+ROLLUP_METRICS = ('cpu_percent', 'memory_percent', 'disk_usage_percent', 'efficiency_score')
+
 
 class MonitoringManager:
     """Manages performance monitoring and metrics collection"""
     
-    def __init__(self):
-        self.metrics_history = deque(maxlen=1440)  # 24 hours of minute-by-minute data
+    def __init__(self, history_capacity: int = 7 * 24 * 360, collection_interval: float = 10.0,
+                 expensive_probes: Optional[List[str]] = None):
+        # Columnar ring buffer: a week of samples at 10 second resolution
+        self.metrics_history = MetricsHistory(history_capacity)
+        self.rollups = RollupStore()  # long-range aggregates, updated per sample
         self.alerts = []
         self.monitoring_enabled = True
-        self.collection_interval = 60  # seconds
+        self.collection_interval = collection_interval  # seconds
         self.alert_thresholds = {
             'cpu_percent': 85.0,
             'memory_percent': 90.0,
@@ -32,14 +40,47 @@ class MonitoringManager:
             'response_time_ms': 5000
         }
         
+        # Each metric family is re-sampled at most this often (seconds);
+        # in between the last value is reused
+        self.family_intervals = {
+            'cpu': 0,
+            'memory': 0,
+            'process': 0,
+            'network': 5,
+            'load': 5,
+            'gpu': 10,
+            'disk': 30,
+            'boot_time': float('inf')
+        }
+        # Probes that scan /proc per file or socket; off unless asked for
+        self.expensive_probes = set(expensive_probes or ())
+        self._family_values: Dict[str, Any] = {}
+        self._family_sampled: Dict[str, float] = {}
+        self._process = None
+        
+        # Collector overhead
+        self.collector_stats = {
+            'samples': 0,
+            'cpu_time': 0.0,
+            'wall_time': 0.0,
+            'last_ms': 0.0,
+            'max_ms': 0.0
+        }
+        self._collector_started = time.time()
+        
         # Metrics collection thread
         self.collection_thread = None
         self.running = False
+        self._stop_event = threading.Event()
         
         # Current metrics
         self.current_metrics = {}
         self.last_collection_time = 0
         
+        if psutil is not None:
+            # Start the CPU counters so the first delta is meaningful
+            psutil.cpu_percent(interval=None)
+        
         print("📊 Monitoring manager initialized")
     
     def start_monitoring(self):
@@ -48,6 +89,7 @@ class MonitoringManager:
             return
         
         self.running = True
+        self._stop_event.clear()
         self.collection_thread = threading.Thread(
             target=self._collection_loop,
             daemon=True,
@@ -59,6 +101,7 @@ class MonitoringManager:
     def stop_monitoring(self):
         """Stop metrics collection"""
         self.running = False
+        self._stop_event.set()
         if self.collection_thread and self.collection_thread.is_alive():
             self.collection_thread.join(timeout=5)
         print("📊 Metrics collection stopped")
@@ -66,56 +109,87 @@ class MonitoringManager:
     def _collection_loop(self):
         """Main metrics collection loop"""
         while self.running:
+            started = time.monotonic()
             try:
                 self.collect_metrics()
-                time.sleep(self.collection_interval)
+                delay = self.collection_interval - (time.monotonic() - started)
             except Exception as e:
                 print(f"⚠️ Metrics collection error: {e}")
-                time.sleep(30)  # Wait before retrying
+                delay = 30  # Wait before retrying
+            if self._stop_event.wait(max(0.0, delay)):
+                break
+    
+    def _sample(self, family: str, now: float, probe):
+        """Value of a metric family, re-probed only when its interval is due"""
+        last = self._family_sampled.get(family)
+        if last is None or now - last >= self.family_intervals.get(family, 0):
+            self._family_values[family] = probe()
+            self._family_sampled[family] = now
+        return self._family_values[family]
+    
+    def _get_process(self):
+        if self._process is None:
+            self._process = psutil.Process()
+            self._process.cpu_percent(None)  # start the delta counter
+        return self._process
+    
+    def _probe_network(self) -> Dict[str, Any]:
+        try:
+            network = psutil.net_io_counters()
+            return {
+                'bytes_sent': network.bytes_sent,
+                'bytes_recv': network.bytes_recv,
+                'packets_sent': network.packets_sent,
+                'packets_recv': network.packets_recv
+            }
+        except Exception:
+            return {'bytes_sent': 0, 'bytes_recv': 0, 'packets_sent': 0, 'packets_recv': 0}
+    
+    def _probe_process(self) -> Dict[str, Any]:
+        try:
+            process = self._get_process()
+            # oneshot() reads /proc/<pid>/stat and friends once for all calls
+            with process.oneshot():
+                process_info = {
+                    'cpu_percent': process.cpu_percent(None),
+                    'memory_mb': process.memory_info().rss / (1024 * 1024),
+                    'threads': process.num_threads()
+                }
+            if 'open_files' in self.expensive_probes:
+                process_info['open_files'] = len(process.open_files())
+            if 'connections' in self.expensive_probes:
+                connections = getattr(process, 'net_connections', None) or process.connections
+                process_info['connections'] = len(connections())
+            return process_info
+        except Exception:
+            self._process = None
+            return {'cpu_percent': 0, 'memory_mb': 0, 'threads': 0}
     
     def collect_metrics(self) -> Dict[str, Any]:
-        """Collect current system metrics"""
+        """Collect current system metrics without blocking.
+        
+        CPU usage is the delta since the previous call rather than a
+        one-second blocking sample. Slow-changing families (disk, network,
+        GPU, load) are re-read only every ``family_intervals`` seconds.
+        """
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
         try:
             timestamp = time.time()
             
             # System metrics
-            cpu_percent = psutil.cpu_percent(interval=1)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
+            cpu_percent = self._sample('cpu', timestamp, lambda: psutil.cpu_percent(interval=None))
+            memory = self._sample('memory', timestamp, psutil.virtual_memory)
+            disk = self._sample('disk', timestamp, lambda: psutil.disk_usage('/'))
             
             # Network I/O
-            try:
-                network = psutil.net_io_counters()
-                network_io = {
-                    'bytes_sent': network.bytes_sent,
-                    'bytes_recv': network.bytes_recv,
-                    'packets_sent': network.packets_sent,
-                    'packets_recv': network.packets_recv
-                }
-            except Exception:
-                network_io = {'bytes_sent': 0, 'bytes_recv': 0, 'packets_sent': 0, 'packets_recv': 0}
+            network_io = self._sample('network', timestamp, self._probe_network)
             
             # Process information
-            try:
-                process = psutil.Process()
-                process_info = {
-                    'cpu_percent': process.cpu_percent(),
-                    'memory_mb': process.memory_info().rss / (1024 * 1024),
-                    'threads': process.num_threads(),
-                    'open_files': len(process.open_files()),
-                    'connections': len(process.connections())
-                }
-            except Exception:
-                process_info = {
-                    'cpu_percent': 0,
-                    'memory_mb': 0,
-                    'threads': 0,
-                    'open_files': 0,
-                    'connections': 0
-                }
+            process_info = self._sample('process', timestamp, self._probe_process)
             
             # GPU metrics (if available)
-            gpu_metrics = self._collect_gpu_metrics()
+            gpu_metrics = self._sample('gpu', timestamp, self._collect_gpu_metrics)
             
             metrics = {
                 'timestamp': timestamp,
@@ -139,8 +213,9 @@ class MonitoringManager:
                 'gpu': gpu_metrics,
                 
                 # Performance indicators
-                'load_average': psutil.getloadavg() if hasattr(psutil, 'getloadavg') else [0, 0, 0],
-                'boot_time': psutil.boot_time(),
+                'load_average': self._sample('load', timestamp, lambda: psutil.getloadavg()
+                                             if hasattr(psutil, 'getloadavg') else [0, 0, 0]),
+                'boot_time': self._sample('boot_time', timestamp, psutil.boot_time),
             }
             
             # Add application-specific metrics
@@ -149,7 +224,8 @@ class MonitoringManager:
             
             # Store metrics
             self.current_metrics = metrics
-            self.metrics_history.append(metrics)
+            self.metrics_history.append(metrics, timestamp)
+            self.rollups.add(self._rollup_values(metrics), timestamp)
             self.last_collection_time = timestamp
             
             # Check for alerts
@@ -160,6 +236,38 @@ class MonitoringManager:
         except Exception as e:
             print(f"❌ Failed to collect metrics: {e}")
             return {}
+        finally:
+            self._record_overhead(time.perf_counter() - wall_start, time.thread_time() - cpu_start)
+    
+    def _record_overhead(self, wall: float, cpu: float):
+        stats = self.collector_stats
+        stats['samples'] += 1
+        stats['wall_time'] += wall
+        stats['cpu_time'] += cpu
+        stats['last_ms'] = wall * 1000
+        stats['max_ms'] = max(stats['max_ms'], wall * 1000)
+    
+    def get_collector_stats(self) -> Dict[str, Any]:
+        """Cost of collection itself; ``cpu_overhead_percent`` is collector
+        CPU time as a share of one core since monitoring started"""
+        stats = self.collector_stats
+        elapsed = max(1e-9, time.time() - self._collector_started)
+        return {
+            **stats,
+            'avg_ms': stats['wall_time'] * 1000 / stats['samples'] if stats['samples'] else 0.0,
+            'cpu_overhead_percent': stats['cpu_time'] / elapsed * 100,
+            'collection_interval': self.collection_interval,
+            'family_intervals': dict(self.family_intervals),
+            'expensive_probes': sorted(self.expensive_probes)
+        }
+    
+    def _rollup_values(self, metrics: Dict[str, Any]) -> Dict[str, float]:
+        values = {name: metrics[name] for name in ROLLUP_METRICS if name in metrics}
+        values['process_memory_mb'] = metrics.get('process', {}).get('memory_mb', 0)
+        gpu = metrics.get('gpu', {})
+        if gpu.get('available'):
+            values['gpu_percent'] = gpu.get('gpu_percent', 0)
+        return values
     
     def _collect_gpu_metrics(self) -> Dict[str, Any]:
         """Collect GPU metrics if available"""
@@ -274,35 +382,47 @@ class MonitoringManager:
     def get_metrics_history(self, hours: int = 1) -> List[Dict[str, Any]]:
         """Get metrics history for specified hours"""
         cutoff_time = time.time() - (hours * 3600)
-        return [m for m in self.metrics_history if m['timestamp'] > cutoff_time]
+        return self.metrics_history.to_records(start=cutoff_time)
+    
+    def get_metrics_rollup(self, metrics: Optional[List[str]] = None, hours: float = 24,
+                           max_points: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Aggregated history at the coarsest resolution that fits ``hours``
+        in ``max_points`` buckets; each row holds count/sum/avg/min/max/p50/p95"""
+        return self.rollups.query(metrics, start=time.time() - hours * 3600, max_points=max_points)
     
     def get_performance_summary(self, hours: int = 1) -> Dict[str, Any]:
         """Get performance summary for specified period"""
-        history = self.get_metrics_history(hours)
-        
-        if not history:
+        now = time.time()
+        start = now - hours * 3600
+        oldest = self.metrics_history.oldest_timestamp()
+        if oldest is None:
             return {}
         
-        # Calculate averages and peaks
-        cpu_values = [m.get('cpu_percent', 0) for m in history]
-        memory_values = [m.get('memory_percent', 0) for m in history]
+        if oldest <= start or len(self.metrics_history) < self.metrics_history.capacity:
+            # The ring buffer holds the whole window: exact vectorized stats
+            cpu_stats = self.metrics_history.aggregate('cpu_percent', start)
+            memory_stats = self.metrics_history.aggregate('memory_percent', start)
+            data_points = cpu_stats.pop('count')
+            memory_stats.pop('count')
+        else:
+            # Older than the buffer: fall back to the rollups
+            cpu, memory = (self.rollups.summary(name, start, now) for name in ('cpu_percent', 'memory_percent'))
+            data_points = cpu['count']
+            cpu_stats, memory_stats = ({'average': m['avg'], 'peak': m['max'], 'minimum': m['min'],
+                                        'p50': m['p50'], 'p95': m['p95']} for m in (cpu, memory))
         
+        if not data_points:
+            return {}
+        
+        oldest = max(start, oldest)
         summary = {
             'period_hours': hours,
-            'data_points': len(history),
-            'cpu_stats': {
-                'average': sum(cpu_values) / len(cpu_values) if cpu_values else 0,
-                'peak': max(cpu_values) if cpu_values else 0,
-                'minimum': min(cpu_values) if cpu_values else 0
-            },
-            'memory_stats': {
-                'average': sum(memory_values) / len(memory_values) if memory_values else 0,
-                'peak': max(memory_values) if memory_values else 0,
-                'minimum': min(memory_values) if memory_values else 0
-            },
+            'data_points': data_points,
+            'cpu_stats': cpu_stats,
+            'memory_stats': memory_stats,
             'alerts_count': len([a for a in self.alerts 
-                               if a['timestamp'] > time.time() - (hours * 3600)]),
-            'uptime_hours': (time.time() - min(m['timestamp'] for m in history)) / 3600 if history else 0
+                               if a['timestamp'] > now - (hours * 3600)]),
+            'uptime_hours': (now - oldest) / 3600
         }
         
         return summary
@@ -456,7 +576,10 @@ class MonitoringManager:
             'monitoring_enabled': self.monitoring_enabled,
             'collection_running': self.running,
             'collection_interval_seconds': self.collection_interval,
+            'collector': self.get_collector_stats(),
             'metrics_history_size': len(self.metrics_history),
+            'metrics_history_bytes': self.metrics_history.memory_bytes,
+            'rollups': self.rollups.get_stats(),
             'alerts_count': len(self.alerts),
             'last_collection_time': self.last_collection_time,
             'health_score': self.get_health_score()['score'],
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+ultimate_agent/monitoring/metrics/history.py
+Columnar ring buffer for recent metrics samples
+"""
+
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+# Column name (dotted path into a collected metrics dict) -> dtype.
+# Percentages and sizes fit float32; byte counters need float64.
+DEFAULT_COLUMNS = {
+    'cpu_percent': np.float32,
+    'memory_percent': np.float32,
+    'memory_available_mb': np.float32,
+    'memory_used_mb': np.float32,
+    'disk_usage_percent': np.float32,
+    'disk_free_gb': np.float32,
+    'network_io.bytes_sent': np.float64,
+    'network_io.bytes_recv': np.float64,
+    'process.cpu_percent': np.float32,
+    'process.memory_mb': np.float32,
+    'process.threads': np.float32,
+    'gpu.gpu_percent': np.float32,
+    'gpu.temperature': np.float32,
+    'tasks_running': np.float32,
+    'efficiency_score': np.float32
+}
+
+
+def _lookup(metrics: Dict[str, Any], path: str) -> float:
+    value: Any = metrics
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return np.nan
+        value = value.get(part)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class MetricsHistory:
+    """Fixed-capacity, column-per-metric ring buffer.
+
+    Each sample costs 8 bytes of timestamp plus 4 or 8 bytes per column
+    (about 70 bytes with the default columns, against several KB for a
+    nested dict), so a week at 10 second resolution fits in under 5 MB.
+    Samples are appended in time order, so the two halves of the ring are
+    each sorted and a time window is found with ``searchsorted``;
+    aggregates run over the window's array slices. Missing values are
+    stored as NaN and ignored by the aggregates.
+    """
+
+    def __init__(self, capacity: int = 7 * 24 * 360, columns: Optional[Dict[str, Any]] = None):
+        self.capacity = int(capacity)
+        self.columns = dict(columns or DEFAULT_COLUMNS)
+        self.timestamps = np.zeros(self.capacity, dtype=np.float64)
+        self.data = {name: np.full(self.capacity, np.nan, dtype=dtype) for name, dtype in self.columns.items()}
+        self._head = 0  # next write position
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def memory_bytes(self) -> int:
+        return self.timestamps.nbytes + sum(column.nbytes for column in self.data.values())
+
+    def append(self, metrics: Dict[str, Any], timestamp: Optional[float] = None):
+        timestamp = metrics.get('timestamp') if timestamp is None else timestamp
+        with self._lock:
+            i = self._head
+            self.timestamps[i] = timestamp
+            for name, column in self.data.items():
+                column[i] = _lookup(metrics, name)
+            self._head = (i + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def clear(self):
+        with self._lock:
+            self._head = 0
+            self._size = 0
+
+    def _segments(self) -> List[Tuple[int, int]]:
+        """Physical index ranges holding samples, oldest first"""
+        if self._size < self.capacity:
+            return [(0, self._size)]
+        return [(self._head, self.capacity), (0, self._head)]
+
+    def _window_ranges(self, start: Optional[float], end: Optional[float]) -> List[Tuple[int, int]]:
+        ranges = []
+        for lo, hi in self._segments():
+            times = self.timestamps[lo:hi]
+            a = lo + (int(np.searchsorted(times, start, side='right')) if start is not None else 0)
+            b = lo + (int(np.searchsorted(times, end, side='right')) if end is not None else hi - lo)
+            if b > a:
+                ranges.append((a, b))
+        return ranges
+
+    def _gather(self, array: np.ndarray, ranges: List[Tuple[int, int]]) -> np.ndarray:
+        if len(ranges) == 1:
+            a, b = ranges[0]
+            return array[a:b]  # view
+        if not ranges:
+            return array[:0]
+        return np.concatenate([array[a:b] for a, b in ranges])
+
+    def window(self, start: Optional[float] = None, end: Optional[float] = None,
+               columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """Arrays for samples with ``start < timestamp <= end``, oldest first.
+
+        Unless the window wraps around the ring these are views, valid until
+        the buffer overwrites them.
+        """
+        with self._lock:
+            ranges = self._window_ranges(start, end)
+            result = {'timestamp': self._gather(self.timestamps, ranges)}
+            for name in columns or self.data:
+                result[name] = self._gather(self.data[name], ranges)
+        return result
+
+    def count(self, start: Optional[float] = None, end: Optional[float] = None) -> int:
+        with self._lock:
+            return sum(b - a for a, b in self._window_ranges(start, end))
+
+    def oldest_timestamp(self) -> Optional[float]:
+        with self._lock:
+            if not self._size:
+                return None
+            return float(self.timestamps[self._segments()[0][0]])
+
+    def aggregate(self, column: str, start: Optional[float] = None, end: Optional[float] = None,
+                  percentiles: Tuple[float, ...] = (50, 95)) -> Dict[str, float]:
+        with self._lock:
+            values = self._gather(self.data[column], self._window_ranges(start, end))
+            values = values[~np.isnan(values)]  # a copy, safe from later appends
+        if not len(values):
+            return {'count': 0, 'average': 0.0, 'peak': 0.0, 'minimum': 0.0,
+                    **{f'p{int(p)}': 0.0 for p in percentiles}}
+        quantiles = np.percentile(values, percentiles)
+        return {
+            'count': int(len(values)),
+            'average': float(values.mean(dtype=np.float64)),
+            'peak': float(values.max()),
+            'minimum': float(values.min()),
+            **{f'p{int(p)}': float(q) for p, q in zip(percentiles, quantiles)}
+        }
+
+    def to_records(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Samples in the window as nested dicts shaped like collected metrics"""
+        window = self.window(start, end)
+        timestamps = window.pop('timestamp').tolist()
+        columns = [(name.split('.'), values.tolist()) for name, values in window.items()]
+        records = []
+        for i, timestamp in enumerate(timestamps):
+            record: Dict[str, Any] = {'timestamp': timestamp,
+                                      'datetime': datetime.fromtimestamp(timestamp).isoformat()}
+            for path, values in columns:
+                value = values[i]
+                if value != value:  # NaN: not collected
+                    continue
+                target = record
+                for part in path[:-1]:
+                    target = target.setdefault(part, {})
+                target[path[-1]] = value
+            records.append(record)
+        return records
+
+
+__all__ = ['MetricsHistory', 'DEFAULT_COLUMNS']
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+ultimate_agent/monitoring/metrics/rollups.py
+Downsampled time-series rollups with per-tier retention
+"""
+
+import math
+import threading
+import time
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with bounded relative error.
+
+    Values are counted in logarithmic bins of ratio ``gamma``, so any
+    quantile is estimated within ``relative_accuracy`` of the true value
+    (DDSketch). Two sketches merge by adding bin counts, which lets a day
+    bucket be answered from its hours without the raw samples.
+    """
+
+    __slots__ = ('relative_accuracy', 'gamma', '_log_gamma', 'bins', 'negative', 'zero', 'count')
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+
+    def _key(self, value: float) -> int:
+        return int(math.ceil(math.log(value) / self._log_gamma))
+
+    def _value(self, key: int) -> float:
+        return 2.0 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        self.count += count
+        if value > 1e-12:
+            key = self._key(value)
+            self.bins[key] = self.bins.get(key, 0) + count
+        elif value < -1e-12:
+            key = self._key(-value)
+            self.negative[key] = self.negative.get(key, 0) + count
+        else:
+            self.zero += count
+
+    def merge(self, other: 'QuantileSketch'):
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        for key, count in other.negative.items():
+            self.negative[key] = self.negative.get(key, 0) + count
+        self.zero += other.zero
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.bins)) if self.bins else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'b': self.bins, 'n': self.negative, 'z': self.zero}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], relative_accuracy: float = 0.01) -> 'QuantileSketch':
+        sketch = cls(relative_accuracy)
+        sketch.bins = {int(k): int(v) for k, v in data.get('b', {}).items()}
+        sketch.negative = {int(k): int(v) for k, v in data.get('n', {}).items()}
+        sketch.zero = int(data.get('z', 0))
+        sketch.count = sketch.zero + sum(sketch.bins.values()) + sum(sketch.negative.values())
+        return sketch
+
+
+class RollupBucket:
+    """count / sum / min / max and a quantile sketch for one interval"""
+
+    __slots__ = ('count', 'total', 'minimum', 'maximum', 'sketch')
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+        self.sketch.add(value)
+
+    def merge(self, other: 'RollupBucket'):
+        self.count += other.count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.sketch.merge(other.sketch)
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any], relative_accuracy: float = 0.01) -> 'RollupBucket':
+        """Bucket from a stored row (see ``RollupStore.drain_dirty``)"""
+        bucket = cls(relative_accuracy)
+        bucket.count = row['count']
+        bucket.total = row['total']
+        bucket.minimum = row['minimum']
+        bucket.maximum = row['maximum']
+        bucket.sketch = QuantileSketch.from_dict(row['sketch'] or {}, relative_accuracy)
+        return bucket
+
+    def summary(self) -> Dict[str, float]:
+        if not self.count:
+            return {'count': 0, 'sum': 0.0, 'avg': 0.0, 'min': 0.0, 'max': 0.0, 'p50': 0.0, 'p95': 0.0}
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'avg': self.total / self.count,
+            'min': self.minimum,
+            'max': self.maximum,
+            'p50': self.sketch.quantile(0.5),
+            'p95': self.sketch.quantile(0.95)
+        }
+
+
+# (resolution seconds, retention seconds)
+DEFAULT_TIERS = (
+    (60, 2 * 86400),          # 1 minute buckets for 2 days
+    (3600, 90 * 86400),       # 1 hour buckets for 90 days
+    (86400, 730 * 86400)      # 1 day buckets for 2 years
+)
+
+
+class RollupStore:
+    """Tiered time-series aggregates maintained incrementally on insert.
+
+    Every sample updates one bucket per tier, so the cost of an insert does
+    not depend on how much history is kept. Queries read the finest tier
+    that still answers the window in at most ``max_points`` buckets, so a
+    week is served from ~170 hourly rows rather than every raw sample.
+    Buckets older than their tier's retention are dropped as time moves on.
+    """
+
+    def __init__(self, tiers: Iterable[Tuple[int, int]] = DEFAULT_TIERS,
+                 relative_accuracy: float = 0.01, max_points: int = 1500):
+        self.tiers = sorted((int(resolution), int(retention)) for resolution, retention in tiers)
+        self.relative_accuracy = relative_accuracy
+        self.max_points = max_points
+        # Per tier: bucket start -> metric -> bucket
+        self._buckets: List[Dict[int, Dict[str, RollupBucket]]] = [{} for _ in self.tiers]
+        self._dirty: set = set()
+        self._lock = threading.Lock()
+        self.samples = 0
+
+    def add(self, values: Dict[str, Any], timestamp: Optional[float] = None):
+        """Record one sample of every numeric entry in ``values``"""
+        timestamp = time.time() if timestamp is None else timestamp
+        numeric = [(name, float(value)) for name, value in values.items()
+                   if isinstance(value, (int, float)) and not isinstance(value, bool)]
+        if not numeric:
+            return
+        with self._lock:
+            self.samples += 1
+            for tier, ((resolution, retention), buckets) in enumerate(zip(self.tiers, self._buckets)):
+                start = int(timestamp // resolution * resolution)
+                bucket_metrics = buckets.get(start)
+                if bucket_metrics is None:
+                    bucket_metrics = buckets[start] = {}
+                    self._expire(tier, timestamp - retention)
+                for name, value in numeric:
+                    bucket = bucket_metrics.get(name)
+                    if bucket is None:
+                        bucket = bucket_metrics[name] = RollupBucket(self.relative_accuracy)
+                    bucket.add(value)
+                self._dirty.add((tier, start))
+
+    def _expire(self, tier: int, cutoff: float):
+        buckets = self._buckets[tier]
+        # Buckets are created in time order, so expired ones are at the front
+        while buckets:
+            oldest = next(iter(buckets))
+            if oldest + self.tiers[tier][0] > cutoff:
+                break
+            del buckets[oldest]
+            self._dirty.discard((tier, oldest))
+
+    def select_tier(self, start: float, end: float, max_points: Optional[int] = None) -> int:
+        """Finest tier that covers ``start`` and needs at most ``max_points``
+        buckets; the coarsest tier if none does"""
+        max_points = max_points or self.max_points
+        now = time.time()
+        for tier, (resolution, retention) in enumerate(self.tiers):
+            if start >= now - retention and (end - start) / resolution <= max_points:
+                return tier
+        return len(self.tiers) - 1
+
+    def query(self, metrics: Optional[Iterable[str]] = None, start: Optional[float] = None,
+              end: Optional[float] = None, max_points: Optional[int] = None,
+              tier: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Bucket rows in time order: {'timestamp', 'resolution', metric: summary}"""
+        end = time.time() if end is None else end
+        start = end - 3600 if start is None else start
+        tier = self.select_tier(start, end, max_points) if tier is None else tier
+        resolution = self.tiers[tier][0]
+        wanted = set(metrics) if metrics is not None else None
+        first = start // resolution * resolution
+        with self._lock:
+            rows = []
+            for bucket_start in sorted(self._buckets[tier]):
+                if bucket_start < first or bucket_start > end:
+                    continue
+                row = {'timestamp': bucket_start, 'resolution': resolution}
+                for name, bucket in self._buckets[tier][bucket_start].items():
+                    if wanted is None or name in wanted:
+                        row[name] = bucket.summary()
+                rows.append(row)
+        return rows
+
+    def summary(self, metric: str, start: Optional[float] = None, end: Optional[float] = None,
+                max_points: Optional[int] = None) -> Dict[str, float]:
+        """One aggregate for ``metric`` over the window, merged from buckets"""
+        end = time.time() if end is None else end
+        start = end - 3600 if start is None else start
+        tier = self.select_tier(start, end, max_points)
+        resolution = self.tiers[tier][0]
+        first = start // resolution * resolution
+        merged = RollupBucket(self.relative_accuracy)
+        with self._lock:
+            for bucket_start, bucket_metrics in self._buckets[tier].items():
+                bucket = bucket_metrics.get(metric)
+                if bucket is not None and first <= bucket_start <= end:
+                    merged.merge(bucket)
+        return merged.summary()
+
+    # Persistence
+
+    def drain_dirty(self) -> List[Dict[str, Any]]:
+        """Buckets changed since the last call, as storable rows"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            rows = []
+            for tier, bucket_start in dirty:
+                resolution = self.tiers[tier][0]
+                for name, bucket in self._buckets[tier].get(bucket_start, {}).items():
+                    rows.append({
+                        'resolution': resolution,
+                        'bucket_start': bucket_start,
+                        'metric': name,
+                        'count': bucket.count,
+                        'total': bucket.total,
+                        'minimum': bucket.minimum,
+                        'maximum': bucket.maximum,
+                        'sketch': bucket.sketch.to_dict()
+                    })
+        return rows
+
+    def mark_dirty(self, rows: Iterable[Dict[str, Any]]):
+        """Queue rows from ``drain_dirty`` again, e.g. after a failed write"""
+        resolutions = {resolution: tier for tier, (resolution, _) in enumerate(self.tiers)}
+        with self._lock:
+            for row in rows:
+                tier = resolutions.get(row['resolution'])
+                if tier is not None and row['bucket_start'] in self._buckets[tier]:
+                    self._dirty.add((tier, row['bucket_start']))
+
+    def load_rows(self, rows: Iterable[Dict[str, Any]]):
+        """Restore buckets previously returned by ``drain_dirty``"""
+        resolutions = {resolution: tier for tier, (resolution, _) in enumerate(self.tiers)}
+        now = time.time()
+        with self._lock:
+            for row in sorted(rows, key=lambda r: r['bucket_start']):
+                tier = resolutions.get(row['resolution'])
+                if tier is None or row['bucket_start'] < now - self.tiers[tier][1]:
+                    continue
+                bucket = RollupBucket.from_row(row, self.relative_accuracy)
+                self._buckets[tier].setdefault(row['bucket_start'], {})[row['metric']] = bucket
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'samples': self.samples,
+                'tiers': [
+                    {'resolution': resolution, 'retention': retention, 'buckets': len(buckets)}
+                    for (resolution, retention), buckets in zip(self.tiers, self._buckets)
+                ]
+            }
+
+
+__all__ = ['QuantileSketch', 'RollupBucket', 'RollupStore', 'DEFAULT_TIERS']
@@ -71,7 +71,7 @@ class NodeAuthenticator:
         return hmac.compare_digest(expected, signature)
 
 
-
+class NATTraversalManager:
     """Placeholder NAT traversal helper returning an unknown NAT type."""
 
     def __init__(self) -> None:
@@ -87,9 +87,14 @@ class NodeAuthenticator:
 class AdvancedNetworkManager:
     """Asynchronous TCP network manager with minimal security features."""
 
-    def __init__(self, node_id: str, listen_port: int = 0, secret: bytes | None = None):
+    def __init__(self, node_id: str, listen_port: int = 0, secret: bytes | None = None,
+                 host: str = "0.0.0.0", max_frame_size: int = 64 * 1024 * 1024):
+        if len(node_id.encode()) > 0xFFFF:
+            raise ValueError("node_id must encode to at most 65535 bytes")
         self.node_id = node_id
         self.listen_port = listen_port
+        self.host = host
+        self.max_frame_size = max_frame_size
         self.secret = secret or secrets.token_bytes(32)
 
         self.auth = NodeAuthenticator(self.secret)
@@ -107,7 +112,7 @@ class AdvancedNetworkManager:
     async def start(self) -> int:
         if self.running:
             return self.listen_port
-        self.server = await asyncio.start_server(self._handle_client, "0.0.0.0", self.listen_port)
+        self.server = await asyncio.start_server(self._handle_client, self.host, self.listen_port)
         if self.listen_port == 0:
             self.listen_port = self.server.sockets[0].getsockname()[1]
         self.running = True
@@ -134,27 +139,36 @@ class AdvancedNetworkManager:
     async def connect(self, node_id: str, host: str, port: int) -> bool:
         if node_id in self.connections:
             return True
+        return await self.connect_address(host, port) is not None
+
+    async def connect_address(self, host: str, port: int) -> Optional[str]:
+        """Connect and authenticate; returns the node id the peer announced"""
         try:
             reader, writer = await asyncio.open_connection(host, port)
             await self._send_auth(writer)
             ok = await self._receive_auth(reader)
-            if not ok:
+            if ok:
+                await self._send_hello(writer)
+                node_id = await self._receive_hello(reader)
+            if not ok or not node_id:
                 writer.close()
                 await writer.wait_closed()
-                return False
+                return None
+            if node_id in self.connections:
+                # Already connected (e.g. the peer dialed us first); keep that one
+                writer.close()
+                return node_id
             self.connections[node_id] = {
                 "reader": reader,
                 "writer": writer,
                 "state": ConnectionState.AUTHENTICATED,
             }
             asyncio.create_task(self._reader_loop(node_id, reader))
-            return True
+            return node_id
         except Exception:
-            return False
+            return None
 
-    async def send(self, node_id: str, msg_type: str, payload: bytes) -> bool:
-        if node_id not in self.connections:
-            return False
+    def _frame(self, node_id: str, msg_type: str, payload: bytes) -> bytes:
         msg = NetworkMessage(
             message_id=os.urandom(8).hex(),
             sender_id=self.node_id,
@@ -163,16 +177,24 @@ class AdvancedNetworkManager:
             payload=payload,
         )
         data = msg.serialize()
+        return len(data).to_bytes(4, "big") + data
+
+    async def send(self, node_id: str, msg_type: str, payload: bytes) -> bool:
+        return await self.send_many(node_id, msg_type, [payload])
+
+    async def send_many(self, node_id: str, msg_type: str, payloads) -> bool:
+        """Write several messages with one syscall batch and a single drain"""
+        if node_id not in self.connections:
+            return False
         writer = self.connections[node_id]["writer"]
         try:
-            writer.write(len(data).to_bytes(4, "big") + data)
+            writer.writelines([self._frame(node_id, msg_type, payload) for payload in payloads])
             await writer.drain()
-            self.metrics["sent"] += 1
+            self.metrics["sent"] += len(payloads)
             return True
         except Exception:
             return False
 
-
     async def disconnect(self, node_id: str) -> None:
         """Disconnect from a peer and close the connection."""
         info = self.connections.pop(node_id, None)
@@ -187,12 +209,21 @@ class AdvancedNetworkManager:
 
     async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
         peer = writer.get_extra_info("peername")
-        if not await self._receive_auth(reader):
+        try:
+            if not await self._receive_auth(reader):
+                writer.close()
+                await writer.wait_closed()
+                return
+            await self._send_auth(writer)
+            node_id = await self._receive_hello(reader) or f"{peer[0]}:{peer[1]}"
+            await self._send_hello(writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
             writer.close()
-            await writer.wait_closed()
             return
-        await self._send_auth(writer)
-        node_id = f"{peer[0]}:{peer[1]}"
+        if node_id in self.connections:
+            # Simultaneous dial: keep the existing connection for sending
+            await self._reader_loop(node_id, reader, owned=False, writer=writer)
+            return
         self.connections[node_id] = {
             "reader": reader,
             "writer": writer,
@@ -214,11 +245,23 @@ class AdvancedNetworkManager:
         sig = sig.strip().decode()
         return self.auth.verify(nonce, sig)
 
-    async def _reader_loop(self, node_id: str, reader: asyncio.StreamReader):
+    async def _send_hello(self, writer: asyncio.StreamWriter):
+        node_id = self.node_id.encode()
+        writer.write(len(node_id).to_bytes(2, "big") + node_id)
+        await writer.drain()
+
+    async def _receive_hello(self, reader: asyncio.StreamReader) -> str:
+        size_data = await reader.readexactly(2)
+        return (await reader.readexactly(int.from_bytes(size_data, "big"))).decode()
+
+    async def _reader_loop(self, node_id: str, reader: asyncio.StreamReader,
+                           owned: bool = True, writer: Optional[asyncio.StreamWriter] = None):
         try:
             while True:
                 size_data = await reader.readexactly(4)
                 size = int.from_bytes(size_data, "big")
+                if size > self.max_frame_size:
+                    raise ValueError(f"Frame of {size} bytes from {node_id} exceeds limit")
                 data = await reader.readexactly(size)
                 message = NetworkMessage.deserialize(data)
                 self.metrics["received"] += 1
@@ -232,12 +275,16 @@ class AdvancedNetworkManager:
         except Exception:
             pass
         finally:
-            if node_id in self.connections:
-
-
-                self.connections[node_id]["writer"].close()
-                await self.connections[node_id]["writer"].wait_closed()
-                del self.connections[node_id]
+            if not owned:
+                if writer is not None:
+                    writer.close()
+            elif self.connections.get(node_id, {}).get("reader") is reader:
+                info = self.connections.pop(node_id)
+                info["writer"].close()
+                try:
+                    await info["writer"].wait_closed()
+                except Exception:
+                    pass
 
 
 
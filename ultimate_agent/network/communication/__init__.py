@@ -13,6 +13,16 @@ import threading
 from typing import Dict, Any, Optional
 import ssl
 import json
+from urllib.parse import urlsplit
+
+from ...monitoring.metrics.registry import REGISTRY
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    'agent_http_request_seconds', 'Latency of outgoing HTTP requests per endpoint', ['method', 'endpoint']
+)
+REQUESTS = REGISTRY.counter(
+    'agent_http_requests_total', 'Outgoing HTTP requests per endpoint and outcome', ['method', 'endpoint', 'outcome']
+)
 
 
 class NetworkManager:
@@ -232,6 +242,14 @@ class NetworkManager:
     
     def _make_request(self, method: str, url: str, **kwargs) -> Optional[Dict[str, Any]]:
         """Make HTTP request with error handling and stats tracking"""
+        start = time.perf_counter()
+        result = self._send_request(method, url, **kwargs)
+        endpoint = urlsplit(url).path or '/'
+        REQUEST_LATENCY.labels(method, endpoint).observe(time.perf_counter() - start)
+        REQUESTS.labels(method, endpoint, 'ok' if result is not None else 'error').inc()
+        return result
+    
+    def _send_request(self, method: str, url: str, **kwargs) -> Optional[Dict[str, Any]]:
         try:
             # Calculate request size for stats
             request_data = kwargs.get('json', {})
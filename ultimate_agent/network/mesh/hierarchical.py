@@ -2,8 +2,12 @@
 
 from __future__ import annotations
 
+import asyncio
+import math
+import time
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Dict, List
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 
 @dataclass
@@ -26,12 +30,39 @@ class MeshCluster:
             self.leader = node
 
 
+@dataclass
+class BroadcastTree:
+    """Dissemination tree rooted at the broadcast source."""
+
+    root: str
+    children: Dict[str, List[str]]
+    parent: Dict[str, str]
+
+    def levels(self) -> List[List[str]]:
+        """Nodes grouped by hop distance from the root."""
+        levels, frontier = [], [self.root]
+        while frontier:
+            levels.append(frontier)
+            frontier = [c for node in frontier for c in self.children.get(node, [])]
+        return levels
+
+    @property
+    def depth(self) -> int:
+        return len(self.levels()) - 1
+
+    def edges(self) -> List[Tuple[str, str]]:
+        return [(p, c) for p, kids in self.children.items() for c in kids]
+
+
 class HierarchicalMeshNetwork:
     """Coordinate nodes in a hierarchical mesh."""
 
     def __init__(self) -> None:
         self.nodes: Dict[str, MeshNode] = {}
         self.clusters: Dict[str, MeshCluster] = {}
+        # Both depend only on membership and leaders; cleared when those change
+        self._routes: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+        self._trees: Dict[str, BroadcastTree] = {}
 
     def add_node(self, node_id: str, cluster_id: str,
                  bandwidth_mbps: float = 100.0, *, is_leader: bool = False) -> None:
@@ -41,15 +72,29 @@ class HierarchicalMeshNetwork:
         if is_leader:
             cluster.leader = node
         self.nodes[node_id] = node
+        self.invalidate_routes()
 
     def rebalance_leaders(self) -> None:
         """Choose the highest-bandwidth node as leader in each cluster."""
         for cluster in self.clusters.values():
             best = max(cluster.nodes.values(), key=lambda n: n.bandwidth_mbps)
+            for node in cluster.nodes.values():
+                node.is_leader = node is best
             cluster.leader = best
-            best.is_leader = True
+        self.invalidate_routes()
+
+    def invalidate_routes(self) -> None:
+        self._routes.clear()
+        self._trees.clear()
 
     def route_path(self, src_id: str, dst_id: str) -> List[str]:
+        key = (src_id, dst_id)
+        path = self._routes.get(key)
+        if path is None:
+            path = self._routes[key] = tuple(self._compute_route(src_id, dst_id))
+        return list(path)
+
+    def _compute_route(self, src_id: str, dst_id: str) -> List[str]:
         src = self.nodes[src_id]
         dst = self.nodes[dst_id]
         if src.cluster_id == dst.cluster_id:
@@ -77,11 +122,156 @@ class HierarchicalMeshNetwork:
             total += size_mb / (bw or 1.0)
         return total
 
-    def broadcast(self, src_id: str, size_mb: float, optimize: bool = False) -> float:
+    # Broadcast planning
+
+    def _bandwidth(self, node_id: str) -> float:
+        return self.nodes[node_id].bandwidth_mbps or 1.0
+
+    def broadcast_tree(self, src_id: str) -> BroadcastTree:
+        """Bandwidth-weighted spanning tree for a broadcast from ``src_id``.
+
+        The source hands the payload to its cluster leader, leaders form a
+        tree among themselves and each leader roots a tree over its own
+        cluster. Nodes are attached in order of bandwidth, each to the
+        parent where it would receive the payload earliest; a parent's
+        uplink is shared by all its children, so fast nodes become interior
+        forwarders and slow ones end up as leaves.
+        """
+        tree = self._trees.get(src_id)
+        if tree is None:
+            tree = self._trees[src_id] = self._build_broadcast_tree(src_id)
+        return tree
+
+    def _build_broadcast_tree(self, src_id: str) -> BroadcastTree:
+        children: Dict[str, List[str]] = {node_id: [] for node_id in self.nodes}
+        parent: Dict[str, str] = {}
+        # Time (per MB) at which each attached node holds the whole payload
+        ready: Dict[str, float] = {src_id: 0.0}
+
+        def attach(node_id: str, candidates: List[str]) -> None:
+            def arrival(p: str) -> float:
+                rate = min(self._bandwidth(p) / (len(children[p]) + 1), self._bandwidth(node_id))
+                return ready[p] + 1.0 / rate
+            best = min(candidates, key=arrival)
+            ready[node_id] = arrival(best)
+            children[best].append(node_id)
+            parent[node_id] = best
+            candidates.append(node_id)
+
+        src_cluster = self.nodes[src_id].cluster_id
+        src_leader = self.clusters[src_cluster].leader.node_id
+        if src_leader != src_id:
+            attach(src_leader, [src_id])
+
+        by_bandwidth = lambda ids: sorted(ids, key=lambda n: (-self._bandwidth(n), n))
+        leaders = [src_leader]
+        for leader in by_bandwidth(c.leader.node_id for c in self.clusters.values()
+                                   if c.leader is not None and c.cluster_id != src_cluster):
+            attach(leader, leaders)
+
+        for cluster in self.clusters.values():
+            root = cluster.leader.node_id
+            members = [root]
+            for node_id in by_bandwidth(cluster.nodes):
+                if node_id not in ready:
+                    attach(node_id, members)
+
+        return BroadcastTree(src_id, {p: kids for p, kids in children.items() if kids}, parent)
+
+    def estimate_broadcast_time(self, src_id: str, size_mb: float, optimize: bool = False,
+                                chunk_mb: Optional[float] = None) -> float:
+        """Completion time of a broadcast along ``broadcast_tree``.
+
+        Every node forwards to its children in parallel, splitting its
+        bandwidth between them. Without ``chunk_mb`` each hop waits for the
+        whole payload; with it, chunks are forwarded as they arrive and a
+        node finishes one chunk-hop per level plus the rest of the payload
+        at the slowest rate on its path.
+        """
+        if optimize and size_mb >= 100:
+            size_mb *= 0.5  # pretend compression for large transfers
+        chunk = min(chunk_mb, size_mb) if chunk_mb else size_mb
+        tree = self.broadcast_tree(src_id)
+
+        first = {src_id: 0.0}
+        bottleneck = {src_id: math.inf}
+        finish = 0.0
+        queue = deque([src_id])
+        while queue:
+            node_id = queue.popleft()
+            kids = tree.children.get(node_id, [])
+            for child in kids:
+                rate = min(self._bandwidth(node_id) / len(kids), self._bandwidth(child))
+                first[child] = first[node_id] + chunk / rate
+                bottleneck[child] = min(bottleneck[node_id], rate)
+                finish = max(finish, first[child] + (size_mb - chunk) / bottleneck[child])
+                queue.append(child)
+        return finish
+
+    def unicast_broadcast_time(self, src_id: str, size_mb: float, optimize: bool = False) -> float:
+        """Time to send the payload to every node one unicast after another."""
+        return sum(self.estimate_transfer_time(src_id, dst_id, size_mb, optimize=optimize)
+                   for dst_id in self.nodes if dst_id != src_id)
+
+    def broadcast(self, src_id: str, size_mb: float, optimize: bool = False,
+                  chunk_mb: Optional[float] = None) -> float:
         """Broadcast a payload to all other nodes, returning total estimated time."""
-        total = 0.0
-        for dst_id in self.nodes:
-            if dst_id == src_id:
-                continue
-            total += self.estimate_transfer_time(src_id, dst_id, size_mb, optimize=optimize)
-        return total
+        return self.estimate_broadcast_time(src_id, size_mb, optimize=optimize, chunk_mb=chunk_mb)
+
+    # Distribution
+
+    async def distribute(self, src_id: str, payload: Any,
+                         send: Callable[[str, str, int, memoryview], Awaitable[Any]],
+                         chunk_mb: float = 4.0) -> Dict[str, Any]:
+        """Push ``payload`` (model weights, an update, any bytes-like or
+        numpy array) from ``src_id`` to every node along the broadcast tree.
+
+        ``send(sender, receiver, chunk_index, chunk)`` performs one hop.
+        Each node forwards chunk ``i`` to its children as soon as it has it,
+        while still receiving chunk ``i + 1``, so the push completes in about
+        tree-depth chunk hops plus one payload transfer rather than one
+        transfer per node. Chunks are views of ``payload``; nothing is copied.
+        """
+        if hasattr(payload, "reshape") and hasattr(payload, "view"):
+            # numpy array: its raw bytes
+            import numpy as np
+            payload = np.ascontiguousarray(payload).reshape(-1).view(np.uint8)
+        data = memoryview(payload).cast("B")
+        chunk_size = max(1, int(chunk_mb * 1024 * 1024))
+        chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+        tree = self.broadcast_tree(src_id)
+
+        inboxes: Dict[Tuple[str, str], asyncio.Queue] = {edge: asyncio.Queue() for edge in tree.edges()}
+
+        def received(node_id: str, index: int) -> None:
+            for child in tree.children.get(node_id, []):
+                inboxes[(node_id, child)].put_nowait(index)
+
+        async def forward(sender: str, receiver: str) -> None:
+            inbox = inboxes[(sender, receiver)]
+            for _ in chunks:
+                index = await inbox.get()
+                await send(sender, receiver, index, chunks[index])
+                received(receiver, index)
+
+        start = time.perf_counter()
+        for index in range(len(chunks)):
+            received(src_id, index)
+        tasks = [asyncio.ensure_future(forward(p, c)) for p, c in tree.edges()]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # A failed hop starves everything below it; don't leave those
+            # forwarders waiting on their inboxes forever
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return {
+            'nodes': len(tree.parent),
+            'chunks': len(chunks),
+            'bytes': len(data),
+            'hops': len(chunks) * len(tree.parent),
+            'depth': tree.depth,
+            'elapsed': time.perf_counter() - start
+        }
@@ -1,4 +1,3 @@
-# File 1: ultimate_agent/network/p2p/__init__.py
 """
 ultimate_agent/network/p2p/__init__.py
 P2P networking module for distributed AI inference
@@ -10,8 +9,10 @@ from .distributed_ai import (
     NodeType,
     MessageType,
     InferenceTask,
-    NodeCapability
+    NodeCapability,
+    P2PMessage
 )
+from .transport import P2PTransport, SimulatedTransport, TCPTransport
 
 __all__ = [
     'P2PNetworkManager',
@@ -19,650 +20,9 @@ __all__ = [
     'NodeType',
     'MessageType',
     'InferenceTask',
-    'NodeCapability'
+    'NodeCapability',
+    'P2PMessage',
+    'P2PTransport',
+    'SimulatedTransport',
+    'TCPTransport'
 ]
-
-# File 2: ultimate_agent/network/p2p/integration.py
-"""
-Integration layer for P2P networking with existing Ultimate Agent
-"""
-
-import asyncio
-import time
-from typing import Dict, Any, List, Optional
-from ...config.config_settings import ConfigManager
-from .distributed_ai import P2PDistributedAIIntegration
-
-
-class P2PNetworkIntegration:
-    """Integrates P2P networking with existing Ultimate Agent"""
-    
-    def __init__(self, agent):
-        self.agent = agent
-        self.config = agent.config_manager
-        self.p2p_integration = None
-        self.running = False
-        
-        # P2P configuration
-        self.p2p_enabled = self.config.getboolean('P2P', 'enabled', fallback=True)
-        self.bootstrap_nodes = self._get_bootstrap_nodes()
-        self.p2p_port = self.config.getint('P2P', 'port', fallback=4001)
-        
-        print("🌐 P2P Network Integration initialized")
-    
-    def _get_bootstrap_nodes(self) -> List[str]:
-        """Get bootstrap nodes from configuration"""
-        bootstrap_str = self.config.get('P2P', 'bootstrap_nodes', fallback='')
-        if bootstrap_str:
-            return [node.strip() for node in bootstrap_str.split(',')]
-        return []
-    
-    async def start_p2p_network(self):
-        """Start P2P network integration"""
-        if not self.p2p_enabled or self.running:
-            return
-        
-        try:
-            # Create P2P integration
-            self.p2p_integration = P2PDistributedAIIntegration(
-                self.agent.config_manager,
-                self.agent.ai_manager,
-                self.agent.blockchain_manager
-            )
-            
-            # Start P2P network
-            await self.p2p_integration.start_p2p_network(self.bootstrap_nodes)
-            
-            # Integrate with task scheduler
-            self._integrate_with_task_scheduler()
-            
-            self.running = True
-            print("🚀 P2P Network started successfully")
-            
-            return True
-            
-        except Exception as e:
-            print(f"❌ Failed to start P2P network: {e}")
-            return False
-    
-    async def stop_p2p_network(self):
-        """Stop P2P network"""
-        if not self.running:
-            return
-        
-        try:
-            if self.p2p_integration:
-                await self.p2p_integration.stop_p2p_network()
-            
-            self.running = False
-            print("🛑 P2P Network stopped")
-            
-        except Exception as e:
-            print(f"❌ Error stopping P2P network: {e}")
-    
-    def _integrate_with_task_scheduler(self):
-        """Integrate P2P inference with task scheduler"""
-        if not hasattr(self.agent, 'task_scheduler'):
-            return
-        
-        # Add P2P inference task type
-        self.agent.task_scheduler.task_simulator.tasks['distributed_inference'] = {
-            'ai_workload': True,
-            'blockchain_task': False,
-            'min_duration': 5,
-            'max_duration': 30,
-            'reward': 0.03,
-            'distributed': True
-        }
-        
-        # Override inference method for distributed tasks
-        original_execute_ai_task = self.agent.task_scheduler.task_simulator.execute_ai_task
-        
-        async def distributed_execute_ai_task(task_config, progress_callback):
-            if task_config.get('distributed', False):
-                return await self._execute_distributed_ai_task(task_config, progress_callback)
-            else:
-                return original_execute_ai_task(task_config, progress_callback)
-        
-        self.agent.task_scheduler.task_simulator.execute_ai_task = distributed_execute_ai_task
-    
-    async def _execute_distributed_ai_task(self, task_config, progress_callback):
-        """Execute AI task using P2P distributed inference"""
-        try:
-            if not self.p2p_integration:
-                return {'success': False, 'error': 'P2P network not available'}
-            
-            # Simulate task progress
-            for i in range(5):
-                if not progress_callback((i + 1) * 20, {'stage': f'p2p_stage_{i+1}'}):
-                    return {'success': False, 'error': 'Task cancelled'}
-                await asyncio.sleep(1)
-            
-            # Perform distributed inference
-            model_name = task_config.get('model', 'sentiment')
-            input_data = task_config.get('input_data', 'Sample input for distributed inference')
-            
-            result = await self.p2p_integration.distributed_inference(
-                model_name, 
-                input_data,
-                priority=task_config.get('priority', 5),
-                timeout=task_config.get('timeout', 30.0)
-            )
-            
-            if result.get('success'):
-                return {
-                    'success': True,
-                    'result': 'Distributed AI inference completed',
-                    'inference_result': result['result'],
-                    'nodes_used': result.get('nodes_used', 1),
-                    'consensus_reached': result.get('consensus_reached', False),
-                    'execution_time': result.get('execution_time', 0)
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': result.get('error', 'Distributed inference failed')
-                }
-                
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
-    
-    def get_p2p_status(self) -> Dict[str, Any]:
-        """Get P2P network status"""
-        if not self.running or not self.p2p_integration:
-            return {
-                'enabled': self.p2p_enabled,
-                'running': False,
-                'error': 'P2P network not started'
-            }
-        
-        return {
-            'enabled': self.p2p_enabled,
-            'running': self.running,
-            **self.p2p_integration.get_p2p_status()
-        }
-    
-    async def distributed_inference_api(self, model_name: str, input_data: Any, 
-                                       options: Dict[str, Any] = None) -> Dict[str, Any]:
-        """API method for distributed inference"""
-        if not self.running or not self.p2p_integration:
-            return {
-                'success': False,
-                'error': 'P2P network not available'
-            }
-        
-        options = options or {}
-        
-        try:
-            result = await self.p2p_integration.distributed_inference(
-                model_name,
-                input_data,
-                priority=options.get('priority', 5),
-                timeout=options.get('timeout', 30.0)
-            )
-            
-            return result
-            
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e)
-            }
-
-
-# File 3: ultimate_agent/config/p2p_config.py
-"""
-P2P network configuration defaults and validation
-"""
-
-def add_p2p_config_defaults(config_manager):
-    """Add P2P configuration defaults to config manager"""
-    
-    # P2P Network Settings
-    if not config_manager.has_section('P2P'):
-        config_manager.config.add_section('P2P')
-    
-    p2p_defaults = {
-        'enabled': 'true',
-        'port': '4001',
-        'bootstrap_nodes': '',
-        'node_type': 'auto',  # auto, full_node, compute_node, coordinator
-        'max_peers': '50',
-        'heartbeat_interval': '30',
-        'message_ttl': '10',
-        'consensus_threshold': '0.67',
-        'redundancy_factor': '3',
-        'model_sharding_enabled': 'true',
-        'auto_announce_models': 'true'
-    }
-    
-    for key, value in p2p_defaults.items():
-        if not config_manager.has_option('P2P', key):
-            config_manager.set('P2P', key, value)
-    
-    # Distributed Inference Settings
-    if not config_manager.has_section('DISTRIBUTED_INFERENCE'):
-        config_manager.config.add_section('DISTRIBUTED_INFERENCE')
-    
-    inference_defaults = {
-        'enabled': 'true',
-        'default_timeout': '30.0',
-        'max_concurrent_inferences': '10',
-        'cache_results': 'true',
-        'cache_ttl': '300',
-        'load_balancing_strategy': 'capability_based',
-        'fault_tolerance_enabled': 'true',
-        'Byzantine_tolerance': '0.33'
-    }
-    
-    for key, value in inference_defaults.items():
-        if not config_manager.has_option('DISTRIBUTED_INFERENCE', key):
-            config_manager.set('DISTRIBUTED_INFERENCE', key, value)
-
-# File 4: Enhanced dashboard/web/routes/__init__.py additions
-"""
-Add P2P API endpoints to existing dashboard
-"""
-
-def add_p2p_routes(app, agent):
-    """Add P2P-specific API routes to Flask app"""
-    
-    @app.route('/api/v4/p2p/status')
-    def get_p2p_status():
-        """Get P2P network status"""
-        if hasattr(agent, 'p2p_integration'):
-            return jsonify(agent.p2p_integration.get_p2p_status())
-        else:
-            return jsonify({
-                'enabled': False,
-                'error': 'P2P integration not available'
-            })
-    
-    @app.route('/api/v4/p2p/peers')
-    def get_p2p_peers():
-        """Get connected P2P peers"""
-        if hasattr(agent, 'p2p_integration') and agent.p2p_integration.running:
-            status = agent.p2p_integration.get_p2p_status()
-            return jsonify({
-                'peers': status.get('connected_peers', 0),
-                'known_nodes': status.get('known_nodes', 0),
-                'node_id': status.get('node_id', 'unknown')
-            })
-        else:
-            return jsonify({'error': 'P2P network not running'})
-    
-    @app.route('/api/v4/p2p/inference', methods=['POST'])
-    def distributed_inference():
-        """Perform distributed inference"""
-        try:
-            data = request.get_json()
-            model_name = data.get('model')
-            input_data = data.get('input')
-            options = data.get('options', {})
-            
-            if not model_name or input_data is None:
-                return jsonify({
-                    'success': False,
-                    'error': 'Missing model or input data'
-                }), 400
-            
-            if hasattr(agent, 'p2p_integration') and agent.p2p_integration.running:
-                # Run inference asynchronously
-                import asyncio
-                
-                async def run_inference():
-                    return await agent.p2p_integration.distributed_inference_api(
-                        model_name, input_data, options
-                    )
-                
-                # Create new event loop if needed
-                try:
-                    loop = asyncio.get_event_loop()
-                except RuntimeError:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                
-                result = loop.run_until_complete(run_inference())
-                return jsonify(result)
-                
-            else:
-                return jsonify({
-                    'success': False,
-                    'error': 'P2P network not available'
-                }), 503
-                
-        except Exception as e:
-            return jsonify({
-                'success': False,
-                'error': str(e)
-            }), 500
-    
-    @app.route('/api/v4/p2p/models')
-    def get_distributed_models():
-        """Get available models in P2P network"""
-        if hasattr(agent, 'p2p_integration') and agent.p2p_integration.running:
-            # This would query the DHT for available models
-            return jsonify({
-                'local_models': list(agent.ai_manager.models.keys()),
-                'network_models': []  # Would be populated from DHT
-            })
-        else:
-            return jsonify({'error': 'P2P network not running'})
-    
-    @app.route('/api/v4/p2p/start', methods=['POST'])
-    def start_p2p_network():
-        """Start P2P network"""
-        try:
-            if hasattr(agent, 'p2p_integration'):
-                import asyncio
-                
-                async def start_network():
-                    return await agent.p2p_integration.start_p2p_network()
-                
-                try:
-                    loop = asyncio.get_event_loop()
-                except RuntimeError:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                
-                success = loop.run_until_complete(start_network())
-                
-                return jsonify({
-                    'success': success,
-                    'message': 'P2P network started' if success else 'Failed to start P2P network'
-                })
-            else:
-                return jsonify({
-                    'success': False,
-                    'error': 'P2P integration not available'
-                }), 503
-                
-        except Exception as e:
-            return jsonify({
-                'success': False,
-                'error': str(e)
-            }), 500
-    
-    @app.route('/api/v4/p2p/stop', methods=['POST'])
-    def stop_p2p_network():
-        """Stop P2P network"""
-        try:
-            if hasattr(agent, 'p2p_integration'):
-                import asyncio
-                
-                async def stop_network():
-                    await agent.p2p_integration.stop_p2p_network()
-                    return True
-                
-                try:
-                    loop = asyncio.get_event_loop()
-                except RuntimeError:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                
-                loop.run_until_complete(stop_network())
-                
-                return jsonify({
-                    'success': True,
-                    'message': 'P2P network stopped'
-                })
-            else:
-                return jsonify({
-                    'success': False,
-                    'error': 'P2P integration not available'
-                }), 503
-                
-        except Exception as e:
-            return jsonify({
-                'success': False,
-                'error': str(e)
-            }), 500
-
-# File 5: Modified core/agent1.py integration
-"""
-Integration code to add to existing UltimatePainNetworkAgent class
-"""
-
-class UltimatePainNetworkAgentP2PEnhanced:
-    """Enhanced agent with P2P capabilities"""
-    
-    def __init__(self, *args, **kwargs):
-        # Call original constructor
-        super().__init__(*args, **kwargs)
-        
-        # Add P2P configuration
-        from ..config.p2p_config import add_p2p_config_defaults
-        add_p2p_config_defaults(self.config_manager)
-        
-        # Initialize P2P integration
-        self.p2p_integration = None
-        self._init_p2p_integration()
-    
-    def _init_p2p_integration(self):
-        """Initialize P2P network integration"""
-        try:
-            from ..network.p2p.integration import P2PNetworkIntegration
-            self.p2p_integration = P2PNetworkIntegration(self)
-            print("🌐 P2P integration initialized")
-        except Exception as e:
-            print(f"⚠️ P2P integration not available: {e}")
-    
-    async def start_p2p_if_enabled(self):
-        """Start P2P network if enabled in configuration"""
-        if (self.p2p_integration and 
-            self.config_manager.getboolean('P2P', 'enabled', fallback=False)):
-            
-            await self.p2p_integration.start_p2p_network()
-    
-    def get_enhanced_status(self):
-        """Get status including P2P information"""
-        status = self.get_status()  # Original status method
-        
-        if self.p2p_integration:
-            status['p2p'] = self.p2p_integration.get_p2p_status()
-        
-        return status
-    
-    def start(self):
-        """Enhanced start method with P2P support"""
-        print(f"\n🚀 Starting Enhanced Ultimate Pain Network Agent with P2P")
-        
-        # Start P2P network in background
-        if self.p2p_integration:
-            import threading
-            import asyncio
-            
-            def start_p2p():
-                try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    loop.run_until_complete(self.start_p2p_if_enabled())
-                except Exception as e:
-                    print(f"❌ P2P startup error: {e}")
-            
-            p2p_thread = threading.Thread(target=start_p2p, daemon=True)
-            p2p_thread.start()
-        
-        # Call original start method
-        return super().start()
-    
-    def stop(self):
-        """Enhanced stop method with P2P cleanup"""
-        print("🛑 Stopping Enhanced Ultimate Pain Network Agent...")
-        
-        # Stop P2P network
-        if self.p2p_integration:
-            import asyncio
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-            
-            loop.run_until_complete(self.p2p_integration.stop_p2p_network())
-        
-        # Call original stop method
-        super().stop()
-
-# File 6: Configuration file updates
-"""
-Updated ultimate_agent_config.ini with P2P settings
-"""
-
-P2P_CONFIG_SECTION = """
-[P2P]
-# P2P Network Configuration
-enabled = true
-port = 4001
-bootstrap_nodes = 
-node_type = auto
-max_peers = 50
-heartbeat_interval = 30
-message_ttl = 10
-consensus_threshold = 0.67
-redundancy_factor = 3
-model_sharding_enabled = true
-auto_announce_models = true
-
-[DISTRIBUTED_INFERENCE]
-# Distributed Inference Configuration
-enabled = true
-default_timeout = 30.0
-max_concurrent_inferences = 10
-cache_results = true
-cache_ttl = 300
-load_balancing_strategy = capability_based
-fault_tolerance_enabled = true
-byzantine_tolerance = 0.33
-"""
-
-# File 7: Example usage script
-"""
-example_p2p_usage.py - Example of using P2P distributed AI
-"""
-
-import asyncio
-import time
-from ultimate_agent import create_agent
-from ultimate_agent.network.p2p.integration import P2PNetworkIntegration
-
-async def example_p2p_distributed_ai():
-    """Example of P2P distributed AI usage"""
-    
-    # Create agent with P2P capabilities
-    agent = create_agent(
-        dashboard_port=8080
-    )
-    
-    # Enable P2P in configuration
-    agent.config_manager.set('P2P', 'enabled', 'true')
-    agent.config_manager.set('P2P', 'bootstrap_nodes', 'node1.example.com,node2.example.com')
-    
-    # Initialize P2P integration
-    p2p = P2PNetworkIntegration(agent)
-    
-    try:
-        print("🚀 Starting P2P distributed AI example...")
-        
-        # Start P2P network
-        success = await p2p.start_p2p_network()
-        if not success:
-            print("❌ Failed to start P2P network")
-            return
-        
-        print("✅ P2P network started")
-        
-        # Wait for network to stabilize
-        await asyncio.sleep(5)
-        
-        # Get network status
-        status = p2p.get_p2p_status()
-        print(f"📊 Network status: {status}")
-        
-        # Perform distributed inference
-        print("\n🔮 Testing distributed inference...")
-        
-        result = await p2p.distributed_inference_api(
-            'sentiment',
-            "This P2P distributed AI system is revolutionary!",
-            {'priority': 8, 'timeout': 20.0}
-        )
-        
-        print(f"📈 Inference result: {result}")
-        
-        if result.get('success'):
-            print(f"✅ Consensus reached: {result.get('consensus_reached', False)}")
-            print(f"🌐 Nodes used: {result.get('nodes_used', 1)}")
-            print(f"⚡ Execution time: {result.get('execution_time', 0):.2f}s")
-        
-        # Test multiple inferences
-        print("\n🔄 Testing multiple concurrent inferences...")
-        
-        tasks = []
-        for i in range(3):
-            task = p2p.distributed_inference_api(
-                'classification',
-                f"Test input {i} for distributed classification",
-                {'priority': 5, 'timeout': 15.0}
-            )
-            tasks.append(task)
-        
-        results = await asyncio.gather(*tasks)
-        
-        print(f"📊 Completed {len(results)} concurrent inferences")
-        for i, result in enumerate(results):
-            print(f"  Result {i+1}: {'✅' if result.get('success') else '❌'}")
-        
-    except Exception as e:
-        print(f"❌ Error in P2P example: {e}")
-    
-    finally:
-        # Cleanup
-        print("\n🛑 Stopping P2P network...")
-        await p2p.stop_p2p_network()
-        print("✅ P2P example completed")
-
-if __name__ == "__main__":
-    asyncio.run(example_p2p_distributed_ai())
-
-# File 8: Installation and requirements
-"""
-requirements_p2p.txt - Additional requirements for P2P functionality
-"""
-
-P2P_REQUIREMENTS = """
-# P2P Networking Dependencies
-asyncio>=3.4.3
-aiofiles>=0.8.0
-aiodns>=3.0.0
-
-# Optional: For production P2P networking
-libp2p>=0.1.0; platform_system != "Windows"
-
-# Message serialization
-msgpack>=1.0.0
-protobuf>=3.20.0
-
-# Network utilities
-netifaces>=0.11.0
-requests>=2.28.0
-
-# Cryptographic utilities for node identification
-cryptography>=3.4.8
-"""
-
-print("📦 P2P Integration Files Created!")
-print("\n🔧 To integrate P2P into your existing Ultimate Agent:")
-print("1. Copy the distributed_ai.py file to ultimate_agent/network/p2p/")
-print("2. Add P2P configuration to your config file")
-print("3. Modify your core agent to include P2P integration")
-print("4. Install additional requirements: pip install -r requirements_p2p.txt")
-print("5. Start your agent with P2P enabled")
-print("\n🌐 Features included:")
-print("  • DHT-based peer discovery")
-print("  • Model sharding and distribution")
-print("  • Consensus-based fault tolerance")
-print("  • Load balancing and routing")
-print("  • Real-time coordination")
-print("  • Integration with existing task system")
-print("  • API endpoints for P2P management")
\ No newline at end of file
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+ultimate_agent/network/p2p/consensus.py
+Vectorized result grouping and persistent node reliability for consensus
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:  # pragma: no cover - optional dependency
+    np = None
+    NUMPY_AVAILABLE = False
+
+
+def flatten_result(result: Any) -> Tuple[Any, Optional[Any]]:
+    """Split a result into a hashable structure signature and its numbers.
+
+    Dicts, lists and tuples are walked; numeric leaves (including numpy
+    arrays) become slots in the signature and their values are returned as
+    one float64 vector, in signature order. Ints and floats share one slot
+    kind, so ``1`` and ``1.0`` compare as numbers like any other pair. Any
+    other leaf (strings, bools, None, ...) is kept in the signature itself,
+    so it must match exactly. Results only count as similar if their
+    signatures are equal, which replaces the recursive key/length/type
+    checks with one hash lookup.
+    """
+    chunks: List[Any] = []
+    scalars: List[float] = []
+
+    def flush():
+        if scalars:
+            chunks.append(scalars[:])
+            scalars.clear()
+
+    def walk(value):
+        if isinstance(value, bool) or value is None or isinstance(value, str):
+            return ('=', value)
+        if isinstance(value, (int, float)):
+            scalars.append(float(value))
+            return 'n'
+        if NUMPY_AVAILABLE and isinstance(value, np.generic) and value.dtype.kind in 'iuf':
+            scalars.append(float(value))
+            return 'n'
+        if NUMPY_AVAILABLE and isinstance(value, np.ndarray) and value.dtype.kind in 'iuf':
+            flush()
+            chunks.append(value.ravel())
+            return ('nd', value.shape)
+        if isinstance(value, dict):
+            return ('d', tuple((key, walk(value[key])) for key in sorted(value, key=str)))
+        if isinstance(value, (list, tuple)):
+            return ('l' if isinstance(value, list) else 't', tuple(walk(item) for item in value))
+        try:
+            hash(value)
+            return ('=', value)
+        except TypeError:
+            return ('r', repr(value))
+
+    signature = walk(result)
+    flush()
+    if not chunks:
+        return signature, None
+    if not NUMPY_AVAILABLE:
+        return signature, tuple(v for chunk in chunks for v in chunk)
+    if len(chunks) == 1:
+        return signature, np.asarray(chunks[0], dtype=np.float64)
+    return signature, np.concatenate([np.asarray(chunk, dtype=np.float64) for chunk in chunks])
+
+
+def rebuild_result(template: Any, values: Any) -> Any:
+    """Inverse of ``flatten_result``: put ``values`` into ``template``'s structure.
+
+    ``template`` is one of the flattened results; its leaves decide whether
+    a slot comes back as an int, a float or an array of a given dtype.
+    """
+    position = 0
+
+    def build(node):
+        nonlocal position
+        if isinstance(node, bool) or node is None or isinstance(node, str):
+            return node
+        if isinstance(node, (int, float)):
+            position += 1
+            value = float(values[position - 1])
+            return int(round(value)) if isinstance(node, int) else value
+        if NUMPY_AVAILABLE and isinstance(node, np.generic) and node.dtype.kind in 'iuf':
+            position += 1
+            value = float(values[position - 1])
+            return node.dtype.type(round(value) if node.dtype.kind in 'iu' else value)
+        if NUMPY_AVAILABLE and isinstance(node, np.ndarray) and node.dtype.kind in 'iuf':
+            part = np.asarray(values[position:position + node.size])
+            position += node.size
+            if node.dtype.kind in 'iu':
+                part = np.rint(part)
+            return part.astype(node.dtype).reshape(node.shape)
+        if isinstance(node, dict):
+            built = {key: build(node[key]) for key in sorted(node, key=str)}
+            return {key: built[key] for key in node}
+        if isinstance(node, (list, tuple)):
+            items = [build(item) for item in node]
+            return items if isinstance(node, list) else tuple(items)
+        return node
+
+    return build(template)
+
+
+def cluster_rows(rows: Any, weights: Any, tolerance: float) -> List[Any]:
+    """Group the rows of ``rows`` that agree element-wise within ``tolerance``.
+
+    Two values agree if their relative difference is at most ``tolerance``,
+    or their absolute difference when either is zero. Identical rows are
+    first collapsed by hashing (``np.unique``), which is the common case for
+    deterministic replicas. The distinct rows are then visited by total
+    weight: the heaviest unassigned row becomes a group head and every
+    unassigned row within tolerance of it joins the group in one
+    broadcasted comparison. The cost is O(groups x distinct rows x width)
+    in numpy, not O(n^2) Python comparisons.
+
+    Returns one non-empty array of row indices per group, heaviest head
+    first.
+    """
+    rows = np.asarray(rows, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    if len(rows) == 0:
+        return []
+    unique, inverse = np.unique(rows, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    unique_weight = np.bincount(inverse, weights=weights, minlength=len(unique))
+    labels = np.full(len(unique), -1)
+    magnitude = np.abs(unique)
+    groups = 0
+    for head in np.argsort(-unique_weight, kind='stable'):
+        if labels[head] >= 0:
+            continue
+        candidates = np.flatnonzero(labels < 0)
+        values = unique[candidates]
+        diff = np.abs(values - unique[head])
+        scale = np.maximum(magnitude[candidates], magnitude[head])
+        zero = (values == 0) | (unique[head] == 0)
+        close = np.where(zero, diff <= tolerance, diff <= tolerance * scale)
+        labels[candidates[close.all(axis=1)]] = groups
+        # A row with NaN matches nothing, not even itself; it still gets
+        # its own group so its node is accounted for
+        labels[head] = groups
+        groups += 1
+    row_labels = labels[inverse]
+    return [np.flatnonzero(row_labels == group) for group in range(groups)]
+
+
+class ReliabilityTracker:
+    """Per-node agreement score that persists across tasks.
+
+    After every consensus round nodes in the winning group move towards 1
+    and dissenting nodes towards 0, as an exponentially weighted average
+    with factor ``alpha``. Unknown nodes start at ``prior``. With
+    ``persist_path`` the scores are loaded at start and written back
+    (atomically, at most every ``save_interval`` seconds) so they survive
+    restarts.
+    """
+
+    def __init__(self, alpha: float = 0.1, prior: float = 1.0, floor: float = 0.01,
+                 persist_path: Optional[str] = None, save_interval: float = 30.0):
+        self.alpha = alpha
+        self.prior = prior
+        self.floor = floor
+        self.persist_path = persist_path
+        self.save_interval = save_interval
+        self.scores: Dict[str, float] = {}
+        self.rounds: Dict[str, int] = {}
+        self._last_save = 0.0
+        self._dirty = False
+        if persist_path:
+            self.load()
+
+    def score(self, node_id: str) -> float:
+        return self.scores.get(node_id, self.prior)
+
+    def weight(self, node_id: str) -> float:
+        """Voting weight; never zero so a node can earn its way back"""
+        return max(self.floor, self.score(node_id))
+
+    def weights(self, node_ids: Iterable[str]) -> List[float]:
+        return [self.weight(node_id) for node_id in node_ids]
+
+    def record(self, agreed: Iterable[str], disagreed: Iterable[str] = ()):
+        for node_id, outcome in [(n, 1.0) for n in agreed] + [(n, 0.0) for n in disagreed]:
+            current = self.score(node_id)
+            self.scores[node_id] = current + self.alpha * (outcome - current)
+            self.rounds[node_id] = self.rounds.get(node_id, 0) + 1
+        self._dirty = True
+        if self.persist_path and time.time() - self._last_save >= self.save_interval:
+            self.save()
+
+    def load(self):
+        try:
+            with open(self.persist_path) as f:
+                data = json.load(f)
+            self.scores.update({k: float(v) for k, v in data.get('scores', {}).items()})
+            self.rounds.update({k: int(v) for k, v in data.get('rounds', {}).items()})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"Could not load reliability scores from {self.persist_path}: {e}")
+
+    def save(self):
+        if not self.persist_path or not self._dirty:
+            return
+        tmp_path = f"{self.persist_path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'scores': self.scores, 'rounds': self.rounds}, f)
+            os.replace(tmp_path, self.persist_path)
+            self._dirty = False
+            self._last_save = time.time()
+        except Exception as e:
+            logging.warning(f"Could not save reliability scores to {self.persist_path}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        scores = list(self.scores.values())
+        return {
+            'tracked_nodes': len(scores),
+            'mean_score': sum(scores) / len(scores) if scores else self.prior,
+            'min_score': min(scores) if scores else self.prior,
+            'persist_path': self.persist_path
+        }
+
+
+__all__ = ['flatten_result', 'rebuild_result', 'cluster_rows', 'ReliabilityTracker']
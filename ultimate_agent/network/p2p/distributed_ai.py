@@ -21,14 +21,21 @@ import uuid
 import threading
 from typing import Dict, Any, List, Optional, Set, Tuple, Callable
 from dataclasses import dataclass, asdict
-from collections import defaultdict, deque
+from collections import defaultdict, deque, OrderedDict
+from functools import lru_cache
+import heapq
 from enum import Enum
 import logging
 from concurrent.futures import ThreadPoolExecutor
 import zlib
 
-# In-memory registry for simulated networking between nodes
-SIMULATED_NETWORK: Dict[str, 'P2PNetworkManager'] = {}
+from . import wire
+from .transport import P2PTransport, SIMULATED_NETWORK, create_transport
+from .pipeline import PipelineExecutor, split_micro_batches, merge_micro_batches
+from .gossip import SeenMessageFilter, HeartbeatTable, gossip_fanout
+from .consensus import (
+    ReliabilityTracker, flatten_result, rebuild_result, cluster_rows, NUMPY_AVAILABLE, np
+)
 
 # Core P2P Infrastructure
 class NodeType(Enum):
@@ -59,6 +66,16 @@ class MessageType(Enum):
     HEARTBEAT = "heartbeat"
     NETWORK_UPDATE = "network_update"
     FAULT_NOTIFICATION = "fault_notification"
+    
+    # DHT RPCs (requests carry 'rpc_id'; replies echo it as 'in_reply_to')
+    PING = "ping"
+    FIND_NODE = "find_node"
+    FIND_VALUE = "find_value"
+    STORE = "store"
+    RPC_RESPONSE = "rpc_response"
+    
+    # Push-pull heartbeat reconciliation
+    ANTI_ENTROPY = "anti_entropy"
 
 @dataclass
 class NodeCapability:
@@ -73,6 +90,7 @@ class NodeCapability:
     location: Optional[Tuple[float, float]] = None  # lat, lon
     reliability_score: float = 1.0
     last_seen: float = 0
+    address: Optional[str] = None  # "host:port" for network transports
 
 @dataclass
 class ModelShard:
@@ -96,21 +114,97 @@ class InferenceTask:
     redundancy: int = 1
     created_at: float = 0
     client_id: str = ""
+    # input_data's first axis holds independent items that may be split
+    # into pipeline micro-batches
+    batched: bool = False
+
+# Wire codes for message types; append new types at the end to stay compatible
+_MESSAGE_TYPE_CODES = {msg_type: code for code, msg_type in enumerate(MessageType)}
+_MESSAGE_TYPES_BY_CODE = list(MessageType)
+
 
 class P2PMessage:
-    """P2P network message"""
+    """P2P network message
+
+    On the wire a message is a small binary header (type, ttl, ids, path)
+    followed by a separately framed payload (see ``wire``). A message read
+    off the network keeps its payload frame, and ``serialize`` reuses it, so
+    relaying only re-encodes the header. Decoded payloads are treated as
+    read-only; assign ``data`` to change them.
+    """
     def __init__(self, msg_type: MessageType, sender_id: str, data: Any, 
-                 message_id: str = None, ttl: int = 10):
+                 message_id: str = None, ttl: int = 10,
+                 compress_threshold: Optional[int] = wire.DEFAULT_COMPRESS_THRESHOLD):
         self.message_id = message_id or str(uuid.uuid4())
         self.type = msg_type
         self.sender_id = sender_id
-        self.data = data
+        self._data = data
+        self._payload_frame: Optional[bytes] = None
+        self.compress_threshold = compress_threshold
         self.ttl = ttl
         self.timestamp = time.time()
         self.path = [sender_id]
     
+    _UNDECODED = object()
+    
+    @property
+    def data(self) -> Any:
+        if self._data is P2PMessage._UNDECODED:
+            self._data = wire.decode_payload(self._payload_frame)
+        return self._data
+    
+    @data.setter
+    def data(self, value: Any):
+        self._data = value
+        self._payload_frame = None
+    
+    def payload_frame(self) -> bytes:
+        """Encoded payload, built once and reused for every send"""
+        if self._payload_frame is None:
+            self._payload_frame = wire.encode_payload(self._data, self.compress_threshold)
+        return self._payload_frame
+    
     def serialize(self) -> bytes:
         """Serialize message for network transmission"""
+        header = wire.encode_header(
+            _MESSAGE_TYPE_CODES[self.type], self.ttl, self.timestamp,
+            self.message_id, self.sender_id, self.path
+        )
+        return header + self.payload_frame()
+    
+    def copy(self) -> 'P2PMessage':
+        """Same message (id, payload) with its own ttl and path, for relaying"""
+        msg = P2PMessage(self.type, self.sender_id, self._data, self.message_id, self.ttl,
+                         self.compress_threshold)
+        msg._payload_frame = self._payload_frame
+        msg.timestamp = self.timestamp
+        msg.path = list(self.path)
+        return msg
+    
+    @classmethod
+    def deserialize(cls, data: bytes) -> 'P2PMessage':
+        """Deserialize message from network data; the payload is decoded on first access"""
+        if not wire.is_binary_frame(data):
+            return cls.deserialize_legacy(data)
+        
+        header, offset = wire.decode_header(data)
+        type_code = header['type_code']
+        if type_code >= len(_MESSAGE_TYPES_BY_CODE):
+            raise wire.WireFormatError(f"Unknown message type {type_code}")
+        msg = cls(
+            _MESSAGE_TYPES_BY_CODE[type_code],
+            header['sender_id'],
+            P2PMessage._UNDECODED,
+            header['message_id'],
+            header['ttl']
+        )
+        msg._payload_frame = wire.split_payload(data, offset)
+        msg.timestamp = header['timestamp']
+        msg.path = header['path']
+        return msg
+    
+    def serialize_legacy(self) -> bytes:
+        """Previous JSON + zlib encoding, kept for peers that have not upgraded"""
         message_dict = {
             'message_id': self.message_id,
             'type': self.type.value,
@@ -124,8 +218,7 @@ class P2PMessage:
         return zlib.compress(json_bytes)
     
     @classmethod
-    def deserialize(cls, data: bytes) -> 'P2PMessage':
-        """Deserialize message from network data"""
+    def deserialize_legacy(cls, data: bytes) -> 'P2PMessage':
         message_dict = json.loads(zlib.decompress(data).decode("utf-8"))
         msg = cls(
             MessageType(message_dict['type']),
@@ -138,57 +231,211 @@ class P2PMessage:
         msg.path = message_dict['path']
         return msg
 
+# Broadcast types relayed hop by hop (heartbeats use anti-entropy instead)
+GOSSIP_MESSAGE_TYPES = frozenset({
+    MessageType.NODE_ANNOUNCE,
+    MessageType.MODEL_ANNOUNCE,
+    MessageType.NETWORK_UPDATE,
+    MessageType.FAULT_NOTIFICATION
+})
+
+ID_BITS = 256  # SHA-256 node and key ids
+
+
+@lru_cache(maxsize=65536)
+def _key_digest(key: str) -> int:
+    """Position of a node id or data key in the 256-bit id space"""
+    return int.from_bytes(hashlib.sha256(key.encode()).digest(), "big")
+
+
+def capability_to_dict(capability: NodeCapability) -> Dict[str, Any]:
+    """Wire-safe form of a NodeCapability"""
+    data = asdict(capability)
+    data['node_type'] = capability.node_type.value
+    if capability.location is not None:
+        data['location'] = list(capability.location)
+    return data
+
+
+def capability_from_dict(data: Dict[str, Any]) -> NodeCapability:
+    data = dict(data)
+    data['node_type'] = NodeType(data['node_type'])
+    if data.get('location') is not None:
+        data['location'] = tuple(data['location'])
+    return NodeCapability(**data)
+
+
 class DistributedHashTable:
-    """Simplified DHT for peer discovery and routing"""
-    
-    def __init__(self, node_id: str, k_bucket_size: int = 20):
+    """Kademlia routing table and local key/value store
+
+    Ids are placed in a 256-bit space by SHA-256 (digests are cached) and
+    contacts are kept in one k-bucket per common-prefix length with this
+    node. Buckets are LRU-ordered; when a full bucket sees a new contact,
+    ``add_node`` returns the least recently seen entry so the caller can
+    ping it. A live entry stays (``touch``) and the newcomer waits in the
+    bucket's replacement cache. Failed RPCs are counted per contact
+    (``record_failure``); only after ``stale_threshold`` failures in a row
+    is it dropped (``remove_node``) and the newest replacement takes its
+    place, so one lost packet does not evict a good contact. Network lookups are driven by
+    ``P2PNetworkManager.iterative_find_node`` / ``iterative_find_value``.
+    """
+    
+    def __init__(self, node_id: str, k_bucket_size: int = 20, stale_threshold: int = 3):
         self.node_id = node_id
         self.k_bucket_size = k_bucket_size
-        self.routing_table = defaultdict(list)  # distance -> [node_ids]
+        self.stale_threshold = max(1, stale_threshold)
+        self.failures: Dict[str, int] = {}  # consecutive failed RPCs per contact
+        self.node_key = _key_digest(node_id)
+        self.buckets: List[OrderedDict] = [OrderedDict() for _ in range(ID_BITS)]
+        self.replacements: List[deque] = [deque(maxlen=k_bucket_size) for _ in range(ID_BITS)]
         self.data_store = {}  # key -> value storage
         self.node_info = {}   # node_id -> NodeCapability
         
-    def add_node(self, node_capability: NodeCapability):
-        """Add node to routing table"""
-        distance = self._calculate_distance(self.node_id, node_capability.node_id)
-        bucket = self.routing_table[distance]
-        
-        # Remove if already exists
-        bucket = [n for n in bucket if n.node_id != node_capability.node_id]
-        
-        # Add to front (most recently seen)
-        bucket.insert(0, node_capability.node_id)
+        # Inverted index for model lookups, plus the load each node last reported
+        self.model_index: Dict[str, Set[str]] = {}
+        self.node_load: Dict[str, float] = {}
+        self._indexed_models: Dict[str, Set[str]] = {}
+    
+    @property
+    def routing_table(self) -> Dict[int, List[str]]:
+        """Non-empty buckets by index, least recently seen first"""
+        return {index: list(bucket) for index, bucket in enumerate(self.buckets) if bucket}
+    
+    def bucket_index(self, node_id: str) -> int:
+        """ID_BITS - 1 - common prefix length with this node"""
+        return (self.node_key ^ _key_digest(node_id)).bit_length() - 1
+    
+    def add_node(self, node_capability: NodeCapability) -> Optional[str]:
+        """Add or refresh a contact.
+
+        Returns the id of the bucket's least recently seen contact when the
+        bucket is full and the newcomer had to wait; ping that contact and
+        call ``touch`` or ``remove_node`` with the outcome.
+        """
+        node_id = node_capability.node_id
+        self.node_info[node_id] = node_capability
+        self._index_models(node_id, node_capability.models)
+        if node_id == self.node_id:
+            return None
         
-        # Maintain k-bucket size
-        if len(bucket) > self.k_bucket_size:
-            bucket = bucket[:self.k_bucket_size]
+        index = self.bucket_index(node_id)
+        bucket = self.buckets[index]
+        if node_id in bucket:
+            bucket.move_to_end(node_id)
+            self.failures.pop(node_id, None)
+            return None
+        if len(bucket) < self.k_bucket_size:
+            bucket[node_id] = None
+            return None
         
-        self.routing_table[distance] = bucket
-        self.node_info[node_capability.node_id] = node_capability
+        replacements = self.replacements[index]
+        if node_id in replacements:
+            replacements.remove(node_id)
+        replacements.append(node_id)
+        return next(iter(bucket))
+    
+    def touch(self, node_id: str):
+        """Mark a contact as just seen"""
+        if node_id == self.node_id:
+            return
+        bucket = self.buckets[self.bucket_index(node_id)]
+        if node_id in bucket:
+            bucket.move_to_end(node_id)
+        self.failures.pop(node_id, None)
+        if node_id in self.node_info:
+            self.node_info[node_id].last_seen = time.time()
+    
+    def record_failure(self, node_id: str) -> bool:
+        """Count a failed RPC to a contact; removes it and returns True once
+        ``stale_threshold`` failures have happened in a row"""
+        failures = self.failures.get(node_id, 0) + 1
+        if failures < self.stale_threshold:
+            self.failures[node_id] = failures
+            return False
+        self.remove_node(node_id)
+        return True
+    
+    def remove_node(self, node_id: str):
+        """Drop a contact and promote the newest replacement into its bucket"""
+        self.failures.pop(node_id, None)
+        self.node_info.pop(node_id, None)
+        self.node_load.pop(node_id, None)
+        self._index_models(node_id, ())
+        if node_id == self.node_id:
+            return
+        index = self.bucket_index(node_id)
+        bucket = self.buckets[index]
+        replacements = self.replacements[index]
+        if node_id in replacements:
+            replacements.remove(node_id)
+        if node_id in bucket:
+            del bucket[node_id]
+            while replacements:
+                candidate = replacements.pop()
+                if candidate in self.node_info:
+                    bucket[candidate] = None
+                    break
+    
+    def __contains__(self, node_id: str) -> bool:
+        return node_id != self.node_id and node_id in self.buckets[self.bucket_index(node_id)]
     
     def find_closest_nodes(self, target_key: str, count: int = 20) -> List[NodeCapability]:
-        """Find closest nodes to target key"""
-        target_distance = self._calculate_distance(self.node_id, target_key)
-        
-        candidates = []
-        for distance in sorted(self.routing_table.keys()):
-            if abs(distance - target_distance) <= 1:  # Close distances
-                for node_id in self.routing_table[distance]:
-                    if node_id in self.node_info:
-                        candidates.append(self.node_info[node_id])
-        
-        # Sort by actual distance to target
-        candidates.sort(key=lambda n: self._calculate_distance(n.node_id, target_key))
-        return candidates[:count]
+        """Routing-table contacts closest to ``target_key`` by XOR distance"""
+        target = _key_digest(target_key)
+        candidates = (node_id for bucket in self.buckets for node_id in bucket)
+        closest = heapq.nsmallest(count, candidates, key=lambda node_id: _key_digest(node_id) ^ target)
+        return [self.node_info[node_id] for node_id in closest if node_id in self.node_info]
+    
+    def _index_models(self, node_id: str, models):
+        old = self._indexed_models.get(node_id, set())
+        new = set(models)
+        for model_id in old - new:
+            holders = self.model_index.get(model_id)
+            if holders is not None:
+                holders.discard(node_id)
+                if not holders:
+                    del self.model_index[model_id]
+        for model_id in new - old:
+            self.model_index.setdefault(model_id, set()).add(node_id)
+        if new:
+            self._indexed_models[node_id] = new
+        else:
+            self._indexed_models.pop(node_id, None)
+    
+    def add_model(self, node_id: str, model_id: str):
+        """Record that a known node now serves ``model_id``"""
+        capability = self.node_info.get(node_id)
+        if capability is None:
+            return
+        if model_id not in capability.models:
+            capability.models.append(model_id)
+        self._index_models(node_id, capability.models)
+    
+    def record_heartbeat(self, node_id: str, load: Optional[float] = None,
+                         seen_at: Optional[float] = None):
+        capability = self.node_info.get(node_id)
+        if capability is None:
+            return
+        capability.last_seen = max(capability.last_seen, seen_at or time.time())
+        if load is not None:
+            self.node_load[node_id] = load
     
     def find_nodes_with_model(self, model_id: str) -> List[NodeCapability]:
         """Find nodes that have specific model"""
+        cutoff = time.time() - 300  # 5 min timeout
         return [
-            capability for capability in self.node_info.values()
-            if model_id in capability.models and 
-            time.time() - capability.last_seen < 300  # 5 min timeout
+            self.node_info[node_id] for node_id in self.model_index.get(model_id, ())
+            if self.node_info[node_id].last_seen > cutoff
         ]
     
+    def top_nodes_for_model(self, model_id: str, count: int) -> List[NodeCapability]:
+        """Best ``count`` live holders of a model: least loaded, then most
+        compute power, then most recently seen"""
+        def rank(capability: NodeCapability):
+            return (self.node_load.get(capability.node_id, 0.0),
+                    -capability.compute_power, -capability.last_seen)
+        return heapq.nsmallest(count, self.find_nodes_with_model(model_id), key=rank)
+    
     def store_data(self, key: str, value: Any):
         """Store data in DHT"""
         self.data_store[key] = {
@@ -205,9 +452,7 @@ class DistributedHashTable:
     
     def _calculate_distance(self, id1: str, id2: str) -> int:
         """Calculate XOR distance between two IDs"""
-        hash1 = int(hashlib.sha256(id1.encode()).hexdigest()[:16], 16)
-        hash2 = int(hashlib.sha256(id2.encode()).hexdigest()[:16], 16)
-        return hash1 ^ hash2
+        return _key_digest(id1) ^ _key_digest(id2)
 
 class ModelShardManager:
     """Manages model sharding and distribution"""
@@ -290,10 +535,20 @@ class ModelShardManager:
 class ConsensusManager:
     """Manages consensus for distributed inference results"""
     
-    def __init__(self, node_id: str, byzantine_tolerance: float = 0.33):
+    def __init__(self, node_id: str, byzantine_tolerance: float = 0.33, tolerance: float = 0.01,
+                 reliability: Optional[ReliabilityTracker] = None):
         self.node_id = node_id
         self.byzantine_tolerance = byzantine_tolerance
+        self.tolerance = tolerance  # relative tolerance for numerical results
+        self.reliability = reliability or ReliabilityTracker()
         self.pending_consensus = {}  # task_id -> consensus_state
+        self.stats = {
+            'rounds': 0,
+            'reached': 0,
+            'failed': 0,
+            'results_grouped': 0,
+            'grouping_time': 0.0
+        }
         
     async def initiate_consensus(self, task_id: str, results: List[Tuple[str, Any]], 
                                 timeout: float = 10.0) -> Optional[Any]:
@@ -327,6 +582,7 @@ class ConsensusManager:
         """Analyze results to find consensus"""
         results = consensus_state['results']
         required_agreement = consensus_state['required_agreement']
+        self.stats['rounds'] += 1
         
         # Group similar results
         result_groups = self._group_similar_results(results)
@@ -334,96 +590,79 @@ class ConsensusManager:
         # Find largest group with sufficient agreement
         for group_results, group_nodes in result_groups:
             if len(group_nodes) >= required_agreement:
-                # Weight by node reliability if available
+                agreed = set(group_nodes)
+                self.reliability.record(group_nodes, [n for n, _ in results if n not in agreed])
+                self.stats['reached'] += 1
                 return await self._compute_weighted_result(group_results, group_nodes)
         
         # No consensus reached
+        self.stats['failed'] += 1
         logging.warning(f"No consensus reached for task {consensus_state['task_id']}")
         return None
     
     def _group_similar_results(self, results: List[Tuple[str, Any]]) -> List[Tuple[List[Any], List[str]]]:
-        """Group similar results together"""
-        groups = []
-        tolerance = 0.01  # 1% tolerance for numerical results
+        """Group similar results together.
+        
+        Results are bucketed by structure signature (a hash lookup), then
+        the numeric values within each bucket are clustered as one matrix
+        with a vectorized relative-tolerance check. Groups are ordered by
+        size, then by the reliability of their members.
+        """
+        start = time.perf_counter()
+        buckets: Dict[Any, List[Tuple[int, Any]]] = defaultdict(list)
+        for index, (node_id, result) in enumerate(results):
+            signature, values = flatten_result(result)
+            if values is not None and not NUMPY_AVAILABLE:
+                # Without numpy only identical numbers group together
+                signature = (signature, values)
+            buckets[signature].append((index, values))
         
-        for node_id, result in results:
-            placed = False
-            
-            for group_results, group_nodes in groups:
-                if self._results_similar(result, group_results[0], tolerance):
-                    group_results.append(result)
-                    group_nodes.append(node_id)
-                    placed = True
-                    break
-            
-            if not placed:
-                groups.append([result], [node_id])
-        
-        # Sort by group size
-        groups.sort(key=lambda g: len(g[1]), reverse=True)
-        return groups
-    
-    def _results_similar(self, result1: Any, result2: Any, tolerance: float) -> bool:
-        """Check if two results are similar within tolerance"""
-        try:
-            if isinstance(result1, dict) and isinstance(result2, dict):
-                # Compare dict results
-                if set(result1.keys()) != set(result2.keys()):
-                    return False
-                
-                for key in result1.keys():
-                    if not self._results_similar(result1[key], result2[key], tolerance):
-                        return False
-                return True
-            
-            elif isinstance(result1, (list, tuple)) and isinstance(result2, (list, tuple)):
-                # Compare sequence results
-                if len(result1) != len(result2):
-                    return False
-                
-                for r1, r2 in zip(result1, result2):
-                    if not self._results_similar(r1, r2, tolerance):
-                        return False
-                return True
-            
-            elif isinstance(result1, (int, float)) and isinstance(result2, (int, float)):
-                # Compare numerical results
-                if result1 == 0 and result2 == 0:
-                    return True
-                if result1 == 0 or result2 == 0:
-                    return abs(result1 - result2) <= tolerance
-                return abs(result1 - result2) / max(abs(result1), abs(result2)) <= tolerance
-            
+        groups = []
+        for members in buckets.values():
+            indices = [index for index, _ in members]
+            if members[0][1] is None or not NUMPY_AVAILABLE or len(members) == 1:
+                clusters = [list(range(len(members)))]
             else:
-                # Exact comparison for other types
-                return result1 == result2
-                
-        except Exception:
-            return False
+                rows = np.stack([values for _, values in members])
+                weights = self.reliability.weights(results[index][0] for index in indices)
+                clusters = cluster_rows(rows, weights, self.tolerance)
+            for cluster in clusters:
+                chosen = [results[indices[i]] for i in cluster]
+                groups.append(([result for _, result in chosen], [node_id for node_id, _ in chosen]))
+        
+        # Sort by group size, then by member reliability
+        groups.sort(key=lambda g: (len(g[1]), sum(self.reliability.weights(g[1]))), reverse=True)
+        self.stats['results_grouped'] += len(results)
+        self.stats['grouping_time'] += time.perf_counter() - start
+        return groups
     
     async def _compute_weighted_result(self, results: List[Any], nodes: List[str]) -> Any:
-        """Compute weighted average of consensus results"""
+        """Compute reliability-weighted average of consensus results"""
         if len(results) == 1:
             return results[0]
         
-        # For numerical results, compute weighted average
-        if all(isinstance(r, (int, float)) for r in results):
-            # Equal weighting for now (could use node reliability)
-            return sum(results) / len(results)
-        
-        # For other types, return most common result
-        result_counts = {}
-        for result in results:
-            result_key = str(result)
-            result_counts[result_key] = result_counts.get(result_key, 0) + 1
+        weights = self.reliability.weights(nodes)
+        _, values = flatten_result(results[0])
+        if values is None:
+            # Nothing numeric: the group agrees exactly
+            return results[0]
         
-        most_common = max(result_counts.items(), key=lambda x: x[1])
-        # Find original result object
-        for result in results:
-            if str(result) == most_common[0]:
-                return result
+        if NUMPY_AVAILABLE:
+            # Members of a group share one signature by construction
+            rows = np.stack([values] + [flatten_result(r)[1] for r in results[1:]])
+            return rebuild_result(results[0], np.average(rows, axis=0, weights=weights))
         
-        return results[0]  # Fallback
+        total = sum(weights)
+        rows = [flatten_result(r)[1] for r in results]
+        averaged = [sum(w * row[i] for w, row in zip(weights, rows)) / total for i in range(len(values))]
+        return rebuild_result(results[0], averaged)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'pending': len(self.pending_consensus),
+            'reliability': self.reliability.get_stats()
+        }
 
 class InferenceCoordinator:
     """Coordinates distributed inference across network"""
@@ -436,12 +675,28 @@ class InferenceCoordinator:
         self.consensus_manager = consensus_manager
         self.active_inferences = {}  # task_id -> inference_state
         self.executor = ThreadPoolExecutor(max_workers=10)
+        self.candidate_pool_size = 16
+        # Set by P2PNetworkManager to deliver requests over its transport:
+        # async (node_id, request_data, timeout) -> response dict or None
+        self.send_request: Optional[Callable[[str, Dict[str, Any], float], Any]] = None
+        
+        # Pipeline execution: batched requests are split into micro-batches
+        # that flow through one long-lived executor per chain of stage nodes
+        self.micro_batches = 4
+        self.stage_queue_size = 2
+        self.max_pipelines = 8
+        self.pipelines: "OrderedDict[Tuple[str, ...], PipelineExecutor]" = OrderedDict()
+        self._closing: Set[asyncio.Task] = set()
+        # Models whose stage outputs could not be merged; they run unsplit
+        self._unsplittable_models: Set[str] = set()
         
     async def coordinate_inference(self, task: InferenceTask) -> Dict[str, Any]:
         """Coordinate distributed inference for a task"""
         try:
-            # Find nodes with the required model
-            available_nodes = self.dht.find_nodes_with_model(task.model_id)
+            # Best-ranked nodes with the required model
+            available_nodes = self.dht.top_nodes_for_model(
+                task.model_id, max(task.redundancy, self.candidate_pool_size)
+            )
             
             if not available_nodes:
                 return {
@@ -461,6 +716,11 @@ class InferenceCoordinator:
                 consensus_result = await self.consensus_manager.initiate_consensus(
                     task.task_id, results, task.timeout
                 )
+                # Node selection prefers reliable nodes; keep the DHT view current
+                for node_id, _ in results:
+                    capability = self.dht.node_info.get(node_id)
+                    if capability is not None:
+                        capability.reliability_score = self.consensus_manager.reliability.score(node_id)
             else:
                 consensus_result = results[0][1] if results else None
             
@@ -510,7 +770,7 @@ class InferenceCoordinator:
             # Find nodes that have this shard
             shard_nodes = [
                 node for node in available_nodes
-                if shard.shard_id in self.shard_manager.shard_locations.get(shard.shard_id, [])
+                if node.node_id in self.shard_manager.shard_locations.get(shard.shard_id, [])
             ]
             
             if not shard_nodes:
@@ -560,28 +820,78 @@ class InferenceCoordinator:
     
     async def _execute_pipeline_inference(self, task: InferenceTask, 
                                         execution_plan: Dict[str, Any]) -> List[Tuple[str, Any]]:
-        """Execute pipeline inference across multiple nodes"""
+        """Execute pipeline inference across multiple nodes
+        
+        A ``batched`` task's input is split into micro-batches that enter the
+        stage chain one after another, so every stage node works on a
+        different micro-batch at the same time (GPipe schedule). Other inputs
+        travel whole. Concurrent requests for the same chain share its
+        executor, so a window of requests fills the pipeline as well.
+        """
         stages = execution_plan['stages']
-        current_data = task.input_data
+        pipeline = self._get_pipeline(task.model_id, stages)
         
-        # Execute stages sequentially
-        for stage in stages:
-            node = stage['node']
-            shard = stage['shard']
-            
-            # Send inference request to node
+        async def run() -> Any:
+            if not task.batched or task.model_id in self._unsplittable_models:
+                (output,) = await pipeline.run([task.input_data], context=task)
+                return output
+            outputs = await pipeline.run(split_micro_batches(task.input_data, self.micro_batches), context=task)
+            try:
+                return merge_micro_batches(outputs)
+            except ValueError as e:
+                logging.warning(f"Outputs of {task.model_id} cannot be merged ({e}); running it unsplit")
+                self._unsplittable_models.add(task.model_id)
+                (output,) = await pipeline.run([task.input_data], context=task)
+                return output
+        
+        output = await asyncio.wait_for(run(), timeout=task.timeout)
+        
+        # Return final result
+        return [(stages[-1]['node'].node_id, output)]
+    
+    def _get_pipeline(self, model_id: str, stages: List[Dict[str, Any]]) -> PipelineExecutor:
+        key = (model_id,) + tuple(f"{stage['node'].node_id}/{stage['shard'].shard_id}" for stage in stages)
+        pipeline = self.pipelines.get(key)
+        if pipeline is not None:
+            self.pipelines.move_to_end(key)
+            return pipeline
+        
+        async def run_stage(index: int, data: Any, task: InferenceTask) -> Any:
+            stage = stages[index]
             stage_result = await self._send_inference_request(
-                node.node_id, task.model_id, current_data, shard.shard_id
+                stage['node'].node_id, model_id, data, stage['shard'].shard_id,
+                timeout=task.timeout, task_id=task.task_id
             )
-            
             if not stage_result.get('success'):
-                raise Exception(f"Stage {stage['stage_order']} failed on node {node.node_id}")
-            
-            # Use output as input for next stage
-            current_data = stage_result['result']
-        
-        # Return final result
-        return [(stages[-1]['node'].node_id, current_data)]
+                raise Exception(f"Stage {stage['stage_order']} failed on node {stage['node'].node_id}")
+            return stage_result['result']
+        
+        pipeline = PipelineExecutor([stage['node'].node_id for stage in stages], run_stage,
+                                    queue_size=self.stage_queue_size)
+        self.pipelines[key] = pipeline
+        # Evict least recently used idle pipelines; busy ones stay until a
+        # later call finds them drained
+        excess = len(self.pipelines) - self.max_pipelines
+        for old_key in list(self.pipelines):
+            if excess <= 0:
+                break
+            evicted = self.pipelines[old_key]
+            if evicted is pipeline or evicted._in_flight:
+                continue
+            del self.pipelines[old_key]
+            closing = asyncio.create_task(evicted.close())
+            self._closing.add(closing)
+            closing.add_done_callback(self._closing.discard)
+            excess -= 1
+        return pipeline
+    
+    def get_pipeline_stats(self) -> Dict[str, Any]:
+        return {' -> '.join(key[1:]): pipeline.get_stats() for key, pipeline in self.pipelines.items()}
+    
+    async def close(self):
+        pipelines = list(self.pipelines.values())
+        self.pipelines.clear()
+        await asyncio.gather(*(pipeline.close() for pipeline in pipelines), *self._closing)
     
     async def _execute_replicated_inference(self, task: InferenceTask, 
                                           execution_plan: Dict[str, Any]) -> List[Tuple[str, Any]]:
@@ -590,7 +900,8 @@ class InferenceCoordinator:
         
         # Send inference requests to all nodes concurrently
         inference_tasks = [
-            self._send_inference_request(node.node_id, task.model_id, task.input_data)
+            self._send_inference_request(node.node_id, task.model_id, task.input_data,
+                                         timeout=task.timeout, task_id=task.task_id)
             for node in nodes
         ]
         
@@ -614,11 +925,23 @@ class InferenceCoordinator:
         return results
     
     async def _send_inference_request(self, node_id: str, model_id: str, 
-                                    input_data: Any, shard_id: str = None) -> Dict[str, Any]:
+                                    input_data: Any, shard_id: str = None,
+                                    timeout: float = 30.0, task_id: str = None) -> Dict[str, Any]:
         """Send inference request to specific node"""
-        # This would be replaced with actual network communication
-        # For now, simulate inference
-        await asyncio.sleep(random.uniform(0.1, 0.5))  # Simulate network + compute time
+        if self.send_request is not None and node_id != self.node_id:
+            start = time.perf_counter()
+            reply = await self.send_request(node_id, {
+                'task_id': task_id,
+                'model_id': model_id,
+                'input_data': input_data,
+                'shard_id': shard_id
+            }, timeout)
+            if reply is None:
+                return {'success': False, 'error': 'timeout', 'node_id': node_id}
+            return dict(reply, node_id=node_id, processing_time=time.perf_counter() - start)
+        
+        # No transport attached: simulate network + compute time
+        await asyncio.sleep(random.uniform(0.1, 0.5))
         
         # Simulate successful inference
         return {
@@ -649,15 +972,25 @@ class InferenceCoordinator:
 class P2PNetworkManager:
     """Main P2P network manager that coordinates all components"""
     
-    def __init__(self, node_id: str, node_type: NodeType, config: Dict[str, Any]):
+    def __init__(self, node_id: str, node_type: NodeType, config: Dict[str, Any],
+                 transport: Optional[P2PTransport] = None):
         self.node_id = node_id
         self.node_type = node_type
         self.config = config
         
         # Initialize components
-        self.dht = DistributedHashTable(node_id)
+        self.dht = DistributedHashTable(node_id, config.get('dht_k', 20), config.get('dht_stale_threshold', 3))
+        self.dht_alpha = config.get('dht_alpha', 3)
+        self.rpc_timeout = config.get('rpc_timeout', 2.0)
+        self._pending_rpcs: Dict[str, asyncio.Future] = {}
+        self._stale_checks: Dict[str, asyncio.Task] = {}
+        self._background_tasks: List[asyncio.Task] = []
         self.shard_manager = ModelShardManager(node_id)
-        self.consensus_manager = ConsensusManager(node_id)
+        self.consensus_manager = ConsensusManager(
+            node_id,
+            tolerance=config.get('consensus_tolerance', 0.01),
+            reliability=ReliabilityTracker(persist_path=config.get('reliability_path'))
+        )
         self.inference_coordinator = InferenceCoordinator(
             node_id, self.dht, self.shard_manager, self.consensus_manager
         )
@@ -666,22 +999,54 @@ class P2PNetworkManager:
         self.running = False
         self.connected_peers = {}  # peer_id -> connection_info
         self.message_handlers = {}
-        self.message_cache = {}   # message_id -> timestamp (for deduplication)
+        
+        # Broadcasts: 'gossip' relays each new message to a few random peers,
+        # 'flood' to every peer; ids seen in the last window are suppressed
+        self.broadcast_mode = config.get('broadcast_mode', 'gossip')
+        self.gossip_fanout = config.get('gossip_fanout')  # None: ln(N) + 3
+        self.seen_messages = SeenMessageFilter(
+            window=config.get('seen_window', 600.0),
+            capacity=config.get('seen_capacity', 100_000)
+        )
+        
+        # Heartbeats are reconciled by anti-entropy rounds instead of broadcast
+        self.heartbeats = HeartbeatTable(max_age=300.0)
+        self.heartbeat_interval = config.get('heartbeat_interval', 30.0)
+        self.anti_entropy_fanout = config.get('anti_entropy_fanout', 2)
         
         # Performance metrics
         self.metrics = {
             'messages_sent': 0,
             'messages_received': 0,
+            'messages_suppressed': 0,
+            'gossip_originated': 0,
+            'gossip_relayed': 0,
+            'gossip_sent': 0,
+            'anti_entropy_rounds': 0,
+            'anti_entropy_entries': 0,
             'inferences_completed': 0,
             'consensus_reached': 0,
-            'average_latency': 0.0
+            'average_latency': 0.0,
+            'dht_lookups': 0,
+            'dht_lookup_rounds': 0,
+            'dht_rpcs': 0,
+            'dht_rpc_timeouts': 0,
+            'dht_evictions': 0,
+            'inference_rpcs': 0,
+            'inference_rpc_timeouts': 0
         }
 
-        # Incoming message queue for simulated network
+        # Messages from every transport are dispatched from this queue
         self.incoming_queue: asyncio.Queue = asyncio.Queue()
 
-        # Register this node in the simulated network registry
-        SIMULATED_NETWORK[self.node_id] = self
+        # Simulated (in-process) unless configured otherwise
+        self.transport = transport or create_transport(config)
+        self.transport.bind(self, self._on_transport_message, P2PMessage.deserialize)
+        if hasattr(self.transport, 'resolve_address'):
+            self.transport.resolve_address = self._peer_address
+        self.inference_coordinator.send_request = self._send_inference_rpc
+        self.inference_coordinator.micro_batches = config.get('pipeline_micro_batches', 4)
+        self.inference_coordinator.stage_queue_size = config.get('pipeline_queue_size', 2)
         
         self._setup_message_handlers()
     
@@ -693,8 +1058,15 @@ class P2PNetworkManager:
             MessageType.MODEL_ANNOUNCE: self._handle_model_announce,
             MessageType.MODEL_REQUEST: self._handle_model_request,
             MessageType.INFERENCE_REQUEST: self._handle_inference_request,
+            MessageType.INFERENCE_RESPONSE: self._handle_rpc_response,
             MessageType.HEARTBEAT: self._handle_heartbeat,
             MessageType.NETWORK_UPDATE: self._handle_network_update,
+            MessageType.PING: self._handle_ping,
+            MessageType.FIND_NODE: self._handle_find_node,
+            MessageType.FIND_VALUE: self._handle_find_value,
+            MessageType.STORE: self._handle_store,
+            MessageType.RPC_RESPONSE: self._handle_rpc_response,
+            MessageType.ANTI_ENTROPY: self._handle_anti_entropy,
         }
     
     async def start_network(self):
@@ -702,13 +1074,15 @@ class P2PNetworkManager:
         if self.running:
             return
         
+        await self.transport.start()
         self.running = True
         
         # Start background tasks
-        asyncio.create_task(self._heartbeat_loop())
-        asyncio.create_task(self._network_maintenance_loop())
-        asyncio.create_task(self._message_cleanup_loop())
-        asyncio.create_task(self._message_dispatch_loop())
+        self._background_tasks = [
+            asyncio.create_task(self._heartbeat_loop()),
+            asyncio.create_task(self._network_maintenance_loop()),
+            asyncio.create_task(self._message_dispatch_loop())
+        ]
         
         # Announce this node to network
         await self._announce_node()
@@ -718,16 +1092,31 @@ class P2PNetworkManager:
     async def stop_network(self):
         """Stop P2P network"""
         self.running = False
-        SIMULATED_NETWORK.pop(self.node_id, None)
+        pending = self._background_tasks + list(self._stale_checks.values())
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._background_tasks = []
+        await self.inference_coordinator.close()
+        self.consensus_manager.reliability.save()
+        await self.transport.stop()
         print(f"🛑 P2P Network stopped: {self.node_id}")
     
     async def join_network(self, bootstrap_nodes: List[str]):
         """Join existing P2P network via bootstrap nodes"""
-        for bootstrap_node in bootstrap_nodes:
+        for bootstrap_entry in bootstrap_nodes:
             try:
-                # Connect to bootstrap node
+                # Connect to bootstrap node (a node id, or "host:port" over TCP)
+                bootstrap_node = await self.transport.resolve_bootstrap(bootstrap_entry)
+                if bootstrap_node is None:
+                    raise ConnectionError("unreachable")
                 await self._connect_to_peer(bootstrap_node)
                 
+                # Kademlia join: learn the bootstrap contact, then look up our
+                # own id so the nodes around us add us to their buckets
+                if await self.ping(bootstrap_node):
+                    await self.iterative_find_node(self.node_id)
+                
                 # Query for more nodes
                 query_msg = P2PMessage(
                     MessageType.NODE_QUERY,
@@ -740,7 +1129,7 @@ class P2PNetworkManager:
                 break
                 
             except Exception as e:
-                print(f"❌ Failed to connect to {bootstrap_node}: {e}")
+                print(f"❌ Failed to connect to {bootstrap_entry}: {e}")
                 continue
     
     async def announce_model(self, model_id: str, model_info: Dict[str, Any]):
@@ -759,8 +1148,9 @@ class P2PNetworkManager:
         self.dht.store_data(f"model:{model_id}", announcement)
     
     async def request_inference(self, model_id: str, input_data: Any, 
-                              priority: int = 5, timeout: float = 30.0) -> Dict[str, Any]:
-        """Request distributed inference"""
+                              priority: int = 5, timeout: float = 30.0,
+                              batched: bool = False) -> Dict[str, Any]:
+        """Request distributed inference; ``batched`` marks input_data's first axis as independent items"""
         task = InferenceTask(
             task_id=str(uuid.uuid4()),
             model_id=model_id,
@@ -768,7 +1158,8 @@ class P2PNetworkManager:
             priority=priority,
             timeout=timeout,
             created_at=time.time(),
-            client_id=self.node_id
+            client_id=self.node_id,
+            batched=batched
         )
         
         # Coordinate inference
@@ -781,9 +1172,8 @@ class P2PNetworkManager:
         
         return result
     
-    async def _announce_node(self):
-        """Announce this node to the network"""
-        capability = NodeCapability(
+    def _local_capability(self) -> NodeCapability:
+        return NodeCapability(
             node_id=self.node_id,
             node_type=self.node_type,
             models=self.config.get('models', []),
@@ -792,13 +1182,16 @@ class P2PNetworkManager:
             bandwidth_mbps=self.config.get('bandwidth_mbps', 100.0),
             gpu_available=self.config.get('gpu_available', False),
             reliability_score=1.0,
-            last_seen=time.time()
+            last_seen=time.time(),
+            address=self.transport.address
         )
-        
+    
+    async def _announce_node(self):
+        """Announce this node to the network"""
         announcement_msg = P2PMessage(
             MessageType.NODE_ANNOUNCE,
             self.node_id,
-            asdict(capability)
+            capability_to_dict(self._local_capability())
         )
         
         await self._broadcast_message(announcement_msg)
@@ -807,22 +1200,30 @@ class P2PNetworkManager:
         """Send periodic heartbeats"""
         while self.running:
             try:
-                heartbeat_msg = P2PMessage(
-                    MessageType.HEARTBEAT,
-                    self.node_id,
-                    {
-                        'timestamp': time.time(),
-                        'load': self._get_current_load(),
-                        'active_inferences': len(self.inference_coordinator.active_inferences)
-                    }
-                )
-                await self._broadcast_message(heartbeat_msg)
-                
-                await asyncio.sleep(30)  # Heartbeat every 30 seconds
+                await self._anti_entropy_round()
+                await asyncio.sleep(self.heartbeat_interval)
                 
             except Exception as e:
                 logging.error(f"Heartbeat error: {e}")
-                await asyncio.sleep(30)
+                await asyncio.sleep(self.heartbeat_interval)
+    
+    async def _anti_entropy_round(self):
+        """Refresh our heartbeat and push our digest to a few random peers"""
+        own = {
+            'timestamp': time.time(),
+            'load': self._get_current_load(),
+            'active_inferences': len(self.inference_coordinator.active_inferences)
+        }
+        self.heartbeats.update(self.node_id, own)
+        peers = list(self.connected_peers)
+        if not peers:
+            return
+        self.metrics['anti_entropy_rounds'] += 1
+        digest = self.heartbeats.digest()
+        for peer_id in random.sample(peers, min(self.anti_entropy_fanout, len(peers))):
+            await self._send_message(peer_id, P2PMessage(
+                MessageType.HEARTBEAT, self.node_id, dict(own, digest=digest)
+            ))
     
     async def _network_maintenance_loop(self):
         """Periodic network maintenance"""
@@ -836,7 +1237,7 @@ class P2PNetworkManager:
                 ]
                 
                 for node_id in stale_nodes:
-                    del self.dht.node_info[node_id]
+                    self.dht.remove_node(node_id)
                     if node_id in self.connected_peers:
                         del self.connected_peers[node_id]
                 
@@ -850,25 +1251,6 @@ class P2PNetworkManager:
                 logging.error(f"Network maintenance error: {e}")
                 await asyncio.sleep(60)
     
-    async def _message_cleanup_loop(self):
-        """Clean up old messages from cache"""
-        while self.running:
-            try:
-                current_time = time.time()
-                old_messages = [
-                    msg_id for msg_id, timestamp in self.message_cache.items()
-                    if current_time - timestamp > 3600  # 1 hour
-                ]
-                
-                for msg_id in old_messages:
-                    del self.message_cache[msg_id]
-                
-                await asyncio.sleep(300)  # Cleanup every 5 minutes
-                
-            except Exception as e:
-                logging.error(f"Message cleanup error: {e}")
-                await asyncio.sleep(300)
-
     async def _message_dispatch_loop(self):
         """Process incoming messages from peers"""
         while self.running:
@@ -876,6 +1258,12 @@ class P2PNetworkManager:
                 peer_id, message = await self.incoming_queue.get()
                 handler = self.message_handlers.get(message.type)
                 self.metrics['messages_received'] += 1
+                # Any message is proof of life for the peer that delivered it;
+                # a relayed broadcast says nothing about its originator
+                self.dht.touch(peer_id)
+                # Relay broadcasts on first sight; drop repeats
+                if message.type in GOSSIP_MESSAGE_TYPES and not await self._broadcast_message(message, peer_id):
+                    continue
                 if handler:
                     await handler(message)
             except Exception as e:
@@ -884,12 +1272,11 @@ class P2PNetworkManager:
     async def _handle_node_announce(self, message: P2PMessage):
         """Handle node announcement"""
         try:
-            capability_data = message.data
-            capability = NodeCapability(**capability_data)
+            capability = capability_from_dict(message.data)
             capability.last_seen = time.time()
             
             # Add to DHT
-            self.dht.add_node(capability)
+            self._learn_contact(capability)
             
             # Connect if not already connected
             if capability.node_id not in self.connected_peers:
@@ -912,7 +1299,7 @@ class P2PNetworkManager:
                 response_msg = P2PMessage(
                     MessageType.NODE_RESPONSE,
                     self.node_id,
-                    {'peers': [asdict(peer) for peer in known_peers]}
+                    {'peers': [capability_to_dict(peer) for peer in known_peers]}
                 )
                 
                 await self._send_message(message.sender_id, response_msg)
@@ -928,6 +1315,7 @@ class P2PNetworkManager:
             
             # Store in DHT
             self.dht.store_data(f"model:{model_id}", announcement)
+            self.dht.add_model(announcement.get('node_id', message.sender_id), model_id)
             
         except Exception as e:
             logging.error(f"Error handling model announcement: {e}")
@@ -951,15 +1339,15 @@ class P2PNetworkManager:
                 request_data['input_data']
             )
             
-            response_msg = P2PMessage(
-                MessageType.INFERENCE_RESPONSE,
-                self.node_id,
-                {
-                    'task_id': request_data['task_id'],
-                    'result': result,
-                    'success': True
-                }
-            )
+            response = {
+                'task_id': request_data['task_id'],
+                'result': result,
+                'success': True
+            }
+            if 'rpc_id' in request_data:
+                self._learn_requester(message)
+                response['in_reply_to'] = request_data['rpc_id']
+            response_msg = P2PMessage(MessageType.INFERENCE_RESPONSE, self.node_id, response)
             
             await self._send_message(message.sender_id, response_msg)
             
@@ -969,21 +1357,216 @@ class P2PNetworkManager:
     async def _handle_heartbeat(self, message: P2PMessage):
         """Handle heartbeat message"""
         try:
-            # Update node's last seen time
-            sender_id = message.sender_id
-            if sender_id in self.dht.node_info:
-                self.dht.node_info[sender_id].last_seen = time.time()
+            # Update node's last seen time and load
+            data = message.data
+            self.dht.record_heartbeat(message.sender_id, data.get('load'))
+            if 'timestamp' in data:
+                self.heartbeats.update(message.sender_id, {
+                    'timestamp': data['timestamp'],
+                    'load': data.get('load'),
+                    'active_inferences': data.get('active_inferences', 0)
+                })
+            
+            # Anti-entropy push: answer with what the sender is missing and
+            # ask for what it knows better
+            digest = data.get('digest')
+            if digest is not None:
+                entries = self.heartbeats.newer_than(digest)
+                want = self.heartbeats.behind_on(digest)
+                if entries or want:
+                    await self._send_message(message.sender_id, P2PMessage(
+                        MessageType.ANTI_ENTROPY, self.node_id, {'entries': entries, 'want': want}
+                    ))
             
         except Exception as e:
             logging.error(f"Error handling heartbeat: {e}")
     
+    async def _handle_anti_entropy(self, message: P2PMessage):
+        """Merge pulled heartbeats and send back any that were asked for"""
+        try:
+            for node_id, entry in message.data.get('entries', {}).items():
+                if node_id != self.node_id and self.heartbeats.update(node_id, entry):
+                    self.metrics['anti_entropy_entries'] += 1
+                    self.dht.record_heartbeat(node_id, entry.get('load'), seen_at=entry['timestamp'])
+            
+            want = message.data.get('want')
+            if want:
+                entries = {n: self.heartbeats.entries[n] for n in want if n in self.heartbeats.entries}
+                await self._send_message(message.sender_id, P2PMessage(
+                    MessageType.ANTI_ENTROPY, self.node_id, {'entries': entries, 'want': []}
+                ))
+        
+        except Exception as e:
+            logging.error(f"Error handling anti-entropy: {e}")
+    
     async def _handle_network_update(self, message: P2PMessage):
         """Handle network update message"""
         pass
     
+    # Kademlia RPCs and iterative lookups
+    
+    def _learn_contact(self, capability: NodeCapability):
+        """Add a contact; if its bucket is full, ping the stalest entry in the background"""
+        stale_id = self.dht.add_node(capability)
+        if stale_id is not None and stale_id not in self._stale_checks:
+            # One check per contact at a time; the reference keeps the task alive
+            task = asyncio.create_task(self._check_stale_contact(stale_id))
+            self._stale_checks[stale_id] = task
+            task.add_done_callback(lambda t, node_id=stale_id: self._stale_check_done(node_id, t))
+    
+    def _stale_check_done(self, node_id: str, task: asyncio.Task):
+        self._stale_checks.pop(node_id, None)
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"Stale contact check for {node_id} failed: {task.exception()}")
+    
+    async def _check_stale_contact(self, node_id: str):
+        if await self.ping(node_id):
+            self.dht.touch(node_id)
+        else:
+            self._record_contact_failure(node_id)
+    
+    def _record_contact_failure(self, node_id: str):
+        if self.dht.record_failure(node_id):
+            self.metrics['dht_evictions'] += 1
+    
+    async def _rpc(self, peer_id: str, msg_type: MessageType, data: Dict[str, Any],
+                   timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Send a request and wait for the reply carrying its rpc_id, or None on timeout"""
+        rpc_id = str(uuid.uuid4())
+        future = asyncio.get_running_loop().create_future()
+        self._pending_rpcs[rpc_id] = future
+        kind = 'inference' if msg_type == MessageType.INFERENCE_REQUEST else 'dht'
+        self.metrics[f'{kind}_rpcs'] += 1
+        request = dict(data, rpc_id=rpc_id, contact=capability_to_dict(self._local_capability()))
+        try:
+            await self._send_message(peer_id, P2PMessage(msg_type, self.node_id, request))
+            return await asyncio.wait_for(future, timeout=timeout or self.rpc_timeout)
+        except asyncio.TimeoutError:
+            self.metrics[f'{kind}_rpc_timeouts'] += 1
+            return None
+        finally:
+            self._pending_rpcs.pop(rpc_id, None)
+    
+    async def _reply(self, request: P2PMessage, data: Dict[str, Any]):
+        response = P2PMessage(MessageType.RPC_RESPONSE, self.node_id,
+                              dict(data, in_reply_to=request.data['rpc_id'],
+                                   contact=capability_to_dict(self._local_capability())))
+        await self._send_message(request.sender_id, response)
+    
+    def _learn_requester(self, message: P2PMessage):
+        contact = message.data.get('contact')
+        if contact:
+            capability = capability_from_dict(contact)
+            capability.last_seen = time.time()
+            self._learn_contact(capability)
+    
+    async def _send_inference_rpc(self, peer_id: str, data: Dict[str, Any],
+                                  timeout: float) -> Optional[Dict[str, Any]]:
+        return await self._rpc(peer_id, MessageType.INFERENCE_REQUEST, data, timeout=timeout)
+    
+    async def ping(self, peer_id: str) -> bool:
+        return await self._rpc(peer_id, MessageType.PING, {}) is not None
+    
+    async def iterative_find_node(self, target_key: str) -> List[NodeCapability]:
+        """The k live nodes closest to ``target_key`` network-wide"""
+        contacts, _ = await self._iterative_lookup(target_key, find_value=False)
+        return contacts
+    
+    async def iterative_find_value(self, key: str) -> Optional[Any]:
+        """Value stored under ``key`` here or on the nodes closest to it"""
+        local = self.dht.get_data(key)
+        if local is not None:
+            return local
+        _, value = await self._iterative_lookup(key, find_value=True)
+        return value
+    
+    async def dht_store(self, key: str, value: Any) -> int:
+        """Store locally and on the k nodes closest to ``key``; returns how many accepted"""
+        self.dht.store_data(key, value)
+        nodes = await self.iterative_find_node(key)
+        replies = await asyncio.gather(*(
+            self._rpc(node.node_id, MessageType.STORE, {'key': key, 'value': value}) for node in nodes
+        ))
+        return sum(1 for reply in replies if reply is not None)
+    
+    async def _iterative_lookup(self, target_key: str, find_value: bool) -> Tuple[List[NodeCapability], Optional[Any]]:
+        """Kademlia node lookup: query the alpha closest unqueried contacts in parallel
+        until the k closest known contacts have all answered"""
+        k = self.dht.k_bucket_size
+        target = _key_digest(target_key)
+        distance = lambda node_id: _key_digest(node_id) ^ target
+        
+        known: Dict[str, NodeCapability] = {c.node_id: c for c in self.dht.find_closest_nodes(target_key, k)}
+        queried: Set[str] = set()
+        failed: Set[str] = set()
+        msg_type = MessageType.FIND_VALUE if find_value else MessageType.FIND_NODE
+        self.metrics['dht_lookups'] += 1
+        
+        while True:
+            shortlist = heapq.nsmallest(k, (n for n in known if n not in failed), key=distance)
+            batch = [n for n in shortlist if n not in queried][:self.dht_alpha]
+            if not batch:
+                return [known[n] for n in shortlist], None
+            
+            self.metrics['dht_lookup_rounds'] += 1
+            queried.update(batch)
+            replies = await asyncio.gather(*(self._rpc(n, msg_type, {'target': target_key}) for n in batch))
+            for node_id, reply in zip(batch, replies):
+                if reply is None:
+                    failed.add(node_id)
+                    self._record_contact_failure(node_id)
+                    continue
+                if find_value and reply.get('found'):
+                    return [known[n] for n in shortlist], reply.get('value')
+                for contact in reply.get('contacts', []):
+                    capability = capability_from_dict(contact)
+                    if capability.node_id != self.node_id and capability.node_id not in known:
+                        known[capability.node_id] = capability
+                        self._learn_contact(capability)
+    
+    async def _handle_ping(self, message: P2PMessage):
+        self._learn_requester(message)
+        await self._reply(message, {})
+    
+    async def _handle_find_node(self, message: P2PMessage):
+        self._learn_requester(message)
+        contacts = self.dht.find_closest_nodes(message.data['target'], self.dht.k_bucket_size)
+        await self._reply(message, {
+            'contacts': [capability_to_dict(c) for c in contacts if c.node_id != message.sender_id]
+        })
+    
+    async def _handle_find_value(self, message: P2PMessage):
+        key = message.data['target']
+        if key in self.dht.data_store:
+            self._learn_requester(message)
+            await self._reply(message, {'found': True, 'value': self.dht.get_data(key)})
+        else:
+            await self._handle_find_node(message)
+    
+    async def _handle_store(self, message: P2PMessage):
+        self._learn_requester(message)
+        self.dht.store_data(message.data['key'], message.data['value'])
+        await self._reply(message, {'stored': True})
+    
+    async def _handle_rpc_response(self, message: P2PMessage):
+        future = self._pending_rpcs.get(message.data.get('in_reply_to'))
+        if future is not None and not future.done():
+            self._learn_requester(message)
+            future.set_result(message.data)
+    
+    # Transport
+    
+    def _peer_address(self, peer_id: str) -> Optional[str]:
+        capability = self.dht.node_info.get(peer_id)
+        return capability.address if capability is not None else None
+    
+    async def _on_transport_message(self, peer_id: str, message: P2PMessage):
+        await self.incoming_queue.put((peer_id, message))
+    
     async def _connect_to_peer(self, peer_id: str):
         """Connect to a peer"""
-        # Simulate connection establishment
+        if peer_id == self.node_id or not await self.transport.connect(peer_id):
+            return
         self.connected_peers[peer_id] = {
             'connected_at': time.time(),
             'last_message': time.time(),
@@ -992,38 +1575,41 @@ class P2PNetworkManager:
     
     async def _send_message(self, peer_id: str, message: P2PMessage):
         """Send message to specific peer"""
-        # Simulate message sending
-        self.metrics['messages_sent'] += 1
-
-        # In real implementation, this would send over network
-        # For simulation, deliver to peer's incoming queue if available
-        peer = SIMULATED_NETWORK.get(peer_id)
-        if peer:
-            await peer.incoming_queue.put((self.node_id, message))
-        else:
-            logging.warning(f"Peer {peer_id} not reachable")
+        if await self.transport.send(peer_id, message):
+            self.metrics['messages_sent'] += 1
     
-    async def _broadcast_message(self, message: P2PMessage):
-        """Broadcast message to all connected peers"""
+    async def _broadcast_message(self, message: P2PMessage, received_from: Optional[str] = None) -> bool:
+        """Send a new broadcast, or relay one received from a peer, to the
+        next peers; returns False (and sends nothing) if it was seen before"""
         # Prevent infinite loops
-        if message.message_id in self.message_cache:
-            return
-        
-        self.message_cache[message.message_id] = time.time()
+        if not self.seen_messages.add(message.message_id):
+            self.metrics['messages_suppressed'] += 1
+            return False
+        self.metrics['gossip_relayed' if received_from else 'gossip_originated'] += 1
         
-        # Decrement TTL
-        message.ttl -= 1
-        if message.ttl <= 0:
-            return
+        # Decrement TTL on our own copy; a received message may be shared
+        relay = message.copy() if received_from else message
+        relay.ttl -= 1
+        if relay.ttl <= 0:
+            return True
         
         # Add this node to path
-        if self.node_id not in message.path:
-            message.path.append(self.node_id)
-        
-        # Send to all connected peers
-        for peer_id in self.connected_peers.keys():
-            if peer_id not in message.path:  # Avoid loops
-                await self._send_message(peer_id, message)
+        visited = set(relay.path)
+        if self.node_id not in visited:
+            relay.path.append(self.node_id)
+            visited.add(self.node_id)
+        visited.add(received_from)
+        
+        peers = [peer_id for peer_id in self.connected_peers if peer_id not in visited]
+        if self.broadcast_mode == 'gossip':
+            fanout = self.gossip_fanout or gossip_fanout(len(self.connected_peers))
+            if len(peers) > fanout:
+                peers = random.sample(peers, fanout)
+        
+        for peer_id in peers:
+            await self._send_message(peer_id, relay)
+        self.metrics['gossip_sent'] += len(peers)
+        return True
     
     def _get_current_load(self) -> float:
         """Get current node load (0.0 to 1.0)"""
@@ -1041,6 +1627,15 @@ class P2PNetworkManager:
             'local_shards': len(self.shard_manager.local_shards),
             'active_inferences': len(self.inference_coordinator.active_inferences),
             'metrics': self.metrics,
+            'transport': self.transport.get_stats(),
+            'pipelines': self.inference_coordinator.get_pipeline_stats(),
+            'consensus': self.consensus_manager.get_stats(),
+            'gossip': {
+                'mode': self.broadcast_mode,
+                'fanout': self.gossip_fanout or gossip_fanout(len(self.connected_peers)),
+                'seen_filter_bytes': self.seen_messages.memory_bytes,
+                'heartbeats_known': len(self.heartbeats.entries)
+            },
             'network_health': self._calculate_network_health()
         }
     
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+ultimate_agent/network/p2p/gossip.py
+Duplicate suppression and anti-entropy state for epidemic broadcast
+"""
+
+import hashlib
+import math
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable
+
+
+def gossip_fanout(peer_count: int, extra: int = 3) -> int:
+    """Peers to forward each new message to: ln(N) + ``extra``.
+
+    With every node forwarding once to ln(N) + c random peers, the chance
+    that some node is missed falls off as exp(-exp(-c)), while the total
+    number of sends stays O(N log N) instead of the O(N^2) of flooding.
+    """
+    if peer_count <= 0:
+        return 0
+    return min(peer_count, int(math.ceil(math.log(peer_count + 1))) + extra)
+
+
+class SeenMessageFilter:
+    """Time-bucketed Bloom filter of recently seen message ids.
+
+    ``window`` seconds are split into ``buckets`` filters; ids are added to
+    the newest one and an id counts as seen if any bucket holds it. Whole
+    buckets expire as the window slides, so memory is fixed no matter how
+    many messages pass through. Each bucket is sized for ``capacity`` ids
+    at ``error_rate`` false positives; a false positive only means one
+    relay of a message is skipped, which gossip redundancy absorbs.
+    """
+
+    def __init__(self, window: float = 600.0, buckets: int = 4, capacity: int = 100_000,
+                 error_rate: float = 1e-4, clock: Callable[[], float] = time.monotonic):
+        self.bucket_span = window / max(1, buckets)
+        self.clock = clock
+        self.bits = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.bits / capacity * math.log(2))))
+        self._buckets: deque = deque(maxlen=max(1, buckets))
+        self._bucket_started = 0.0
+        self._rotate(force=True)
+
+    def _rotate(self, force: bool = False):
+        now = self.clock()
+        if force:
+            self._buckets.append(bytearray(self.bits // 8 + 1))
+            self._bucket_started = now
+            return
+        # Several idle spans may have passed; clear at most all buckets
+        for _ in range(self._buckets.maxlen):
+            if now - self._bucket_started < self.bucket_span:
+                break
+            self._buckets.append(bytearray(self.bits // 8 + 1))
+            self._bucket_started += self.bucket_span
+        if now - self._bucket_started >= self.bucket_span:
+            # Idle for longer than the whole window: every bucket was just
+            # cleared, so the newest one starts now
+            self._bucket_started = now
+
+    def _positions(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def _seen(self, positions: List[int]) -> bool:
+        self._rotate()
+        return any(all(bucket[p >> 3] & (1 << (p & 7)) for p in positions) for bucket in self._buckets)
+
+    def __contains__(self, key: str) -> bool:
+        return self._seen(self._positions(key))
+
+    def add(self, key: str) -> bool:
+        """Record ``key``; returns False if it was already seen"""
+        positions = self._positions(key)
+        if self._seen(positions):
+            return False
+        bucket = self._buckets[-1]
+        for p in positions:
+            bucket[p >> 3] |= 1 << (p & 7)
+        return True
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(len(bucket) for bucket in self._buckets)
+
+
+class HeartbeatTable:
+    """Latest heartbeat per node, reconciled by push-pull anti-entropy.
+
+    A round sends a digest ({node_id: timestamp}) to a few random peers.
+    The peer answers with every entry that is newer than the digest and
+    asks for the ones it is behind on; the initiator then sends those. Each
+    node's heartbeat reaches the whole fleet in O(log N) rounds at O(N)
+    messages per round, instead of being flooded to everyone.
+    """
+
+    def __init__(self, max_age: float = 300.0):
+        self.max_age = max_age
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+    def update(self, node_id: str, entry: Dict[str, Any]) -> bool:
+        """Store ``entry`` if it is newer than what we have"""
+        current = self.entries.get(node_id)
+        if current is not None and current['timestamp'] >= entry['timestamp']:
+            return False
+        self.entries[node_id] = entry
+        return True
+
+    def prune(self, now: Optional[float] = None):
+        cutoff = (now or time.time()) - self.max_age
+        for node_id in [n for n, e in self.entries.items() if e['timestamp'] < cutoff]:
+            del self.entries[node_id]
+
+    def digest(self) -> Dict[str, float]:
+        self.prune()
+        return {node_id: entry['timestamp'] for node_id, entry in self.entries.items()}
+
+    def newer_than(self, digest: Dict[str, float]) -> Dict[str, Dict[str, Any]]:
+        """Our entries the digest's owner is missing or behind on"""
+        return {node_id: entry for node_id, entry in self.entries.items()
+                if entry['timestamp'] > digest.get(node_id, 0.0)}
+
+    def behind_on(self, digest: Dict[str, float]) -> List[str]:
+        """Node ids the digest's owner has fresher heartbeats for"""
+        return [node_id for node_id, timestamp in digest.items()
+                if timestamp > self.entries.get(node_id, {}).get('timestamp', 0.0)]
+
+
+__all__ = ['SeenMessageFilter', 'HeartbeatTable', 'gossip_fanout']
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+ultimate_agent/network/p2p/pipeline.py
+Micro-batched pipeline-parallel execution over a chain of shard nodes
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, List, Callable, Awaitable, Optional
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:  # pragma: no cover - optional dependency
+    np = None
+    NUMPY_AVAILABLE = False
+
+
+def split_micro_batches(data: Any, count: int) -> List[Any]:
+    """Split a batch along its first axis into at most ``count`` parts.
+
+    Only call this for inputs whose first axis holds independent items;
+    anything without one (scalars, dicts) comes back as a single part.
+    """
+    if NUMPY_AVAILABLE and isinstance(data, np.ndarray) and data.ndim > 0:
+        count = max(1, min(count, len(data)))
+        return [part for part in np.array_split(data, count) if len(part)]
+    if isinstance(data, (list, tuple)) and data:
+        count = max(1, min(count, len(data)))
+        size = -(-len(data) // count)
+        return [list(data[i:i + size]) for i in range(0, len(data), size)]
+    return [data]
+
+
+def _same(a: Any, b: Any) -> bool:
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+
+def merge_micro_batches(parts: List[Any], _field: bool = False) -> Any:
+    """Join per-micro-batch outputs back along the batch axis.
+
+    Lists and arrays are concatenated and dicts merged key by key; inside a
+    dict, a value every part agrees on (e.g. a model name) is kept once.
+    Raises ValueError when the outputs have no batch axis to join on.
+    """
+    if len(parts) == 1:
+        return parts[0]
+    first = parts[0]
+    if all(isinstance(part, (list, tuple)) for part in parts):
+        return [item for part in parts for item in part]
+    if NUMPY_AVAILABLE and all(isinstance(part, np.ndarray) and part.ndim > 0 for part in parts):
+        return np.concatenate(parts)
+    if all(isinstance(part, dict) for part in parts):
+        if any(part.keys() != first.keys() for part in parts):
+            raise ValueError("micro-batch outputs have different keys")
+        return {key: merge_micro_batches([part[key] for part in parts], _field=True) for key in first}
+    if _field and all(_same(part, first) for part in parts[1:]):
+        return first
+    raise ValueError(f"{type(first).__name__} outputs have no batch axis")
+
+
+class _StageStats:
+    __slots__ = ('busy_time', 'processed', 'failures', 'latencies', 'queue_high_water')
+
+    def __init__(self):
+        self.busy_time = 0.0
+        self.processed = 0
+        self.failures = 0
+        self.latencies: deque = deque(maxlen=256)
+        self.queue_high_water = 0
+
+
+class PipelineExecutor:
+    """GPipe-style executor for one chain of stages.
+
+    Every stage has a worker that takes micro-batches from a bounded queue
+    (``queue_size``), runs them through ``run_stage(stage_index, data, context)`` and
+    hands the output to the next stage's queue. While stage ``i`` works on
+    micro-batch ``n``, stage ``i - 1`` already works on ``n + 1``, so with
+    enough micro-batches in flight every stage is busy. A full queue blocks
+    the stage in front of it, which bounds memory per stage.
+
+    Micro-batches from concurrent requests share the same workers, so a
+    window of small requests fills the pipeline just like one split request.
+
+    ``run_stage`` returns the stage output or raises; a failure resolves that
+    micro-batch's future with the exception and skips the remaining stages.
+    ``context`` is whatever the caller passed to ``run`` (e.g. the task whose
+    timeout and id the stage requests should carry).
+    """
+
+    def __init__(self, stage_names: List[str],
+                 run_stage: Callable[[int, Any, Any], Awaitable[Any]], queue_size: int = 2):
+        self.stage_names = list(stage_names)
+        self.run_stage = run_stage
+        self.queue_size = max(1, int(queue_size))
+        self.queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stage_names]
+        self.stage_stats = [_StageStats() for _ in self.stage_names]
+        self._workers = [asyncio.create_task(self._stage_worker(i)) for i in range(len(self.stage_names))]
+
+        # Time during which at least one micro-batch was in flight
+        self._in_flight = 0
+        self._active_since = 0.0
+        self._active_time = 0.0
+        self.completed = 0
+        self.failed = 0
+        self.requests = 0
+
+    async def run(self, micro_batches: List[Any], context: Any = None) -> List[Any]:
+        """Push micro-batches through every stage; outputs in input order"""
+        self.requests += 1
+        loop = asyncio.get_running_loop()
+        futures = []
+        try:
+            for data in micro_batches:
+                future = loop.create_future()
+                futures.append(future)
+                self._begin()
+                try:
+                    await self._put(0, (data, future, context))
+                except BaseException:
+                    # Never queued, so no worker will account for it
+                    self._leave()
+                    raise
+            return list(await asyncio.gather(*futures))
+        except BaseException:
+            # Let the workers skip this request's remaining micro-batches
+            for future in futures:
+                future.cancel()
+            raise
+
+    async def _put(self, index: int, item):
+        queue = self.queues[index]
+        await queue.put(item)
+        stats = self.stage_stats[index]
+        stats.queue_high_water = max(stats.queue_high_water, queue.qsize())
+
+    def _begin(self):
+        if self._in_flight == 0:
+            self._active_since = time.perf_counter()
+        self._in_flight += 1
+
+    def _leave(self):
+        self._in_flight -= 1
+        if self._in_flight == 0:
+            self._active_time += time.perf_counter() - self._active_since
+
+    def _finish(self, future: asyncio.Future, result: Any = None, error: Optional[BaseException] = None):
+        self._leave()
+        if error is not None:
+            self.failed += 1
+            if not future.done():
+                future.set_exception(error)
+        else:
+            self.completed += 1
+            if not future.done():
+                future.set_result(result)
+
+    async def _stage_worker(self, index: int):
+        queue = self.queues[index]
+        stats = self.stage_stats[index]
+        last = index == len(self.stage_names) - 1
+        while True:
+            data, future, context = await queue.get()
+            if future.done():
+                # The request already failed or was cancelled
+                self._leave()
+                continue
+            try:
+                await self._process(index, stats, last, data, future, context)
+            except asyncio.CancelledError:
+                # Closed mid-stage or while waiting on the next queue
+                self._finish(future, error=RuntimeError("Pipeline closed"))
+                raise
+
+    async def _process(self, index: int, stats: _StageStats, last: bool, data: Any,
+                       future: asyncio.Future, context: Any):
+        start = time.perf_counter()
+        try:
+            output = await self.run_stage(index, data, context)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            stats.failures += 1
+            self._finish(future, error=e)
+            return
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.busy_time += elapsed
+            stats.latencies.append(elapsed)
+        stats.processed += 1
+        if last:
+            self._finish(future, result=output)
+        else:
+            await self._put(index + 1, (output, future, context))
+
+    def _active_seconds(self) -> float:
+        active = self._active_time
+        if self._in_flight:
+            active += time.perf_counter() - self._active_since
+        return active
+
+    def get_stats(self) -> Dict[str, Any]:
+        active = self._active_seconds()
+        stages = []
+        for name, queue, stats in zip(self.stage_names, self.queues, self.stage_stats):
+            latencies = sorted(stats.latencies)
+            bubble = max(0.0, active - stats.busy_time)
+            stages.append({
+                'node_id': name,
+                'processed': stats.processed,
+                'failures': stats.failures,
+                'avg_latency': sum(latencies) / len(latencies) if latencies else 0.0,
+                'p95_latency': latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+                'busy_time': stats.busy_time,
+                'bubble_time': bubble,
+                'utilization': stats.busy_time / active if active else 0.0,
+                'throughput': stats.processed / active if active else 0.0,
+                'queue_depth': queue.qsize(),
+                'queue_high_water': stats.queue_high_water
+            })
+        return {
+            'stages': stages,
+            'requests': self.requests,
+            'micro_batches_completed': self.completed,
+            'micro_batches_failed': self.failed,
+            'in_flight': self._in_flight,
+            'active_time': active,
+            'throughput': self.completed / active if active else 0.0,
+            'bubble_fraction': (sum(s['bubble_time'] for s in stages) / (active * len(stages))
+                                if active and stages else 0.0)
+        }
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        # Fail anything still queued so callers are not left waiting
+        for queue in self.queues:
+            while not queue.empty():
+                _, future, _ = queue.get_nowait()
+                self._finish(future, error=RuntimeError("Pipeline closed"))
+        logging.debug(f"Pipeline {' -> '.join(self.stage_names)} closed")
+
+
+__all__ = ['PipelineExecutor', 'split_micro_batches', 'merge_micro_batches']
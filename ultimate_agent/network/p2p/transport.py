@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+ultimate_agent/network/p2p/transport.py
+Pluggable transports that carry P2PMessages between nodes
+"""
+
+import asyncio
+import logging
+import random
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+# In-memory registry for simulated networking between nodes
+SIMULATED_NETWORK: Dict[str, Any] = {}
+
+P2P_MESSAGE_TYPE = "p2p"
+
+
+class P2PTransport:
+    """Interface between P2PNetworkManager and the wire.
+
+    ``bind`` is called once by the manager with its node id, a coroutine
+    ``on_receive(peer_id, message)`` for inbound messages and a ``decode``
+    function turning wire bytes back into a message.
+    """
+
+    address: Optional[str] = None
+
+    def bind(self, manager, on_receive: Callable[[str, Any], Awaitable[None]],
+             decode: Callable[[bytes], Any]):
+        self.manager = manager
+        self.node_id = manager.node_id
+        self.on_receive = on_receive
+        self.decode = decode
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def resolve_bootstrap(self, entry: str) -> Optional[str]:
+        """Turn a bootstrap entry into a connected peer id"""
+        return entry if await self.connect(entry) else None
+
+    async def connect(self, peer_id: str) -> bool:
+        raise NotImplementedError
+
+    async def send(self, peer_id: str, message) -> bool:
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class SimulatedTransport(P2PTransport):
+    """Delivers message objects straight into peers' queues in this process"""
+
+    def bind(self, manager, on_receive, decode):
+        super().bind(manager, on_receive, decode)
+        SIMULATED_NETWORK[self.node_id] = manager
+
+    async def stop(self):
+        SIMULATED_NETWORK.pop(self.node_id, None)
+
+    async def connect(self, peer_id: str) -> bool:
+        return peer_id in SIMULATED_NETWORK
+
+    async def send(self, peer_id: str, message) -> bool:
+        peer = SIMULATED_NETWORK.get(peer_id)
+        if peer is None:
+            logging.warning(f"Peer {peer_id} not reachable")
+            return False
+        await peer.incoming_queue.put((self.node_id, message))
+        return True
+
+
+class _PeerChannel:
+    """Outbound queue for one peer, drained by a single writer task"""
+
+    def __init__(self):
+        self.frames: deque = deque()
+        self.queued_bytes = 0
+        self.wakeup = asyncio.Event()
+        self.writer_task: Optional[asyncio.Task] = None
+
+
+class TCPTransport(P2PTransport):
+    """P2P messages over persistent AdvancedNetworkManager TCP connections.
+
+    Each peer gets a bounded send queue (``max_queue_bytes``) drained by one
+    writer task, which writes everything queued since its last write in a
+    single batch. A lost connection is re-dialed with exponential backoff
+    while messages keep queuing; once ``max_reconnect_attempts`` dials in a
+    row fail, the queue is dropped.
+
+    Peer addresses ("host:port") come from ``resolve_address`` (normally the
+    ``address`` of the peer's NodeCapability) or from bootstrap entries.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, secret: Optional[bytes] = None,
+                 advertise_host: Optional[str] = None,
+                 max_queue_bytes: int = 8 * 1024 * 1024,
+                 max_batch_bytes: int = 1024 * 1024,
+                 max_reconnect_attempts: int = 6,
+                 reconnect_base_delay: float = 0.1,
+                 reconnect_max_delay: float = 5.0):
+        if not secret:
+            # AdvancedNetworkManager would otherwise pick a random per-node
+            # key, and no two nodes could ever authenticate each other
+            raise ValueError("TCPTransport requires a secret shared by all nodes")
+        self.host = host
+        self.port = port
+        self.secret = secret
+        self.advertise_host = advertise_host or ("127.0.0.1" if host in ("0.0.0.0", "") else host)
+        self.max_queue_bytes = max_queue_bytes
+        self.max_batch_bytes = max_batch_bytes
+        self.max_reconnect_attempts = max_reconnect_attempts
+        self.reconnect_base_delay = reconnect_base_delay
+        self.reconnect_max_delay = reconnect_max_delay
+
+        self.network = None
+        self.addresses: Dict[str, str] = {}
+        self.resolve_address: Callable[[str], Optional[str]] = lambda peer_id: None
+        self._channels: Dict[str, _PeerChannel] = {}
+        self._running = False
+
+        self.stats = {
+            'frames_sent': 0,
+            'batches_sent': 0,
+            'bytes_sent': 0,
+            'dropped_frames': 0,
+            'reconnects': 0,
+            'connect_failures': 0
+        }
+
+    def bind(self, manager, on_receive, decode):
+        from ..advanced.network_manager import AdvancedNetworkManager
+
+        super().bind(manager, on_receive, decode)
+        self.network = AdvancedNetworkManager(self.node_id, listen_port=self.port,
+                                              secret=self.secret, host=self.host)
+        self.network.register_handler(P2P_MESSAGE_TYPE, self._on_network_message)
+
+    async def start(self):
+        self.port = await self.network.start()
+        self.address = f"{self.advertise_host}:{self.port}"
+        self._running = True
+
+    async def stop(self):
+        self._running = False
+        for channel in self._channels.values():
+            if channel.writer_task is not None:
+                channel.writer_task.cancel()
+        await asyncio.gather(*(c.writer_task for c in self._channels.values() if c.writer_task),
+                             return_exceptions=True)
+        self._channels.clear()
+        await self.network.stop()
+
+    async def _on_network_message(self, network_message):
+        try:
+            message = self.decode(network_message.payload)
+        except Exception as e:
+            logging.warning(f"Dropping undecodable frame from {network_message.sender_id}: {e}")
+            return
+        await self.on_receive(network_message.sender_id, message)
+
+    async def resolve_bootstrap(self, entry: str) -> Optional[str]:
+        if ":" in entry and entry not in self.network.connections:
+            host, port = entry.rsplit(":", 1)
+            peer_id = await self.network.connect_address(host, int(port))
+            if peer_id:
+                self.addresses[peer_id] = entry
+            return peer_id
+        return entry if await self.connect(entry) else None
+
+    async def connect(self, peer_id: str) -> bool:
+        if peer_id in self.network.connections:
+            return True
+        address = self.addresses.get(peer_id) or self.resolve_address(peer_id)
+        if not address:
+            return False
+        host, port = address.rsplit(":", 1)
+        connected = await self.network.connect(peer_id, host, int(port))
+        if connected:
+            self.addresses[peer_id] = address
+        else:
+            self.stats['connect_failures'] += 1
+        return connected
+
+    async def send(self, peer_id: str, message) -> bool:
+        """Queue a message; returns False if the peer's queue is full"""
+        if not self._running:
+            return False
+        frame = message.serialize()
+        channel = self._channels.get(peer_id)
+        if channel is None:
+            channel = self._channels[peer_id] = _PeerChannel()
+        if channel.queued_bytes + len(frame) > self.max_queue_bytes:
+            self.stats['dropped_frames'] += 1
+            return False
+        channel.frames.append(frame)
+        channel.queued_bytes += len(frame)
+        channel.wakeup.set()
+        if channel.writer_task is None or channel.writer_task.done():
+            channel.writer_task = asyncio.create_task(self._writer_loop(peer_id, channel))
+        return True
+
+    async def _writer_loop(self, peer_id: str, channel: _PeerChannel):
+        while self._running:
+            await channel.wakeup.wait()
+            channel.wakeup.clear()
+            while channel.frames:
+                if not await self._ensure_connected(peer_id):
+                    self.stats['dropped_frames'] += len(channel.frames)
+                    channel.frames.clear()
+                    channel.queued_bytes = 0
+                    return
+
+                # Coalesce everything queued so far, up to max_batch_bytes
+                batch, size = [], 0
+                while channel.frames and (not batch or size + len(channel.frames[0]) <= self.max_batch_bytes):
+                    frame = channel.frames.popleft()
+                    batch.append(frame)
+                    size += len(frame)
+                channel.queued_bytes -= size
+
+                if await self.network.send_many(peer_id, P2P_MESSAGE_TYPE, batch):
+                    self.stats['frames_sent'] += len(batch)
+                    self.stats['batches_sent'] += 1
+                    self.stats['bytes_sent'] += size
+                else:
+                    # Connection broke mid-write; retry this batch after reconnecting
+                    channel.frames.extendleft(reversed(batch))
+                    channel.queued_bytes += size
+                    await self.network.disconnect(peer_id)
+
+    async def _ensure_connected(self, peer_id: str) -> bool:
+        attempt = 0
+        while self._running:
+            if await self.connect(peer_id):
+                if attempt:
+                    self.stats['reconnects'] += 1
+                return True
+            attempt += 1
+            if attempt >= self.max_reconnect_attempts:
+                logging.warning(f"Giving up on {peer_id} after {attempt} connection attempts")
+                return False
+            delay = min(self.reconnect_max_delay, self.reconnect_base_delay * (2 ** (attempt - 1)))
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'address': self.address,
+            'connections': len(self.network.connections) if self.network else 0,
+            'queued_frames': sum(len(c.frames) for c in self._channels.values()),
+            'queued_bytes': sum(c.queued_bytes for c in self._channels.values())
+        }
+
+
+def create_transport(config: Dict[str, Any]) -> P2PTransport:
+    """Transport named by ``config['transport']`` ('simulated' or 'tcp')"""
+    if config.get('transport', 'simulated') == 'tcp':
+        secret = config.get('network_secret')
+        if not secret:
+            raise ValueError("transport 'tcp' requires 'network_secret' to be set to a secret shared by all nodes")
+        return TCPTransport(
+            host=config.get('listen_host', '127.0.0.1'),
+            port=config.get('listen_port', 0),
+            secret=secret.encode() if isinstance(secret, str) else secret,
+            advertise_host=config.get('advertise_host'),
+            max_queue_bytes=config.get('max_queue_bytes', 8 * 1024 * 1024)
+        )
+    return SimulatedTransport()
+
+
+__all__ = ['P2PTransport', 'SimulatedTransport', 'TCPTransport', 'create_transport', 'SIMULATED_NETWORK']
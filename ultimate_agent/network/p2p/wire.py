@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+ultimate_agent/network/p2p/wire.py
+Versioned binary envelope for P2P messages
+
+Layout (network byte order):
+
+    header   magic "UA" | version u8 | type u8 | flags u8 | ttl u16 | timestamp f64
+             message_id, sender_id (u8 length + utf-8) | path count u16 + ids
+    payload  kind u8 | compressed u8 | length u32 | body
+
+The payload frame is self-contained, so a relay that only changes ttl or
+path re-encodes the few header bytes and forwards the payload untouched.
+"""
+
+import json
+import struct
+import zlib
+from typing import Any, List, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:  # pragma: no cover - optional dependency
+    np = None
+    NUMPY_AVAILABLE = False
+
+
+MAGIC = b"UA"
+VERSION = 1
+
+_FIXED = struct.Struct("!2sBBBHd")
+_PAYLOAD = struct.Struct("!BBI")
+_U8 = struct.Struct("!B")
+_U16 = struct.Struct("!H")
+
+# Payload kinds
+PAYLOAD_JSON = 0
+PAYLOAD_BYTES = 1
+PAYLOAD_NDARRAY = 2
+
+DEFAULT_COMPRESS_THRESHOLD = 512
+
+
+class WireFormatError(ValueError):
+    """Raised for frames that are truncated, malformed or from an unknown version"""
+
+
+def is_binary_frame(data: bytes) -> bool:
+    return len(data) >= _FIXED.size and data[:2] == MAGIC
+
+
+def _pack_str(value: str) -> bytes:
+    raw = value.encode("utf-8")
+    if len(raw) > 255:
+        raise ValueError(f"Identifier too long for wire format: {value[:32]}...")
+    return _U8.pack(len(raw)) + raw
+
+
+def _unpack_str(view: memoryview, offset: int) -> Tuple[str, int]:
+    length = view[offset]
+    offset += 1
+    return str(view[offset:offset + length], "utf-8"), offset + length
+
+
+def encode_header(type_code: int, ttl: int, timestamp: float, message_id: str,
+                  sender_id: str, path: List[str], flags: int = 0) -> bytes:
+    parts = [
+        _FIXED.pack(MAGIC, VERSION, type_code, flags, max(0, min(ttl, 0xFFFF)), timestamp),
+        _pack_str(message_id),
+        _pack_str(sender_id),
+        _U16.pack(len(path))
+    ]
+    parts.extend(_pack_str(node_id) for node_id in path)
+    return b"".join(parts)
+
+
+def decode_header(data: bytes) -> Tuple[dict, int]:
+    """Parse the header; returns its fields and the offset of the payload frame"""
+    if not is_binary_frame(data):
+        raise WireFormatError("Not a binary P2P frame")
+    view = memoryview(data)
+    magic, version, type_code, flags, ttl, timestamp = _FIXED.unpack_from(view, 0)
+    if version != VERSION:
+        raise WireFormatError(f"Unsupported wire version {version}")
+    try:
+        offset = _FIXED.size
+        message_id, offset = _unpack_str(view, offset)
+        sender_id, offset = _unpack_str(view, offset)
+        (count,) = _U16.unpack_from(view, offset)
+        offset += _U16.size
+        path = []
+        for _ in range(count):
+            node_id, offset = _unpack_str(view, offset)
+            path.append(node_id)
+    except (IndexError, struct.error) as e:
+        raise WireFormatError(f"Truncated header: {e}")
+    return {
+        'type_code': type_code,
+        'flags': flags,
+        'ttl': ttl,
+        'timestamp': timestamp,
+        'message_id': message_id,
+        'sender_id': sender_id,
+        'path': path
+    }, offset
+
+
+def encode_payload(data: Any, compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+                   compress_binary: bool = False) -> bytes:
+    """Frame a payload. Bytes and ndarrays are carried raw, anything else as JSON.
+
+    JSON bodies of at least ``compress_threshold`` bytes are zlib-compressed
+    when that actually makes them smaller; pass None to never compress.
+    Raw bytes and arrays (usually incompressible floats) are only compressed
+    with ``compress_binary``.
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        kind, body = PAYLOAD_BYTES, bytes(data)
+    elif NUMPY_AVAILABLE and isinstance(data, np.ndarray):
+        kind, body = PAYLOAD_NDARRAY, _encode_ndarray(data)
+    else:
+        kind, body = PAYLOAD_JSON, json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+    compressed = 0
+    if (compress_threshold is not None and len(body) >= compress_threshold
+            and (kind == PAYLOAD_JSON or compress_binary)):
+        packed = zlib.compress(body, 1)
+        if len(packed) < len(body):
+            body, compressed = packed, 1
+    return _PAYLOAD.pack(kind, compressed, len(body)) + body
+
+
+def split_payload(data: bytes, offset: int) -> bytes:
+    """The complete payload frame starting at ``offset``, still encoded"""
+    try:
+        _, _, length = _PAYLOAD.unpack_from(data, offset)
+    except struct.error as e:
+        raise WireFormatError(f"Truncated payload header: {e}")
+    end = offset + _PAYLOAD.size + length
+    if end > len(data):
+        raise WireFormatError("Truncated payload body")
+    return data[offset:end]
+
+
+def decode_payload(frame: bytes) -> Any:
+    kind, compressed, length = _PAYLOAD.unpack_from(frame, 0)
+    body = memoryview(frame)[_PAYLOAD.size:_PAYLOAD.size + length]
+    if compressed:
+        body = memoryview(zlib.decompress(body))
+    if kind == PAYLOAD_JSON:
+        return json.loads(str(body, "utf-8"))
+    if kind == PAYLOAD_BYTES:
+        return bytes(body)
+    if kind == PAYLOAD_NDARRAY:
+        return _decode_ndarray(body)
+    raise WireFormatError(f"Unknown payload kind {kind}")
+
+
+def _plain_dtype(dtype) -> bool:
+    """Only fixed-size dtypes without object pointers or fields travel raw"""
+    return not dtype.hasobject and dtype.kind != "V"
+
+
+def _encode_ndarray(array) -> bytes:
+    if not _plain_dtype(array.dtype):
+        raise ValueError(f"Cannot send arrays of dtype {array.dtype} on the wire")
+    array = np.require(array, requirements="C")
+    dtype = array.dtype.str.encode("ascii")
+    header = (_U8.pack(len(dtype)) + dtype + _U8.pack(array.ndim)
+              + struct.pack(f"!{array.ndim}Q", *array.shape))
+    return header + array.tobytes()
+
+
+def _decode_ndarray(body: memoryview):
+    if not NUMPY_AVAILABLE:
+        raise WireFormatError("numpy is required to decode ndarray payloads")
+    try:
+        dtype_len = body[0]
+        offset = 1 + dtype_len
+        dtype = np.dtype(str(body[1:offset], "ascii"))
+        ndim = body[offset]
+        offset += 1
+        shape = struct.unpack_from(f"!{ndim}Q", body, offset)
+        offset += 8 * ndim
+    except (IndexError, TypeError, ValueError, struct.error) as e:
+        raise WireFormatError(f"Malformed ndarray header: {e}")
+    if not _plain_dtype(dtype):
+        raise WireFormatError(f"Unsupported ndarray dtype {dtype}")
+    expected = dtype.itemsize
+    for dim in shape:
+        expected *= dim
+    if len(body) - offset != expected:
+        raise WireFormatError(f"ndarray body is {len(body) - offset} bytes, expected {expected}")
+    # Read-only view over the received buffer; no copy
+    return np.frombuffer(body, dtype=dtype, offset=offset).reshape(shape)
+
+
+__all__ = [
+    'MAGIC', 'VERSION', 'WireFormatError', 'DEFAULT_COMPRESS_THRESHOLD',
+    'is_binary_frame', 'encode_header', 'decode_header',
+    'encode_payload', 'split_payload', 'decode_payload'
+]
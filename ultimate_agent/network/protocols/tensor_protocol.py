@@ -1,10 +1,28 @@
 # ultimate_agent/network/protocols/tensor_protocol.py
+import asyncio
+import socket as _socket
 import struct
+import zlib
 import numpy as np
-import lz4
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Iterator, AsyncIterator, Tuple
 from enum import Enum
 
+try:
+    import lz4.block
+    LZ4_AVAILABLE = True
+except ImportError:  # only needed for the compressed (legacy) framing
+    lz4 = None
+    LZ4_AVAILABLE = False
+
+# Stream framing (version 2): fixed prefix, then dtype string, request id and
+# shape (u64 per dimension), then the raw tensor bytes as a run of chunks,
+# each preceded by its length and CRC32. Sizes are 64-bit throughout.
+STREAM_PREFIX_FORMAT = "!IHBBBBBQI"  # magic, version, msg_type, flags, ndim, dtype_len, id_len, nbytes, chunk_size
+STREAM_PREFIX = struct.Struct(STREAM_PREFIX_FORMAT)
+CHUNK_HEADER = struct.Struct("!II")  # chunk length, crc32 (0 when unchecked)
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+_IOV_MAX = 64
+
 class TensorType(Enum):
     FLOAT32 = 0
     FLOAT16 = 1
@@ -31,6 +49,9 @@ class TensorProtocol:
     FLAG_COMPRESSED = 0x01
     FLAG_ENCRYPTED = 0x02
     FLAG_STREAMING = 0x04
+    FLAG_CHECKSUM = 0x08
+    
+    STREAM_VERSION = 2
     
     @staticmethod
     def serialize_tensor(tensor: np.ndarray, 
@@ -66,6 +87,8 @@ class TensorProtocol:
         
         # Compression
         if compress:
+            if not LZ4_AVAILABLE:
+                raise RuntimeError("lz4 is required for compressed tensors")
             tensor_bytes = lz4.block.compress(tensor_bytes, compression=compression_level)
         
         # Combine all parts
@@ -89,11 +112,13 @@ class TensorProtocol:
         shape = struct.unpack(f"!{ndims}I", data[offset:offset+ndims*4])
         offset += ndims * 4
         
-        # Parse tensor data
-        tensor_bytes = data[offset:]
+        # Parse tensor data (a view, not a copy of the remaining bytes)
+        tensor_bytes = memoryview(data)[offset:]
         
         # Decompress if needed
         if compressed:
+            if not LZ4_AVAILABLE:
+                raise RuntimeError("lz4 is required for compressed tensors")
             tensor_bytes = lz4.block.decompress(tensor_bytes)
         
         # Convert back to numpy
@@ -110,6 +135,131 @@ class TensorProtocol:
         
         return tensor
     
+    @staticmethod
+    def stream_header(tensor: np.ndarray, msg_type: int, request_id: str = "",
+                      chunk_size: int = DEFAULT_CHUNK_SIZE, checksum: bool = True) -> bytes:
+        """Header of a version 2 stream frame for ``tensor``
+        
+        Only shape and dtype are read, so this works for arrays of any size.
+        """
+        dtype = tensor.dtype.str.encode("ascii")
+        rid = request_id.encode()
+        if len(rid) > 255:
+            raise ValueError("request_id too long for stream header")
+        flags = TensorProtocol.FLAG_STREAMING
+        if checksum:
+            flags |= TensorProtocol.FLAG_CHECKSUM
+        return b"".join([
+            STREAM_PREFIX.pack(TensorProtocol.MAGIC_NUMBER, TensorProtocol.STREAM_VERSION, msg_type,
+                               flags, tensor.ndim, len(dtype), len(rid), tensor.nbytes,
+                               TensorProtocol.stream_chunk_size(tensor.dtype, chunk_size)),
+            dtype,
+            rid,
+            struct.pack(f"!{tensor.ndim}Q", *tensor.shape)
+        ])
+    
+    @staticmethod
+    def stream_chunk_size(dtype, chunk_size: int) -> int:
+        """Chunk size rounded down to whole elements, so every chunk decodes alone"""
+        itemsize = max(1, np.dtype(dtype).itemsize)
+        return max(itemsize, min(chunk_size, 0xFFFFFFFF) // itemsize * itemsize)
+    
+    @staticmethod
+    def parse_stream_prefix(prefix) -> Dict[str, Any]:
+        """Fixed part of a stream header; ``extra_size`` more header bytes follow"""
+        magic, version, msg_type, flags, ndim, dtype_len, id_len, nbytes, chunk_size = \
+            STREAM_PREFIX.unpack_from(prefix, 0)
+        if magic != TensorProtocol.MAGIC_NUMBER:
+            raise ValueError("Invalid magic number")
+        if version != TensorProtocol.STREAM_VERSION:
+            raise ValueError(f"Unsupported stream version: {version}")
+        return {
+            'type': msg_type,
+            'checksum': bool(flags & TensorProtocol.FLAG_CHECKSUM),
+            'ndim': ndim,
+            'dtype_len': dtype_len,
+            'id_len': id_len,
+            'nbytes': nbytes,
+            'chunk_size': chunk_size,
+            'extra_size': dtype_len + id_len + 8 * ndim
+        }
+    
+    @staticmethod
+    def parse_stream_extra(header: Dict[str, Any], extra) -> Dict[str, Any]:
+        """Complete a parsed prefix with dtype, request id and shape"""
+        view = memoryview(extra)
+        dtype_end = header['dtype_len']
+        id_end = dtype_end + header['id_len']
+        header['dtype'] = np.dtype(str(view[:dtype_end], "ascii"))
+        header['request_id'] = str(view[dtype_end:id_end], "utf-8")
+        header['shape'] = struct.unpack_from(f"!{header['ndim']}Q", view, id_end)
+        expected = int(np.prod(header['shape'], dtype=np.uint64)) * header['dtype'].itemsize
+        if expected != header['nbytes']:
+            raise ValueError("Stream header size does not match shape")
+        return header
+    
+    @staticmethod
+    def iter_stream_chunks(tensor: np.ndarray, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                           checksum: bool = True) -> Iterator[Tuple[bytes, memoryview]]:
+        """(chunk header, view) pairs over the tensor's own buffer; nothing is copied
+        unless ``tensor`` is not C-contiguous"""
+        tensor = np.require(tensor, requirements="C")
+        chunk_size = TensorProtocol.stream_chunk_size(tensor.dtype, chunk_size)
+        flat = memoryview(tensor.reshape(-1).view(np.uint8))
+        for start in range(0, len(flat), chunk_size):
+            view = flat[start:start + chunk_size]
+            crc = zlib.crc32(view) if checksum else 0
+            yield CHUNK_HEADER.pack(len(view), crc), view
+    
+    @staticmethod
+    def stream_buffers(tensor: np.ndarray, msg_type: int, request_id: str = "",
+                       chunk_size: int = DEFAULT_CHUNK_SIZE, checksum: bool = True) -> Iterator[Any]:
+        """Every buffer of a stream frame in order, for ``writelines``/``sendmsg``"""
+        yield TensorProtocol.stream_header(tensor, msg_type, request_id, chunk_size, checksum)
+        for chunk_header, view in TensorProtocol.iter_stream_chunks(tensor, chunk_size, checksum):
+            yield chunk_header
+            yield view
+    
+    @staticmethod
+    def decode_stream(data) -> Dict[str, Any]:
+        """Decode a complete in-memory stream frame
+        
+        A single-chunk frame decodes to a read-only view of ``data``; a
+        multi-chunk frame is assembled into one preallocated array.
+        """
+        view = memoryview(data)
+        header = TensorProtocol.parse_stream_prefix(view)
+        offset = STREAM_PREFIX.size
+        TensorProtocol.parse_stream_extra(header, view[offset:offset + header['extra_size']])
+        offset += header['extra_size']
+        
+        chunks = []
+        remaining = header['nbytes']
+        while remaining:
+            length, crc = CHUNK_HEADER.unpack_from(view, offset)
+            offset += CHUNK_HEADER.size
+            if length > remaining or offset + length > len(view):
+                raise ValueError("Truncated stream frame")
+            chunk = view[offset:offset + length]
+            if header['checksum'] and zlib.crc32(chunk) != crc:
+                raise ValueError("Checksum mismatch")
+            chunks.append(chunk)
+            offset += length
+            remaining -= length
+        
+        if len(chunks) == 1:
+            tensor = np.frombuffer(chunks[0], dtype=header['dtype'])
+        else:
+            tensor = np.empty(header['nbytes'] // max(1, header['dtype'].itemsize), dtype=header['dtype'])
+            target = memoryview(tensor.view(np.uint8))
+            position = 0
+            for chunk in chunks:
+                target[position:position + len(chunk)] = chunk
+                position += len(chunk)
+        header['tensor'] = tensor.reshape(header['shape'])
+        header['remaining_data'] = view[offset:]
+        return header
+    
     @staticmethod
     def create_message(msg_type: int, payload: bytes, 
                       compressed: bool = False, 
@@ -182,11 +332,28 @@ class TensorProtocol:
         }
 
 class StreamingTensorSocket:
-    """TCP socket optimized for streaming tensor data"""
+    """TCP socket optimized for streaming tensor data
     
-    def __init__(self, socket):
+    ``socket`` is either a connected ``socket.socket``, driven through the
+    running event loop, or an object with async ``send``/``recv`` (and
+    optionally ``recv_into``). ``send_tensor``/``receive_tensor`` use the
+    compressed single-message format; ``send_tensor_stream`` and
+    ``receive_tensor_stream`` use the chunked version 2 framing, which
+    sends straight from the array's buffer with ``sendmsg`` and receives
+    straight into the destination array with ``recv_into``.
+    """
+    
+    def __init__(self, socket, chunk_size: int = DEFAULT_CHUNK_SIZE, checksum: bool = True):
         self.socket = socket
         self.buffer = b""
+        self.chunk_size = chunk_size
+        self.checksum = checksum
+        self._raw = isinstance(socket, _socket.socket)
+        if self._raw:
+            socket.setblocking(False)
+        # Reused for every stream header
+        self._prefix = bytearray(STREAM_PREFIX.size)
+        self._chunk_header = bytearray(CHUNK_HEADER.size)
         
     async def send_tensor(self, tensor: np.ndarray, request_id: str = ""):
         """Send tensor with streaming support"""
@@ -249,4 +416,132 @@ class StreamingTensorSocket:
             except Exception:
                 break
         
-        return None
\ No newline at end of file
+        return None
+    
+    # Chunked zero-copy stream framing
+    
+    async def send_tensor_stream(self, tensor: np.ndarray, request_id: str = "",
+                                 msg_type: int = TensorProtocol.MSG_INFERENCE_REQUEST,
+                                 chunk_size: Optional[int] = None):
+        """Send a tensor of any size; memory use is independent of its size"""
+        tensor = np.require(tensor, requirements="C")
+        chunk_size = chunk_size or self.chunk_size
+        pending = [TensorProtocol.stream_header(tensor, msg_type, request_id, chunk_size, self.checksum)]
+        for chunk_header, view in TensorProtocol.iter_stream_chunks(tensor, chunk_size, self.checksum):
+            pending.extend((chunk_header, view))
+            await self._send_buffers(pending)
+            pending = []
+        if pending:
+            await self._send_buffers(pending)
+    
+    async def receive_tensor_header(self) -> Dict[str, Any]:
+        """Read the header of the next stream frame"""
+        await self._recv_into(memoryview(self._prefix))
+        header = TensorProtocol.parse_stream_prefix(self._prefix)
+        extra = bytearray(header['extra_size'])
+        await self._recv_into(memoryview(extra))
+        return TensorProtocol.parse_stream_extra(header, extra)
+    
+    async def receive_tensor_stream(self, out: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Receive a whole stream frame directly into ``out`` (or a new array)
+        
+        ``out`` must be C-contiguous and writable with the sender's shape and
+        dtype; an ``np.memmap`` keeps multi-GB tensors out of RAM.
+        """
+        header = await self.receive_tensor_header()
+        if out is None:
+            out = np.empty(header['shape'], dtype=header['dtype'])
+        elif (tuple(out.shape) != tuple(header['shape']) or out.dtype != header['dtype']
+                or not out.flags.c_contiguous or not out.flags.writeable):
+            raise ValueError(f"Output array must be a writable C-contiguous {header['dtype']} "
+                             f"array of shape {header['shape']}")
+        target = memoryview(out.reshape(-1).view(np.uint8))
+        position = 0
+        while position < header['nbytes']:
+            length = await self._receive_chunk(header, target, position)
+            position += length
+        return {'request_id': header['request_id'], 'tensor': out, 'type': header['type']}
+    
+    async def iter_tensor_chunks(self, header: Dict[str, Any]) -> AsyncIterator[Tuple[int, np.ndarray]]:
+        """Yield (element offset, elements) for each chunk of the frame whose
+        header was just read
+        
+        Chunks are received into one reused buffer of the sender's chunk
+        size, so each yielded array is only valid until the next iteration.
+        """
+        buffer = memoryview(bytearray(header['chunk_size']))
+        itemsize = max(1, header['dtype'].itemsize)
+        position = 0
+        while position < header['nbytes']:
+            length = await self._receive_chunk(header, buffer, 0)
+            yield position // itemsize, np.frombuffer(buffer[:length], dtype=header['dtype'])
+            position += length
+    
+    async def _receive_chunk(self, header: Dict[str, Any], target: memoryview, position: int) -> int:
+        await self._recv_into(memoryview(self._chunk_header))
+        length, crc = CHUNK_HEADER.unpack_from(self._chunk_header, 0)
+        if length > header['chunk_size'] or position + length > len(target):
+            raise ValueError(f"Stream chunk of {length} bytes exceeds the announced size")
+        view = target[position:position + length]
+        await self._recv_into(view)
+        if header['checksum'] and zlib.crc32(view) != crc:
+            raise ValueError("Checksum mismatch")
+        return length
+    
+    async def _send_buffers(self, buffers: List[Any]):
+        if not self._raw:
+            for buffer in buffers:
+                await self.socket.send(buffer)
+            return
+        loop = asyncio.get_running_loop()
+        if not hasattr(self.socket, "sendmsg"):
+            for buffer in buffers:
+                await loop.sock_sendall(self.socket, buffer)
+            return
+        
+        pending = [memoryview(b).cast("B") for b in buffers if len(b)]
+        while pending:
+            try:
+                sent = self.socket.sendmsg(pending[:_IOV_MAX])
+            except (BlockingIOError, InterruptedError):
+                await self._writable(loop)
+                continue
+            # Drop what went out; a partial buffer continues from a sub-view
+            while sent:
+                if sent >= len(pending[0]):
+                    sent -= len(pending.pop(0))
+                else:
+                    pending[0] = pending[0][sent:]
+                    sent = 0
+    
+    async def _writable(self, loop):
+        ready = loop.create_future()
+        fd = self.socket.fileno()
+        loop.add_writer(fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            await ready
+        finally:
+            loop.remove_writer(fd)
+    
+    async def _recv_into(self, view: memoryview):
+        """Fill ``view`` completely from the socket"""
+        if self.buffer:
+            # Bytes left over from receive_tensor()
+            take = min(len(view), len(self.buffer))
+            view[:take] = self.buffer[:take]
+            self.buffer = self.buffer[take:]
+            view = view[take:]
+        if self._raw:
+            loop = asyncio.get_running_loop()
+        while len(view):
+            if self._raw:
+                received = await loop.sock_recv_into(self.socket, view)
+            elif hasattr(self.socket, "recv_into"):
+                received = await self.socket.recv_into(view)
+            else:
+                chunk = await self.socket.recv(len(view))
+                received = len(chunk)
+                view[:received] = chunk
+            if not received:
+                raise ConnectionError("Connection closed mid-frame")
+            view = view[received:]
@@ -101,6 +101,11 @@ class RemoteCommandHandler:
 
     def pause_task(self, params: Dict[str, Any]) -> Dict[str, Any]:
         task_id = params.get('task_id')
+        scheduler = getattr(self.agent, 'task_scheduler', None)
+        if scheduler is not None and hasattr(scheduler, 'pause_task'):
+            if scheduler.pause_task(task_id):
+                return {'task_id': task_id, 'status': 'paused'}
+            return {'error': 'task_not_found', 'task_id': task_id}
         task = getattr(self.agent, 'current_tasks', {}).get(task_id)
         if task:
             task['status'] = 'paused'
@@ -109,6 +114,11 @@ class RemoteCommandHandler:
 
     def resume_task(self, params: Dict[str, Any]) -> Dict[str, Any]:
         task_id = params.get('task_id')
+        scheduler = getattr(self.agent, 'task_scheduler', None)
+        if scheduler is not None and hasattr(scheduler, 'resume_task'):
+            if scheduler.resume_task(task_id):
+                return {'task_id': task_id, 'status': 'running'}
+            return {'error': 'task_not_found', 'task_id': task_id}
         task = getattr(self.agent, 'current_tasks', {}).get(task_id)
         if task:
             task['status'] = 'running'
@@ -7,15 +7,21 @@ Database management and data persistence
 import os
 import json
 import time
+import atexit
 import sqlite3
-from datetime import datetime
+import threading
+from collections import deque
+from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 try:
-    from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, Text, JSON
+    from sqlalchemy import create_engine, event, Column, Integer, String, Float, Boolean, DateTime, Text, JSON
     from sqlalchemy.ext.declarative import declarative_base
     from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 except Exception:  # pragma: no cover - optional dependency
     create_engine = None
+    event = None
+    sqlite_insert = None
 
     class Dummy:
         def __init__(self, *args, **kwargs):
@@ -48,6 +54,16 @@ except Exception:  # pragma: no cover - optional dependency
 
 from contextlib import contextmanager
 
+from ....monitoring.metrics.rollups import RollupBucket, RollupStore
+from ....monitoring.metrics.registry import REGISTRY
+
+DB_FLUSH_LATENCY = REGISTRY.histogram(
+    'agent_db_flush_seconds', 'Time to write one batch of queued rows',
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+DB_ROWS = REGISTRY.counter('agent_db_rows_total', 'Rows written by the write-behind queue', ['outcome'])
+DB_QUEUE_DEPTH = REGISTRY.gauge('agent_db_queue_depth', 'Rows waiting in the write-behind queue')
+
 # If SQLAlchemy is unavailable, provide dummy DatabaseManager and skip models
 if create_engine is None:
     Base = object
@@ -151,6 +167,25 @@ class AITrainingRecord(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class PerformanceRollup(Base):
+    """Downsampled performance metrics (1 minute / 1 hour / 1 day buckets)"""
+    __tablename__ = 'performance_rollups'
+    
+    resolution = Column(Integer, primary_key=True)
+    bucket_start = Column(Integer, primary_key=True)
+    metric = Column(String, primary_key=True)
+    count = Column(Integer)
+    total = Column(Float)
+    minimum = Column(Float)
+    maximum = Column(Float)
+    sketch = Column(JSON)
+
+
+# PerformanceMetric columns that are rolled up
+PERFORMANCE_ROLLUP_FIELDS = ('cpu_percent', 'memory_percent', 'gpu_percent', 'network_io',
+                             'task_count', 'efficiency_score')
+
+
 class AgentConfiguration(Base):
     """Agent configuration history"""
     __tablename__ = 'agent_configurations'
@@ -164,21 +199,73 @@ class AgentConfiguration(Base):
 
 
 class DatabaseManager:
-    """Manages database operations and data persistence"""
+    """Manages database operations and data persistence
+
+    ``save_*`` calls do not write immediately: the row is queued and a
+    background writer inserts queued rows in one transaction per batch,
+    once ``batch_size`` rows are waiting or ``flush_interval`` seconds have
+    passed. Reads, backups and ``close()`` flush first, so callers still
+    see their own writes. ``write_behind=False`` writes on every call.
+    """
     
-    def __init__(self, db_path: str = "ultimate_agent.db"):
+    # SQLite tuning applied to every new connection
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',       # readers no longer block the writer
+        'synchronous': 'NORMAL',     # fsync at checkpoints, safe with WAL
+        'temp_store': 'MEMORY',
+        'cache_size': -16000,        # 16 MB page cache
+        'busy_timeout': 5000,
+        'wal_autocheckpoint': 1000
+    }
+    
+    def __init__(self, db_path: str = "ultimate_agent.db", batch_size: int = 500,
+                 flush_interval: float = 1.0, max_pending: int = 50_000, write_behind: bool = True):
         self.db_path = db_path
         self.engine = None
         self.session_factory = None
         self.stats_file = "ultimate_stats.json"
         
+        # Write-behind queue of (model, row) pairs
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.write_behind = write_behind
+        self._pending = deque()
+        self._writing = 0  # rows taken off the queue, not yet committed
+        self._pending_lock = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._writer = None
+        self._closing = False
+        # Performance metrics are also rolled up as they are saved
+        self.rollups = RollupStore()
+        self._last_rollup_prune = 0.0
+        
+        self.write_stats = {
+            'batches': 0,
+            'rows_written': 0,
+            'rows_failed': 0,
+            'last_batch_size': 0,
+            'max_batch_size': 0,
+            'flush_time': 0.0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'queue_high_water': 0,
+            'inline_flushes': 0
+        }
+        
         self.init_database()
+        self._load_rollups()
+        if self.write_behind and self.session_factory is not None:
+            self._writer = threading.Thread(target=self._writer_loop, daemon=True, name="DatabaseWriter")
+            self._writer.start()
+            atexit.register(self.close)
     
     def init_database(self):
         """Initialize database connection and create tables"""
         try:
             # Create SQLAlchemy engine
             self.engine = create_engine(f'sqlite:///{self.db_path}')
+            event.listen(self.engine, 'connect', self._apply_pragmas)
             
             # Create all tables
             Base.metadata.create_all(self.engine)
@@ -194,6 +281,14 @@ class DatabaseManager:
         except Exception as e:
             print(f"⚠️ Database initialization warning: {e}")
     
+    def _apply_pragmas(self, dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in self.SQLITE_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+    
     @contextmanager
     def get_session(self):
         """Get database session with automatic cleanup"""
@@ -217,25 +312,186 @@ class DatabaseManager:
         except Exception as e:
             print(f"⚠️ Migration warning: {e}")
     
-    def save_task_record(self, task_data: Dict[str, Any]) -> bool:
-        """Save task execution record"""
+    # Write-behind queue
+    
+    def _enqueue(self, model, row: Dict[str, Any]) -> bool:
+        """Queue one row for insertion; never waits on the database
+        unless the queue is full"""
+        if self.session_factory is None:
+            return False
+        if not self.write_behind or self._closing:
+            with self._flush_lock:
+                written = self._write_batch([(model, row)])
+                self._persist_rollups()
+            return written > 0
+        
+        with self._pending_lock:
+            self._pending.append((model, row))
+            depth = len(self._pending)
+            if depth > self.write_stats['queue_high_water']:
+                self.write_stats['queue_high_water'] = depth
+            if depth >= self.batch_size:
+                self._pending_lock.notify()
+        
+        if depth >= self.max_pending:
+            # Writer cannot keep up: apply backpressure instead of growing
+            self.write_stats['inline_flushes'] += 1
+            self.flush()
+        return True
+    
+    def _take_batch(self) -> List[Any]:
+        with self._pending_lock:
+            count = min(len(self._pending), self.batch_size)
+            self._writing += count
+            return [self._pending.popleft() for _ in range(count)]
+    
+    def _queue_depth(self) -> int:
+        """Rows not yet committed, including a batch being written"""
+        with self._pending_lock:
+            return len(self._pending) + self._writing
+    
+    def _writer_loop(self):
+        while not self._closing:
+            with self._pending_lock:
+                if len(self._pending) < self.batch_size:
+                    self._pending_lock.wait(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Database writer error: {e}")
+    
+    def flush(self) -> int:
+        """Write every queued row now; returns the number of rows written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    break
+                try:
+                    written += self._write_batch(batch)
+                finally:
+                    with self._pending_lock:
+                        self._writing -= len(batch)
+                    DB_QUEUE_DEPTH.set(self._queue_depth())
+            self._persist_rollups()
+        return written
+    
+    def _write_batch(self, batch: List[Any]) -> int:
+        """Insert ``batch`` in one transaction with one executemany per table"""
+        start = time.perf_counter()
+        by_model: Dict[Any, List[Dict[str, Any]]] = {}
+        for model, row in batch:
+            by_model.setdefault(model, []).append(row)
+        
         try:
             with self.get_session() as session:
-                task_record = TaskRecord(
-                    id=task_data.get('id', str(time.time())),
-                    task_id=task_data['task_id'],
-                    task_type=task_data['task_type'],
-                    start_time=task_data.get('start_time'),
-                    end_time=task_data.get('end_time'),
-                    duration=task_data.get('duration', 0),
-                    success=task_data.get('success', False),
-                    reward=task_data.get('reward', 0),
-                    ai_result=task_data.get('ai_result'),
-                    blockchain_tx=task_data.get('blockchain_tx')
+                for model, rows in by_model.items():
+                    session.execute(model.__table__.insert(), rows)
+            written = len(batch)
+        except Exception as e:
+            # One bad row (e.g. a duplicate task_id) must not lose the batch
+            print(f"⚠️ Batch insert failed, retrying rows individually: {e}")
+            written = 0
+            for model, row in batch:
+                try:
+                    with self.get_session() as session:
+                        session.execute(model.__table__.insert(), [row])
+                    written += 1
+                except Exception as row_error:
+                    print(f"❌ Failed to save {model.__tablename__} record: {row_error}")
+        
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        DB_FLUSH_LATENCY.observe(elapsed_ms / 1000)
+        DB_ROWS.labels('written').inc(written)
+        if written < len(batch):
+            DB_ROWS.labels('failed').inc(len(batch) - written)
+        DB_QUEUE_DEPTH.set(self._queue_depth())
+        stats = self.write_stats
+        stats['batches'] += 1
+        stats['rows_written'] += written
+        stats['rows_failed'] += len(batch) - written
+        stats['last_batch_size'] = len(batch)
+        stats['max_batch_size'] = max(stats['max_batch_size'], len(batch))
+        stats['flush_time'] += elapsed_ms / 1000
+        stats['last_flush_ms'] = elapsed_ms
+        stats['max_flush_ms'] = max(stats['max_flush_ms'], elapsed_ms)
+        return written
+    
+    def _load_rollups(self):
+        if self.session_factory is None:
+            return
+        try:
+            with self.get_session() as session:
+                self.rollups.load_rows({
+                    'resolution': r.resolution, 'bucket_start': r.bucket_start, 'metric': r.metric,
+                    'count': r.count, 'total': r.total, 'minimum': r.minimum,
+                    'maximum': r.maximum, 'sketch': r.sketch
+                } for r in session.query(PerformanceRollup).all())
+        except Exception as e:
+            print(f"⚠️ Failed to load performance rollups: {e}")
+    
+    def _persist_rollups(self):
+        """Upsert rollup buckets touched since the last call and drop
+        buckets past their tier's retention.
+        
+        Each row is the full in-memory bucket (seeded from the table at
+        startup), so it replaces the stored row: one DatabaseManager is
+        assumed to be the only writer of a database file's rollups. Rows
+        that fail to save stay dirty and are retried on the next flush.
+        """
+        rows = self.rollups.drain_dirty()
+        if not rows or sqlite_insert is None:
+            return
+        try:
+            with self.get_session() as session:
+                stmt = sqlite_insert(PerformanceRollup.__table__)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=['resolution', 'bucket_start', 'metric'],
+                    set_={c: stmt.excluded[c] for c in ('count', 'total', 'minimum', 'maximum', 'sketch')}
                 )
-                session.add(task_record)
+                session.execute(stmt, rows)
                 
-            return True
+                now = time.time()
+                if now - self._last_rollup_prune >= 3600:
+                    self._last_rollup_prune = now
+                    for resolution, retention in self.rollups.tiers:
+                        session.query(PerformanceRollup).filter(
+                            PerformanceRollup.resolution == resolution,
+                            PerformanceRollup.bucket_start < now - retention
+                        ).delete(synchronize_session=False)
+        except Exception as e:
+            self.rollups.mark_dirty(rows)
+            print(f"❌ Failed to save performance rollups: {e}")
+    
+    def get_write_stats(self) -> Dict[str, Any]:
+        stats = dict(self.write_stats)
+        batches = stats['batches']
+        stats.update({
+            'write_behind': self.write_behind,
+            'queue_depth': self._queue_depth(),
+            'batch_size_limit': self.batch_size,
+            'flush_interval': self.flush_interval,
+            'avg_batch_size': stats['rows_written'] / batches if batches else 0.0,
+            'avg_flush_ms': stats['flush_time'] * 1000 / batches if batches else 0.0
+        })
+        return stats
+    
+    def save_task_record(self, task_data: Dict[str, Any]) -> bool:
+        """Save task execution record"""
+        try:
+            return self._enqueue(TaskRecord, {
+                'id': task_data.get('id', str(time.time())),
+                'task_id': task_data['task_id'],
+                'task_type': task_data['task_type'],
+                'start_time': task_data.get('start_time'),
+                'end_time': task_data.get('end_time'),
+                'duration': task_data.get('duration', 0),
+                'success': task_data.get('success', False),
+                'reward': task_data.get('reward', 0),
+                'ai_result': task_data.get('ai_result'),
+                'blockchain_tx': task_data.get('blockchain_tx')
+            })
         except Exception as e:
             print(f"❌ Failed to save task record: {e}")
             return False
@@ -243,21 +499,17 @@ class DatabaseManager:
     def save_ai_training_record(self, training_data: Dict[str, Any]) -> bool:
         """Save AI training session record"""
         try:
-            with self.get_session() as session:
-                training_record = AITrainingRecord(
-                    id=training_data.get('id', str(time.time())),
-                    session_id=training_data['session_id'],
-                    model_type=training_data['model_type'],
-                    training_type=training_data.get('training_type', 'standard'),
-                    epochs=training_data.get('epochs', 0),
-                    final_loss=training_data.get('final_loss', 0),
-                    accuracy=training_data.get('accuracy', 0),
-                    device_used=training_data.get('device_used', 'cpu'),
-                    duration=training_data.get('duration', 0)
-                )
-                session.add(training_record)
-                
-            return True
+            return self._enqueue(AITrainingRecord, {
+                'id': training_data.get('id', str(time.time())),
+                'session_id': training_data['session_id'],
+                'model_type': training_data['model_type'],
+                'training_type': training_data.get('training_type', 'standard'),
+                'epochs': training_data.get('epochs', 0),
+                'final_loss': training_data.get('final_loss', 0),
+                'accuracy': training_data.get('accuracy', 0),
+                'device_used': training_data.get('device_used', 'cpu'),
+                'duration': training_data.get('duration', 0)
+            })
         except Exception as e:
             print(f"❌ Failed to save AI training record: {e}")
             return False
@@ -265,19 +517,18 @@ class DatabaseManager:
     def save_performance_metric(self, metrics: Dict[str, Any]) -> bool:
         """Save system performance metrics"""
         try:
-            with self.get_session() as session:
-                metric_record = PerformanceMetric(
-                    timestamp=datetime.now(),
-                    cpu_percent=metrics.get('cpu_percent', 0),
-                    memory_percent=metrics.get('memory_percent', 0),
-                    gpu_percent=metrics.get('gpu_percent', 0),
-                    network_io=metrics.get('network_io', 0),
-                    task_count=metrics.get('task_count', 0),
-                    efficiency_score=metrics.get('efficiency_score', 0)
-                )
-                session.add(metric_record)
-                
-            return True
+            timestamp = datetime.now()
+            row = {
+                'timestamp': timestamp,
+                'cpu_percent': metrics.get('cpu_percent', 0),
+                'memory_percent': metrics.get('memory_percent', 0),
+                'gpu_percent': metrics.get('gpu_percent', 0),
+                'network_io': metrics.get('network_io', 0),
+                'task_count': metrics.get('task_count', 0),
+                'efficiency_score': metrics.get('efficiency_score', 0)
+            }
+            self.rollups.add({field: row[field] for field in PERFORMANCE_ROLLUP_FIELDS}, timestamp.timestamp())
+            return self._enqueue(PerformanceMetric, row)
         except Exception as e:
             print(f"❌ Failed to save performance metric: {e}")
             return False
@@ -285,24 +536,21 @@ class DatabaseManager:
     def save_earnings_record(self, earnings: Dict[str, Any]) -> bool:
         """Save blockchain earnings record"""
         try:
-            with self.get_session() as session:
-                earnings_record = EarningsRecord(
-                    timestamp=datetime.now(),
-                    amount=earnings['amount'],
-                    currency=earnings.get('currency', 'ETH'),
-                    task_id=earnings.get('task_id'),
-                    transaction_hash=earnings.get('transaction_hash'),
-                    block_number=earnings.get('block_number')
-                )
-                session.add(earnings_record)
-                
-            return True
+            return self._enqueue(EarningsRecord, {
+                'timestamp': datetime.now(),
+                'amount': earnings['amount'],
+                'currency': earnings.get('currency', 'ETH'),
+                'task_id': earnings.get('task_id'),
+                'transaction_hash': earnings.get('transaction_hash'),
+                'block_number': earnings.get('block_number')
+            })
         except Exception as e:
             print(f"❌ Failed to save earnings record: {e}")
             return False
     
     def get_task_records(self, limit: int = 100, task_type: str = None) -> List[Dict]:
         """Get task execution records"""
+        self.flush()
         try:
             with self.get_session() as session:
                 query = session.query(TaskRecord)
@@ -332,8 +580,22 @@ class DatabaseManager:
             print(f"❌ Failed to get task records: {e}")
             return []
     
-    def get_performance_metrics(self, hours: int = 24) -> List[Dict]:
-        """Get recent performance metrics"""
+    def get_performance_metrics(self, hours: int = 24, raw: bool = False,
+                                max_points: Optional[int] = None) -> List[Dict]:
+        """Get recent performance metrics, newest first.
+        
+        By default rows come from the ``performance_rollups`` table, at the
+        tier that covers ``hours`` in at most ``max_points`` buckets
+        (1 minute, 1 hour or 1 day). Reading the table rather than this
+        process's in-memory rollups keeps readers in other processes (such
+        as the API server) current. Each row has the bucket average under
+        the metric's name plus ``<metric>_max`` and ``<metric>_p95``.
+        ``raw=True`` returns every stored sample instead.
+        """
+        if not raw:
+            return self._get_performance_rollups(hours, max_points)
+        
+        self.flush()
         try:
             with self.get_session() as session:
                 cutoff_time = datetime.now() - timedelta(hours=hours)
@@ -357,8 +619,44 @@ class DatabaseManager:
             print(f"❌ Failed to get performance metrics: {e}")
             return []
     
+    def _get_performance_rollups(self, hours: int, max_points: Optional[int]) -> List[Dict]:
+        self.flush()
+        end = time.time()
+        start = end - hours * 3600
+        resolution = self.rollups.tiers[self.rollups.select_tier(start, end, max_points)][0]
+        try:
+            with self.get_session() as session:
+                records = session.query(PerformanceRollup).filter(
+                    PerformanceRollup.resolution == resolution,
+                    PerformanceRollup.bucket_start >= start // resolution * resolution,
+                    PerformanceRollup.metric.in_(PERFORMANCE_ROLLUP_FIELDS)
+                ).order_by(PerformanceRollup.bucket_start.desc()).all()
+                
+                buckets: Dict[int, Dict[str, Any]] = {}
+                for record in records:
+                    summary = RollupBucket.from_row({
+                        'count': record.count, 'total': record.total, 'minimum': record.minimum,
+                        'maximum': record.maximum, 'sketch': record.sketch
+                    }, self.rollups.relative_accuracy).summary()
+                    entry = buckets.get(record.bucket_start)
+                    if entry is None:
+                        entry = buckets[record.bucket_start] = {
+                            'timestamp': datetime.fromtimestamp(record.bucket_start).isoformat(),
+                            'resolution_seconds': resolution,
+                            'samples': 0
+                        }
+                    entry['samples'] = max(entry['samples'], summary['count'])
+                    entry[record.metric] = summary['avg']
+                    entry[f'{record.metric}_max'] = summary['max']
+                    entry[f'{record.metric}_p95'] = summary['p95']
+                return list(buckets.values())
+        except Exception as e:
+            print(f"❌ Failed to get performance metrics: {e}")
+            return []
+    
     def get_earnings_summary(self) -> Dict[str, Any]:
         """Get earnings summary"""
+        self.flush()
         try:
             with self.get_session() as session:
                 records = session.query(EarningsRecord).all()
@@ -385,6 +683,7 @@ class DatabaseManager:
     
     def get_ai_training_summary(self) -> Dict[str, Any]:
         """Get AI training session summary"""
+        self.flush()
         try:
             with self.get_session() as session:
                 records = session.query(AITrainingRecord).all()
@@ -446,9 +745,11 @@ class DatabaseManager:
     
     def backup_database(self, backup_path: str) -> bool:
         """Create database backup"""
+        self.flush()
         try:
-            import shutil
-            shutil.copy2(self.db_path, backup_path)
+            # Committed rows may still live in the -wal file, so copy through
+            # SQLite's online backup API rather than the main file alone
+            self._copy_database(self.db_path, backup_path)
             print(f"💾 Database backed up to {backup_path}")
             return True
         except Exception as e:
@@ -458,17 +759,24 @@ class DatabaseManager:
     def restore_database(self, backup_path: str) -> bool:
         """Restore database from backup"""
         try:
-            import shutil
-            
-            # Close current connections
-            if self.engine:
-                self.engine.dispose()
-            
-            # Restore backup
-            shutil.copy2(backup_path, self.db_path)
-            
-            # Reinitialize
-            self.init_database()
+            self.flush()
+            # Hold the flush lock throughout so the writer thread cannot
+            # recreate or write into the database mid-restore; rows queued
+            # meanwhile are written to the restored database afterwards
+            with self._flush_lock:
+                # Close current connections
+                if self.engine:
+                    self.engine.dispose()
+                
+                # Restore backup; stale -wal/-shm files would otherwise be
+                # replayed over the restored pages
+                for path in (self.db_path, self.db_path + '-wal', self.db_path + '-shm'):
+                    if os.path.exists(path):
+                        os.remove(path)
+                self._copy_database(backup_path, self.db_path)
+                
+                # Reinitialize
+                self.init_database()
             
             print(f"✅ Database restored from {backup_path}")
             return True
@@ -476,8 +784,22 @@ class DatabaseManager:
             print(f"❌ Database restore failed: {e}")
             return False
     
+    @staticmethod
+    def _copy_database(source_path: str, target_path: str):
+        """Consistent copy of a SQLite database, including WAL contents"""
+        source = sqlite3.connect(source_path)
+        try:
+            target = sqlite3.connect(target_path)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+        finally:
+            source.close()
+    
     def vacuum_database(self) -> bool:
         """Optimize database by running VACUUM"""
+        self.flush()
         try:
             # Use raw SQLite connection for VACUUM
             conn = sqlite3.connect(self.db_path)
@@ -491,7 +813,7 @@ class DatabaseManager:
             return False
     
     def get_database_stats(self) -> Dict[str, Any]:
-        """Get database statistics"""
+        """Get database statistics; rows still queued show up in ``write_behind``"""
         try:
             with self.get_session() as session:
                 stats = {
@@ -500,7 +822,9 @@ class DatabaseManager:
                     'earnings_records': session.query(EarningsRecord).count(),
                     'ai_training_records': session.query(AITrainingRecord).count(),
                     'database_size_mb': os.path.getsize(self.db_path) / (1024 * 1024) if os.path.exists(self.db_path) else 0,
-                    'tables': ['task_records', 'performance_metrics', 'earnings', 'task_executions_enhanced', 'ai_training_sessions']
+                    'tables': ['task_records', 'performance_metrics', 'earnings', 'task_executions_enhanced', 'ai_training_sessions', 'performance_rollups'],
+                    'write_behind': self.get_write_stats(),
+                    'rollups': self.rollups.get_stats()
                 }
                 
                 return stats
@@ -555,8 +879,18 @@ class DatabaseManager:
             return {}
     
     def close(self):
-        """Close database connection"""
+        """Flush queued writes and close database connection"""
+        if self._closing:
+            return
+        self._closing = True
         try:
+            if self._writer is not None:
+                with self._pending_lock:
+                    self._pending_lock.notify()
+                self._writer.join(timeout=max(5.0, self.flush_interval * 2))
+                atexit.unregister(self.close)
+            if self.session_factory is not None:
+                self.flush()
             if self.engine:
                 self.engine.dispose()
             print("💾 Database connection closed")
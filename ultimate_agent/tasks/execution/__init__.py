@@ -7,6 +7,7 @@ except ModuleNotFoundError:  # pragma: no cover - fallback for tests
     aioredis = None
 
 from .executor import TaskExecutor
+from .stream_consumer import StreamConsumer
 
 class TaskScheduler:
     def __init__(self, config=None):
@@ -19,6 +20,7 @@ class TaskScheduler:
         self.stream_key = self.config.get("REDIS_STREAM_KEY", "agent:tasks")
         self.group_name = self.config.get("REDIS_GROUP_NAME", "agent-workers")
         self.consumer_name = self.config.get("REDIS_CONSUMER_PREFIX", "agent-") + str(id(self))
+        self.stream_consumer = None
 
     async def connect_redis(self):
         if aioredis is None:
@@ -35,26 +37,29 @@ class TaskScheduler:
             else:
                 raise
 
+    def create_stream_consumer(self) -> StreamConsumer:
+        """Build the concurrent consumer for the task stream"""
+        return StreamConsumer(
+            self.redis,
+            self.stream_key,
+            self.group_name,
+            self.consumer_name,
+            self.executor.execute,
+            max_in_flight=self.config.get("STREAM_MAX_IN_FLIGHT", 8),
+            pool_type=self.config.get("STREAM_POOL_TYPE", "thread"),
+            ack_batch_size=self.config.get("STREAM_ACK_BATCH_SIZE", 32),
+            reclaim_idle_ms=int(self.config.get("STREAM_RECLAIM_IDLE_MS", 60000))
+        )
+
     async def read_stream_tasks(self):
-        while not self.shutdown_event.is_set():
-            try:
-                results = await self.redis.xreadgroup(
-                    groupname=self.group_name,
-                    consumername=self.consumer_name,
-                    streams={self.stream_key: '>'},
-                    count=5,
-                    block=3000
-                )
-                if results:
-                    for stream_key, messages in results:
-                        for message_id, fields in messages:
-                            task = {k.decode(): v.decode() for k, v in fields.items()}
-                            print(f"🔧 Received task: {task}")
-                            self.executor.execute(task)
-                            await self.redis.xack(self.stream_key, self.group_name, message_id)
-            except Exception as e:
-                print(f"❌ Error reading stream: {e}")
-                await asyncio.sleep(1)
+        """Consume the task stream with up to N tasks in flight"""
+        self.stream_consumer = self.create_stream_consumer()
+        stopper = asyncio.create_task(self.shutdown_event.wait())
+        stopper.add_done_callback(lambda _: self.stream_consumer.stop())
+        try:
+            await self.stream_consumer.run()
+        finally:
+            stopper.cancel()
 
     async def redis_listener(self):
         pubsub = self.redis.pubsub()
@@ -86,7 +91,10 @@ class TaskScheduler:
         await self.shutdown_event.wait()
         print("🚭 Shutdown initiated")
 
-        stream_task.cancel()
         redis_task.cancel()
 
+        # The stream consumer drains in-flight tasks and flushes acks on shutdown
+        await asyncio.wait([stream_task], timeout=30)
+        stream_task.cancel()
+
         await self.redis.close()
\ No newline at end of file
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+ultimate_agent/tasks/execution/engine.py
+Priority-queue task execution engine backed by a bounded worker pool
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, Any, List, Optional, Callable
+
+
+class TaskState(Enum):
+    """Lifecycle state of a task handled by the engine"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    PAUSED = "paused"
+    CANCELLED = "cancelled"
+    FINISHED = "finished"
+
+
+@dataclass
+class TaskHandle:
+    """Engine-side handle for a submitted task"""
+    task_id: str
+    task_type: str
+    func: Callable[["TaskHandle"], Any]
+    priority: int = 0
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    # Runtime state
+    state: TaskState = field(default=TaskState.QUEUED, init=False)
+    submitted_at: float = field(default_factory=time.time, init=False)
+    started_at: Optional[float] = field(default=None, init=False)
+    finished_at: Optional[float] = field(default=None, init=False)
+    _entry_seq: int = field(default=-1, init=False, repr=False)
+    _cancel_event: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+    _resume_event: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+
+    def __post_init__(self):
+        self._resume_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def queue_wait(self) -> float:
+        """Seconds spent in the queue before a worker picked the task up"""
+        end = self.started_at if self.started_at is not None else time.time()
+        return end - self.submitted_at
+
+    def checkpoint(self, timeout: Optional[float] = None) -> bool:
+        """Cooperative pause/cancel point for running tasks.
+
+        Blocks while the task is paused and returns False once it has been
+        cancelled, so task bodies can call it from their progress callbacks.
+        """
+        if not self._resume_event.is_set():
+            self._resume_event.wait(timeout)
+        return not self._cancel_event.is_set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'task_id': self.task_id,
+            'task_type': self.task_type,
+            'priority': self.priority,
+            'status': self.state.value,
+            'queued_at': self.submitted_at,
+            'started_at': self.started_at,
+            'queue_wait': self.queue_wait,
+            **self.metadata
+        }
+
+
+class TaskExecutionEngine:
+    """Runs tasks on a fixed pool of worker threads.
+
+    Pending tasks live in a binary heap ordered by priority (higher first),
+    then by a per-type virtual round so a burst of one task type cannot
+    starve the others, then by submission order. Cancel, pause and resume
+    are O(1) lookups in ``_handles``; stale heap entries are skipped lazily
+    when popped and compacted once they make up half the heap.
+    """
+
+    _COMPACT_MIN_STALE = 64
+
+    def __init__(self, max_workers: int = 3, name: str = "TaskWorker"):
+        self.name = name
+        self._max_workers = max(1, int(max_workers))
+        self._cond = threading.Condition()
+        self._heap: List[tuple] = []
+        self._handles: Dict[str, TaskHandle] = {}
+        self._seq = itertools.count()
+        self._type_rounds: Dict[str, int] = defaultdict(int)
+        self._current_round = 0
+        self._queued = 0
+        self._running = 0
+        self._stale = 0
+        self._workers: List[threading.Thread] = []
+        self._worker_ids = itertools.count(1)
+        self._shutdown = False
+
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'cancelled': 0,
+            'errors': 0
+        }
+
+    # ------------------------------------------------------------------
+    # Submission and control
+    # ------------------------------------------------------------------
+    def submit(self, task_id: str, task_type: str, func: Callable[[TaskHandle], Any],
+               priority: int = 0, metadata: Dict[str, Any] = None) -> TaskHandle:
+        """Queue ``func(handle)`` for execution and return its handle"""
+        handle = TaskHandle(task_id, task_type, func, priority, metadata or {})
+
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Task engine is shut down")
+            if task_id in self._handles:
+                raise ValueError(f"Duplicate task id: {task_id}")
+
+            self._handles[task_id] = handle
+            self._push(handle)
+            self.stats['submitted'] += 1
+            self._ensure_workers()
+            self._cond.notify()
+
+        return handle
+
+    def cancel(self, task_id: str) -> bool:
+        """Cancel a queued, paused or running task"""
+        with self._cond:
+            handle = self._handles.get(task_id)
+            if handle is None or handle.state in (TaskState.CANCELLED, TaskState.FINISHED):
+                return False
+
+            was_queued = handle.state == TaskState.QUEUED
+            handle.state = TaskState.CANCELLED
+            handle._cancel_event.set()
+            handle._resume_event.set()
+            self.stats['cancelled'] += 1
+
+            if handle.started_at is None:
+                # Never picked up by a worker, drop it right away
+                if was_queued:
+                    self._queued -= 1
+                    self._mark_stale()
+                del self._handles[task_id]
+            return True
+
+    def pause(self, task_id: str) -> bool:
+        """Pause a task; queued tasks are held back, running ones block at their next checkpoint"""
+        with self._cond:
+            handle = self._handles.get(task_id)
+            if handle is None or handle.state not in (TaskState.QUEUED, TaskState.RUNNING):
+                return False
+
+            if handle.state == TaskState.QUEUED:
+                self._queued -= 1
+                self._mark_stale()
+            handle.state = TaskState.PAUSED
+            handle._resume_event.clear()
+            return True
+
+    def resume(self, task_id: str) -> bool:
+        """Resume a paused task"""
+        with self._cond:
+            handle = self._handles.get(task_id)
+            if handle is None or handle.state != TaskState.PAUSED:
+                return False
+
+            handle._resume_event.set()
+            if handle.started_at is None:
+                self._push(handle)
+                self._cond.notify()
+            else:
+                handle.state = TaskState.RUNNING
+            return True
+
+    def get(self, task_id: str) -> Optional[TaskHandle]:
+        return self._handles.get(task_id)
+
+    # ------------------------------------------------------------------
+    # Pool management
+    # ------------------------------------------------------------------
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    def set_max_workers(self, max_workers: int):
+        """Resize the pool; surplus workers exit after their current task"""
+        with self._cond:
+            self._max_workers = max(1, int(max_workers))
+            self._ensure_workers()
+            self._cond.notify_all()
+
+    def queued_count(self) -> int:
+        return self._queued
+
+    def running_count(self) -> int:
+        return self._running
+
+    def worker_count(self) -> int:
+        return len(self._workers)
+
+    def queued_tasks(self) -> List[TaskHandle]:
+        """Snapshot of queued and paused-before-start tasks"""
+        with self._cond:
+            return [h for h in self._handles.values() if h.started_at is None]
+
+    def shutdown(self, cancel_pending: bool = True, timeout: Optional[float] = 5.0):
+        """Stop the workers.
+
+        With ``cancel_pending`` every queued, paused or running task is
+        cancelled. Otherwise the workers first run everything still queued;
+        tasks paused before they started stay paused and are not run.
+        """
+        with self._cond:
+            self._shutdown = True
+            if cancel_pending:
+                for task_id in list(self._handles):
+                    handle = self._handles[task_id]
+                    handle._cancel_event.set()
+                    handle._resume_event.set()
+                    if handle.started_at is None:
+                        del self._handles[task_id]
+                self._heap.clear()
+                self._queued = 0
+                self._stale = 0
+            self._cond.notify_all()
+            workers = list(self._workers)
+
+        for worker in workers:
+            if worker is not threading.current_thread():
+                worker.join(timeout=timeout)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'max_workers': self._max_workers,
+            'workers': len(self._workers),
+            'running': self._running,
+            'queued': self._queued,
+            'heap_size': len(self._heap),
+            **self.stats
+        }
+
+    # ------------------------------------------------------------------
+    # Internals (callers hold ``self._cond``)
+    # ------------------------------------------------------------------
+    def _push(self, handle: TaskHandle):
+        task_round = max(self._type_rounds[handle.task_type], self._current_round)
+        self._type_rounds[handle.task_type] = task_round + 1
+
+        seq = next(self._seq)
+        handle._entry_seq = seq
+        handle.state = TaskState.QUEUED
+        heapq.heappush(self._heap, (-handle.priority, task_round, seq, handle))
+        self._queued += 1
+
+    def _pop(self) -> Optional[TaskHandle]:
+        while self._heap:
+            _, task_round, seq, handle = heapq.heappop(self._heap)
+            if handle.state == TaskState.QUEUED and handle._entry_seq == seq:
+                self._current_round = max(self._current_round, task_round)
+                self._queued -= 1
+                return handle
+            self._stale -= 1
+        return None
+
+    def _mark_stale(self):
+        self._stale += 1
+        if self._stale >= self._COMPACT_MIN_STALE and self._stale * 2 >= len(self._heap):
+            self._heap = [entry for entry in self._heap
+                          if entry[3].state == TaskState.QUEUED and entry[3]._entry_seq == entry[2]]
+            heapq.heapify(self._heap)
+            self._stale = 0
+
+    def _ensure_workers(self):
+        self._workers = [w for w in self._workers if w.is_alive()]
+        while len(self._workers) < self._max_workers:
+            worker = threading.Thread(
+                target=self._worker_loop,
+                daemon=True,
+                name=f"{self.name}-{next(self._worker_ids)}"
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def _worker_loop(self):
+        me = threading.current_thread()
+        while True:
+            with self._cond:
+                handle = None
+                while True:
+                    if len(self._workers) > self._max_workers:
+                        break
+                    # Keep popping after shutdown: without cancel_pending the
+                    # queue is drained, with it the heap is already empty
+                    handle = self._pop()
+                    if handle is not None or self._shutdown:
+                        break
+                    self._cond.wait()
+
+                if handle is None:
+                    if me in self._workers:
+                        self._workers.remove(me)
+                    return
+
+                handle.state = TaskState.RUNNING
+                handle.started_at = time.time()
+                self._running += 1
+
+            try:
+                handle.func(handle)
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"❌ Task engine worker error in {handle.task_id}: {e}")
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    handle.finished_at = time.time()
+                    if handle.state != TaskState.CANCELLED:
+                        handle.state = TaskState.FINISHED
+                        self.stats['completed'] += 1
+                    self._handles.pop(handle.task_id, None)
+
+
+__all__ = ['TaskExecutionEngine', 'TaskHandle', 'TaskState']
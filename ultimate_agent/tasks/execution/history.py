@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+ultimate_agent/tasks/execution/history.py
+Bounded, indexed store for completed task records
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Any, Iterator, List, Optional
+
+
+class TaskHistoryStore:
+    """Ring buffer of completion records with a task_id index.
+
+    Only the most recent ``max_records`` records are retained, but the
+    aggregates behind ``get_statistics`` are updated on every ``append`` and
+    cover every task ever recorded, so statistics reads are O(1) regardless
+    of how many tasks have finished.
+    """
+
+    def __init__(self, max_records: int = 10000):
+        self.max_records = max(1, int(max_records))
+        self._records: deque = deque(maxlen=self.max_records)
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+        # Running aggregates
+        self.total_count = 0
+        self.success_count = 0
+        self.duration_sum = 0.0
+        self.duration_count = 0
+        self.total_earnings = 0.0
+
+    def append(self, record: Dict[str, Any]):
+        """Record a finished task and fold it into the aggregates"""
+        with self._lock:
+            if len(self._records) == self.max_records:
+                self._forget(self._records[0])
+            self._records.append(record)
+            self._index[record.get('task_id')] = record
+
+            self.total_count += 1
+            if record.get('success', False):
+                self.success_count += 1
+                if 'duration' in record:
+                    self.duration_sum += record['duration']
+                    self.duration_count += 1
+            self.total_earnings += record.get('reward', 0)
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return self._index.get(task_id)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Lifetime totals, success rate, mean duration and earnings"""
+        total = self.total_count
+        return {
+            'total_completed': total,
+            'successful_tasks': self.success_count,
+            'failed_tasks': total - self.success_count,
+            'success_rate': (self.success_count / total) if total > 0 else 0,
+            'average_duration': (self.duration_sum / self.duration_count) if self.duration_count else 0,
+            'total_earnings': self.total_earnings
+        }
+
+    def trim(self, keep_recent: int) -> int:
+        """Drop all but the ``keep_recent`` newest records; returns how many were removed"""
+        with self._lock:
+            removed = max(0, len(self._records) - max(0, keep_recent))
+            for _ in range(removed):
+                self._forget(self._records.popleft())
+            return removed
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Newest records first"""
+        with self._lock:
+            count = min(max(0, limit), len(self._records))
+            return [self._records[-i] for i in range(1, count + 1)]
+
+    def _forget(self, record: Dict[str, Any]):
+        task_id = record.get('task_id')
+        if self._index.get(task_id) is record:
+            del self._index[task_id]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        # Iterate over a snapshot so concurrent appends cannot invalidate it
+        with self._lock:
+            snapshot = list(self._records)
+        return iter(snapshot)
+
+
+__all__ = ['TaskHistoryStore']
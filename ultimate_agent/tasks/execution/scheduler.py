@@ -28,6 +28,7 @@ except ModuleNotFoundError:
     aioredis = None
 
 from .executor import TaskExecutor
+from .stream_consumer import StreamConsumer
 from ...config.settings import settings
 from ..simulation import TaskSimulator
 from ..control import TaskControlClient
@@ -59,6 +60,7 @@ class TaskScheduler:
         self.stream_key = "agent:tasks"
         self.group_name = "agent-workers"
         self.consumer_name = f"agent-{id(self)}"
+        self.stream_consumer = None
 
         print("🎯 Task Scheduler initialized")
 
@@ -76,26 +78,29 @@ class TaskScheduler:
             else:
                 raise
 
+    def create_stream_consumer(self) -> StreamConsumer:
+        """Build the concurrent consumer for the task stream"""
+        return StreamConsumer(
+            self.redis,
+            self.stream_key,
+            self.group_name,
+            self.consumer_name,
+            self.executor.execute,
+            max_in_flight=self.config.get('stream_max_in_flight', 8),
+            pool_type=self.config.get('stream_pool_type', 'thread'),
+            ack_batch_size=self.config.get('stream_ack_batch_size', 32),
+            reclaim_idle_ms=int(self.config.get('stream_reclaim_idle_ms', 60000))
+        )
+
     async def read_stream_tasks(self):
-        while not self.shutdown_event.is_set():
-            try:
-                results = await self.redis.xreadgroup(
-                    groupname=self.group_name,
-                    consumername=self.consumer_name,
-                    streams={self.stream_key: '>'},
-                    count=5,
-                    block=3000
-                )
-                if results:
-                    for stream_key, messages in results:
-                        for message_id, fields in messages:
-                            task = {k.decode(): v.decode() for k, v in fields.items()}
-                            print(f"🔧 Received task: {task}")
-                            self.executor.execute(task)
-                            await self.redis.xack(self.stream_key, self.group_name, message_id)
-            except Exception as e:
-                print(f"❌ Error reading stream: {e}")
-                await asyncio.sleep(1)
+        """Consume the task stream with up to N tasks in flight"""
+        self.stream_consumer = self.create_stream_consumer()
+        stopper = asyncio.create_task(self.shutdown_event.wait())
+        stopper.add_done_callback(lambda _: self.stream_consumer.stop())
+        try:
+            await self.stream_consumer.run()
+        finally:
+            stopper.cancel()
 
     async def redis_listener(self):
         pubsub = self.redis.pubsub()
@@ -127,9 +132,12 @@ class TaskScheduler:
         await self.shutdown_event.wait()
         print("🛑 Shutdown initiated")
 
-        stream_task.cancel()
         redis_task.cancel()
 
+        # The stream consumer drains in-flight tasks and flushes acks on shutdown
+        await asyncio.wait([stream_task], timeout=30)
+        stream_task.cancel()
+
         await self.redis.close()
 
     async def process_pending(self):
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+ultimate_agent/tasks/execution/stream_consumer.py
+Concurrent Redis stream consumer with batched acks and pending-entry reclaim
+"""
+
+import asyncio
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Callable
+
+from ...core.events import event_bus
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, (bytes, bytearray)) else value
+
+
+class StreamConsumer:
+    """Keeps up to ``max_in_flight`` stream tasks running at once.
+
+    Messages are read with XREADGROUP only while the worker pool has free
+    slots, executed off the event loop in a thread or process pool, and
+    acknowledged in batches with a single multi-id XACK. Entries left pending
+    by crashed consumers are taken over with XAUTOCLAIM once they have been
+    idle for ``reclaim_idle_ms``.
+
+    ``redis`` only needs ``xreadgroup``, ``xack`` and ``xautoclaim`` with the
+    redis-py asyncio signatures, so an in-process fake works for tests.
+    """
+
+    def __init__(self, redis, stream_key: str, group_name: str, consumer_name: str,
+                 execute: Callable[[Dict[str, Any]], Any],
+                 max_in_flight: int = 8,
+                 pool: Optional[Executor] = None,
+                 pool_type: str = "thread",
+                 ack_batch_size: int = 32,
+                 ack_interval: float = 0.05,
+                 block_ms: int = 1000,
+                 reclaim_idle_ms: int = 60000,
+                 reclaim_interval: float = 30.0,
+                 max_retries: int = 3):
+        self.redis = redis
+        self.stream_key = stream_key
+        self.group_name = group_name
+        self.consumer_name = consumer_name
+        self.execute = execute
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.ack_batch_size = max(1, int(ack_batch_size))
+        self.ack_interval = ack_interval
+        self.block_ms = block_ms
+        self.reclaim_idle_ms = int(reclaim_idle_ms)
+        self.reclaim_interval = reclaim_interval
+        self.max_retries = max_retries
+
+        self._owns_pool = pool is None
+        if pool is None:
+            if pool_type == "process":
+                pool = ProcessPoolExecutor(max_workers=self.max_in_flight)
+            else:
+                pool = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="StreamTask")
+        self.pool = pool
+        self._publish_results = isinstance(pool, ProcessPoolExecutor)
+
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight: Dict[Any, asyncio.Task] = {}
+        self._pending_acks: List[Any] = []
+        self._ack_wakeup: Optional[asyncio.Event] = None
+        self._failures: Dict[Any, int] = {}
+        self._stopping = False
+        self._last_reclaim = 0.0
+
+        self.stats = {
+            'received': 0,
+            'completed': 0,
+            'failed': 0,
+            'dead_lettered': 0,
+            'acked': 0,
+            'ack_batches': 0,
+            'reclaimed': 0
+        }
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    async def run(self):
+        """Consume until ``stop`` is called, then drain in-flight work and flush acks"""
+        self._stopping = False
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._ack_wakeup = asyncio.Event()
+
+        ack_task = asyncio.create_task(self._ack_loop())
+        try:
+            await self._read_loop()
+        finally:
+            if self._in_flight:
+                await asyncio.gather(*self._in_flight.values(), return_exceptions=True)
+            ack_task.cancel()
+            await asyncio.gather(ack_task, return_exceptions=True)
+            await self._flush_acks()
+            if self._owns_pool:
+                self.pool.shutdown(wait=False)
+
+    def stop(self):
+        self._stopping = True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'pending_acks': len(self._pending_acks)
+        }
+
+    async def _read_loop(self):
+        while not self._stopping:
+            # Backpressure: only take as many messages as there are free pool slots
+            await self._slots.acquire()
+            free = 1
+            while free < self.max_in_flight and not self._slots.locked():
+                await self._slots.acquire()
+                free += 1
+
+            try:
+                if time.monotonic() - self._last_reclaim >= self.reclaim_interval:
+                    self._last_reclaim = time.monotonic()
+                    free -= await self._reclaim_pending(free)
+                    if free == 0:
+                        continue
+
+                results = await self.redis.xreadgroup(
+                    groupname=self.group_name,
+                    consumername=self.consumer_name,
+                    streams={self.stream_key: '>'},
+                    count=free,
+                    block=self.block_ms
+                )
+                messages = [msg for _, stream_messages in (results or []) for msg in stream_messages]
+                for message_id, fields in messages[:free]:
+                    self._dispatch(message_id, fields)
+                    free -= 1
+            except Exception as e:
+                print(f"❌ Error reading stream: {e}")
+                await asyncio.sleep(1)
+            finally:
+                for _ in range(free):
+                    self._slots.release()
+
+    def _dispatch(self, message_id, fields):
+        """Start a message on the pool; the caller already holds a slot for it"""
+        if message_id in self._in_flight:
+            self._slots.release()
+            return
+        task = {_decode(k): _decode(v) for k, v in (fields or {}).items()}
+        self.stats['received'] += 1
+        self._in_flight[message_id] = asyncio.create_task(self._run_one(message_id, task))
+
+    async def _run_one(self, message_id, task: Dict[str, Any]):
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.pool, self.execute, task)
+            self.stats['completed'] += 1
+            self._failures.pop(message_id, None)
+            if self._publish_results:
+                event_bus.publish("task.completed", result)
+            self._queue_ack(message_id)
+        except Exception as e:
+            self.stats['failed'] += 1
+            failures = self._failures.get(message_id, 0) + 1
+            self._failures[message_id] = failures
+            print(f"❌ Stream task {_decode(message_id)} failed ({failures}/{self.max_retries}): {e}")
+            if failures >= self.max_retries:
+                # Give up and ack so the entry does not cycle through reclaim forever
+                self.stats['dead_lettered'] += 1
+                self._failures.pop(message_id, None)
+                event_bus.publish("task.failed", {"task_id": task.get("task_id", "unknown"), "error": str(e)})
+                self._queue_ack(message_id)
+        finally:
+            self._in_flight.pop(message_id, None)
+            self._slots.release()
+
+    def _queue_ack(self, message_id):
+        self._pending_acks.append(message_id)
+        if len(self._pending_acks) >= self.ack_batch_size:
+            self._ack_wakeup.set()
+
+    async def _ack_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._ack_wakeup.wait(), timeout=self.ack_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._ack_wakeup.clear()
+            await self._flush_acks()
+
+    async def _flush_acks(self):
+        if not self._pending_acks:
+            return
+        ids, self._pending_acks = self._pending_acks, []
+        try:
+            await self.redis.xack(self.stream_key, self.group_name, *ids)
+            self.stats['acked'] += len(ids)
+            self.stats['ack_batches'] += 1
+        except Exception as e:
+            print(f"❌ Failed to ack {len(ids)} stream entries: {e}")
+            self._pending_acks[:0] = ids
+
+    async def _reclaim_pending(self, free: int) -> int:
+        """Claim up to ``free`` entries idle longer than ``reclaim_idle_ms`` and run them here"""
+        claimed = 0
+        start_id = '0-0'
+        while claimed < free:
+            response = await self.redis.xautoclaim(
+                self.stream_key, self.group_name, self.consumer_name,
+                min_idle_time=self.reclaim_idle_ms, start_id=start_id, count=free - claimed
+            )
+            next_id, messages = response[0], response[1]
+            for message_id, fields in messages:
+                if fields is not None:
+                    self._dispatch(message_id, fields)
+                    claimed += 1
+            if _decode(next_id) in ('0-0', '0'):
+                break
+            start_id = next_id
+
+        if claimed:
+            self.stats['reclaimed'] += claimed
+            print(f"♻️ Reclaimed {claimed} stalled stream entries")
+        return claimed
+
+
+__all__ = ['StreamConsumer']
@@ -20,30 +20,57 @@ from datetime import datetime
 from typing import Dict, Any, List, Callable
 from ..simulation import TaskSimulator
 from ..control import TaskControlClient
+from .engine import TaskExecutionEngine, TaskHandle
+from .history import TaskHistoryStore
+from ...monitoring.metrics.registry import REGISTRY
+
+TASK_QUEUE_WAIT = REGISTRY.histogram(
+    'agent_task_queue_wait_seconds', 'Time tasks spend queued before a worker starts them',
+    ['task_type'], buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+)
+TASK_RUN_TIME = REGISTRY.histogram(
+    'agent_task_run_seconds', 'Task execution time',
+    ['task_type'], buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600)
+)
+TASKS_FINISHED = REGISTRY.counter(
+    'agent_tasks_finished_total', 'Tasks finished, by outcome', ['task_type', 'outcome']
+)
 
 
 class TaskScheduler:
     """Manages task scheduling and execution"""
     
-    def __init__(self, ai_manager, blockchain_manager):
+    def __init__(self, ai_manager, blockchain_manager, config_manager=None):
         self.ai_manager = ai_manager
         self.blockchain_manager = blockchain_manager
+        self.config_manager = config_manager
         self.task_simulator = TaskSimulator(ai_manager, blockchain_manager)
         self.task_control_client = TaskControlClient(self)
         
         # Active tasks and execution state
         self.current_tasks = {}
-        self.completed_tasks = []
-        self.task_queue = []
         self.max_concurrent_tasks = 3
+        history_size = 10000
+        if config_manager is not None:
+            self.max_concurrent_tasks = max(1, config_manager.getint('DEFAULT', 'max_concurrent_tasks', fallback=3))
+            history_size = config_manager.getint('DEFAULT', 'task_history_size', fallback=history_size)
+        
+        # Completed task records: bounded ring buffer, indexed by task_id
+        self.completed_tasks = TaskHistoryStore(max_records=history_size)
         
-        # Task execution threads
-        self.executor_threads = {}
+        # Bounded worker pool with a priority queue in front of it
+        self.engine = TaskExecutionEngine(max_workers=self.max_concurrent_tasks)
         self._thread = None
         self.running = False
 
         print(f"🎯 Task Scheduler initialized")
 
+    @property
+    def task_queue(self) -> List[Dict[str, Any]]:
+        """Queued (not yet started) tasks, highest priority first"""
+        handles = sorted(self.engine.queued_tasks(), key=lambda h: (-h.priority, h.submitted_at))
+        return [h.to_dict() for h in handles]
+
     def start(self):
         """Start the scheduler background loop."""
         if self.running:
@@ -67,37 +94,12 @@ class TaskScheduler:
         return list(self.task_simulator.tasks.keys())
     
     def start_task(self, task_type: str, task_config: Dict = None) -> str:
-        """Start a new task"""
+        """Start a new task, queueing it if all workers are busy"""
         if task_type not in self.task_simulator.tasks:
             raise ValueError(f"Unknown task type: {task_type}")
         
-        if len(self.current_tasks) >= self.max_concurrent_tasks:
-            # Queue the task
-            task_id = self._queue_task(task_type, task_config or {})
-            return task_id
-        
-        return self._execute_task_immediately(task_type, task_config or {})
-    
-    def _queue_task(self, task_type: str, task_config: Dict) -> str:
-        """Queue task for later execution"""
-        task_id = f"queued-{int(time.time())}-{random.randint(1000, 9999)}"
-        
-        queued_task = {
-            'task_id': task_id,
-            'task_type': task_type,
-            'config': task_config,
-            'queued_at': datetime.now(),
-            'status': 'queued'
-        }
-        
-        self.task_queue.append(queued_task)
-        print(f"📋 Task queued: {task_id} ({task_type})")
-        
-        return task_id
-    
-    def _execute_task_immediately(self, task_type: str, task_config: Dict) -> str:
-        """Execute task immediately"""
-        task_id = f"task-{int(time.time())}-{random.randint(1000, 9999)}"
+        task_config = task_config or {}
+        task_id = f"task-{int(time.time())}-{uuid.uuid4().hex[:8]}"
         
         # Get task configuration
         base_config = self.task_simulator.tasks[task_type].copy()
@@ -107,41 +109,41 @@ class TaskScheduler:
             base_config['min_duration'], 
             base_config['max_duration']
         )
+        priority = int(base_config.get('priority', 0))
         
-        # Create task details
-        task_details = {
-            **base_config,
+        busy = self.engine.running_count() + self.engine.queued_count() >= self.engine.max_workers
+        self.engine.submit(
+            task_id,
+            task_type,
+            lambda handle: self._execute_task_thread(handle, base_config),
+            priority=priority,
+            metadata={'config': task_config}
+        )
+        
+        if busy:
+            print(f"📋 Task queued: {task_id} ({task_type})")
+        return task_id
+    
+    def _execute_task_thread(self, handle: TaskHandle, task_config: Dict):
+        """Execute task on an engine worker thread"""
+        task_id = handle.task_id
+        self.current_tasks[task_id] = {
+            **task_config,
             "task_id": task_id,
             "start_time": datetime.now().isoformat(),
             "progress": 0,
             "status": "running",
             "details": {}
         }
+        print(f"🚀 Task started: {task_id} ({task_config['type']})")
+        TASK_QUEUE_WAIT.labels(handle.task_type).observe(handle.queue_wait)
         
-        self.current_tasks[task_id] = task_details
-        
-        # Start execution thread
-        execution_thread = threading.Thread(
-            target=self._execute_task_thread,
-            args=(task_id, base_config),
-            daemon=True,
-            name=f"Task-{task_id}"
-        )
-        
-        self.executor_threads[task_id] = execution_thread
-        execution_thread.start()
-        
-        print(f"🚀 Task started: {task_id} ({task_type})")
-        return task_id
-    
-    def _execute_task_thread(self, task_id: str, task_config: Dict):
-        """Execute task in separate thread"""
+        start_time = time.time()
+        outcome = 'failed'
         try:
-            start_time = time.time()
-            
             # Progress callback
             def progress_callback(progress: float, details: Dict = None) -> bool:
-                if task_id not in self.current_tasks:
+                if not handle.checkpoint() or task_id not in self.current_tasks:
                     return False
                 
                 self.current_tasks[task_id]["progress"] = progress
@@ -165,20 +167,17 @@ class TaskScheduler:
             duration = end_time - start_time
             
             # Handle completion
+            outcome = 'success' if result.get('success', False) else 'unsuccessful'
             self._handle_task_completion(task_id, task_config, result, duration, start_time, end_time)
             
         except Exception as e:
             print(f"❌ Task {task_id} execution failed: {e}")
             self._handle_task_failure(task_id, str(e))
         finally:
+            TASK_RUN_TIME.labels(handle.task_type).observe(time.time() - start_time)
+            TASKS_FINISHED.labels(handle.task_type, 'cancelled' if handle.cancelled else outcome).inc()
             # Clean up
-            if task_id in self.current_tasks:
-                del self.current_tasks[task_id]
-            if task_id in self.executor_threads:
-                del self.executor_threads[task_id]
-            
-            # Check for queued tasks
-            self._process_task_queue()
+            self.current_tasks.pop(task_id, None)
     
     def _handle_task_completion(self, task_id: str, task_config: Dict, result: Dict, 
                                duration: float, start_time: float, end_time: float):
@@ -226,17 +225,6 @@ class TaskScheduler:
         
         print(f"❌ Task failed: {task_id} - {error}")
     
-    def _process_task_queue(self):
-        """Process queued tasks"""
-        if self.task_queue and len(self.current_tasks) < self.max_concurrent_tasks:
-            queued_task = self.task_queue.pop(0)
-            print(f"📋 Starting queued task: {queued_task['task_id']}")
-            
-            self._execute_task_immediately(
-                queued_task['task_type'],
-                queued_task['config']
-            )
-    
     def _broadcast_progress(self, task_id: str, progress: float, details: Dict = None):
         """Broadcast task progress (placeholder for agent integration)"""
         # This would be implemented by the agent to broadcast via WebSocket
@@ -248,21 +236,35 @@ class TaskScheduler:
         pass
     
     def cancel_task(self, task_id: str) -> bool:
-        """Cancel running task"""
-        if task_id in self.current_tasks:
-            # Mark for cancellation (task thread will check and exit)
-            del self.current_tasks[task_id]
+        """Cancel running or queued task"""
+        if not self.engine.cancel(task_id):
+            return False
+        
+        if self.current_tasks.pop(task_id, None) is not None:
             print(f"🛑 Task cancelled: {task_id}")
-            return True
+        else:
+            print(f"🛑 Queued task cancelled: {task_id}")
+        return True
+    
+    def pause_task(self, task_id: str) -> bool:
+        """Pause a queued task or a running task at its next progress update"""
+        if not self.engine.pause(task_id):
+            return False
         
-        # Check if task is queued
-        for i, queued_task in enumerate(self.task_queue):
-            if queued_task['task_id'] == task_id:
-                del self.task_queue[i]
-                print(f"🛑 Queued task cancelled: {task_id}")
-                return True
+        if task_id in self.current_tasks:
+            self.current_tasks[task_id]["status"] = "paused"
+        print(f"⏸️ Task paused: {task_id}")
+        return True
+    
+    def resume_task(self, task_id: str) -> bool:
+        """Resume a paused task"""
+        if not self.engine.resume(task_id):
+            return False
         
-        return False
+        if task_id in self.current_tasks:
+            self.current_tasks[task_id]["status"] = "running"
+        print(f"▶️ Task resumed: {task_id}")
+        return True
     
     def get_task_status(self, task_id: str) -> Dict[str, Any]:
         """Get status of specific task"""
@@ -271,33 +273,38 @@ class TaskScheduler:
             return self.current_tasks[task_id]
         
         # Check queued tasks
-        for queued_task in self.task_queue:
-            if queued_task['task_id'] == task_id:
-                return queued_task
+        handle = self.engine.get(task_id)
+        if handle is not None:
+            return handle.to_dict()
         
         # Check completed tasks
-        for completed_task in self.completed_tasks:
-            if completed_task['task_id'] == task_id:
-                return completed_task
+        completed_task = self.completed_tasks.get(task_id)
+        if completed_task is not None:
+            return completed_task
         
         return {'error': 'Task not found'}
     
+    def get_recent_tasks(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recently finished task records, newest first"""
+        return self.completed_tasks.recent(limit)
+    
     def get_scheduler_status(self) -> Dict[str, Any]:
         """Get comprehensive scheduler status"""
         return {
             'current_tasks': len(self.current_tasks),
-            'queued_tasks': len(self.task_queue),
+            'queued_tasks': self.engine.queued_count(),
             'completed_tasks': len(self.completed_tasks),
             'max_concurrent_tasks': self.max_concurrent_tasks,
             'available_task_types': self.get_available_task_types(),
             'task_control_connected': self.task_control_client.connected if hasattr(self.task_control_client, 'connected') else False,
-            'active_threads': len(self.executor_threads),
-            'scheduler_running': self.running
+            'active_threads': self.engine.worker_count(),
+            'scheduler_running': self.running,
+            'engine': self.engine.get_status()
         }
     
     def auto_start_tasks(self):
         """Automatically start tasks based on configuration"""
-        if len(self.current_tasks) < self.max_concurrent_tasks:
+        if self.engine.running_count() + self.engine.queued_count() < self.max_concurrent_tasks:
             # 10% chance to start a random task
             if random.random() < 0.1:
                 task_types = self.get_available_task_types()
@@ -309,40 +316,21 @@ class TaskScheduler:
         self.max_concurrent_tasks = max(1, max_tasks)
         print(f"🎯 Max concurrent tasks set to: {self.max_concurrent_tasks}")
         
-        # Process queue if we can now run more tasks
-        self._process_task_queue()
+        # Resize the worker pool; queued tasks start as soon as workers free up
+        self.engine.set_max_workers(self.max_concurrent_tasks)
     
     def get_task_statistics(self) -> Dict[str, Any]:
         """Get task execution statistics"""
-        total_completed = len(self.completed_tasks)
-        successful_tasks = len([t for t in self.completed_tasks if t.get('success', False)])
-        failed_tasks = total_completed - successful_tasks
-        
-        # Calculate average duration for successful tasks
-        successful_with_duration = [t for t in self.completed_tasks 
-                                  if t.get('success', False) and 'duration' in t]
-        avg_duration = (sum(t['duration'] for t in successful_with_duration) / 
-                       len(successful_with_duration)) if successful_with_duration else 0
-        
-        # Total earnings
-        total_earnings = sum(t.get('reward', 0) for t in self.completed_tasks)
-        
         return {
-            'total_completed': total_completed,
-            'successful_tasks': successful_tasks,
-            'failed_tasks': failed_tasks,
-            'success_rate': (successful_tasks / total_completed) if total_completed > 0 else 0,
-            'average_duration': avg_duration,
-            'total_earnings': total_earnings,
+            **self.completed_tasks.get_statistics(),
             'current_active': len(self.current_tasks),
-            'current_queued': len(self.task_queue)
+            'current_queued': self.engine.queued_count()
         }
     
     def clear_completed_tasks(self, keep_recent: int = 100):
-        """Clear old completed tasks to save memory"""
-        if len(self.completed_tasks) > keep_recent:
-            removed_count = len(self.completed_tasks) - keep_recent
-            self.completed_tasks = self.completed_tasks[-keep_recent:]
+        """Clear old completed tasks to save memory (lifetime statistics are kept)"""
+        removed_count = self.completed_tasks.trim(keep_recent)
+        if removed_count:
             print(f"🗑️ Cleared {removed_count} old completed tasks")
     
     def export_task_history(self, filepath: str):
@@ -350,22 +338,24 @@ class TaskScheduler:
         try:
             import json
             
-            export_data = {
-                'completed_tasks': [
-                    {
-                        **task,
-                        'start_time': task['start_time'].isoformat() if isinstance(task.get('start_time'), datetime) else task.get('start_time'),
-                        'end_time': task['end_time'].isoformat() if isinstance(task.get('end_time'), datetime) else task.get('end_time'),
-                        'failed_at': task['failed_at'].isoformat() if isinstance(task.get('failed_at'), datetime) else task.get('failed_at')
-                    }
-                    for task in self.completed_tasks
-                ],
-                'statistics': self.get_task_statistics(),
-                'exported_at': datetime.now().isoformat()
-            }
+            def _iso(value):
+                return value.isoformat() if isinstance(value, datetime) else value
             
+            # Stream records straight from the store instead of building one big document
             with open(filepath, 'w') as f:
-                json.dump(export_data, f, indent=2, default=str)
+                f.write('{\n  "completed_tasks": [')
+                for i, task in enumerate(self.completed_tasks):
+                    record = {
+                        **task,
+                        'start_time': _iso(task.get('start_time')),
+                        'end_time': _iso(task.get('end_time')),
+                        'failed_at': _iso(task.get('failed_at'))
+                    }
+                    f.write(',\n    ' if i else '\n    ')
+                    f.write(json.dumps(record, default=str))
+                f.write('\n  ],\n  "statistics": ')
+                f.write(json.dumps(self.get_task_statistics(), default=str))
+                f.write(f',\n  "exported_at": {json.dumps(datetime.now().isoformat())}\n}}\n')
             
             print(f"📄 Task history exported to {filepath}")
             return True
@@ -378,14 +368,9 @@ class TaskScheduler:
         print("🛑 Stopping task scheduler...")
         self.running = False
         
-        # Cancel all current tasks
-        for task_id in list(self.current_tasks.keys()):
-            self.cancel_task(task_id)
-        
-        # Wait for threads to complete
-        for thread in list(self.executor_threads.values()):
-            if thread.is_alive():
-                thread.join(timeout=5)
+        # Cancel all running and queued tasks and wait for the workers
+        self.engine.shutdown(cancel_pending=True, timeout=5)
+        self.current_tasks.clear()
 
         if self._thread and self._thread.is_alive():
             self._thread.join(timeout=5)